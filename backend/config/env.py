@@ -1,5 +1,6 @@
 import os
 from logging import getLogger
+from typing import Optional
 
 from pydantic import SecretStr
 
@@ -20,6 +21,18 @@ class Env:
     OPEN_ROUTE_API_KEY: SecretStr = SecretStr(os.environ["OPEN_ROUTE_API_KEY"])
     OPENAI_API_KEY: SecretStr = SecretStr(os.environ["OPENAI_API_KEY"])
     DEEPSEEK_API_KEY: SecretStr = SecretStr(os.environ["DEEPSEEK_API_KEY"])
+    COMMAND_CACHE_DIR: Optional[str] = os.environ.get("COMMAND_CACHE_DIR")
+    WORKSPACE_DIR: Optional[str] = os.environ.get("WORKSPACE_DIR")
+    WORKSPACE_TEMPLATE: Optional[str] = os.environ.get("WORKSPACE_TEMPLATE")
+    FILE_DURABILITY: str = os.environ.get("FILE_DURABILITY", "none")
+    ASSET_DIR: Optional[str] = os.environ.get("ASSET_DIR")
+    ASSET_BUCKET: Optional[str] = os.environ.get("ASSET_BUCKET")
+    ARTIFACT_DIR: Optional[str] = os.environ.get("ARTIFACT_DIR")
+    ARTIFACT_BUCKET: Optional[str] = os.environ.get("ARTIFACT_BUCKET")
+    FILE_OVERLAY: bool = os.environ.get("FILE_OVERLAY", "false").lower() == "true"
+    READ_CACHE_SKIP_UNCHANGED: bool = (
+        os.environ.get("READ_CACHE_SKIP_UNCHANGED", "false").lower() == "true"
+    )
 
 
 env = Env()
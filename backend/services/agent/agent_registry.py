@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+from typing import Dict, Any, Type
+
+from backend.config.enum import TeamEnum
+from backend.services.agent.base_agent import BaseAgent
+from backend.services.agent.frontend_agent import FrontendAgent
+from backend.services.agent.graphic_designer_agent import GraphicDesignerAgent
+from backend.services.agent.manager_agent import ManagerAgent
+from backend.services.agent.planner_agent import PlannerAgent
+from backend.services.exception.app_exception import AppException
+
+logger = logging.getLogger(__name__)
+
+
+class AgentRegistry:
+    """
+    Registry of agents built once per team and reused across tasks.
+
+    Building an agent renders the system prompt templates, creates the LLM
+    client and compiles the agent graph. The registry keeps one instance per
+    team so that work is done once; each task only creates its own messages.
+    """
+
+    agent_classes: Dict[TeamEnum, Type[BaseAgent]] = {
+        TeamEnum.MANAGER: ManagerAgent,
+        TeamEnum.FRONTEND_DEVELOPER: FrontendAgent,
+        TeamEnum.PLANNER: PlannerAgent,
+        TeamEnum.GRAPHIC_DESIGNER: GraphicDesignerAgent,
+    }
+
+    def __init__(self) -> None:
+        self._agents: Dict[TeamEnum, BaseAgent] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def get_agent(self, team: TeamEnum) -> BaseAgent:
+        """
+        Get the agent for a team, building and caching it on first use.
+
+        Args:
+            team: Team the agent works for
+
+        Returns:
+            The cached agent instance
+        """
+        start = time.perf_counter()
+        with self._lock:
+            agent = self._agents.get(team)
+            stats = self._stats.setdefault(
+                team.value,
+                {"builds": 0, "hits": 0, "build_seconds": 0.0, "hit_seconds": 0.0},
+            )
+            if agent is not None:
+                stats["hits"] += 1
+                stats["hit_seconds"] += time.perf_counter() - start
+                return agent
+
+            agent_class = self.agent_classes.get(team)
+            if agent_class is None:
+                raise AppException(f"No agent registered for team: {team.value}")
+            agent = agent_class()
+            agent.get_agent()
+            elapsed = time.perf_counter() - start
+            stats["builds"] += 1
+            stats["build_seconds"] += elapsed
+            self._agents[team] = agent
+        logger.info(f"Agent for {team.value} built in {elapsed:.3f}s")
+        return agent
+
+    def warm_up(self, teams: list[TeamEnum]) -> None:
+        """
+        Build agents ahead of the first task.
+
+        Args:
+            teams: Teams whose agents should be built
+        """
+        for team in teams:
+            self.get_agent(team)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-team setup statistics.
+
+        Returns:
+            Build and cache hit counts with the time spent on each, per team
+        """
+        with self._lock:
+            return {team: dict(stats) for team, stats in self._stats.items()}
+
+    def clear(self) -> None:
+        """Drop all cached agents so they are rebuilt on next use."""
+        with self._lock:
+            self._agents.clear()
+
+
+agent_registry = AgentRegistry()
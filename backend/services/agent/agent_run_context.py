@@ -0,0 +1,10 @@
+from dataclasses import dataclass
+
+from backend.services.agent.budget import BudgetTracker
+
+
+@dataclass
+class AgentRunContext:
+    """Per-run state passed to the compiled agent as its runtime context."""
+
+    budget: BudgetTracker
@@ -2,8 +2,9 @@ from backend.services.helper.system_prompt.system_prompt_helper import (
     SystemPromptHelper,
 )
 from backend.services.agent.base_agent import BaseAgent
+from backend.services.agent.budget import Budget
 from backend.config.enum import TeamEnum
-from typing import List
+from typing import List, Optional
 
 
 class BackendAgent(BaseAgent):
@@ -17,7 +18,7 @@ class BackendAgent(BaseAgent):
             role=self.role, teams=self.teams
         ).get_system_prompt()
 
-    def start_task(self, task: str):
+    def start_task(self, task: str, budget: Optional[Budget] = None):
         pass
 
     def resume_task(self, task_id: str):
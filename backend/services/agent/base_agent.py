@@ -1,10 +1,22 @@
 from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from langchain.agents import create_agent
+
+from backend.services.agent.agent_run_context import AgentRunContext
+from backend.services.agent.budget import Budget, BudgetTracker
+from backend.services.agent.middleware.budget_middleware import BudgetMiddleware
 
 
 class BaseAgent(ABC):
+    name: str
+    system_prompt: str
+    model: Any = None
+    budget: Budget = Budget()
+    _compiled_agent: Any = None
 
     @abstractmethod
-    def start_task(self, task: str):
+    def start_task(self, task: str, budget: Optional[Budget] = None):
         pass
 
     @abstractmethod
@@ -13,3 +25,73 @@ class BaseAgent(ABC):
 
     def get_system_prompt_and_message(self):
         return "test", "test message"
+
+    def _build_agent(self) -> Any:
+        """
+        Build the compiled agent graph for this agent.
+
+        The default is a tool-less `create_agent` graph on the agent's model
+        and system prompt under a BudgetMiddleware; agents with tools or a
+        response format override it. It is called once per instance; the
+        result is reused for every task.
+        """
+        return create_agent(
+            name=self.name,
+            model=self.model,
+            system_prompt=self.system_prompt,
+            context_schema=AgentRunContext,
+            middleware=[BudgetMiddleware()],
+        )
+
+    def get_agent(self) -> Any:
+        """
+        Get the compiled agent graph, building it on first use.
+
+        Returns:
+            The compiled agent graph
+        """
+        if self._compiled_agent is None:
+            self._compiled_agent = self._build_agent()
+        return self._compiled_agent
+
+    def _invoke_agent(
+        self,
+        agent_input: Dict[str, Any],
+        budget: Optional[Budget] = None,
+        config: Optional[Dict[str, Any]] = None,
+        on_message_chunk: Optional[Callable[[Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the compiled agent once under a budget.
+
+        Args:
+            agent_input: Input state for the agent, including messages
+            budget: Limits for this run (default: the agent's budget)
+            config: Runnable config passed to invoke (optional)
+            on_message_chunk: Called with each LLM message chunk as it is
+                streamed (optional). Without it the agent is invoked unstreamed.
+
+        Returns:
+            Agent result with the budget usage under the "budget" key
+        """
+        tracker = BudgetTracker(budget or self.budget)
+        context = AgentRunContext(budget=tracker)
+        result: Dict[str, Any]
+        if on_message_chunk is None:
+            result = self.get_agent().invoke(
+                agent_input, config=config, context=context
+            )
+        else:
+            result = {}
+            for mode, data in self.get_agent().stream(
+                agent_input,
+                config=config,
+                context=context,
+                stream_mode=["messages", "values"],
+            ):
+                if mode == "messages":
+                    on_message_chunk(data[0])
+                else:
+                    result = data
+        result["budget"] = tracker.to_json()
+        return result
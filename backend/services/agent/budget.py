@@ -0,0 +1,119 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Resource limits for a single agent run. `None` means no limit."""
+
+    max_tokens: Optional[int] = 500_000
+    max_cost: Optional[float] = None  # USD
+    max_wall_seconds: Optional[float] = 1800  # 30 minutes
+    max_llm_calls: Optional[int] = 50
+    max_tool_calls: Optional[int] = 100
+    input_cost_per_million: float = 0.0  # USD per million input tokens
+    output_cost_per_million: float = 0.0  # USD per million output tokens
+
+
+class BudgetTracker:
+    """
+    Tracks resource usage of an agent run against a Budget.
+
+    The tracker is created per run and shared by the budget middleware hooks,
+    which record usage after each LLM and tool call and check the limits
+    before the next step.
+    """
+
+    def __init__(self, budget: Budget):
+        """
+        Initialize BudgetTracker.
+
+        Args:
+            budget: Limits for the run
+        """
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.exceeded: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def cost(self) -> float:
+        return (
+            self.input_tokens * self.budget.input_cost_per_million
+            + self.output_tokens * self.budget.output_cost_per_million
+        ) / 1_000_000
+
+    @property
+    def wall_seconds(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def record_llm_call(self, usage_metadata: Optional[Mapping[str, Any]]) -> None:
+        """
+        Record an LLM call and its token usage.
+
+        Args:
+            usage_metadata: Token usage reported on the AI message (optional)
+        """
+        with self._lock:
+            self.llm_calls += 1
+            if usage_metadata:
+                self.input_tokens += usage_metadata.get("input_tokens", 0)
+                self.output_tokens += usage_metadata.get("output_tokens", 0)
+
+    def record_tool_call(self) -> None:
+        """Record a tool invocation."""
+        with self._lock:
+            self.tool_calls += 1
+
+    def check(self) -> Optional[str]:
+        """
+        Check whether the next step would exceed the budget.
+
+        Returns:
+            Reason the budget is exceeded, or None if within budget
+        """
+        budget = self.budget
+        reason = None
+        if budget.max_tokens is not None and self.total_tokens >= budget.max_tokens:
+            reason = f"token limit of {budget.max_tokens} reached"
+        elif budget.max_cost is not None and self.cost >= budget.max_cost:
+            reason = f"cost limit of ${budget.max_cost} reached"
+        elif (
+            budget.max_wall_seconds is not None
+            and self.wall_seconds >= budget.max_wall_seconds
+        ):
+            reason = f"wall clock limit of {budget.max_wall_seconds}s reached"
+        elif (
+            budget.max_llm_calls is not None and self.llm_calls >= budget.max_llm_calls
+        ):
+            reason = f"LLM call limit of {budget.max_llm_calls} reached"
+        elif (
+            budget.max_tool_calls is not None
+            and self.tool_calls >= budget.max_tool_calls
+        ):
+            reason = f"tool call limit of {budget.max_tool_calls} reached"
+        if reason and not self.exceeded:
+            self.exceeded = reason
+        return reason
+
+    def to_json(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+            "cost": round(self.cost, 6),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "exceeded": self.exceeded,
+        }
@@ -2,41 +2,161 @@ from backend.services.helper.system_prompt.system_prompt_helper import (
     SystemPromptHelper,
 )
 from backend.config.enum import TeamEnum
+from backend.config.env import env
 from langchain.agents import create_agent
 from backend.services.ai.deepseek_ai import DeepseekAI
+from backend.services.tool.artifact_store import shared_artifact_store
+from backend.services.tool.change_feed_tool import ChangeFeedTool
+from backend.services.tool.command_audit_log import command_audit_log
 from backend.services.tool.command_tool import CommandTool
-from langchain.messages import SystemMessage, HumanMessage, ToolMessage
+from backend.services.tool.diagnostics_tool import DiagnosticsTool
+from backend.services.tool.file_tool import FileTool
+from backend.services.tool.resource_limits import ResourceLimits
+from backend.services.tool.search_tool import SearchTool
+from backend.services.tool.workspace_manager import WorkspaceManager
+from langchain.agents.middleware import AgentMiddleware, ModelCallLimitMiddleware
+from langchain.messages import SystemMessage, HumanMessage
 from backend.services.agent.base_agent import BaseAgent
-from typing import Dict, Any, List
+from backend.services.agent.agent_run_context import AgentRunContext
+from backend.services.agent.budget import Budget
+from backend.services.agent.middleware.budget_middleware import BudgetMiddleware
+from typing import Dict, Any, List, Mapping, Optional
+from contextvars import ContextVar
+from uuid import uuid4
 import json
 import logging
-from langchain.tools import tool
+import os
+from langchain.tools import BaseTool, tool
+from backend.services.agent.middleware.loop_detection_middleware import (
+    LoopDetectionMiddleware,
+)
 
 logger = logging.getLogger(__name__)
 
+# Shell session of the task run in the current context; the agent instance is
+# shared between concurrent runs, so it cannot be kept on self
+_run_session_id: ContextVar[Optional[str]] = ContextVar(
+    "frontend_run_session_id", default=None
+)
+# Workspace directory of the task run in the current context
+_run_workspace: ContextVar[Optional[str]] = ContextVar(
+    "frontend_run_workspace", default=None
+)
+
 
 class FrontendAgent(BaseAgent):
     name: str = "Elizabeth"
     role: TeamEnum = TeamEnum.FRONTEND_DEVELOPER
     teams: List[TeamEnum] = []
 
-    def __init__(self):
+    # Configuration
+    MAX_ITERATIONS = 25  # LLM calls per task
+    MAX_TOOL_REPEATS = 3  # identical tool calls per task
+    GRAPH_STEPS_PER_ITERATION = 10  # upper bound of graph nodes run per LLM call
+    # No address space limit: node reserves far more virtual memory than it uses
+    COMMAND_LIMITS = ResourceLimits(cpu_seconds=900, open_files=4096)
+    # Tools served from the run's file overlay; any other tool reads the disk,
+    # so pending file changes are flushed before it runs
+    OVERLAY_TOOLS = ("file_batch", "file_patcher")
+
+    def __init__(
+        self,
+        max_iterations: int = MAX_ITERATIONS,
+        max_tool_repeats: int = MAX_TOOL_REPEATS,
+    ):
+        self.max_iterations = max_iterations
+        self.max_tool_repeats = max_tool_repeats
         self.system_prompt_helper = SystemPromptHelper(role=self.role, teams=self.teams)
         self.system_prompt = self.system_prompt_helper.get_system_prompt()
+        self.system_message = self.system_prompt_helper.get_system_message(
+            content="You are a frontend developer agent. Your role is to build and maintain the user interface of applications."
+        )
         self.model = DeepseekAI().get_model()
-        self.command_tool = CommandTool()
+        self.artifact_store = shared_artifact_store()
+        self.command_tool = CommandTool(
+            reduce_output=True,
+            cache_dir=env.COMMAND_CACHE_DIR,
+            resource_limits=self.COMMAND_LIMITS,
+            audit_log=command_audit_log,
+            artifact_store=self.artifact_store,
+        )
+        self.diagnostics_tool = DiagnosticsTool()
+        self.search_tool = SearchTool()
+        self.change_feed_tool = ChangeFeedTool()
+        self.file_tool = FileTool(
+            durability=env.FILE_DURABILITY,
+            change_listener=self.search_tool.file_changed,
+            artifact_store=self.artifact_store,
+        )
+        # Tools that work on files of the run's workspace, by tool name
+        self.workspace_tools = {
+            "code_diagnostics": self.diagnostics_tool.invoke,
+            "file_batch": self.file_tool.invoke_batch,
+            "file_patcher": self.file_tool.invoke_patch,
+            "file_glob": self.search_tool.invoke_glob,
+            "code_grep": self.search_tool.invoke_grep,
+            "symbol_lookup": self.search_tool.invoke_symbols,
+            "workspace_changes": self.change_feed_tool.invoke,
+        }
+        self.workspace_manager = (
+            WorkspaceManager(env.WORKSPACE_DIR) if env.WORKSPACE_DIR else None
+        )
+        self.workspace_template = env.WORKSPACE_TEMPLATE
+        # Keep file changes of a run in memory until a checkpoint
+        self.file_overlay = env.FILE_OVERLAY
+        # Answer rereads of unchanged files with a short note
+        self.skip_unchanged_reads = env.READ_CACHE_SKIP_UNCHANGED
         self.tools = self._initialize_tools()
 
-    def _initialize_tools(self) -> List[Dict[str, Any]]:
+    def _initialize_tools(self) -> List[BaseTool]:
         """
         Initialize available tools for the agent.
 
+        Each tool is executed by create_agent's own tool loop and dispatched
+        through `_handle_tool_call`.
+
+        Returns:
+            List of tools
+        """
+        return [
+            self._to_tool(definition)
+            for definition in [
+                self.command_tool.get_tool_definition(),
+                self.command_tool.get_batch_tool_definition(),
+                self.diagnostics_tool.get_tool_definition(),
+                self.file_tool.get_batch_tool_definition(),
+                self.file_tool.get_patch_tool_definition(),
+                self.search_tool.get_glob_tool_definition(),
+                self.search_tool.get_grep_tool_definition(),
+                self.search_tool.get_symbol_tool_definition(),
+                self.change_feed_tool.get_tool_definition(),
+            ]
+        ]
+
+    def _to_tool(self, definition: Dict[str, Any]) -> BaseTool:
+        """
+        Convert a tool definition into a LangChain tool.
+
+        Args:
+            definition: Tool definition with name, description and inputSchema
+
         Returns:
-            List of tool definitions
+            Tool that calls `_handle_tool_call` with the definition name
         """
-        return [self.command_tool.get_tool_definition()]
+        tool_name = definition["name"]
+
+        def run_tool(**tool_input: Any) -> str:
+            logger.info(f"Calling tool: {tool_name} with input: {tool_input}")
+            return self._handle_tool_call(tool_name, tool_input)
+
+        langchain_tool: BaseTool = tool(
+            tool_name,
+            description=definition["description"],
+            args_schema=definition["inputSchema"],
+        )(run_tool)
+        return langchain_tool
 
-    def _handle_tool_call(self, tool_name: str, tool_input: Dict[str, Any]) -> str:
+    def _handle_tool_call(self, tool_name: str, tool_input: Mapping[str, Any]) -> str:
         """
         Handle tool calls from the agent.
 
@@ -47,31 +167,99 @@ class FrontendAgent(BaseAgent):
         Returns:
             Tool execution result as string
         """
+        if tool_name not in self.OVERLAY_TOOLS:
+            self._checkpoint()
         if tool_name == "command_executor":
             if not isinstance(tool_input, dict):
                 return json.dumps(
                     {"error": "Invalid input format for command_executor"}
                 )
-            command = tool_input.get("command")
-            shell = tool_input.get("shell", False)
-
-            # Auto-detect if shell is needed (contains shell operators)
-            shell_operators = ("&&", "||", "|", ">", "<", "&", "$")
-            if not shell and command and any(op in command for op in shell_operators):
-                shell = True
-                logger.info(
-                    f"Auto-enabling shell mode due to shell operators in command: {command}"
-                )
-
+            tool_input = self._detect_shell(tool_input)
+            session_id = None if tool_input.get("cache") else _run_session_id.get()
             result = self.command_tool.execute_command(
-                command=command,
-                cwd=tool_input.get("cwd"),
-                shell=shell,
+                command=tool_input.get("command"),
+                # The run's session starts in its workspace and keeps its own cwd
+                cwd=tool_input.get("cwd")
+                or (None if session_id else _run_workspace.get()),
+                shell=tool_input["shell"],
+                timeout=tool_input.get("timeout"),
+                session_id=session_id,
+                cache=tool_input.get("cache", False),
+                cache_inputs=tool_input.get("cache_inputs"),
+                cache_artifacts=tool_input.get("cache_artifacts"),
+                cache_root=_run_workspace.get(),
+                run_id=_run_session_id.get(),
             )
+            self._sync_changes()  # the command may have changed files
             return json.dumps(result)
+        elif tool_name == "command_batch_executor":
+            commands = (
+                tool_input.get("commands") if isinstance(tool_input, dict) else None
+            )
+            if not isinstance(commands, list):
+                return json.dumps(
+                    {"error": "Invalid input format for command_batch_executor"}
+                )
+            workspace = _run_workspace.get()
+            batch_result = self.command_tool.invoke_batch(
+                {
+                    "commands": [
+                        (
+                            self._detect_shell(
+                                {**entry, "cwd": entry.get("cwd") or workspace}
+                            )
+                            if isinstance(entry, dict)
+                            else entry
+                        )
+                        for entry in commands
+                    ]
+                },
+                run_id=_run_session_id.get(),
+                cache_root=workspace,
+            )
+            self._sync_changes()
+            return json.dumps(batch_result)
+        elif tool_name in self.workspace_tools:
+            if not isinstance(tool_input, dict):
+                return json.dumps({"error": f"Invalid input format for {tool_name}"})
+            cwd = tool_input.get("cwd") or _run_workspace.get() or os.getcwd()
+            output = self.workspace_tools[tool_name]({**tool_input, "cwd": cwd})
+            return json.dumps(output)
         else:
             return json.dumps({"error": f"Unknown tool: {tool_name}"})
 
+    def _checkpoint(self) -> None:
+        """Flush the file changes the run kept in memory to its workspace."""
+        workspace = _run_workspace.get()
+        if workspace:
+            self.file_tool.flush_overlay(workspace)
+
+    def _sync_changes(self) -> None:
+        """Pass the file changes of a command on to the index and read cache."""
+        workspace = _run_workspace.get()
+        if not (workspace and self.change_feed_tool.sync(workspace)):
+            self.search_tool.mark_stale()
+
+    def _workspace_file_changed(self, path: str) -> None:
+        """Update the search index and read cache for a changed file."""
+        self.search_tool.file_changed(path)
+        self.file_tool.invalidate_reads(path)
+
+    @staticmethod
+    def _detect_shell(tool_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Enable shell mode for commands that contain shell operators."""
+        command = tool_input.get("command")
+        shell = tool_input.get("shell", False)
+
+        # Auto-detect if shell is needed (contains shell operators)
+        shell_operators = ("&&", "||", "|", ">", "<", "&", "$")
+        if not shell and command and any(op in command for op in shell_operators):
+            shell = True
+            logger.info(
+                f"Auto-enabling shell mode due to shell operators in command: {command}"
+            )
+        return {**tool_input, "shell": shell}
+
     def execute_command(
         self, command: str, cwd: str | None = None, shell: bool = False
     ) -> Dict[str, Any]:
@@ -91,66 +279,106 @@ class FrontendAgent(BaseAgent):
         )
         return result
 
-    def start_task(self, task: str):
-        agent = create_agent(
+    def _build_agent(self):
+        middleware: List[AgentMiddleware[Any, Any, Any]] = [
+            BudgetMiddleware(),
+            ModelCallLimitMiddleware(
+                run_limit=self.max_iterations, exit_behavior="end"
+            ),
+            LoopDetectionMiddleware(max_repeats=self.max_tool_repeats),
+        ]
+        return create_agent(
             name=self.name,
             model=self.model,
             tools=self.tools,
             system_prompt=self.system_prompt,
+            context_schema=AgentRunContext,
+            middleware=middleware,
         )
-        system_message = self.system_prompt_helper.get_system_message(
-            content="You are a frontend developer agent. Your role is to build and maintain the user interface of applications."
-        )
+
+    def start_task(self, task: str, budget: Optional[Budget] = None):
+        # Commands of this run share one shell, so cd/exports carry over;
+        # background processes they start are terminated when the run ends
+        session_id = str(uuid4())
+        workspace = self._create_workspace(session_id)
+        if workspace:
+            task = f"{task}\n\nWork in the project directory {workspace}"
         messages = [
-            SystemMessage(content=system_message),
+            SystemMessage(content=self.system_message),
             HumanMessage(content=task),
         ]
 
-        # Run agent in a loop to handle tool calls
-        while True:
-            result = agent.invoke(
+        if workspace and self.file_overlay:
+            self.file_tool.open_overlay(workspace)
+        if workspace:
+            self.file_tool.open_read_cache(
+                workspace, skip_unchanged=self.skip_unchanged_reads
+            )
+            self.change_feed_tool.open_workspace(
+                workspace, change_listener=self._workspace_file_changed
+            )
+        self.command_tool.open_session(session_id, cwd=workspace)
+        token = _run_session_id.set(session_id)
+        workspace_token = _run_workspace.set(workspace)
+        completed = False
+        try:
+            # create_agent runs the model <-> tool loop; middleware bounds it
+            result = self._invoke_agent(
                 {
                     "messages": messages,
                     "user_preferences": {"style": "technical", "verbosity": "detailed"},
-                }
+                },
+                budget=budget,
+                config={
+                    "recursion_limit": self.max_iterations
+                    * self.GRAPH_STEPS_PER_ITERATION
+                },
             )
+            completed = True
+        finally:
+            _run_session_id.reset(token)
+            _run_workspace.reset(workspace_token)
+            leaked = self.command_tool.reap_run(session_id)
+            if workspace:
+                # Changes of a failed run are dropped, not left half-written
+                file_changes = self.file_tool.close_overlay(workspace, flush=completed)
+                self.file_tool.close_read_cache(workspace)
+                self.change_feed_tool.close_workspace(workspace)
+                self.diagnostics_tool.close_workspace(workspace)
+                self.search_tool.close_workspace(workspace)
+                if self.workspace_manager is not None:
+                    self.workspace_manager.release_workspace(session_id)
 
-            # Update messages with agent response
-            if "messages" in result:
-                messages = result["messages"]
-                last_message = messages[-1]
-                last_message.pretty_print()
-                logger.info(f"Agent response: {last_message}")
-
-                # Check if the last message contains tool use
-                if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-                    for tool_call in last_message.tool_calls:
-                        tool_name = tool_call.get("name") or tool_call.get("tool")
-                        tool_input = tool_call.get("args") or tool_call.get("input")
-
-                        logger.info(
-                            f"Calling tool: {tool_name} with input: {tool_input}"
-                        )
-
-                        # Execute the tool
-                        tool_result = self._handle_tool_call(tool_name, tool_input)
+        result["leaked_processes"] = leaked
+        if workspace:
+            result["workspace"] = workspace
+        if workspace and file_changes:
+            result["file_changes"] = file_changes["changes"]
 
-                        # Add tool message to messages
-                        messages.append(
-                            ToolMessage(
-                                content=tool_result,
-                                tool_call_id=tool_call.get("id"),
-                                name=tool_name,
-                            )
-                        )
-                        logger.info(f"Tool result: {tool_result}")
-                else:
-                    # No more tool calls, exit loop
-                    logger.info("Agent completed task, no more tool calls")
-                    break
-            else:
-                break
+        logger.info(
+            f"Agent completed task with {result['budget']['llm_calls']} LLM call(s)"
+        )
         return result
 
+    def _create_workspace(self, run_id: str) -> Optional[str]:
+        """
+        Create the workspace of a run from the configured template.
+
+        Args:
+            run_id: Identifier of the run, used as the workspace name
+
+        Returns:
+            Path of the workspace, or None without a workspace manager
+        """
+        if self.workspace_manager is None:
+            return None
+        try:
+            return self.workspace_manager.create_workspace(
+                self.workspace_template, workspace_id=run_id
+            )
+        except ValueError as e:
+            logger.warning(f"{e}, starting from an empty workspace")
+            return self.workspace_manager.create_workspace(workspace_id=run_id)
+
     def resume_task(self, task_id: str):
         pass
@@ -2,13 +2,20 @@ from backend.services.helper.system_prompt.system_prompt_helper import (
     SystemPromptHelper,
 )
 from backend.services.agent.base_agent import BaseAgent
+from backend.services.agent.agent_run_context import AgentRunContext
+from backend.services.agent.budget import Budget
+from backend.services.agent.middleware.budget_middleware import BudgetMiddleware
 from backend.config.enum import TeamEnum
+from backend.config.env import env
 from backend.services.ai.open_ai import OpenAI, ModelEnum
-from typing import List
+from backend.services.aws.s3_storage import S3Storage
+from backend.services.tool.asset_writer import AssetRef, AssetWriter
+from typing import Any, List, Optional
 from langchain.agents import create_agent
-from langchain.messages import SystemMessage, HumanMessage, ToolMessage
-import base64
-from IPython.display import Image
+from langchain.messages import AIMessage, SystemMessage, HumanMessage, ToolMessage
+import logging
+
+logger = logging.getLogger(__name__)
 
 # https://docs.langchain.com/oss/python/integrations/chat/openai#image-generation
 
@@ -19,37 +26,103 @@ class GraphicDesignerAgent(BaseAgent):
     teams: List[TeamEnum] = []
 
     def __init__(self) -> None:
-        self.system_prompt = SystemPromptHelper(
-            role=self.role, teams=self.teams
-        ).get_system_prompt()
+        self.system_prompt_helper = SystemPromptHelper(role=self.role, teams=self.teams)
+        self.system_prompt = self.system_prompt_helper.get_system_prompt()
+        self.system_message = self.system_prompt_helper.get_system_message(
+            content="You are a graphic designer agent. Your role is to create compelling visual content that aligns with the company's branding guidelines and marketing strategies."
+        )
         self.model = OpenAI(ModelEnum.GPT_5).get_model()
         self.model = self.model.bind_tools(self.__set_image_tools())
-        self.system_prompt_helper = SystemPromptHelper(role=self.role, teams=self.teams)
+        self.asset_writer = self._create_asset_writer()
+
+    @staticmethod
+    def _create_asset_writer() -> Optional[AssetWriter]:
+        """Asset writer for generated images, to S3 or else a directory."""
+        if env.ASSET_BUCKET:
+            return AssetWriter(storage=S3Storage(env.ASSET_BUCKET))
+        if env.ASSET_DIR:
+            return AssetWriter(directory=env.ASSET_DIR, durability=env.FILE_DURABILITY)
+        return None
 
     def __set_image_tools(self) -> list[dict]:
         return [{"type": "image_generation", "quality": "low"}]
 
-    def start_task(self, task: str):
-        agent = create_agent(
+    def _build_agent(self):
+        return create_agent(
             name=self.name,
             model=self.model,
             system_prompt=self.system_prompt,
+            context_schema=AgentRunContext,
+            middleware=[BudgetMiddleware()],
         )
-        system_message = self.system_prompt_helper.get_system_message(
-            content="You are a graphic designer agent. Your role is to create compelling visual content that aligns with the company's branding guidelines and marketing strategies."
-        )
+
+    def start_task(self, task: str, budget: Optional[Budget] = None):
         messages = [
-            SystemMessage(content=system_message),
+            SystemMessage(content=self.system_message),
             HumanMessage(content=task),
         ]
-        result = agent.invoke(
+        result = self._invoke_agent(
             {
                 "messages": messages,
                 "user_preferences": {"style": "technical", "verbosity": "detailed"},
-            }
+            },
+            budget=budget,
         )
-        breakpoint()
+        if self.asset_writer is not None:
+            result["assets"] = self._store_images(result["messages"])
         return result
 
+    def _store_images(self, messages: List[Any]) -> List[AssetRef]:
+        """
+        Store the images generated in a run and drop their base64 payloads.
+
+        Each image block keeps an `asset` reference in place of its payload,
+        so the messages stay small wherever they are kept afterwards.
+
+        Args:
+            messages: Messages of the run
+
+        Returns:
+            References of the stored images, in message order
+        """
+        assets = []
+        for message in messages:
+            if not isinstance(message, AIMessage):
+                continue
+            blocks = message.content if isinstance(message.content, list) else []
+            for block in [*blocks, *message.additional_kwargs.get("tool_outputs", [])]:
+                asset = self._store_image(block)
+                if asset is not None:
+                    assets.append(asset)
+        return assets
+
+    def _store_image(self, block: Any) -> Optional[AssetRef]:
+        """Store the image of a content block, if it has one."""
+        asset_writer = self.asset_writer
+        if asset_writer is None or not isinstance(block, dict):
+            return None
+        # Responses API image_generation_call blocks, or standard image blocks
+        block_type = block.get("type")
+        key = (
+            {"image_generation_call": "result", "image": "base64"}.get(block_type)
+            if isinstance(block_type, str)
+            else None
+        )
+        if not key or not isinstance(block.get(key), str):
+            return None
+        media_type = block.get("mime_type")
+        if not media_type and block.get("output_format"):
+            media_type = f"image/{block['output_format']}"
+        try:
+            asset = asset_writer.write_base64(
+                block[key], name=block.get("id"), media_type=media_type
+            )
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not store generated image {block.get('id')}: {e}")
+            return None
+        del block[key]
+        block["asset"] = asset
+        return asset
+
     def resume_task(self, task_id: str):
         pass
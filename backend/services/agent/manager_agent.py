@@ -2,10 +2,11 @@ from backend.services.helper.system_prompt.system_prompt_helper import (
     SystemPromptHelper,
 )
 from backend.config.enum import TeamEnum
-from langchain.agents import create_agent
 from backend.services.ai.deepseek_ai import DeepseekAI
 from langchain.messages import SystemMessage, HumanMessage
 from backend.services.agent.base_agent import BaseAgent
+from backend.services.agent.budget import Budget
+from typing import Optional
 
 
 class ManagerAgent(BaseAgent):
@@ -20,23 +21,19 @@ class ManagerAgent(BaseAgent):
         ).get_system_prompt()
         self.model = DeepseekAI().get_model()
 
-    def start_task(self, task: str):
-        agent = create_agent(
-            name=self.name,
-            model=self.model,
-            system_prompt=self.system_prompt,
-        )
+    def start_task(self, task: str, budget: Optional[Budget] = None):
         messages = [
             SystemMessage(
                 content="You are a manager agent. Your role is to oversee team performance and project delivery."
             ),
             HumanMessage(content=task),
         ]
-        result = agent.invoke(
+        result = self._invoke_agent(
             {
                 "messages": messages,
                 "user_preferences": {"style": "technical", "verbosity": "detailed"},
-            }
+            },
+            budget=budget,
         )
         return result
 
@@ -0,0 +1,76 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from langchain.agents.middleware import AgentMiddleware, AgentState, hook_config
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain.messages import AIMessage, ToolMessage
+
+from backend.services.agent.budget import BudgetTracker
+
+logger = logging.getLogger(__name__)
+
+# Name of the note added when a run stops, so it is not taken for its output
+STOP_MESSAGE_NAME = "budget"
+
+
+class BudgetMiddleware(AgentMiddleware):
+    """
+    Enforce the per-run Budget of an agent.
+
+    The BudgetTracker is read from the run's AgentRunContext, so one compiled
+    agent can serve many runs with separate budgets. Limits are checked before
+    every LLM call and every tool call. When a limit is reached the run jumps
+    to the end, leaving the messages produced so far as the partial result.
+    """
+
+    @staticmethod
+    def _get_tracker(runtime: Any) -> Optional[BudgetTracker]:
+        context = getattr(runtime, "context", None)
+        return getattr(context, "budget", None)
+
+    @hook_config(can_jump_to=["end"])
+    def before_model(self, state: AgentState, runtime: Any) -> Optional[Dict[str, Any]]:
+        tracker = self._get_tracker(runtime)
+        if tracker is None:
+            return None
+        reason = tracker.check()
+        if reason is None:
+            return None
+        logger.warning(f"Budget exceeded, stopping agent run: {reason}")
+        return {
+            "jump_to": "end",
+            "messages": [
+                AIMessage(
+                    content=f"Stopped: budget exceeded ({reason}).",
+                    name=STOP_MESSAGE_NAME,
+                )
+            ],
+        }
+
+    def after_model(self, state: AgentState, runtime: Any) -> Optional[Dict[str, Any]]:
+        tracker = self._get_tracker(runtime)
+        messages = state.get("messages", [])
+        if tracker is not None and messages and isinstance(messages[-1], AIMessage):
+            tracker.record_llm_call(messages[-1].usage_metadata)
+        return None
+
+    def wrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Any],
+    ) -> Any:
+        tracker = self._get_tracker(request.runtime)
+        if tracker is None:
+            return handler(request)
+        reason = tracker.check()
+        if reason is not None:
+            logger.warning(f"Budget exceeded, skipping tool call: {reason}")
+            return ToolMessage(
+                content=json.dumps({"error": f"Budget exceeded: {reason}"}),
+                tool_call_id=request.tool_call["id"],
+                name=request.tool_call["name"],
+                status="error",
+            )
+        tracker.record_tool_call()
+        return handler(request)
@@ -0,0 +1,77 @@
+import json
+import logging
+from collections import Counter
+from typing import Any, Dict, Mapping, Optional
+
+from langchain.agents.middleware import AgentMiddleware, AgentState, hook_config
+from langchain.messages import AIMessage
+
+logger = logging.getLogger(__name__)
+
+
+class LoopDetectionMiddleware(AgentMiddleware):
+    """
+    Stop an agent run when the model keeps repeating the same tool call.
+
+    A tool call is identified by its name and arguments. When the latest model
+    response repeats a call that has already been made `max_repeats` times in
+    the run, the agent jumps to the end instead of executing it again.
+    """
+
+    DEFAULT_MAX_REPEATS = 3
+
+    def __init__(self, max_repeats: int = DEFAULT_MAX_REPEATS):
+        """
+        Initialize LoopDetectionMiddleware.
+
+        Args:
+            max_repeats: Number of identical tool calls allowed per run (default: 3)
+        """
+        super().__init__()
+        if max_repeats <= 0:
+            raise ValueError(f"Max repeats must be positive, got {max_repeats}")
+        self.max_repeats = max_repeats
+
+    @staticmethod
+    def get_signature(tool_call: Mapping[str, Any]) -> str:
+        """
+        Get a stable signature for a tool call.
+
+        Args:
+            tool_call: Tool call with name and args
+
+        Returns:
+            String identifying the tool and its arguments
+        """
+        args = json.dumps(tool_call.get("args") or {}, sort_keys=True, default=str)
+        return f"{tool_call.get('name')}:{args}"
+
+    @hook_config(can_jump_to=["end"])
+    def after_model(self, state: AgentState, runtime: Any) -> Optional[Dict[str, Any]]:
+        messages = state.get("messages", [])
+        if not messages or not isinstance(messages[-1], AIMessage):
+            return None
+
+        previous = Counter(
+            self.get_signature(tool_call)
+            for message in messages[:-1]
+            if isinstance(message, AIMessage)
+            for tool_call in message.tool_calls
+        )
+        for tool_call in messages[-1].tool_calls:
+            signature = self.get_signature(tool_call)
+            if previous[signature] >= self.max_repeats:
+                logger.warning(f"Loop detected, stopping agent run: {signature}")
+                return {
+                    "jump_to": "end",
+                    "messages": [
+                        AIMessage(
+                            content=(
+                                f"Stopped: tool call '{tool_call.get('name')}' was "
+                                f"repeated {previous[signature] + 1} times with "
+                                "identical arguments."
+                            )
+                        )
+                    ],
+                }
+        return None
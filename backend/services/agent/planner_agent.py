@@ -6,11 +6,26 @@ from langchain.agents import create_agent
 from backend.services.ai.deepseek_ai import DeepseekAI
 from langchain.messages import SystemMessage, HumanMessage
 from backend.services.agent.base_agent import BaseAgent
-from typing import Dict, Any, List
+from backend.services.agent.agent_run_context import AgentRunContext
+from backend.services.agent.budget import Budget
+from backend.services.agent.middleware.budget_middleware import BudgetMiddleware
+from typing import Dict, Any, List, Optional, Set, Tuple
+from uuid import UUID
 import logging
 from langchain.tools import tool, ToolRuntime
+from langchain.messages import AIMessageChunk
+from pydantic import ValidationError
 from backend.services.aws.message_db import MessageDB
-from backend.services.aws.task_db import TaskDB, PlannedTaskOutputResponse
+from backend.services.aws.task_db import (
+    TaskDB,
+    PlannedTaskOutput,
+    PlannedTaskOutputResponse,
+)
+from backend.services.helper.structured_output.json_stream_parser import (
+    JsonStreamParser,
+)
+from backend.services.task.task_events import task_events
+from backend.services.tool.artifact_store import shared_artifact_store
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +43,72 @@ def list_all_tasks(runtime: ToolRuntime) -> List[Dict[str, Any]]:
     return [task.to_json() for task in tasks]
 
 
+class PlannedTaskStream:
+    """
+    Persist planned tasks while the planner's structured output is streamed.
+
+    Each PlannedTaskOutput is validated and saved to TaskDB as soon as its
+    JSON object is complete in the token stream, and a task available event is
+    published for it, so early tasks can start while later ones are generated.
+    """
+
+    RESPONSE_TOOL_NAME = PlannedTaskOutputResponse.__name__
+
+    def __init__(self, task_db: TaskDB):
+        self.task_db = task_db
+        self.saved_task_ids: Set[UUID] = set()
+        self._parsers: Dict[Tuple[Any, Any], JsonStreamParser] = {}
+        self._tool_names: Dict[Tuple[Any, Any], str] = {}
+
+    def on_message_chunk(self, chunk: Any) -> None:
+        """
+        Feed a streamed LLM message chunk.
+
+        Args:
+            chunk: Message chunk from the agent stream
+        """
+        if not isinstance(chunk, AIMessageChunk):
+            return
+        # Structured output arrives as tool call arguments or as plain content
+        for tool_call_chunk in chunk.tool_call_chunks:
+            key = (chunk.id, tool_call_chunk.get("index"))
+            name = tool_call_chunk.get("name")
+            if name:
+                self._tool_names[key] = name
+            if self._tool_names.get(key) == self.RESPONSE_TOOL_NAME:
+                self._feed(key, tool_call_chunk.get("args") or "")
+        if isinstance(chunk.content, str) and chunk.content:
+            self._feed((chunk.id, "content"), chunk.content)
+
+    def save_remaining(self, response: PlannedTaskOutputResponse) -> None:
+        """
+        Save tasks from the final response that were not saved while streaming.
+
+        Args:
+            response: Complete structured response of the planner
+        """
+        for task in response.tasks:
+            if task.task_id not in self.saved_task_ids:
+                self._save(task)
+
+    def _feed(self, key: Tuple[Any, Any], text: str) -> None:
+        parser = self._parsers.setdefault(key, JsonStreamParser())
+        for item in parser.feed(text):
+            try:
+                task = PlannedTaskOutput.model_validate_json(item)
+            except ValidationError as e:
+                logger.warning(f"Skipping invalid planned task in stream: {e}")
+                continue
+            if task.task_id not in self.saved_task_ids:
+                self._save(task)
+
+    def _save(self, task: PlannedTaskOutput) -> None:
+        saved_task = self.task_db.save_task(task)
+        self.saved_task_ids.add(task.task_id)
+        logger.info(f"Planned task {task.task_id} saved")
+        task_events.publish_task_available(saved_task)
+
+
 class PlannerAgent(BaseAgent):
     name: str = "Parker"
     role: TeamEnum = TeamEnum.PLANNER
@@ -36,33 +117,42 @@ class PlannerAgent(BaseAgent):
     def __init__(self):
         self.system_prompt_helper = SystemPromptHelper(role=self.role, teams=self.teams)
         self.system_prompt = self.system_prompt_helper.get_system_prompt()
+        self.system_message = self.system_prompt_helper.get_system_message(
+            content="You are a planner agent. Your role is to plan and organize tasks."
+        )
         self.model = DeepseekAI().get_model()
 
-    def start_task(self, task: str):
-        agent = create_agent(
+    def _build_agent(self):
+        return create_agent(
             name=self.name,
             model=self.model,
             tools=[list_all_tasks],
             system_prompt=self.system_prompt,
             response_format=PlannedTaskOutputResponse,
+            context_schema=AgentRunContext,
+            middleware=[BudgetMiddleware()],
         )
-        system_message = self.system_prompt_helper.get_system_message(
-            content="You are a planner agent. Your role is to plan and organize tasks."
-        )
+
+    def start_task(self, task: str, budget: Optional[Budget] = None):
         messages = [
-            SystemMessage(content=system_message),
+            SystemMessage(content=self.system_message),
             HumanMessage(content=task),
         ]
 
+        task_stream = PlannedTaskStream(TaskDB())
         try:
-            result = agent.invoke(
+            result = self._invoke_agent(
                 {
                     "messages": messages,
-                }
+                },
+                budget=budget,
+                on_message_chunk=task_stream.on_message_chunk,
             )
-            MessageDB(self.role).save_message_from_agent_result(result)
             if structured_response := result.get("structured_response"):
-                TaskDB().save_tasks(structured_response)
+                task_stream.save_remaining(structured_response)
+            MessageDB(
+                self.role, artifact_store=shared_artifact_store()
+            ).save_message_from_agent_result(result)
             # Reset retry count on successful invocation
         except Exception as e:
             pass
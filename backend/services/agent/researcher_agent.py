@@ -1,4 +1,3 @@
-from langchain.agents import create_agent
 from langchain.messages import SystemMessage, HumanMessage
 
 from backend.services.helper.system_prompt.system_prompt_helper import (
@@ -7,6 +6,8 @@ from backend.services.helper.system_prompt.system_prompt_helper import (
 from backend.config.enum import TeamEnum
 from backend.services.ai.perplexity_ai import PerplexityAI
 from backend.services.agent.base_agent import BaseAgent
+from backend.services.agent.budget import Budget
+from typing import Optional
 
 
 class ResearcherAgent(BaseAgent):
@@ -20,23 +21,19 @@ class ResearcherAgent(BaseAgent):
         ).get_system_prompt()
         self.model = PerplexityAI().get_model()
 
-    def start_task(self, task: str):
-        agent = create_agent(
-            name=self.name,
-            model=self.model,
-            system_prompt=self.system_prompt,
-        )
+    def start_task(self, task: str, budget: Optional[Budget] = None):
         messages = [
             SystemMessage(
                 content="You are a researcher agent. Your role is to conduct in-depth research to gather relevant information."
             ),
             HumanMessage(content=task),
         ]
-        result = agent.invoke(
+        result = self._invoke_agent(
             {
                 "messages": messages,
                 "user_preferences": {"style": "technical", "verbosity": "detailed"},
-            }
+            },
+            budget=budget,
         )
         return result
 
@@ -1,12 +1,14 @@
 from backend.services.agent.base_agent import BaseAgent
+from backend.services.agent.budget import Budget
 from backend.config.enum import TeamEnum
+from typing import Optional
 
 
 class SocialMediaAgent(BaseAgent):
     name = "Samantha"
     role: TeamEnum = TeamEnum.SOCIAL_MEDIA_MANAGER
 
-    def start_task(self, task: str):
+    def start_task(self, task: str, budget: Optional[Budget] = None):
         pass
 
     def resume_task(self, task_id: str):
@@ -1,5 +1,8 @@
+import json
 from backend.services.aws.dynamo_database import DbManager
 from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
 from uuid import uuid4, UUID
 from datetime import datetime, timezone
 from backend.services.exception.app_exception import AppException
@@ -11,20 +14,36 @@ class Command:
     id: UUID
     cmd: str
     created_at: datetime
+    cwd: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    returncode: Optional[int] = None
+    stdout_bytes: Optional[int] = None
+    stderr_bytes: Optional[int] = None
 
     def to_json(self) -> dict:
         return {
             "id": str(self.id),
             "cmd": self.cmd,
             "created_at": self.created_at.isoformat(),
+            "cwd": self.cwd,
+            "duration_seconds": self.duration_seconds,
+            "returncode": self.returncode,
+            "stdout_bytes": self.stdout_bytes,
+            "stderr_bytes": self.stderr_bytes,
         }
 
     @classmethod
     def to_cls(cls, data: dict):
+        duration = data.get("duration_seconds")
         return cls(
             id=UUID(data["id"]),
             cmd=data["cmd"],
             created_at=datetime.fromisoformat(data["created_at"]),
+            cwd=data.get("cwd"),
+            duration_seconds=float(duration) if duration is not None else None,
+            returncode=data.get("returncode"),
+            stdout_bytes=data.get("stdout_bytes"),
+            stderr_bytes=data.get("stderr_bytes"),
         )
 
 
@@ -36,16 +55,26 @@ class CommandDB:
 
     def save_command(self, command: Command) -> dict:
         try:
-            self.db_manager.add_item(
-                {
-                    DbKeys.Primary.value: self.table,
-                    DbKeys.Secondary.value: str(command.id),
-                    **command.to_json(),
-                }
-            )
+            self.db_manager.add_item(self.__to_item(command))
         except Exception as e:
             raise AppException(f"Error saving command: {e}")
         return {
             DbKeys.Primary.value: self.table,
             DbKeys.Secondary.value: str(command.id),
         }
+
+    def save_commands(self, commands: list[Command]) -> None:
+        try:
+            self.db_manager.batch_write_items(
+                [self.__to_item(command) for command in commands]
+            )
+        except Exception as e:
+            raise AppException(f"Error saving commands: {e}")
+
+    def __to_item(self, command: Command) -> dict:
+        return {
+            DbKeys.Primary.value: self.table,
+            DbKeys.Secondary.value: str(command.id),
+            # DynamoDB does not accept floats
+            **json.loads(json.dumps(command.to_json()), parse_float=Decimal),
+        }
@@ -26,6 +26,13 @@ class DbManager:
         except ClientError:
             return []
 
+    def batch_write_items(self, items: list[dict]):
+        # batch_writer splits the items into requests of 25 and retries
+        # unprocessed items
+        with self.table.batch_writer() as batch:
+            for item in items:
+                batch.put_item(Item=item)
+
     def update_item(self, **data):
         return self.table.update_item(**data)
 
@@ -1,11 +1,17 @@
+import base64
+import binascii
+import logging
 from backend.services.aws.dynamo_database import DbManager
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from backend.services.data.enum import DbKeys
 from boto3.dynamodb.conditions import Key
 from uuid import uuid4, UUID
 from backend.config.enum import TeamEnum
 from datetime import datetime, timezone
 from backend.services.exception.app_exception import AppException
+from backend.services.tool.artifact_store import ArtifactStore
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -19,6 +25,12 @@ class Message:
     llm_model: str | None
     completed: bool = False
     id: str | None = None
+    # Artifact references ({"sha256", "bytes", "name", "media_type"})
+    attachments: list[dict] = field(default_factory=list)
+    # Attachments stored when the message is saved: (data, name, media_type)
+    pending_attachments: list[tuple[bytes, str, str]] = field(
+        default_factory=list, repr=False
+    )
 
     @classmethod
     def to_cls(cls, data: dict):
@@ -32,6 +44,7 @@ class Message:
             id=data.get("id", None),
             ref_id=data["ref_id"],
             created_at=datetime.now(timezone.utc),
+            attachments=data.get("attachments", []),
         )
 
     def to_json(self) -> dict:
@@ -45,30 +58,57 @@ class Message:
             "llm_model": self.llm_model,
             "ref_id": self.ref_id,
             "created_at": self.created_at.isoformat() if self.created_at else None,
+            "attachments": self.attachments,
         }
 
 
 class MessageDB:
     table = "CA#MESSAGE"
+    # Content blocks carrying base64 data, by type: the key of the data
+    BINARY_BLOCKS = {"image": "base64", "image_generation_call": "result"}
 
-    def __init__(self, team: TeamEnum) -> None:
+    def __init__(
+        self, team: TeamEnum, artifact_store: ArtifactStore | None = None
+    ) -> None:
         self.db_manager = DbManager()
         self.team = team
+        self.artifact_store = artifact_store
+
+    def add_attachment(
+        self, message: Message, data: bytes, name: str, media_type: str
+    ) -> None:
+        # Attachments are stored once by content when the message is saved;
+        # the item keeps the hash
+        if self.artifact_store is None:
+            raise AppException("No artifact store for message attachments")
+        message.pending_attachments.append((data, name, media_type))
+
+    def get_attachment(self, attachment: dict) -> bytes:
+        if self.artifact_store is None:
+            raise AppException("No artifact store for message attachments")
+        return self.artifact_store.get(attachment["sha256"])
 
     def save_message(self, message: Message) -> None:
+        stored = self.__store_attachments(message)
         try:
             self.db_manager.add_item(
                 {
                     DbKeys.Primary.value: self.table,
                     DbKeys.Secondary.value: message.name,
                     **message.to_json(),
+                    "attachments": [*message.attachments, *stored],
                 }
             )
         except Exception as e:
+            self.__release_attachments(stored)
             raise AppException(f"Error saving message: {e}")
+        message.attachments.extend(stored)
+        message.pending_attachments.clear()
 
     def save_message_from_agent_result(self, result: dict) -> None:
         message = self.__transform_result_to_message(result)
+        if self.artifact_store is not None:
+            self.__move_binary_blocks(message)
         self.save_message(message)
 
     def get_message(self) -> None:
@@ -100,12 +140,64 @@ class MessageDB:
             raise AppException(f"Error querying messages: {e}")
 
     def delete_message(self, id: str) -> None:
-        self.db_manager.remove_item(
-            {
-                DbKeys.Primary.value: self.table,
-                DbKeys.Secondary.value: id,
-            }
-        )
+        key = {
+            DbKeys.Primary.value: self.table,
+            DbKeys.Secondary.value: id,
+        }
+        item = self.db_manager.get_item(key) if self.artifact_store else None
+        self.db_manager.remove_item(key)
+        if self.artifact_store is None or item is None:
+            return
+        self.__release_attachments(item.get("attachments", []))
+
+    def __store_attachments(self, message: Message) -> list[dict]:
+        if not message.pending_attachments:
+            return []
+        if self.artifact_store is None:
+            raise AppException("No artifact store for message attachments")
+        stored: list[dict] = []
+        try:
+            for data, name, media_type in message.pending_attachments:
+                ref = self.artifact_store.put_bytes(data)
+                stored.append({**ref, "name": name, "media_type": media_type})
+        except Exception as e:
+            self.__release_attachments(stored)
+            raise AppException(f"Error storing message attachments: {e}")
+        return stored
+
+    def __release_attachments(self, attachments: list[dict]) -> None:
+        if self.artifact_store is None:
+            return
+        for attachment in attachments:
+            try:
+                self.artifact_store.release(attachment["sha256"])
+            except OSError as e:
+                logger.error(f"Could not release attachment {attachment}: {e}")
+
+    def __move_binary_blocks(self, message: Message) -> None:
+        # Base64 payloads, e.g. generated images, are stored as attachments
+        # instead of inline in the item
+        for item in message.messages:
+            content = item.get("content")
+            for block in content if isinstance(content, list) else []:
+                if not isinstance(block, dict):
+                    continue
+                key = self.BINARY_BLOCKS.get(str(block.get("type")))
+                if key is None or not isinstance(block.get(key), str):
+                    continue
+                try:
+                    data = base64.b64decode(block[key], validate=True)
+                except binascii.Error:
+                    continue
+                name = block.get("id") or uuid4().hex
+                media_type = block.get("mime_type") or (
+                    f"image/{block['output_format']}"
+                    if block.get("output_format")
+                    else "application/octet-stream"
+                )
+                self.add_attachment(message, data, name, media_type)
+                del block[key]
+                block["attachment"] = name
 
     def __transform_result_to_message(self, result) -> Message:
         messages = result.get("messages", [])
@@ -119,5 +211,6 @@ class MessageDB:
             completed=False,
             ref_id=result["ref_id"],
             created_at=datetime.now(timezone.utc),
+            attachments=result.get("attachments", []),
         )
         return message
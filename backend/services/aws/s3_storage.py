@@ -1,10 +1,102 @@
+from typing import Iterable, Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+
+from backend.config.env import env
+from backend.services.aws.session import Session
+
+
 class S3Storage:
+    # Every part of a multipart upload but the last must be at least 5 MB
+    PART_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, bucket: str):
+        session = Session().get_session()
+        self.s3 = session.client("s3", region_name=env.AWS_REGION)
+        self.bucket = bucket
+
+    def upload_data(self, key: str, data: bytes, content_type: Optional[str] = None):
+        extra = {"ContentType": content_type} if content_type else {}
+        return self.s3.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+
+    def upload_stream(
+        self, key: str, chunks: Iterable[bytes], content_type: Optional[str] = None
+    ) -> int:
+        # Only one part is held in memory; data smaller than a part is
+        # uploaded with a single put
+        buffer = bytearray()
+        size = 0
+        upload_id = None
+        parts: List[dict] = []
+        try:
+            for chunk in chunks:
+                buffer += chunk
+                size += len(chunk)
+                if len(buffer) < self.PART_SIZE:
+                    continue
+                if upload_id is None:
+                    upload_id = self._create_upload(key, content_type)
+                parts.append(self._upload_part(key, upload_id, len(parts) + 1, buffer))
+                buffer = bytearray()
+            if upload_id is None:
+                self.upload_data(key, bytes(buffer), content_type)
+                return size
+            if buffer:
+                parts.append(self._upload_part(key, upload_id, len(parts) + 1, buffer))
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            if upload_id is not None:
+                self.s3.abort_multipart_upload(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id
+                )
+            raise
+        return size
+
+    def get_data(self, key: str) -> Optional[bytes]:
+        try:
+            data: bytes = self.s3.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except ClientError:
+            return None
+        return data
+
+    def iter_data(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        body = self.s3.get_object(Bucket=self.bucket, Key=key)["Body"]
+        yield from body.iter_chunks(chunk_size)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+                return False
+            raise
+
+    def delete_data(self, key: str):
+        return self.s3.delete_object(Bucket=self.bucket, Key=key)
 
-    def upload_data(self):
-        pass
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
 
-    def get_data(self):
-        pass
+    def _create_upload(self, key: str, content_type: Optional[str]) -> str:
+        extra = {"ContentType": content_type} if content_type else {}
+        upload = self.s3.create_multipart_upload(Bucket=self.bucket, Key=key, **extra)
+        upload_id: str = upload["UploadId"]
+        return upload_id
 
-    def delete_data(self):
-        pass
+    def _upload_part(
+        self, key: str, upload_id: str, number: int, data: bytearray
+    ) -> dict:
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=number,
+            Body=bytes(data),
+        )
+        return {"PartNumber": number, "ETag": response["ETag"]}
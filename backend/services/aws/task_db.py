@@ -1,4 +1,6 @@
+import json
 from datetime import datetime, timezone
+from decimal import Decimal
 from backend.services.aws.dynamo_database import DbManager
 from dataclasses import dataclass
 from pydantic import BaseModel, Field
@@ -21,7 +23,9 @@ class StatusLevel(str, Enum):
     NEW = "New"
     PLANNED = "Planned"
     IN_PROGRESS = "In Progress"
+    PAUSED = "Paused"
     DONE = "Done"
+    FAILED = "Failed"
 
 
 class PlannedTaskOutput(BaseModel):
@@ -58,6 +62,9 @@ class Task:
     created_at: datetime
     assigned_to: Optional[TeamEnum] = None
     review_comments: Optional[str] = None
+    attempts: int = 0
+    budget_usage: Optional[dict] = None
+    partial_result: Optional[str] = None
 
     def to_json(self) -> dict:
         return {
@@ -69,6 +76,9 @@ class Task:
             "assigned_to": self.assigned_to.value if self.assigned_to else None,
             "priority": self.priority.value if self.priority else None,
             "review_comments": self.review_comments,
+            "attempts": self.attempts,
+            "budget_usage": self.budget_usage,
+            "partial_result": self.partial_result,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
@@ -89,10 +99,10 @@ class Task:
     @classmethod
     def to_cls(cls, data: dict):
         return cls(
-            task_id=data["task_id"],
+            task_id=UUID(data["task_id"]),
             feature=data["feature"],
             description=data["description"],
-            dependencies=data["dependencies"],
+            dependencies=[UUID(dep) for dep in data["dependencies"]],
             status=StatusLevel(data["status"]),
             created_at=datetime.fromisoformat(data["created_at"]),
             assigned_to=TeamEnum(data.get("assigned_to")),
@@ -100,6 +110,9 @@ class Task:
                 PriorityLevel(data.get("priority")) if data.get("priority") else None
             ),
             review_comments=data.get("review_comments", None),
+            attempts=int(data.get("attempts", 0)),
+            budget_usage=data.get("budget_usage", None),
+            partial_result=data.get("partial_result", None),
         )
 
 
@@ -109,24 +122,34 @@ class TaskDB:
     def __init__(self) -> None:
         self.db_manager = DbManager()
 
+    def save_task(self, task: PlannedTaskOutput) -> Task:
+        try:
+            saved_task: Task = Task.from_parsed_response(task)
+            self.db_manager.add_item(
+                {
+                    DbKeys.Primary.value: self.table,
+                    DbKeys.Secondary.value: str(task.task_id),
+                    **saved_task.to_json(),
+                }
+            )
+        except Exception as e:
+            raise AppException(f"Error saving task: {e}")
+        return saved_task
+
     def save_tasks(self, tasks: PlannedTaskOutputResponse) -> dict:
+        keys = {}
         for task in tasks.tasks:
             try:
-                self.db_manager.add_item(
-                    {
-                        DbKeys.Primary.value: self.table,
-                        DbKeys.Secondary.value: str(task.task_id),
-                        **Task.from_parsed_response(task).to_json(),
-                    }
-                )
-            except Exception as e:
+                self.save_task(task)
+            except AppException as e:
                 raise AppException(f"Error saving tasks: {e}")
-            return {
+            keys = {
                 DbKeys.Primary.value: self.table,
                 DbKeys.Secondary.value: str(task.task_id),
             }
+        return keys
 
-    def get_tasks(self) -> Optional[PlannedTaskOutputResponse]:
+    def get_tasks(self) -> Optional[List[Task]]:
         results = self.db_manager.query_items(Key(DbKeys.Primary.value).eq(self.table))
         return [Task.to_cls(item) for item in results] if results else None
 
@@ -152,11 +175,14 @@ class TaskDB:
                     SET feature = :feature,
                         description = :description,
                         dependencies = :dependencies,
-                        status = :status,
+                        #status = :status,
                         assigned_to = :assigned_to,
                         priority = :priority,
-                        review_comments = :review_comments
+                        review_comments = :review_comments,
+                        attempts = :attempts
                 """,
+                # status is a DynamoDB reserved word
+                ExpressionAttributeNames={"#status": "status"},
                 ExpressionAttributeValues={
                     ":feature": task.feature,
                     ":description": task.description,
@@ -167,7 +193,43 @@ class TaskDB:
                     ),
                     ":priority": task.priority.value if task.priority else None,
                     ":review_comments": task.review_comments,
+                    ":attempts": task.attempts,
                 },
             )
         except Exception as e:
             raise AppException(f"Error updating task: {e}")
+
+    def save_run_result(
+        self,
+        task_id: UUID,
+        budget_usage: dict,
+        partial_result: Optional[str] = None,
+    ) -> None:
+        """
+        Record the budget consumed by an agent run on the task.
+
+        Args:
+            task_id: Task the run worked on
+            budget_usage: Budget usage reported by the agent run
+            partial_result: Output checkpointed when the run stopped early
+        """
+        try:
+            self.db_manager.update_item(
+                Key={
+                    DbKeys.Primary.value: self.table,
+                    DbKeys.Secondary.value: str(task_id),
+                },
+                UpdateExpression="""
+                    SET budget_usage = :budget_usage,
+                        partial_result = :partial_result
+                """,
+                ExpressionAttributeValues={
+                    # DynamoDB does not accept floats
+                    ":budget_usage": json.loads(
+                        json.dumps(budget_usage), parse_float=Decimal
+                    ),
+                    ":partial_result": partial_result,
+                },
+            )
+        except Exception as e:
+            raise AppException(f"Error saving run result: {e}")
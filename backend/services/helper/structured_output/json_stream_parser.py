@@ -0,0 +1,70 @@
+from typing import List, Optional
+
+
+class JsonStreamParser:
+    """
+    Incremental parser that extracts objects from a JSON array as they complete.
+
+    Text is fed in arbitrary chunks, as it arrives from a token stream. Every
+    object that is a direct item of an array inside the root object (such as
+    each task in `{"tasks": [{...}, {...}]}`) is returned as soon as its
+    closing brace is seen, without waiting for the rest of the document.
+    """
+
+    def __init__(self) -> None:
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._item: List[str] = []
+        self._item_depth = 0
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Feed the next chunk of text.
+
+        Args:
+            text: Next piece of the JSON document
+
+        Returns:
+            JSON strings of the array items completed by this chunk
+        """
+        completed = []
+        for char in text:
+            if self._item_depth:
+                self._item.append(char)
+            if self._in_string:
+                self._consume_string_char(char)
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._open(char)
+            elif char in "}]":
+                item = self._close()
+                if item is not None:
+                    completed.append(item)
+        return completed
+
+    def _consume_string_char(self, char: str) -> None:
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+
+    def _open(self, char: str) -> None:
+        # An object opened directly inside the root object's array is an item
+        if char == "{" and self._stack == ["{", "["]:
+            self._item = [char]
+            self._item_depth = len(self._stack) + 1
+        self._stack.append(char)
+
+    def _close(self) -> Optional[str]:
+        if self._stack:
+            self._stack.pop()
+        if self._item_depth and len(self._stack) < self._item_depth:
+            item = "".join(self._item)
+            self._item = []
+            self._item_depth = 0
+            return item
+        return None
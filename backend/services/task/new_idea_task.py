@@ -1,7 +1,4 @@
-from backend.services.agent.manager_agent import ManagerAgent
-from backend.services.agent.frontend_agent import FrontendAgent
-from backend.services.agent.planner_agent import PlannerAgent
-from backend.services.agent.graphic_designer_agent import GraphicDesignerAgent
+from backend.services.agent.agent_registry import agent_registry
 from backend.config.enum import TeamEnum
 
 
@@ -10,11 +7,5 @@ class NewIdeaTask:
         self.assigned_team = assigned_team
 
     def input(self, task: str):
-        if self.assigned_team == TeamEnum.MANAGER:
-            return ManagerAgent().start_task(task=task)
-        if self.assigned_team == TeamEnum.FRONTEND_DEVELOPER:
-            return FrontendAgent().start_task(task=task)
-        if self.assigned_team == TeamEnum.PLANNER:
-            return PlannerAgent().start_task(task=task)
-        if self.assigned_team == TeamEnum.GRAPHIC_DESIGNER:
-            return GraphicDesignerAgent().start_task(task=task)
+        if self.assigned_team in agent_registry.agent_classes:
+            return agent_registry.get_agent(self.assigned_team).start_task(task=task)
@@ -0,0 +1,62 @@
+import logging
+import threading
+from typing import Callable, List
+
+from backend.services.aws.task_db import Task
+
+logger = logging.getLogger(__name__)
+
+TaskListener = Callable[[Task], None]
+
+
+class TaskEvents:
+    """
+    In-process publisher for "task available" events.
+
+    The planner publishes each task as soon as it has been saved, so that
+    subscribers such as the worker can start on it while the rest of the plan
+    is still being generated.
+    """
+
+    def __init__(self) -> None:
+        self._listeners: List[TaskListener] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, listener: TaskListener) -> None:
+        """
+        Register a listener for task available events.
+
+        Args:
+            listener: Callable invoked with each available task
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: TaskListener) -> None:
+        """
+        Remove a previously registered listener.
+
+        Args:
+            listener: Listener to remove
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def publish_task_available(self, task: Task) -> None:
+        """
+        Notify every listener that a task is available.
+
+        Args:
+            task: Task that was saved
+        """
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(task)
+            except Exception as e:
+                logger.error(f"Task listener failed: {e}", exc_info=True)
+
+
+task_events = TaskEvents()
@@ -0,0 +1,360 @@
+import functools
+import hashlib
+import itertools
+import logging
+import os
+import re
+import threading
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TypedDict
+
+from backend.config.env import env
+from backend.services.aws.s3_storage import S3Storage
+from backend.services.tool.atomic_file import AtomicFile
+
+logger = logging.getLogger(__name__)
+
+SHA256_HEX = re.compile(r"[0-9a-f]{64}")
+
+
+class ArtifactRef(TypedDict):
+    """Reference to an artifact, kept instead of its content."""
+
+    sha256: str  # Hex digest of the content, which addresses the artifact
+    bytes: int  # Size of the content
+
+
+class ArtifactNotFound(KeyError):
+    """No artifact is stored under a hash."""
+
+
+class LocalArtifactBackend:
+    """Artifact objects as files under a directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self.root, key))
+
+    def write(self, key: str, chunks: Iterable[bytes]) -> int:
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = 0
+        with AtomicFile(path) as target:
+            for chunk in chunks:
+                target.file.write(chunk)
+                size += len(chunk)
+            target.commit()
+        return size
+
+    def read(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        try:
+            f = open(os.path.join(self.root, key), "rb")
+        except FileNotFoundError:
+            raise ArtifactNotFound(key) from None
+        with f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(os.path.join(self.root, key))
+        except FileNotFoundError:
+            pass
+
+
+class S3ArtifactBackend:
+    """Artifact objects in an S3 bucket, under a key prefix."""
+
+    def __init__(self, storage: S3Storage, prefix: str = "artifacts"):
+        self.storage = storage
+        self.prefix = prefix.strip("/")
+
+    def exists(self, key: str) -> bool:
+        return self.storage.exists(self._key(key))
+
+    def write(self, key: str, chunks: Iterable[bytes]) -> int:
+        return self.storage.upload_stream(self._key(key), chunks)
+
+    def read(self, key: str, chunk_size: int) -> Iterator[bytes]:
+        if not self.exists(key):
+            raise ArtifactNotFound(key)
+        return self.storage.iter_data(self._key(key), chunk_size)
+
+    def delete(self, key: str) -> None:
+        self.storage.delete_data(self._key(key))
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+
+class ArtifactStore:
+    """
+    Content-addressable store of files, images and logs.
+
+    Artifacts are addressed by the SHA-256 of their content, so storing the
+    same content again only adds a reference instead of a copy. Content that
+    compresses well is stored zlib-compressed; a sample of it is compressed
+    first to decide. Every `put` takes a reference, and `release` gives one
+    back; an artifact is deleted with its last reference.
+
+    Reference counts are kept next to the objects. Their updates are
+    serialized within a store, while uploads run concurrently; processes
+    sharing a backend may race on them.
+
+    Examples:
+        >>> store = ArtifactStore(LocalArtifactBackend("/var/artifacts"))
+        >>> ref = store.put_bytes(b"npm ERR! missing script: build")
+        >>> store.get(ref["sha256"])
+        b'npm ERR! missing script: build'
+    """
+
+    OBJECTS_PREFIX = "objects"
+    REFS_PREFIX = "refs"
+    CHUNK_SIZE = 1024 * 1024  # 1 MB
+    COMPRESSION_SAMPLE_BYTES = 64 * 1024
+    MIN_COMPRESSION_RATIO = 0.9  # compressed sample size / sample size
+    MIN_COMPRESS_BYTES = 512  # smaller artifacts are stored as they are
+    COMPRESSION_LEVEL = 6
+    # First byte of every stored object
+    RAW = b"\x00"
+    ZLIB = b"\x01"
+
+    def __init__(self, backend: Any, compress: bool = True):
+        """
+        Initialize ArtifactStore.
+
+        Args:
+            backend: LocalArtifactBackend or S3ArtifactBackend
+            compress: Compress artifacts that compress well (default: True)
+        """
+        self.backend = backend
+        self.compress = compress
+        self.stats = {"stored": 0, "deduplicated": 0, "bytes_in": 0, "bytes_stored": 0}
+        self._lock = threading.Lock()
+
+    def put_bytes(self, data: bytes) -> ArtifactRef:
+        """
+        Store content and take a reference to it.
+
+        Args:
+            data: Content to store
+
+        Returns:
+            ArtifactRef of the content
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        chunk = self.CHUNK_SIZE
+        return self._put(
+            digest,
+            len(data),
+            lambda: (data[i : i + chunk] for i in range(0, len(data), chunk)),
+        )
+
+    def put_file(self, path: str) -> ArtifactRef:
+        """
+        Store the content of a file and take a reference to it.
+
+        The file is hashed first and only read again if its content is not
+        stored yet.
+
+        Args:
+            path: File to store
+
+        Returns:
+            ArtifactRef of the file's content
+        """
+        with open(path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+            size = f.tell()
+
+        def read() -> Iterator[bytes]:
+            with open(path, "rb") as f:
+                while chunk := f.read(self.CHUNK_SIZE):
+                    yield chunk
+
+        return self._put(digest, size, read)
+
+    def get(self, sha256: str) -> bytes:
+        """
+        Get the content of an artifact.
+
+        Raises:
+            ArtifactNotFound: If no artifact has the hash
+        """
+        return b"".join(self.iter_content(sha256))
+
+    def iter_content(self, sha256: str) -> Iterator[bytes]:
+        """
+        Read the content of an artifact a chunk at a time.
+
+        Raises:
+            ArtifactNotFound: If no artifact has the hash
+        """
+        chunks = self.backend.read(self._object_key(sha256), self.CHUNK_SIZE)
+        first = next(chunks, b"")
+        header, first = first[:1], first[1:]
+        if header == self.RAW:
+            yield first
+            yield from chunks
+            return
+        decompressor = zlib.decompressobj()
+        for chunk in itertools.chain([first], chunks):
+            yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+    def copy_to(self, sha256: str, path: str) -> None:
+        """
+        Write the content of an artifact to a file, e.g. to roll a file back.
+
+        The file is replaced atomically, and only if the content matches the
+        hash.
+
+        Raises:
+            ArtifactNotFound: If no artifact has the hash
+            ValueError: If the stored content is corrupt
+        """
+        digest = hashlib.sha256()
+        with AtomicFile(path) as target:
+            for chunk in self.iter_content(sha256):
+                digest.update(chunk)
+                target.file.write(chunk)
+            if digest.hexdigest() != sha256:
+                raise ValueError(f"Artifact {sha256} is corrupt")
+            target.commit()
+
+    def release(self, sha256: str) -> int:
+        """
+        Give back a reference; the artifact is deleted with its last one.
+
+        Returns:
+            Number of references left
+        """
+        with self._lock:
+            count = max(self._refcount(sha256) - 1, 0)
+            if count:
+                self._write_refcount(sha256, count)
+                return count
+            self.backend.delete(self._object_key(sha256))
+            self.backend.delete(self._refs_key(sha256))
+        logger.info(f"Artifact {sha256} deleted, no references left")
+        return 0
+
+    def refcount(self, sha256: str) -> int:
+        """Number of references to an artifact."""
+        with self._lock:
+            return self._refcount(sha256)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get store statistics.
+
+        Returns:
+            Dictionary with artifacts stored and deduplicated by this store,
+            and the bytes put in and actually stored
+        """
+        with self._lock:
+            return dict(self.stats)
+
+    def _put(
+        self, sha256: str, size: int, read: Callable[[], Iterator[bytes]]
+    ) -> ArtifactRef:
+        key = self._object_key(sha256)
+        with self._lock:
+            self.stats["bytes_in"] += size
+        stored: Optional[int] = None
+        while True:
+            if stored is None and not self.backend.exists(key):
+                stored = self._write_object(key, sha256, read)
+            # Only the reference count is updated under the lock, so uploads
+            # run concurrently. A `release` may delete the object between the
+            # upload and the update; it is then written again.
+            with self._lock:
+                if self.backend.exists(key):
+                    if stored is None:
+                        self.stats["deduplicated"] += 1
+                    else:
+                        self.stats["bytes_stored"] += stored
+                        self.stats["stored"] += 1
+                    self._write_refcount(sha256, self._refcount(sha256) + 1)
+                    return ArtifactRef(sha256=sha256, bytes=size)
+            stored = None
+
+    def _write_object(
+        self, key: str, sha256: str, read: Callable[[], Iterator[bytes]]
+    ) -> int:
+        digest = hashlib.sha256()
+
+        def hashed() -> Iterator[bytes]:
+            for chunk in read():
+                digest.update(chunk)
+                yield chunk
+
+        stored: int = self.backend.write(key, self._encode(hashed()))
+        if digest.hexdigest() != sha256:
+            self.backend.delete(key)
+            raise ValueError("Content changed while it was being stored")
+        return stored
+
+    def _encode(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """Header byte and content, compressed if a sample compresses well."""
+        sample = b""
+        for chunk in chunks:
+            sample += chunk
+            if len(sample) >= self.COMPRESSION_SAMPLE_BYTES:
+                break
+        rest = itertools.chain([sample], chunks)
+        if not self._compressible(sample):
+            yield self.RAW
+            yield from rest
+            return
+        yield self.ZLIB
+        compressor = zlib.compressobj(self.COMPRESSION_LEVEL)
+        for chunk in rest:
+            yield compressor.compress(chunk)
+        yield compressor.flush()
+
+    def _compressible(self, sample: bytes) -> bool:
+        if not self.compress or len(sample) < self.MIN_COMPRESS_BYTES:
+            return False
+        sample = sample[: self.COMPRESSION_SAMPLE_BYTES]
+        compressed = zlib.compress(sample, 1)
+        return len(compressed) < len(sample) * self.MIN_COMPRESSION_RATIO
+
+    def _refcount(self, sha256: str) -> int:
+        try:
+            data = b"".join(self.backend.read(self._refs_key(sha256), 64))
+        except ArtifactNotFound:
+            return 0
+        return int(data or 0)
+
+    def _write_refcount(self, sha256: str, count: int) -> None:
+        self.backend.write(self._refs_key(sha256), [str(count).encode()])
+
+    def _object_key(self, sha256: str) -> str:
+        return f"{self.OBJECTS_PREFIX}/{sha256[:2]}/{self._check_hash(sha256)}"
+
+    def _refs_key(self, sha256: str) -> str:
+        return f"{self.REFS_PREFIX}/{sha256[:2]}/{self._check_hash(sha256)}"
+
+    @staticmethod
+    def _check_hash(sha256: str) -> str:
+        if not isinstance(sha256, str) or not SHA256_HEX.fullmatch(sha256):
+            raise ArtifactNotFound(f"Not a SHA-256 hex digest: {sha256!r}")
+        return sha256
+
+
+@functools.lru_cache(maxsize=1)
+def shared_artifact_store() -> Optional[ArtifactStore]:
+    """
+    Artifact store of the process, in S3 or else a directory, if configured.
+
+    Everything in the process uses this one store, since reference counts
+    are only serialized within a store.
+    """
+    if env.ARTIFACT_BUCKET:
+        return ArtifactStore(S3ArtifactBackend(S3Storage(env.ARTIFACT_BUCKET)))
+    if env.ARTIFACT_DIR:
+        return ArtifactStore(LocalArtifactBackend(env.ARTIFACT_DIR))
+    return None
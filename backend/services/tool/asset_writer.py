@@ -0,0 +1,205 @@
+import base64
+import hashlib
+import itertools
+import logging
+import os
+from typing import Iterator, Optional, TypedDict
+from uuid import uuid4
+
+from backend.services.aws.s3_storage import S3Storage
+from backend.services.tool.atomic_file import DURABILITY_MODES, AtomicFile
+
+logger = logging.getLogger(__name__)
+
+BASE64_WHITESPACE = str.maketrans("", "", " \t\r\n")
+
+
+class AssetRef(TypedDict):
+    """Reference to a stored asset, kept instead of its content."""
+
+    uri: str  # File path, or s3://bucket/key
+    media_type: str  # e.g. 'image/png'
+    bytes: int  # Decoded size
+    sha256: str  # Hex digest of the decoded content
+
+
+class AssetWriter:
+    """
+    Store base64-encoded binary assets, such as generated images.
+
+    Payloads are decoded a chunk at a time, and each chunk is hashed and
+    written to a file or an S3 upload as soon as it is decoded, so the
+    decoded asset is never held in memory next to its encoded form. Files
+    are replaced atomically.
+
+    Examples:
+        >>> writer = AssetWriter(directory="./assets")
+        >>> writer.write_base64("iVBORw0KGgo...", name="logo")
+        {'uri': './assets/logo.png', 'media_type': 'image/png', ...}
+    """
+
+    MEDIA_TYPES = {
+        "image/png": ".png",
+        "image/jpeg": ".jpg",
+        "image/gif": ".gif",
+        "image/webp": ".webp",
+        "image/svg+xml": ".svg",
+    }
+    DEFAULT_MEDIA_TYPE = "application/octet-stream"
+    DECODE_CHUNK_SIZE = 1024 * 1024  # base64 characters decoded at a time
+    DEFAULT_PREFIX = "assets"
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        storage: Optional[S3Storage] = None,
+        prefix: str = DEFAULT_PREFIX,
+        durability: str = "none",
+    ):
+        """
+        Initialize AssetWriter.
+
+        Args:
+            directory: Directory assets are written to (either this or storage)
+            storage: S3 storage assets are uploaded to (either this or
+                directory)
+            prefix: Key prefix of assets uploaded to S3 (default: 'assets')
+            durability: When files are synced to disk, see FileTool
+
+        Raises:
+            ValueError: If neither or both of directory and storage are given,
+                or durability is not a known mode
+        """
+        if (directory is None) == (storage is None):
+            raise ValueError("Give either a directory or an S3 storage")
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Durability must be one of {DURABILITY_MODES}, got {durability!r}"
+            )
+        self.directory = directory
+        self.storage = storage
+        self.prefix = prefix.strip("/")
+        self.durability = durability
+
+    def write_base64(
+        self,
+        payload: str,
+        name: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> AssetRef:
+        """
+        Decode a base64 payload and store it.
+
+        Args:
+            payload: Base64 data, optionally as a data URL
+                ('data:image/png;base64,...')
+            name: File name; the extension of the media type is added if it
+                has none (default: a random name)
+            media_type: Media type of the content (default: from the data URL,
+                or else detected from the content)
+
+        Returns:
+            AssetRef of the stored asset
+
+        Raises:
+            ValueError: If the payload is not valid base64 or name is not a
+                plain file name
+        """
+        start = 0
+        if payload.startswith("data:"):
+            start = payload.find(",", 0, 256) + 1
+            if start == 0:
+                raise ValueError("Invalid data URL: no ',' after the header")
+            media_type = media_type or payload[5 : start - 1].split(";")[0] or None
+        chunks = decode_base64(payload, start, self.DECODE_CHUNK_SIZE)
+        first = next(chunks, b"")
+        media_type = media_type or detect_media_type(first)
+        file_name = self._file_name(name, media_type)
+
+        digest = hashlib.sha256()
+        size = 0
+
+        def hashed() -> Iterator[bytes]:
+            nonlocal size
+            for chunk in itertools.chain([first], chunks):
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+        uri = self._store(file_name, hashed(), media_type)
+        logger.info(f"Asset '{uri}' stored ({size} bytes, {media_type})")
+        return AssetRef(
+            uri=uri, media_type=media_type, bytes=size, sha256=digest.hexdigest()
+        )
+
+    def _file_name(self, name: Optional[str], media_type: str) -> str:
+        """File name of an asset, with the extension of its media type."""
+        name = name or uuid4().hex
+        if os.path.basename(name) != name or name in (".", ".."):
+            raise ValueError(f"Invalid asset name: {name!r}")
+        if os.path.splitext(name)[1]:
+            return name
+        return name + self.MEDIA_TYPES.get(media_type, ".bin")
+
+    def _store(self, file_name: str, chunks: Iterator[bytes], media_type: str) -> str:
+        """Write the chunks to a file or S3; returns the asset's URI."""
+        if self.storage is not None:
+            key = f"{self.prefix}/{file_name}" if self.prefix else file_name
+            self.storage.upload_stream(key, chunks, media_type)
+            return self.storage.uri(key)
+        if self.directory is None:
+            raise RuntimeError("AssetWriter has neither a directory nor a storage")
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, file_name)
+        with AtomicFile(path, self.durability) as target:
+            for chunk in chunks:
+                target.file.write(chunk)
+            target.commit()
+        return path
+
+
+def decode_base64(
+    payload: str, start: int = 0, chunk_size: int = AssetWriter.DECODE_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Decode base64 a chunk at a time.
+
+    Line breaks and spaces, as in MIME-wrapped base64, are skipped.
+
+    Args:
+        payload: Base64 text
+        start: Position in payload the data starts at
+        chunk_size: Number of characters decoded at a time
+
+    Yields:
+        Decoded chunks
+
+    Raises:
+        ValueError: If the payload is not valid base64
+    """
+    carry = ""
+    for position in range(start, len(payload), chunk_size):
+        text = carry + payload[position : position + chunk_size].translate(
+            BASE64_WHITESPACE
+        )
+        usable = len(text) - len(text) % 4
+        carry = text[usable:]
+        if usable:
+            yield base64.b64decode(text[:usable], validate=True)
+    if carry:
+        raise ValueError("Invalid base64: the data is truncated")
+
+
+def detect_media_type(data: bytes) -> str:
+    """Media type of an image from its first bytes."""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:256].lstrip().startswith((b"<svg", b"<?xml")):
+        return "image/svg+xml"
+    return AssetWriter.DEFAULT_MEDIA_TYPE
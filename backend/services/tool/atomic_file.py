@@ -0,0 +1,269 @@
+import ctypes
+import ctypes.util
+import functools
+import hashlib
+import logging
+import os
+import secrets
+import shutil
+import threading
+from typing import IO, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# "none": atomic rename only; a crash may lose recent writes, never half of one
+# "batch": the files of an operation are synced together, then renamed into
+#          place, and each directory is synced once
+# "always": file data and directory entry are synced on every write
+DURABILITY_MODES = ("none", "batch", "always")
+
+
+class SyncBatch:
+    """
+    Atomic writes of a multi-file operation, made durable together.
+
+    With "batch" durability, committing an AtomicFile only finishes its
+    temporary file. `flush` then syncs the data of every file at once (one
+    syncfs per filesystem where available, else file by file), renames the
+    files into place, and syncs each of their directories once. A file that
+    is needed before the end, e.g. to be read again, is committed on its own
+    with `commit`.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, "AtomicFile"] = {}
+        self._directories: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def defer(self, atomic_file: "AtomicFile") -> None:
+        """Hold a committed file until the batch is flushed."""
+        with self._lock:
+            previous = self._pending.pop(atomic_file.path, None)
+            self._pending[atomic_file.path] = atomic_file
+        if previous is not None:
+            previous.discard()  # superseded by the later write
+
+    def commit(self, path: str) -> bool:
+        """
+        Sync and rename the deferred write of one file into place now.
+
+        Args:
+            path: File whose write to commit
+
+        Returns:
+            True if the file had a deferred write
+        """
+        with self._lock:
+            atomic_file = self._pending.pop(os.path.realpath(path), None)
+        if atomic_file is None:
+            return False
+        try:
+            sync_files([atomic_file.temp_path])
+            atomic_file.replace()
+        except OSError:
+            atomic_file.discard()
+            raise
+        with self._lock:
+            self._directories.add(os.path.dirname(atomic_file.path))
+        return True
+
+    def flush(self) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Sync the deferred writes, rename them into place and sync directories.
+
+        Returns:
+            Tuple of (paths replaced, error message by path of failed files)
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        errors: Dict[str, str] = {}
+        try:
+            sync_files(atomic_file.temp_path for atomic_file in pending.values())
+        except OSError as e:
+            for path, atomic_file in pending.items():
+                atomic_file.discard()
+                errors[path] = str(e)
+            pending = {}
+        replaced = []
+        for path, atomic_file in sorted(pending.items()):
+            try:
+                atomic_file.replace()
+            except OSError as e:
+                atomic_file.discard()
+                errors[path] = str(e)
+                continue
+            replaced.append(path)
+        with self._lock:
+            directories, self._directories = self._directories, set()
+        directories.update(os.path.dirname(path) for path in replaced)
+        for directory in sorted(directories):
+            fsync_directory(directory)
+        return replaced, errors
+
+
+class AtomicFile:
+    """
+    Temporary file next to a target path that replaces the target on commit.
+
+    Readers see either the old or the new content, never a partly written
+    file. Leaving the `with` block without committing discards the temporary
+    file. Symlinks are written through, and the mode of an existing target
+    is kept.
+
+    Examples:
+        >>> with AtomicFile("./src/app.tsx") as f:
+        ...     f.file.write(b"export const App = () => null;")
+        ...     f.commit()
+    """
+
+    def __init__(
+        self,
+        path: str,
+        durability: str = "none",
+        sync_batch: Optional[SyncBatch] = None,
+        encoding: Optional[str] = None,
+    ):
+        """
+        Create the temporary file.
+
+        Args:
+            path: File to replace
+            durability: One of DURABILITY_MODES
+            sync_batch: Holds the file until it is synced with the rest of the
+                batch for "batch" durability; without one the file and its
+                directory are synced on commit
+            encoding: Open the file in text mode with this encoding (and no
+                newline translation) instead of binary mode
+        """
+        self.path = os.path.realpath(path)
+        self.durability = durability
+        self.sync_batch = sync_batch
+        directory, name = os.path.split(self.path)
+        self.temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        fd = os.open(self.temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+        if encoding:
+            self.file: IO = os.fdopen(fd, "w", encoding=encoding, newline="")
+        else:
+            self.file = os.fdopen(fd, "wb")
+        self.committed = False
+
+    def __enter__(self) -> "AtomicFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if not self.committed:
+            self.discard()
+
+    def commit(self) -> None:
+        """
+        Replace the target with the temporary file.
+
+        With "batch" durability and a sync_batch, the target is only
+        replaced when the batch is flushed or commits this file.
+        """
+        self.file.flush()
+        if self.durability == "batch" and self.sync_batch is not None:
+            self.file.close()
+            self.committed = True
+            self.sync_batch.defer(self)
+            return
+        if self.durability != "none":
+            os.fsync(self.file.fileno())
+        self.file.close()
+        self.replace()
+        self.committed = True
+        if self.durability != "none":
+            fsync_directory(os.path.dirname(self.path))
+
+    def replace(self) -> None:
+        """Rename the temporary file over the target, keeping its mode."""
+        if os.path.exists(self.path):
+            shutil.copymode(self.path, self.temp_path)
+        os.replace(self.temp_path, self.path)
+
+    def discard(self) -> None:
+        """Remove the temporary file without touching the target."""
+        self.file.close()
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+def sync_files(paths: Iterable[str]) -> None:
+    """
+    Sync the data of files to disk.
+
+    Each filesystem is synced once with syncfs(2) where it is available,
+    which also flushes other dirty data on that filesystem; elsewhere each
+    file is synced on its own.
+
+    Args:
+        paths: Files to sync
+
+    Raises:
+        OSError: If a file cannot be opened or synced
+    """
+    synced_devices: Set[int] = set()
+    for path in paths:
+        if os.stat(path).st_dev in synced_devices:
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if _syncfs(fd):
+                synced_devices.add(os.fstat(fd).st_dev)
+            else:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_libc() -> Optional[Any]:
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    except OSError:
+        return None
+
+
+def _syncfs(fd: int) -> bool:
+    """Sync the filesystem of an open file; False if syncfs is not available."""
+    syncfs = getattr(_load_libc(), "syncfs", None)
+    return syncfs is not None and syncfs(fd) == 0
+
+
+def fsync_directory(directory: str) -> None:
+    """Sync a directory so renames and new entries in it survive a crash."""
+    try:
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError as e:
+        logger.warning(f"Could not open directory '{directory}' to sync it: {e}")
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def has_content(path: str, data: bytes) -> bool:
+    """
+    Check whether a file already holds exactly data.
+
+    Only files of the same size are hashed, so most changed files are told
+    apart by a stat.
+
+    Args:
+        path: File to compare
+        data: Content to compare with
+
+    Returns:
+        True if the file exists with the same SHA-256 as data
+    """
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as f:
+            digest = hashlib.file_digest(f, "sha256").digest()
+    except OSError:
+        return False
+    return digest == hashlib.sha256(data).digest()
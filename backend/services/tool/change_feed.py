@@ -0,0 +1,514 @@
+import bisect
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import re
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, TypedDict
+
+logger = logging.getLogger(__name__)
+
+# inotify event masks, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+TEST_FILE = re.compile(
+    r"(?:^|/)(?:__tests__/[^/]+|test_[^/]+\.py|[^/]+_test\.py"
+    r"|[^/]+\.(?:test|spec)\.[cm]?[jt]sx?)$"
+)
+TEST_DIRS = ("test", "tests")
+
+
+class FileChange(TypedDict):
+    """A file created, modified or deleted in a workspace."""
+
+    path: str  # Relative to the workspace
+    action: str  # "created", "modified" or "deleted"
+    cursor: int  # Position of the change in the feed
+
+
+class InotifyWatcher:
+    """
+    Paths touched in a directory tree, from Linux inotify.
+
+    Every directory of the tree but the skipped ones is watched; directories
+    created later are watched as they appear, and the files already in them
+    are reported, since they may have been written before the watch was set.
+    """
+
+    MASK = (
+        IN_MODIFY
+        | IN_CLOSE_WRITE
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+        | IN_CREATE
+        | IN_DELETE
+        | IN_ONLYDIR
+    )
+    EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+    READ_SIZE = 64 * 1024
+
+    def __init__(self, root: str, skipped_dirs: Iterable[str] = ()):
+        """
+        Initialize InotifyWatcher and watch the tree.
+
+        Args:
+            root: Directory to watch
+            skipped_dirs: Names of directories that are not watched
+
+        Raises:
+            OSError: If inotify is not available, or the tree has more
+                directories than the user may watch
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self.root = root
+        self.skipped_dirs = frozenset(skipped_dirs)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1: {os.strerror(error)}")
+        self._dirs: Dict[int, str] = {}  # watch descriptor -> relative dir
+        try:
+            self._watch_tree("")
+        except OSError:
+            self.close()
+            raise
+
+    def read(self) -> Tuple[Set[str], bool]:
+        """
+        Read the events queued since the last read, without blocking.
+
+        Returns:
+            Tuple of (relative paths of files touched, whether events were
+            lost so the tree has to be rescanned)
+        """
+        paths: Set[str] = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self.fd, self.READ_SIZE)
+            except BlockingIOError:
+                break
+            for wd, mask, name in self._parse(data):
+                touched, lost = self._handle(wd, mask, name)
+                paths |= touched
+                rescan = rescan or lost
+        if rescan:
+            # Watches of moved directories point at their old paths
+            self._rewatch()
+        return paths, rescan
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def _parse(self, data: bytes) -> Iterable[Tuple[int, int, str]]:
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            yield wd, mask, name
+
+    def _handle(self, wd: int, mask: int, name: str) -> Tuple[Set[str], bool]:
+        """Paths an event touched, and whether it lost track of some."""
+        if mask & IN_Q_OVERFLOW:
+            return set(), True
+        if mask & IN_IGNORED:
+            self._dirs.pop(wd, None)
+            return set(), False
+        directory = self._dirs.get(wd)
+        if directory is None or not name:
+            return set(), False
+        relative = f"{directory}/{name}" if directory else name
+        if not mask & IN_ISDIR:
+            return {relative}, False
+        if mask & IN_MOVED_FROM:
+            # The files of a directory moved away go without an event each
+            return set(), True
+        if mask & (IN_CREATE | IN_MOVED_TO) and name not in self.skipped_dirs:
+            return self._watch_tree(relative), False
+        return set(), False
+
+    def _watch_tree(self, relative: str) -> Set[str]:
+        """Watch a directory and its subdirectories; returns their files."""
+        files = set()
+        stack = [relative]
+        while stack:
+            directory = stack.pop()
+            if not self._watch(directory):
+                continue
+            try:
+                entries = list(os.scandir(os.path.join(self.root, directory)))
+            except OSError:
+                continue
+            for entry in entries:
+                path = f"{directory}/{entry.name}" if directory else entry.name
+                if not entry.is_dir(follow_symlinks=False):
+                    files.add(path)
+                elif entry.name not in self.skipped_dirs:
+                    stack.append(path)
+        return files
+
+    def _watch(self, relative: str) -> bool:
+        path = os.fsencode(os.path.join(self.root, relative))
+        wd = self._libc.inotify_add_watch(self.fd, path, self.MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return False  # removed before it could be watched
+            raise OSError(error, f"inotify_add_watch: {os.strerror(error)}", path)
+        self._dirs[wd] = relative
+        return True
+
+    def _rewatch(self) -> None:
+        for wd in list(self._dirs):
+            self._libc.inotify_rm_watch(self.fd, wd)
+        self._dirs.clear()
+        try:
+            self._watch_tree("")
+        except OSError as e:
+            logger.error(f"Could not watch {self.root} again: {e}")
+
+
+class WorkspaceChangeFeed:
+    """
+    Feed of the file changes in a workspace, by cursor.
+
+    Changes come from inotify on Linux and from rescanning the tree every
+    POLL_INTERVAL seconds elsewhere, or when inotify cannot watch the tree.
+    Paths touched by events are collected until no event arrived for
+    `debounce` seconds (or MAX_DELAY passed), then compared with a snapshot
+    of every file's size and mtime, so a burst of writes, e.g. by a build,
+    is committed as one batch with a single change per file. Each committed
+    change gets the next cursor; `changes_since` returns the changes after a
+    cursor, merged by file.
+
+    Examples:
+        >>> feed = WorkspaceChangeFeed("/home/user/project")
+        >>> cursor = feed.cursor
+        >>> # ... a build command writes dist/app.js
+        >>> feed.changes_since(cursor)[0]
+        [{'path': 'dist/app.js', 'action': 'created', 'cursor': 1}]
+    """
+
+    # Unlike the search index, build output such as dist is watched
+    SKIPPED_DIRS = frozenset({".git", "node_modules", "__pycache__"})
+    DEFAULT_DEBOUNCE = 0.2  # seconds without events before a batch is committed
+    MAX_DELAY = 2.0  # seconds a steady stream of events is batched at most
+    POLL_INTERVAL = 2.0  # seconds between rescans without inotify
+    IDLE_WAIT = 1.0  # seconds between checks for close while nothing happens
+    MAX_LOG_ENTRIES = 10_000
+
+    def __init__(
+        self,
+        root: str,
+        change_listener: Optional[Callable[[str], None]] = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        use_inotify: bool = True,
+    ):
+        """
+        Initialize WorkspaceChangeFeed and take the snapshot of the tree.
+
+        Args:
+            root: Workspace directory
+            change_listener: Called with the absolute path of every changed
+                file, once its change is committed
+            debounce: Seconds without events before a batch is committed
+                (default: 0.2)
+            use_inotify: Watch with inotify when available (default: True)
+
+        Raises:
+            ValueError: If debounce is negative
+        """
+        if debounce < 0:
+            raise ValueError(f"Debounce must not be negative, got {debounce}")
+        self.root = os.path.realpath(root)
+        self.change_listener = change_listener
+        self.debounce = debounce
+        self.cursor = 0
+        self._watcher: Optional[InotifyWatcher] = None
+        if use_inotify:
+            try:
+                self._watcher = InotifyWatcher(self.root, self.SKIPPED_DIRS)
+            except OSError as e:
+                logger.warning(f"Cannot watch {self.root} ({e}), polling instead")
+        self._files = dict(self._walk())  # relative path -> (size, mtime_ns)
+        self._pending: Set[str] = set()
+        self._rescan = False
+        self._log: List[FileChange] = []
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def mode(self) -> str:
+        """'inotify', or 'polling' without a watcher."""
+        return "inotify" if self._watcher is not None else "polling"
+
+    def start(self) -> None:
+        """Commit changes in the background as they happen."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="change-feed", daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Stop watching the workspace."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        os.write(self._wakeup_write, b"\0")
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            if self._watcher is not None:
+                self._watcher.close()
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+
+    def sync(self) -> List[FileChange]:
+        """
+        Commit every change made so far, without waiting for the debounce.
+
+        Returns:
+            The changes committed
+        """
+        with self._lock:
+            self._collect()
+            if self._watcher is None:
+                self._rescan = True
+            changes = self._commit()
+        self._publish(changes)
+        return changes
+
+    def changes_since(
+        self, cursor: int, limit: Optional[int] = None
+    ) -> Tuple[List[FileChange], int, bool]:
+        """
+        Get the changes after a cursor, including those not committed yet.
+
+        A file changed several times is reported once: created and then
+        modified is created, created and then deleted is left out.
+
+        Args:
+            cursor: Cursor of a previous call, or 0 for every change kept
+            limit: Most files to report (default: no limit). Past it, the
+                changes are cut before the first change of the next file, so
+                every file reported has all of its changes up to the returned
+                cursor merged; that cursor is then lower than `self.cursor`.
+
+        Returns:
+            Tuple of (changes in the order they were made, cursor to pass
+            next time, whether every change since cursor was still kept)
+        """
+        self.sync()
+        with self._lock:
+            first = self._log[0]["cursor"] if self._log else self.cursor + 1
+            start = bisect.bisect_right(
+                self._log, cursor, key=lambda change: change["cursor"]
+            )
+            merged: Dict[str, FileChange] = {}
+            touched: Set[str] = set()
+            next_cursor = self.cursor
+            for change in self._log[start:]:
+                if change["path"] not in touched:
+                    if limit is not None and len(touched) >= limit:
+                        next_cursor = max(cursor, change["cursor"] - 1)
+                        break
+                    touched.add(change["path"])
+                previous = merged.pop(change["path"], None)
+                action = _merge_actions(previous, change["action"])
+                if action is not None:
+                    merged[change["path"]] = FileChange(
+                        path=change["path"], action=action, cursor=change["cursor"]
+                    )
+            return list(merged.values()), next_cursor, cursor >= first - 1
+
+    def related_tests(self, paths: Iterable[str]) -> List[str]:
+        """
+        Find the test files covering changed files, by naming convention.
+
+        A test is related to a source file of the same name stem in the same
+        directory, its `__tests__` directory or a top-level test(s)
+        directory, e.g. src/Button.test.tsx and src/__tests__/Button.tsx to
+        src/Button.tsx, or tests/test_app.py to app.py. Changed tests are
+        related to themselves.
+
+        Args:
+            paths: Changed files, relative to the workspace
+
+        Returns:
+            Relative paths of the existing test files, sorted
+        """
+        with self._lock:
+            files = list(self._files)
+        tests: Dict[str, List[str]] = {}
+        for path in files:
+            if TEST_FILE.search(path):
+                tests.setdefault(_test_stem(path), []).append(path)
+        existing = set(files)
+        selected = set()
+        for path in paths:
+            if TEST_FILE.search(path):
+                if path in existing:
+                    selected.add(path)
+                continue
+            directory = os.path.dirname(path)
+            for test in tests.get(os.path.basename(path).split(".")[0], []):
+                test_dir = os.path.dirname(test).removesuffix("__tests__").rstrip("/")
+                if test_dir == directory or test.split("/")[0] in TEST_DIRS:
+                    selected.add(test)
+        return sorted(selected)
+
+    def _run(self) -> None:
+        """Collect events and commit them once they settle."""
+        first_event: Optional[float] = None
+        last_event: Optional[float] = None
+        while not self._stopped.is_set():
+            if self._watcher is None:
+                if not self._wait(self.POLL_INTERVAL):
+                    self.sync()
+                continue
+            timeout = self.debounce if first_event else self.IDLE_WAIT
+            if self._wait(timeout):
+                with self._lock:
+                    collected = self._collect()
+                if collected:
+                    last_event = time.monotonic()
+                    first_event = first_event or last_event
+                continue
+            now = time.monotonic()
+            if (
+                first_event is not None
+                and last_event is not None
+                and (
+                    now - last_event >= self.debounce
+                    or now - first_event >= self.MAX_DELAY
+                )
+            ):
+                first_event = last_event = None
+                with self._lock:
+                    changes = self._commit()
+                self._publish(changes)
+
+    def _wait(self, timeout: float) -> bool:
+        """Wait for events; returns whether any arrived (or close was called)."""
+        fds = [self._wakeup_read]
+        if self._watcher is not None:
+            fds.append(self._watcher.fd)
+        readable, _, _ = select.select(fds, [], [], timeout)
+        return bool(readable)
+
+    def _collect(self) -> bool:
+        """Add the paths touched since the last collect to the pending ones."""
+        if self._watcher is None:
+            return False
+        paths, rescan = self._watcher.read()
+        self._pending |= paths
+        self._rescan = self._rescan or rescan
+        return bool(paths) or rescan
+
+    def _commit(self) -> List[FileChange]:
+        """Compare the pending paths with the snapshot and log the changes."""
+        current: Dict[str, Optional[Tuple[int, int]]]
+        if self._rescan:
+            current = dict(self._walk())
+            paths = set(self._files) | set(current)
+        else:
+            paths = self._pending
+            current = {path: self._stat(path) for path in paths}
+        self._pending = set()
+        self._rescan = False
+        changes = []
+        for path in sorted(paths):
+            before, after = self._files.get(path), current.get(path)
+            if before == after:
+                continue
+            if after is None:
+                del self._files[path]
+            else:
+                self._files[path] = after
+            self.cursor += 1
+            action = "created" if before is None else "modified"
+            changes.append(
+                FileChange(
+                    path=path,
+                    action="deleted" if after is None else action,
+                    cursor=self.cursor,
+                )
+            )
+        self._log.extend(changes)
+        del self._log[: max(len(self._log) - self.MAX_LOG_ENTRIES, 0)]
+        return changes
+
+    def _publish(self, changes: List[FileChange]) -> None:
+        if changes:
+            logger.info(f"{len(changes)} file change(s) in {self.root}")
+        if self.change_listener is None:
+            return
+        for change in changes:
+            path = os.path.join(self.root, change["path"])
+            try:
+                self.change_listener(path)
+            except Exception as e:
+                logger.error(f"Change listener failed for '{path}': {e}")
+
+    def _stat(self, path: str) -> Optional[Tuple[int, int]]:
+        """Size and mtime of a file; None if it is not a file (any more)."""
+        try:
+            st = os.stat(os.path.join(self.root, path))
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _walk(self) -> Iterable[Tuple[str, Tuple[int, int]]]:
+        """Yield (relative path, (size, mtime_ns)) of the files in the tree."""
+        for directory, dirs, files in os.walk(self.root):
+            dirs[:] = [name for name in dirs if name not in self.SKIPPED_DIRS]
+            relative = os.path.relpath(directory, self.root)
+            for name in files:
+                path = name if relative == "." else f"{relative}/{name}"
+                signature = self._stat(path)
+                if signature is not None:
+                    yield path, signature
+
+
+def _merge_actions(previous: Optional[FileChange], action: str) -> Optional[str]:
+    """Net action of a file changed again; None if it made no change."""
+    if previous is None:
+        return action
+    if previous["action"] == "created":
+        return None if action == "deleted" else "created"
+    if previous["action"] == "deleted" and action == "created":
+        return "modified"
+    return action
+
+
+def _test_stem(path: str) -> str:
+    """Name of the module a test file tests, e.g. 'Button' for Button.test.tsx."""
+    name = os.path.basename(path).split(".")[0]
+    return name.removeprefix("test_").removesuffix("_test")
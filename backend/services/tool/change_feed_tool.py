@@ -0,0 +1,339 @@
+import logging
+import os
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    NotRequired,
+    Optional,
+    TypedDict,
+    Union,
+)
+
+from backend.services.tool.change_feed import FileChange, WorkspaceChangeFeed
+
+logger = logging.getLogger(__name__)
+
+
+class ChangesInput(TypedDict, total=False):
+    """Input schema for ChangeFeedTool."""
+
+    cwd: str  # Optional: Workspace whose changes to get
+    cursor: int  # Optional: Cursor of the previous call (default: 0)
+
+
+class ChangesOutput(TypedDict):
+    """Output schema for ChangeFeedTool."""
+
+    success: bool
+    changes: List[FileChange]  # Files changed since cursor, one entry each
+    cursor: int  # Cursor to pass next time
+    complete: bool  # Whether every change since cursor was still kept
+    related_tests: List[str]  # Test files covering the changed files
+    truncated: bool  # Whether changes were capped
+    error: NotRequired[str]
+
+
+class ChangeFeedTool:
+    """
+    Tool for finding out which files changed in a workspace.
+
+    Each open workspace has a WorkspaceChangeFeed, so after a build or a
+    codegen step the agent gets the files it created, modified or deleted
+    from a cursor instead of rescanning the tree or reading files to find
+    out. The test files related to the changes are returned with them, so
+    only those need to run.
+    """
+
+    # Tool Metadata
+    TOOL_NAME = "workspace_changes"
+    TOOL_VERSION = "1.0.0"
+    TOOL_DESCRIPTION = (
+        "List the files created, modified or deleted in the workspace since "
+        "a cursor (e.g. by a build or a generator), with the test files "
+        "related to them. Pass the returned cursor next time to only get "
+        "newer changes."
+    )
+    TOOL_CATEGORY = "search"
+
+    # Configuration
+    MAX_CHANGES = 500
+
+    # Tool Schema
+    INPUT_SCHEMA = {
+        "type": "object",
+        "title": "WorkspaceChangesInput",
+        "description": "Input parameters for listing workspace changes",
+        "properties": {
+            "cwd": {
+                "type": "string",
+                "description": "Project directory (default: the task workspace)",
+                "examples": ["/home/user/project"],
+            },
+            "cursor": {
+                "type": "integer",
+                "description": (
+                    "Cursor returned by the previous call (default: 0, every "
+                    "change since the task started)"
+                ),
+                "examples": [0, 42],
+            },
+        },
+        "required": [],
+    }
+
+    OUTPUT_SCHEMA = {
+        "type": "object",
+        "title": "WorkspaceChangesOutput",
+        "description": "Files changed since the cursor",
+        "properties": {
+            "success": {"type": "boolean"},
+            "changes": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "path": {"type": "string"},
+                        "action": {
+                            "type": "string",
+                            "enum": ["created", "modified", "deleted"],
+                        },
+                        "cursor": {"type": "integer"},
+                    },
+                },
+                "description": "Changed files, relative to cwd, oldest first",
+            },
+            "cursor": {
+                "type": "integer",
+                "description": "Cursor to pass next time",
+            },
+            "complete": {
+                "type": "boolean",
+                "description": (
+                    "False if older changes were dropped; rescan what you need"
+                ),
+            },
+            "related_tests": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Test files covering the changed files",
+            },
+            "truncated": {
+                "type": "boolean",
+                "description": "Whether the changes list was capped",
+            },
+            "error": {"type": "string"},
+        },
+        "required": [
+            "success",
+            "changes",
+            "cursor",
+            "complete",
+            "related_tests",
+            "truncated",
+        ],
+    }
+
+    def __init__(
+        self,
+        debounce: float = WorkspaceChangeFeed.DEFAULT_DEBOUNCE,
+        use_inotify: bool = True,
+    ):
+        """
+        Initialize ChangeFeedTool.
+
+        Args:
+            debounce: Seconds without events before a batch of changes is
+                committed (default: 0.2)
+            use_inotify: Watch with inotify when available, rather than
+                polling (default: True)
+
+        Raises:
+            ValueError: If debounce is negative
+        """
+        if debounce < 0:
+            raise ValueError(f"Debounce must not be negative, got {debounce}")
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self._feeds: Dict[str, WorkspaceChangeFeed] = {}
+        self._lock = threading.Lock()
+
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for registration.
+
+        Returns:
+            Dictionary with full tool definition including metadata and schemas
+        """
+        return {
+            "name": self.TOOL_NAME,
+            "version": self.TOOL_VERSION,
+            "description": self.TOOL_DESCRIPTION,
+            "category": self.TOOL_CATEGORY,
+            "inputSchema": self.INPUT_SCHEMA,
+            "outputSchema": self.OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Files a build changed",
+                    "input": {"cwd": "/home/user/project", "cursor": 12},
+                    "output": {
+                        "success": True,
+                        "changes": [
+                            {
+                                "path": "dist/index.js",
+                                "action": "created",
+                                "cursor": 13,
+                            },
+                            {
+                                "path": "src/api/client.ts",
+                                "action": "modified",
+                                "cursor": 14,
+                            },
+                        ],
+                        "cursor": 14,
+                        "complete": True,
+                        "related_tests": ["src/api/client.test.ts"],
+                        "truncated": False,
+                    },
+                }
+            ],
+        }
+
+    def open_workspace(
+        self, cwd: str, change_listener: Optional[Callable[[str], None]] = None
+    ) -> WorkspaceChangeFeed:
+        """
+        Start watching a workspace.
+
+        Args:
+            cwd: Workspace directory
+            change_listener: Called with the absolute path of every changed
+                file, e.g. to update a search index
+
+        Returns:
+            The feed of the workspace, which is reused if it is already open
+        """
+        root = os.path.realpath(cwd)
+        with self._lock:
+            feed = self._feeds.get(root)
+            if feed is None:
+                feed = self._feeds[root] = WorkspaceChangeFeed(
+                    root, change_listener, self.debounce, self.use_inotify
+                )
+                feed.start()
+        logger.info(f"Watching {root} for changes ({feed.mode})")
+        return feed
+
+    def close_workspace(self, cwd: str) -> None:
+        """
+        Stop watching a workspace.
+
+        Args:
+            cwd: Workspace directory
+        """
+        with self._lock:
+            feed = self._feeds.pop(os.path.realpath(cwd), None)
+        if feed is not None:
+            feed.close()
+
+    def feed_for(self, cwd: str) -> Optional[WorkspaceChangeFeed]:
+        """Get the feed of a workspace, if it is open."""
+        with self._lock:
+            return self._feeds.get(os.path.realpath(cwd))
+
+    def sync(self, cwd: str) -> bool:
+        """
+        Commit the changes of a workspace right away, e.g. after a command.
+
+        Args:
+            cwd: Workspace directory
+
+        Returns:
+            Whether the workspace has a feed
+        """
+        feed = self.feed_for(cwd)
+        if feed is None:
+            return False
+        feed.sync()
+        return True
+
+    def changes_since(self, cwd: str, cursor: int = 0) -> ChangesOutput:
+        """
+        Get the files changed in a workspace since a cursor.
+
+        Args:
+            cwd: Workspace directory
+            cursor: Cursor of the previous call (default: 0)
+
+        Returns:
+            ChangesOutput with the changes and the next cursor
+        """
+        feed = self.feed_for(cwd)
+        if feed is None:
+            return self._error_output(f"No change feed is open for '{cwd}'", cursor)
+        changes, next_cursor, complete = feed.changes_since(cursor, self.MAX_CHANGES)
+        related_tests = feed.related_tests(
+            change["path"] for change in changes if change["action"] != "deleted"
+        )
+        # Capped by MAX_CHANGES, or changes were committed meanwhile; either
+        # way the next call returns more
+        truncated = next_cursor < feed.cursor
+        return ChangesOutput(
+            success=True,
+            changes=changes,
+            cursor=next_cursor,
+            complete=complete,
+            related_tests=related_tests,
+            truncated=truncated,
+        )
+
+    def validate_input(self, input_data: Mapping[str, Any]) -> tuple[bool, str]:
+        """
+        Validate input data against schema.
+
+        Args:
+            input_data: Input dictionary to validate
+
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if not isinstance(input_data, dict):
+            return False, "Input must be a dictionary"
+        cwd = input_data.get("cwd")
+        if not isinstance(cwd, str) or not os.path.isdir(cwd):
+            return False, f"'cwd' must be an existing directory, got {cwd!r}"
+        cursor = input_data.get("cursor", 0)
+        if not isinstance(cursor, int) or isinstance(cursor, bool) or cursor < 0:
+            return False, "'cursor' must be a non-negative integer"
+        return True, ""
+
+    def invoke(self, input_data: Union[Dict[str, Any], ChangesInput]) -> ChangesOutput:
+        """
+        Invoke the tool with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with cwd and cursor
+
+        Returns:
+            ChangesOutput with the changes since cursor
+        """
+        is_valid, error_msg = self.validate_input(input_data)
+        if not is_valid:
+            logger.error(f"Input validation failed: {error_msg}")
+            return self._error_output(f"Input validation failed: {error_msg}", 0)
+        return self.changes_since(input_data["cwd"], input_data.get("cursor", 0))
+
+    @staticmethod
+    def _error_output(message: str, cursor: int) -> ChangesOutput:
+        return ChangesOutput(
+            success=False,
+            changes=[],
+            cursor=cursor,
+            complete=False,
+            related_tests=[],
+            truncated=False,
+            error=message,
+        )
@@ -0,0 +1,176 @@
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional
+from uuid import uuid4
+
+from backend.services.aws.command_db import Command, CommandDB
+
+logger = logging.getLogger(__name__)
+
+
+class CommandAuditLog:
+    """
+    Write-behind audit log of command executions.
+
+    Records are buffered in memory and written to CommandDB in batches by a
+    background thread, once `max_batch_size` records are waiting or every
+    `flush_interval` seconds, so recording a command costs no DB round trip.
+    Records of a failed write are kept for the next flush; `close()` writes
+    whatever is left on shutdown.
+    """
+
+    DEFAULT_MAX_BATCH_SIZE = 25  # items of one DynamoDB batch write request
+    DEFAULT_FLUSH_INTERVAL = 5.0  # seconds
+    MAX_BUFFERED = 10_000  # oldest records are dropped beyond this
+    CLOSE_TIMEOUT = 10  # seconds to wait for the flush thread on close
+
+    def __init__(
+        self,
+        command_db: Optional[CommandDB] = None,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ):
+        """
+        Initialize CommandAuditLog. The flush thread starts on first record.
+
+        Args:
+            command_db: Database the records are written to (default: a
+                CommandDB created on first flush)
+            max_batch_size: Buffered records that trigger a flush (default: 25)
+            flush_interval: Seconds between time-based flushes (default: 5)
+        """
+        if max_batch_size <= 0:
+            raise ValueError(f"Max batch size must be positive, got {max_batch_size}")
+        if flush_interval <= 0:
+            raise ValueError(f"Flush interval must be positive, got {flush_interval}")
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._command_db = command_db
+        self._buffer: List[Command] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, command: Command) -> None:
+        """
+        Buffer a command record for the next flush.
+
+        Args:
+            command: Record of an executed command
+        """
+        with self._lock:
+            self._buffer.append(command)
+            self._trim()
+            full = len(self._buffer) >= self.max_batch_size
+            if self._thread is None and not self._stopped.is_set():
+                self._thread = threading.Thread(
+                    target=self._run, name="command-audit-log", daemon=True
+                )
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def record_execution(
+        self,
+        command: str,
+        cwd: Optional[str],
+        duration_seconds: float,
+        output: Mapping[str, Any],
+    ) -> None:
+        """
+        Buffer the record of a CommandTool execution.
+
+        Args:
+            command: The command that was run
+            cwd: Working directory of the command
+            duration_seconds: Time the execution took
+            output: CommandOutput of the execution
+        """
+        self.record(
+            Command(
+                id=uuid4(),
+                cmd=command,
+                created_at=datetime.now(timezone.utc),
+                cwd=cwd,
+                duration_seconds=round(duration_seconds, 3),
+                returncode=output["returncode"],
+                stdout_bytes=_byte_count(output, "stdout"),
+                stderr_bytes=_byte_count(output, "stderr"),
+            )
+        )
+
+    def flush(self) -> int:
+        """
+        Write buffered records to CommandDB.
+
+        Returns:
+            Number of records written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            try:
+                if self._command_db is None:
+                    self._command_db = CommandDB()
+                self._command_db.save_commands(batch)
+            except Exception as e:
+                logger.error(f"Could not write {len(batch)} command record(s): {e}")
+                with self._lock:
+                    self._buffer[:0] = batch
+                    self._trim()
+                return 0
+            self.written += len(batch)
+            return len(batch)
+
+    def close(self) -> None:
+        """Stop the flush thread and write the remaining records."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.CLOSE_TIMEOUT)
+        written = self.flush()
+        logger.info(f"Command audit log closed ({written} record(s) flushed)")
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get audit log statistics.
+
+        Returns:
+            Dictionary with written, buffered and dropped record counts
+        """
+        with self._lock:
+            buffered = len(self._buffer)
+        return {"written": self.written, "buffered": buffered, "dropped": self.dropped}
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - self.MAX_BUFFERED
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            logger.warning(f"Command audit log full, dropped {overflow} record(s)")
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+def _byte_count(output: Mapping[str, Any], name: str) -> int:
+    """Size of an output stream, counted by CommandTool or else encoded."""
+    count = output.get(f"{name}_bytes")
+    if count is None:
+        return len(output[name].encode("utf-8"))
+    return int(count)
+
+
+command_audit_log = CommandAuditLog()
+atexit.register(command_audit_log.close)
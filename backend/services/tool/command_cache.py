@@ -0,0 +1,282 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class CommandCache:
+    """
+    Content-addressed cache of command results.
+
+    Results are keyed on the command, its working directory, a whitelisted
+    part of the environment and the hashes of declared input files (e.g.
+    lockfiles and source globs), so a hit means the command would run on
+    the same inputs. A working directory inside a given root, e.g. a task's
+    workspace, is keyed relative to it, so workspaces cloned from the same
+    template share results. Output directories such as node_modules or dist can be
+    stored with a result and restored on a hit. Entries are evicted least
+    recently used first once the entry count or total size limit is reached.
+    """
+
+    DEFAULT_MAX_ENTRIES = 256
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB
+    DEFAULT_ENV_WHITELIST = ("PATH", "NODE_ENV", "CI", "NODE_OPTIONS")
+    HASH_CHUNK_SIZE = 1024 * 1024  # 1 MB
+    RESULT_FILE = "result.json"
+    ARTIFACTS_DIR = "artifacts"
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        env_whitelist: Sequence[str] = DEFAULT_ENV_WHITELIST,
+    ):
+        """
+        Initialize CommandCache, loading entries already in cache_dir.
+
+        Args:
+            cache_dir: Directory the cache entries are stored in
+            max_entries: Maximum number of cached results (default: 256)
+            max_bytes: Maximum total size of results and artifacts
+                (default: 2 GB)
+            env_whitelist: Environment variables that are part of the key
+        """
+        if max_entries <= 0:
+            raise ValueError(f"Max entries must be positive, got {max_entries}")
+        if max_bytes <= 0:
+            raise ValueError(f"Max bytes must be positive, got {max_bytes}")
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.env_whitelist = tuple(env_whitelist)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self._entries.values())
+
+    def make_key(
+        self,
+        command: str,
+        cwd: Optional[str],
+        shell: bool,
+        inputs: Sequence[str] = (),
+        root: Optional[str] = None,
+    ) -> str:
+        """
+        Compute the cache key of a command.
+
+        Args:
+            command: The command
+            cwd: Working directory of the command
+            shell: Whether the command runs through a shell
+            inputs: Glob patterns of input files, relative to cwd
+            root: Directory cwd is keyed relative to when it is inside it,
+                e.g. the task's workspace (default: cwd is keyed as is)
+
+        Returns:
+            Hex digest identifying the command and its inputs
+        """
+        cwd = os.path.abspath(cwd or os.getcwd())
+        key = {
+            "command": command,
+            "cwd": self._relative_cwd(cwd, root),
+            "shell": shell,
+            "env": {name: os.environ.get(name) for name in self.env_whitelist},
+            "inputs": self._hash_inputs(cwd, inputs),
+        }
+        return hashlib.sha256(
+            json.dumps(key, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str, cwd: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached result and restore its artifacts.
+
+        Args:
+            key: Cache key from make_key
+            cwd: Directory the artifacts are restored into (default: current)
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        entry_dir = os.path.join(self.cache_dir, key)
+        try:
+            with open(os.path.join(entry_dir, self.RESULT_FILE), encoding="utf-8") as f:
+                stored = json.load(f)
+            os.utime(entry_dir)
+            for artifact in stored["artifacts"]:
+                self._restore_artifact(entry_dir, artifact, cwd or os.getcwd())
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Dropping unreadable cache entry {key}: {e}")
+            self._remove(key)
+            return None
+        result: Dict[str, Any] = stored["result"]
+        return result
+
+    def put(
+        self,
+        key: str,
+        result: Mapping[str, Any],
+        cwd: Optional[str] = None,
+        artifacts: Sequence[str] = (),
+    ) -> None:
+        """
+        Store a result and copies of its artifact directories.
+
+        Args:
+            key: Cache key from make_key
+            result: Result to store (must be JSON serializable)
+            cwd: Directory the artifact paths are relative to (default: current)
+            artifacts: Output files or directories to store with the result
+        """
+        cwd = cwd or os.getcwd()
+        entry_dir = os.path.join(self.cache_dir, key)
+        staging_dir = tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+        try:
+            stored_artifacts = []
+            for artifact in artifacts:
+                source = os.path.join(cwd, artifact)
+                if not os.path.exists(source):
+                    continue
+                target = os.path.join(staging_dir, self.ARTIFACTS_DIR, artifact)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.isdir(source):
+                    shutil.copytree(source, target, symlinks=True)
+                else:
+                    shutil.copy2(source, target)
+                stored_artifacts.append(artifact)
+            with open(
+                os.path.join(staging_dir, self.RESULT_FILE), "w", encoding="utf-8"
+            ) as f:
+                json.dump({"result": result, "artifacts": stored_artifacts}, f)
+            size = self._dir_size(staging_dir)
+            with self._lock:
+                if key in self._entries:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(staging_dir, entry_dir)
+                self._entries[key] = size
+                self._entries.move_to_end(key)
+                self._evict()
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"Could not cache command result {key}: {e}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_locked(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with entry count, total size, hits and misses
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    @staticmethod
+    def _relative_cwd(cwd: str, root: Optional[str]) -> str:
+        if root is None:
+            return cwd
+        relative = os.path.relpath(os.path.realpath(cwd), os.path.realpath(root))
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return cwd
+        return os.path.join("<root>", relative)
+
+    def _hash_inputs(self, cwd: str, patterns: Sequence[str]) -> Dict[str, str]:
+        hashes = {}
+        for pattern in patterns:
+            matches = glob.glob(os.path.join(cwd, pattern), recursive=True)
+            for path in sorted(matches):
+                if os.path.isfile(path):
+                    hashes[os.path.relpath(path, cwd)] = self._hash_file(path)
+            if not matches:
+                hashes[pattern] = ""  # Missing inputs are part of the key too
+        return hashes
+
+    def _hash_file(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(self.HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _restore_artifact(self, entry_dir: str, artifact: str, cwd: str) -> None:
+        source = os.path.join(entry_dir, self.ARTIFACTS_DIR, artifact)
+        target = os.path.join(cwd, artifact)
+        if os.path.isdir(target) and not os.path.islink(target):
+            shutil.rmtree(target)
+        elif os.path.lexists(target):
+            os.remove(target)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, symlinks=True)
+        else:
+            shutil.copy2(source, target)
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes
+        ):
+            key = next(iter(self._entries))
+            logger.info(f"Evicting command cache entry {key}")
+            self._remove_locked(key)
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            self._remove_locked(key)
+
+    def _remove_locked(self, key: str) -> None:
+        self._entries.pop(key, None)
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def _load(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if name.startswith(".staging-"):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            elif os.path.isfile(os.path.join(entry_dir, self.RESULT_FILE)):
+                entries.append((os.path.getmtime(entry_dir), name, entry_dir))
+        for _, name, entry_dir in sorted(entries):
+            self._entries[name] = self._dir_size(entry_dir)
+        self._evict()
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                file_path = os.path.join(root, name)
+                if not os.path.islink(file_path):
+                    total += os.path.getsize(file_path)
+        return total
@@ -1,10 +1,55 @@
 import subprocess
+import errno
 import logging
+import os
+import queue
+import selectors
 import shlex
-from typing import Optional, Dict, Any, TypedDict, Union
+import shutil
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import (
+    Optional,
+    Dict,
+    Any,
+    TypedDict,
+    Union,
+    Callable,
+    Generator,
+    List,
+    Mapping,
+    NotRequired,
+    Tuple,
+    cast,
+)
+from backend.services.tool.artifact_store import ArtifactStore
+from backend.services.tool.command_audit_log import CommandAuditLog
+from backend.services.tool.command_cache import CommandCache
+from backend.services.tool.output_buffer import OutputBuffer
+from backend.services.tool.output_reducer import OutputReducer, ReductionStats
+from backend.services.tool.process_tree import (
+    LeakedProcess,
+    ProcessReaper,
+    kill_process_group,
+    list_process_group,
+    signal_process_group,
+    wait_for_process_group,
+)
+from backend.services.tool.resource_limits import (
+    ResourceLimits,
+    ResourceUsage,
+    get_resource_usage,
+)
+from backend.services.tool.shell_session import ShellSession, ShellSessionError
 
 logger = logging.getLogger(__name__)
 
+# Waits until the parent closes the gate pipe (fd in $1), then execs the command.
+# Run by bash, since the fd may have more digits than sh redirections allow.
+LIMITS_GATE = 'read -r _ <&"$1"; eval "exec $1<&-"; shift; exec "$@"'
+
 
 class CommandInput(TypedDict, total=False):
     """Input schema for CommandTool."""
@@ -12,6 +57,10 @@ class CommandInput(TypedDict, total=False):
     command: str  # Required: The command to execute
     cwd: Optional[str]  # Optional: Working directory
     shell: bool  # Optional: Use shell execution
+    timeout: int  # Optional: Timeout in seconds for this command
+    cache: bool  # Optional: Reuse a cached result for the same inputs
+    cache_inputs: List[str]  # Optional: Globs of input files for the cache key
+    cache_artifacts: List[str]  # Optional: Output paths stored with the result
 
 
 class CommandOutput(TypedDict):
@@ -21,6 +70,37 @@ class CommandOutput(TypedDict):
     stdout: str  # Standard output
     stderr: str  # Standard error
     success: bool  # Command success status
+    stdout_bytes: NotRequired[int]  # Total size of stdout before capping
+    stderr_bytes: NotRequired[int]  # Total size of stderr before capping
+    truncated: NotRequired[bool]  # Whether stdout/stderr were capped
+    stdout_log: NotRequired[Optional[str]]  # Full stdout log file, if spilled
+    stderr_log: NotRequired[Optional[str]]  # Full stderr log file, if spilled
+    stdout_log_artifact: NotRequired[Optional[str]]  # Hash of the stored log
+    stderr_log_artifact: NotRequired[Optional[str]]  # Hash of the stored log
+    reduction: NotRequired[Dict[str, ReductionStats]]  # Per stream, when reduced
+    cancelled: NotRequired[bool]  # Whether the command was cancelled
+    cached: NotRequired[bool]  # Whether the result came from the cache
+    resources: NotRequired[ResourceUsage]  # CPU, memory and wall time used
+
+
+class BatchCommandInput(TypedDict):
+    """Input schema for batch execution with CommandTool."""
+
+    commands: List[CommandInput]  # Required: Commands to run concurrently
+
+
+class BatchCommandOutput(TypedDict):
+    """Output schema for batch execution with CommandTool."""
+
+    results: List[CommandOutput]  # Results in the order of the input commands
+    success: bool  # Whether every command succeeded
+
+
+OutputCallback = Callable[[str, str], None]  # (stream name, line)
+
+
+class CommandCancelled(Exception):
+    """Raised when a running command is cancelled."""
 
 
 class CommandTool:
@@ -62,6 +142,32 @@ class CommandTool:
                 "description": "Whether to use shell execution for complex commands (default: False)",
                 "examples": [True, False],
             },
+            "timeout": {
+                "type": "integer",
+                "description": "Timeout in seconds for this command (optional, default: 300)",
+                "examples": [60, 600],
+            },
+            "cache": {
+                "type": "boolean",
+                "description": (
+                    "Reuse the result of an earlier successful run when the command, "
+                    "cwd and input files are unchanged (default: False). Only for "
+                    "deterministic commands such as 'npm install' or 'tsc --noEmit'"
+                ),
+                "examples": [True, False],
+            },
+            "cache_inputs": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Glob patterns, relative to cwd, of files the result depends on",
+                "examples": [["package-lock.json"], ["src/**/*.ts", "tsconfig.json"]],
+            },
+            "cache_artifacts": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Output paths, relative to cwd, restored on a cache hit",
+                "examples": [["node_modules"], ["dist"]],
+            },
         },
         "required": ["command"],
     }
@@ -88,26 +194,193 @@ class CommandTool:
                 "type": "boolean",
                 "description": "Whether the command executed successfully",
             },
+            "stdout_bytes": {
+                "type": "integer",
+                "description": "Total size of standard output in bytes",
+            },
+            "stderr_bytes": {
+                "type": "integer",
+                "description": "Total size of standard error in bytes",
+            },
+            "truncated": {
+                "type": "boolean",
+                "description": "Whether the middle of stdout/stderr was cut to fit the output cap",
+            },
+            "stdout_log": {
+                "type": ["string", "null"],
+                "description": "Path of the full stdout log when it was truncated",
+            },
+            "stderr_log": {
+                "type": ["string", "null"],
+                "description": "Path of the full stderr log when it was truncated",
+            },
+            "stdout_log_artifact": {
+                "type": ["string", "null"],
+                "description": "Artifact hash of the full stdout log when it was truncated",
+            },
+            "stderr_log_artifact": {
+                "type": ["string", "null"],
+                "description": "Artifact hash of the full stderr log when it was truncated",
+            },
+            "reduction": {
+                "type": "object",
+                "description": (
+                    "Size of stdout/stderr before and after output reduction, "
+                    "present when reduction is enabled"
+                ),
+            },
+            "cancelled": {
+                "type": "boolean",
+                "description": "Whether the command was cancelled before it finished",
+            },
+            "cached": {
+                "type": "boolean",
+                "description": "Whether the result was returned from the command cache",
+            },
+            "resources": {
+                "type": "object",
+                "description": (
+                    "User/system CPU seconds, max RSS bytes and wall seconds "
+                    "used by the command"
+                ),
+            },
         },
         "required": ["returncode", "stdout", "stderr", "success"],
     }
 
+    # Tool Schema for batch execution
+    BATCH_TOOL_NAME = "command_batch_executor"
+    BATCH_INPUT_SCHEMA = {
+        "type": "object",
+        "title": "CommandToolBatchInput",
+        "description": "Input parameters for concurrent execution of several commands",
+        "properties": {
+            "commands": {
+                "type": "array",
+                "description": (
+                    "Independent commands to run concurrently "
+                    "(e.g. lint, type-check and test)"
+                ),
+                "items": INPUT_SCHEMA,
+                "minItems": 1,
+            },
+        },
+        "required": ["commands"],
+    }
+
+    BATCH_OUTPUT_SCHEMA = {
+        "type": "object",
+        "title": "CommandToolBatchOutput",
+        "description": "Results of concurrent command execution",
+        "properties": {
+            "results": {
+                "type": "array",
+                "description": "Result of each command, in the order of the input commands",
+                "items": OUTPUT_SCHEMA,
+            },
+            "success": {
+                "type": "boolean",
+                "description": "Whether every command executed successfully",
+            },
+        },
+        "required": ["results", "success"],
+    }
+
     # Configuration
     DEFAULT_TIMEOUT = 300  # 5 minutes
     MAX_TIMEOUT = 1800  # 30 minutes
+    DEFAULT_MAX_OUTPUT_BYTES = 256 * 1024  # 256 KB kept in memory per stream
+    READ_CHUNK_SIZE = 64 * 1024  # 64 KB
+    MAX_LINE_BYTES = 64 * 1024  # longer lines are split
+    DEFAULT_MAX_PROCESSES = 4  # commands run concurrently by a batch
+    MAX_BATCH_COMMANDS = 20
+    CANCEL_POLL_INTERVAL = 0.1  # seconds between cancellation checks
+    MIN_WAIT_INTERVAL = 0.001  # first poll interval while waiting for exit
+    DEFAULT_KILL_GRACE_SECONDS = 5  # between SIGTERM and SIGKILL on timeout
 
-    def __init__(self, timeout: int = DEFAULT_TIMEOUT):
+    def __init__(
+        self,
+        timeout: int = DEFAULT_TIMEOUT,
+        max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+        log_dir: Optional[str] = None,
+        reduce_output: bool = False,
+        max_reduced_bytes: int = OutputReducer.DEFAULT_MAX_BYTES,
+        max_reduced_tokens: int = OutputReducer.DEFAULT_MAX_TOKENS,
+        max_processes: int = DEFAULT_MAX_PROCESSES,
+        cache_dir: Optional[str] = None,
+        resource_limits: Optional[ResourceLimits] = None,
+        audit_log: Optional[CommandAuditLog] = None,
+        kill_grace_seconds: float = DEFAULT_KILL_GRACE_SECONDS,
+        artifact_store: Optional[ArtifactStore] = None,
+    ):
         """
         Initialize CommandTool.
 
         Args:
             timeout: Command execution timeout in seconds (default: 300)
+            max_output_bytes: Output kept in memory per stream, split between
+                head and tail (default: 256 KB)
+            log_dir: Directory for full logs of truncated output
+                (default: system temp dir)
+            reduce_output: Reduce stdout/stderr for LLM consumption: strip
+                ANSI codes and progress bars, dedupe lines, extract errors and
+                cap the size (default: False)
+            max_reduced_bytes: Byte cap of each reduced stream (default: 16 KB)
+            max_reduced_tokens: Estimated token cap of each reduced stream
+                (default: 4000)
+            max_processes: Maximum number of commands a batch runs at the same
+                time (default: 4)
+            cache_dir: Directory of the result cache used by commands run with
+                cache=True (default: no cache)
+            resource_limits: rlimits applied to every command (default: none)
+            audit_log: Write-behind log every execution is recorded in
+                (default: no auditing)
+            kill_grace_seconds: Time a timed out or cancelled command's process
+                group is given to exit after SIGTERM before SIGKILL (default: 5)
+            artifact_store: Store full logs of truncated output of a run's
+                commands are moved into until `reap_run`, so identical logs
+                are kept once (default: keep them in log_dir)
         """
         if timeout > self.MAX_TIMEOUT:
             raise ValueError(f"Timeout cannot exceed {self.MAX_TIMEOUT} seconds")
         if timeout <= 0:
             raise ValueError(f"Timeout must be positive, got {timeout}")
+        if max_output_bytes <= 0:
+            raise ValueError(
+                f"Max output bytes must be positive, got {max_output_bytes}"
+            )
+        if max_processes <= 0:
+            raise ValueError(f"Max processes must be positive, got {max_processes}")
         self.timeout = timeout
+        self.max_processes = max_processes
+        self.max_output_bytes = max_output_bytes
+        self.log_dir = log_dir
+        self.reducer = (
+            OutputReducer(max_reduced_bytes, max_reduced_tokens)
+            if reduce_output
+            else None
+        )
+        self.resource_limits = resource_limits
+        self.audit_log = audit_log
+        self.kill_grace_seconds = kill_grace_seconds
+        self.artifact_store = artifact_store
+        self.reaper = ProcessReaper(grace_seconds=min(kill_grace_seconds, 2))
+        self.metrics = {
+            "reduced_commands": 0,
+            "original_bytes": 0,
+            "reduced_bytes": 0,
+            "commands": 0,
+            "cpu_user_seconds": 0.0,
+            "cpu_system_seconds": 0.0,
+            "wall_seconds": 0.0,
+            "peak_rss_bytes": 0,
+        }
+        self._metrics_lock = threading.Lock()
+        self.cache = CommandCache(cache_dir) if cache_dir else None
+        self._sessions: Dict[str, ShellSession] = {}
+        self._sessions_lock = threading.Lock()
+        self._run_artifacts: Dict[str, List[str]] = {}  # log references by run
+        self._run_artifacts_lock = threading.Lock()
         logger.info(f"CommandTool initialized with timeout: {timeout}s")
 
     def get_tool_definition(self) -> Dict[str, Any]:
@@ -158,23 +431,115 @@ class CommandTool:
             ],
         }
 
+    def get_batch_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for concurrent execution of several commands.
+
+        Returns:
+            Dictionary with full tool definition for batch execution
+        """
+        return {
+            "name": self.BATCH_TOOL_NAME,
+            "version": self.TOOL_VERSION,
+            "description": (
+                "Execute several independent shell commands concurrently and "
+                "capture their output. Use it to run lint, type-check and tests "
+                "in parallel instead of one after another."
+            ),
+            "category": self.TOOL_CATEGORY,
+            "inputSchema": self.BATCH_INPUT_SCHEMA,
+            "outputSchema": self.BATCH_OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Lint and type-check in parallel",
+                    "input": {
+                        "commands": [
+                            {"command": "npm run lint", "cwd": "/project"},
+                            {"command": "npx tsc --noEmit", "cwd": "/project"},
+                        ]
+                    },
+                    "output": {
+                        "results": [
+                            {
+                                "returncode": 0,
+                                "stdout": "No lint errors",
+                                "stderr": "",
+                                "success": True,
+                            },
+                            {
+                                "returncode": 0,
+                                "stdout": "",
+                                "stderr": "",
+                                "success": True,
+                            },
+                        ],
+                        "success": True,
+                    },
+                },
+            ],
+        }
+
     def execute_command(
-        self, command: str, cwd: Optional[str] = None, shell: bool = False
+        self,
+        command: str,
+        cwd: Optional[str] = None,
+        shell: bool = False,
+        on_output: Optional[OutputCallback] = None,
+        timeout: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+        session_id: Optional[str] = None,
+        cache: bool = False,
+        cache_inputs: Optional[List[str]] = None,
+        cache_artifacts: Optional[List[str]] = None,
+        cache_root: Optional[str] = None,
+        resource_limits: Optional[ResourceLimits] = None,
+        run_id: Optional[str] = None,
     ) -> CommandOutput:
         """
         Execute a command and return the result.
 
+        Output is read incrementally while the command runs. Each stream keeps
+        a capped head/tail view in memory; when output exceeds the cap the
+        full log is written to a file referenced in the result.
+
         Args:
             command: The command to execute (string or list)
             cwd: The working directory to execute the command in (optional)
             shell: Whether to use shell execution (default: False)
+            on_output: Called with (stream name, line) for each line of output
+                as it is produced (optional)
+            timeout: Timeout in seconds for this command (default: the tool's)
+            cancel_event: Kills the command when set (optional)
+            session_id: Run the command in this open shell session, keeping
+                its working directory and environment (optional)
+            cache: Return the cached result of an earlier successful run with
+                the same command, cwd, environment and inputs (default: False).
+                Ignored without a cache_dir or in a session.
+            cache_inputs: Glob patterns of input files, relative to cwd, that
+                are part of the cache key (optional)
+            cache_artifacts: Output files or directories, relative to cwd,
+                stored with the result and restored on a hit (optional)
+            cache_root: Directory the cwd is keyed relative to, e.g. the
+                task's workspace, so results are reused across workspaces
+                (default: the cwd is keyed as an absolute path)
+            resource_limits: rlimits for this command (default: the tool's).
+                Ignored in a session, whose shell has its own limits.
+            run_id: Agent run the command belongs to (optional). Processes
+                the command leaves running in the background are kept until
+                `reap_run(run_id)`; without a run they are terminated at once.
 
         Returns:
             Dictionary containing:
                 - returncode: Exit code of the command
-                - stdout: Standard output
-                - stderr: Standard error
+                - stdout: Standard output (head/tail view if truncated)
+                - stderr: Standard error (head/tail view if truncated)
                 - success: Boolean indicating if command succeeded
+                - stdout_bytes / stderr_bytes: Total output sizes
+                - truncated: Whether output was capped
+                - stdout_log / stderr_log: Full log paths when truncated
+                - cancelled: Whether the command was cancelled
+                - cached: Whether the result came from the cache
+                - resources: CPU, max RSS and wall time used by the command
 
         Examples:
             >>> tool = CommandTool()
@@ -186,10 +551,20 @@ class CommandTool:
 
             >>> result = tool.execute_command("echo $HOME", shell=True)
             >>> print(result["stdout"])
+
+            >>> tool.execute_command("npm run build", on_output=print)
         """
         # Validate input first
+        timeout = timeout or self.timeout
         is_valid, error_msg = self.validate_input(
-            {"command": command, "cwd": cwd, "shell": shell}
+            {
+                "command": command,
+                "cwd": cwd,
+                "shell": shell,
+                "timeout": timeout,
+                "cache_inputs": cache_inputs or [],
+                "cache_artifacts": cache_artifacts or [],
+            }
         )
         if not is_valid:
             logger.error(f"Validation failed: {error_msg}")
@@ -199,13 +574,135 @@ class CommandTool:
                 stderr=f"Validation error: {error_msg}",
                 success=False,
             )
+        started = time.monotonic()
+        limits = resource_limits or self.resource_limits
+        if session_id is not None:
+            output = self._execute_in_session(
+                session_id, command, cwd, timeout, on_output
+            )
+        elif cache and self.cache:
+            output = self._execute_cached(
+                command,
+                cwd,
+                shell,
+                cache_inputs or [],
+                cache_artifacts or [],
+                cache_root,
+                lambda: self._execute_process(
+                    command,
+                    cwd,
+                    shell,
+                    timeout,
+                    on_output,
+                    cancel_event,
+                    limits,
+                    run_id,
+                ),
+            )
+        else:
+            output = self._execute_process(
+                command, cwd, shell, timeout, on_output, cancel_event, limits, run_id
+            )
+        if self.audit_log:
+            self.audit_log.record_execution(
+                command, cwd, time.monotonic() - started, output
+            )
+        return output
 
+    def _execute_cached(
+        self,
+        command: str,
+        cwd: Optional[str],
+        shell: bool,
+        inputs: List[str],
+        artifacts: List[str],
+        root: Optional[str],
+        execute: Callable[[], CommandOutput],
+    ) -> CommandOutput:
+        """Return a cached result, or execute and cache a successful one."""
+        cache = self.cache
+        if cache is None:
+            return execute()
+        try:
+            key = cache.make_key(command, cwd, shell, inputs, root)
+        except OSError as e:
+            logger.error(f"Could not compute cache key, running uncached: {e}")
+            return execute()
+        cached = cache.get(key, cwd)
+        if cached is not None:
+            logger.info(f"Cache hit for command: {command[:100]}")
+            return cast(CommandOutput, {**cached, "cached": True})
+        output = execute()
+        if output["success"]:
+            cache.put(key, output, cwd, artifacts)
+        output["cached"] = False
+        return output
+
+    @staticmethod
+    def _start_process(
+        cmd_list: Union[str, List[str]],
+        cwd: Optional[str],
+        shell: bool,
+        limits: Optional[ResourceLimits],
+    ) -> subprocess.Popen:
+        """
+        Start a command in its own session, with its resource limits applied.
+
+        Limits are set with prlimit rather than in preexec_fn, which is not
+        safe with threads. So that the command never runs without them, it
+        is started behind a shell gate that execs it once the limits are set.
+        """
+        popen_kwargs: Dict[str, Any] = dict(
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Own session and process group, so the whole tree can be signalled
+            start_new_session=True,
+        )
+        if not limits:
+            return subprocess.Popen(cmd_list, shell=shell, **popen_kwargs)
+        if isinstance(cmd_list, str):  # a shell command
+            cmd_list = ["/bin/sh", "-c", cmd_list]
+        elif "/" not in cmd_list[0] and shutil.which(cmd_list[0]) is None:
+            raise FileNotFoundError(
+                errno.ENOENT, "No such file or directory", cmd_list[0]
+            )
+        gate_read, gate_write = os.pipe()
+        try:
+            process = subprocess.Popen(
+                ["/bin/bash", "-c", LIMITS_GATE, "gate", str(gate_read), *cmd_list],
+                pass_fds=(gate_read,),
+                **popen_kwargs,
+            )
+            limits.apply(process.pid)
+        finally:
+            os.close(gate_read)
+            os.close(gate_write)  # releases the gate
+        return process
+
+    def _execute_process(
+        self,
+        command: str,
+        cwd: Optional[str],
+        shell: bool,
+        timeout: int,
+        on_output: Optional[OutputCallback],
+        cancel_event: Optional[threading.Event],
+        limits: Optional[ResourceLimits] = None,
+        run_id: Optional[str] = None,
+    ) -> CommandOutput:
+        buffers = {
+            "stdout": self._create_buffer("stdout"),
+            "stderr": self._create_buffer("stderr"),
+        }
+        usage: Dict[str, ResourceUsage] = {}
         try:
             logger.info(
                 f"Executing command: {command[:100]}... (cwd={cwd}, shell={shell})"
             )
 
             # Parse command into list if it's a string and shell is False
+            cmd_list: Union[str, List[str]]
             if isinstance(command, str) and not shell:
                 # Use shlex to properly handle quoted arguments
                 cmd_list = shlex.split(command)
@@ -213,36 +710,37 @@ class CommandTool:
                 cmd_list = command
 
             # Execute the command
-            result = subprocess.run(
-                cmd_list,
-                cwd=cwd,
-                shell=shell,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout,
-            )
+            process = self._start_process(cmd_list, cwd, shell, limits)
+            started = time.monotonic()
+            deadline = started + timeout
+            try:
+                self._read_output(process, buffers, on_output, deadline, cancel_event)
+                returncode = self._wait(process, deadline, cancel_event, started, usage)
+            except BaseException:
+                self._terminate(process, started, usage)
+                raise
+            self._handle_background_processes(process.pid, run_id)
 
-            output = CommandOutput(
-                returncode=result.returncode,
-                stdout=result.stdout,
-                stderr=result.stderr,
-                success=result.returncode == 0,
-            )
+            output = self._build_output(returncode, buffers, run_id)
+            self._record_usage(output, usage, limits)
 
-            logger.info(
-                f"Command executed successfully. Return code: {result.returncode}"
-            )
+            logger.info(f"Command executed successfully. Return code: {returncode}")
             return output
 
-        except subprocess.TimeoutExpired as e:
-            error_msg = f"Command execution timed out after {self.timeout} seconds"
+        except subprocess.TimeoutExpired:
+            error_msg = f"Command execution timed out after {timeout} seconds"
             logger.error(error_msg)
-            return CommandOutput(
+            output = CommandOutput(
                 returncode=-1,
-                stdout="",
+                stdout=buffers["stdout"].get_text(),
                 stderr=error_msg,
                 success=False,
             )
+            self._record_usage(output, usage)
+            return output
+        except CommandCancelled:
+            logger.info(f"Command cancelled: {command[:100]}")
+            return self._cancelled_output(buffers["stdout"].get_text())
         except FileNotFoundError as e:
             error_msg = f"Command not found: {str(e)}"
             logger.error(error_msg)
@@ -261,8 +759,599 @@ class CommandTool:
                 stderr=error_msg,
                 success=False,
             )
+        finally:
+            for buffer in buffers.values():
+                buffer.close()
+
+    def open_session(
+        self,
+        session_id: str,
+        cwd: Optional[str] = None,
+        resource_limits: Optional[ResourceLimits] = None,
+    ) -> ShellSession:
+        """
+        Open a persistent shell session for commands run with `session_id`.
+
+        Commands in a session share one bash process, so `cd`, exported
+        variables and activated environments carry over between commands.
+        The limits are set on the shell and inherited by every command.
+
+        Args:
+            session_id: Identifier of the session, e.g. the agent run id
+            cwd: Initial working directory of the session (optional)
+            resource_limits: rlimits of the session (default: the tool's)
+
+        Returns:
+            The session; an already open session with this id is returned as is
+        """
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = ShellSession(
+                    cwd=cwd, resource_limits=resource_limits or self.resource_limits
+                )
+        return session
+
+    def close_session(self, session_id: str) -> List[LeakedProcess]:
+        """
+        Close a shell session and terminate any process left in it.
+
+        Args:
+            session_id: Identifier of the session
+
+        Returns:
+            Processes the session's commands left running
+        """
+        with self._sessions_lock:
+            session = self._sessions.pop(session_id, None)
+        return session.close() if session else []
+
+    def reap_run(self, run_id: str) -> List[LeakedProcess]:
+        """
+        Terminate everything an agent run left running.
+
+        Closes the run's shell session, if any, and the process groups of its
+        commands that still had processes running, and gives back the run's
+        references to logs in the artifact store.
+
+        Args:
+            run_id: Identifier of the agent run (and of its session)
+
+        Returns:
+            Processes that were still running, reported as leaked
+        """
+        leaked = self.close_session(run_id) + self.reaper.reap(run_id)
+        self._release_logs(run_id)
+        return leaked
+
+    def close_all_sessions(self) -> None:
+        """Close every open shell session."""
+        with self._sessions_lock:
+            session_ids = list(self._sessions)
+        for session_id in session_ids:
+            self.close_session(session_id)
+
+    def _execute_in_session(
+        self,
+        session_id: str,
+        command: str,
+        cwd: Optional[str],
+        timeout: int,
+        on_output: Optional[OutputCallback],
+    ) -> CommandOutput:
+        with self._sessions_lock:
+            session = self._sessions.get(session_id)
+        if session is None:
+            return CommandOutput(
+                returncode=-1,
+                stdout="",
+                stderr=f"Shell session not found: {session_id}",
+                success=False,
+            )
+        if cwd:
+            command = f"cd -- {shlex.quote(cwd)} && {command}"
+
+        buffers = {
+            "stdout": self._create_buffer("stdout"),
+            "stderr": self._create_buffer("stderr"),
+        }
+        try:
+            logger.info(f"Executing command in session {session_id}: {command[:100]}")
+            usage: Dict[str, ResourceUsage] = {}
+            returncode = session.run(
+                command,
+                timeout,
+                lambda name, data: self._emit_line(name, data, buffers, on_output),
+                usage,
+            )
+            output = self._build_output(returncode, buffers, session_id)
+            self._record_usage(output, usage, session.resource_limits)
+            return output
+        except subprocess.TimeoutExpired:
+            error_msg = (
+                f"Command execution timed out after {timeout} seconds; "
+                "the shell session was restarted"
+            )
+            logger.error(error_msg)
+            return CommandOutput(
+                returncode=-1,
+                stdout=buffers["stdout"].get_text(),
+                stderr=error_msg,
+                success=False,
+            )
+        except ShellSessionError as e:
+            logger.error(f"Shell session {session_id} failed: {e}")
+            return CommandOutput(
+                returncode=-1,
+                stdout=buffers["stdout"].get_text(),
+                stderr=buffers["stderr"].get_text() + str(e),
+                success=False,
+            )
+        finally:
+            for buffer in buffers.values():
+                buffer.close()
 
-    def validate_input(self, input_data: Dict[str, Any]) -> tuple[bool, str]:
+    def execute_batch(
+        self,
+        commands: List[CommandInput],
+        cancel_event: Optional[threading.Event] = None,
+        run_id: Optional[str] = None,
+        cache_root: Optional[str] = None,
+    ) -> Generator[Tuple[int, CommandOutput], None, None]:
+        """
+        Run commands concurrently and yield their results as they finish.
+
+        At most `max_processes` commands run at the same time; each keeps its
+        own timeout. Setting `cancel_event` kills running commands and skips
+        those not started yet. Closing the generator early cancels the rest.
+
+        Args:
+            commands: Commands to run, each with command, cwd, shell and timeout
+            cancel_event: Cancels the remaining commands when set (optional)
+            run_id: Agent run that background processes are kept for until
+                reap_run (optional)
+            cache_root: Directory cached commands key their cwd relative to
+                (optional)
+
+        Yields:
+            Tuples of (index in commands, CommandOutput), in completion order
+
+        Examples:
+            >>> commands = [{"command": "npm run lint"}, {"command": "npm test"}]
+            >>> for index, result in tool.execute_batch(commands):
+            ...     print(commands[index]["command"], result["success"])
+        """
+        if not commands:
+            return
+        cancel_event = cancel_event or threading.Event()
+        executor = ThreadPoolExecutor(
+            max_workers=min(self.max_processes, len(commands)),
+            thread_name_prefix="command",
+        )
+        futures = {
+            executor.submit(
+                self._run_batch_entry, entry, cancel_event, run_id, cache_root
+            ): index
+            for index, entry in enumerate(commands)
+        }
+        finished = False
+        try:
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+            finished = True
+        finally:
+            if not finished:
+                cancel_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def run_batch(
+        self,
+        commands: List[CommandInput],
+        cancel_event: Optional[threading.Event] = None,
+        run_id: Optional[str] = None,
+        cache_root: Optional[str] = None,
+    ) -> List[CommandOutput]:
+        """
+        Run commands concurrently and wait for all of them.
+
+        Args:
+            commands: Commands to run, each with command, cwd, shell and timeout
+            cancel_event: Cancels the remaining commands when set (optional)
+            run_id: Agent run that background processes are kept for until
+                reap_run (optional)
+            cache_root: Directory cached commands key their cwd relative to
+                (optional)
+
+        Returns:
+            CommandOutput of each command, in the order of the input commands
+        """
+        outputs = dict(self.execute_batch(commands, cancel_event, run_id, cache_root))
+        return [outputs[index] for index in range(len(commands))]
+
+    def _run_batch_entry(
+        self,
+        entry: CommandInput,
+        cancel_event: threading.Event,
+        run_id: Optional[str] = None,
+        cache_root: Optional[str] = None,
+    ) -> CommandOutput:
+        if cancel_event.is_set():
+            return self._cancelled_output("")
+        is_valid, error_msg = self.validate_input(entry)
+        if not is_valid:
+            return CommandOutput(
+                returncode=-1,
+                stdout="",
+                stderr=f"Input validation failed: {error_msg}",
+                success=False,
+            )
+        return self._execute_input(entry, cancel_event, run_id, cache_root)
+
+    @staticmethod
+    def _cancelled_output(stdout: str) -> CommandOutput:
+        return CommandOutput(
+            returncode=-1,
+            stdout=stdout,
+            stderr="Command cancelled",
+            success=False,
+            cancelled=True,
+        )
+
+    def stream_command(
+        self, command: str, cwd: Optional[str] = None, shell: bool = False
+    ) -> Generator[Tuple[str, str], None, CommandOutput]:
+        """
+        Execute a command and yield its output lines as they are produced.
+
+        Args:
+            command: The command to execute
+            cwd: The working directory to execute the command in (optional)
+            shell: Whether to use shell execution (default: False)
+
+        Yields:
+            Tuples of (stream name, line), stream name being 'stdout' or 'stderr'
+
+        Returns:
+            CommandOutput of the finished command, as the generator return value
+
+        Examples:
+            >>> for stream, line in tool.stream_command("npm install"):
+            ...     print(stream, line, end="")
+        """
+        lines: queue.Queue = queue.Queue()
+        done = object()
+        result: Dict[str, CommandOutput] = {}
+
+        def run() -> None:
+            try:
+                result["output"] = self.execute_command(
+                    command,
+                    cwd=cwd,
+                    shell=shell,
+                    on_output=lambda stream, line: lines.put((stream, line)),
+                )
+            finally:
+                lines.put(done)
+
+        threading.Thread(target=run, name="command-stream", daemon=True).start()
+        while (item := lines.get()) is not done:
+            yield item
+        return result["output"]
+
+    def _create_buffer(self, name: str) -> OutputBuffer:
+        return OutputBuffer(
+            name,
+            max_head_bytes=self.max_output_bytes // 2,
+            max_tail_bytes=self.max_output_bytes - self.max_output_bytes // 2,
+            log_dir=self.log_dir,
+        )
+
+    def _read_output(
+        self,
+        process: subprocess.Popen,
+        buffers: Dict[str, OutputBuffer],
+        on_output: Optional[OutputCallback],
+        deadline: float,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> None:
+        """
+        Read stdout and stderr incrementally until both are closed.
+
+        Raises:
+            subprocess.TimeoutExpired: If the command runs past the deadline
+            CommandCancelled: If cancel_event is set
+        """
+        pending = {"stdout": b"", "stderr": b""}
+        streams = {
+            name: stream
+            for name, stream in (("stdout", process.stdout), ("stderr", process.stderr))
+            if stream is not None
+        }
+        with selectors.DefaultSelector() as selector:
+            for name, stream in streams.items():
+                selector.register(stream, selectors.EVENT_READ, name)
+            while selector.get_map():
+                remaining = self._check_deadline(process, deadline, cancel_event)
+                for key, _ in selector.select(timeout=remaining):
+                    name = key.data
+                    data = os.read(key.fd, self.READ_CHUNK_SIZE)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        streams[name].close()
+                        data, pending[name] = pending[name], b""
+                        if data:
+                            self._emit_line(name, data, buffers, on_output)
+                        continue
+                    pending[name] = self._emit_lines(
+                        name, pending[name] + data, buffers, on_output
+                    )
+
+    def _wait(
+        self,
+        process: subprocess.Popen,
+        deadline: float,
+        cancel_event: Optional[threading.Event],
+        started: float,
+        usage: Dict[str, ResourceUsage],
+    ) -> int:
+        """
+        Wait for the process to exit, checking the deadline and cancellation.
+
+        The process is reaped with os.wait4 so its resource usage is recorded
+        in usage["usage"].
+        """
+        delay = self.MIN_WAIT_INTERVAL
+        while True:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                return self._set_exit(process, status, rusage, started, usage)
+            remaining = self._check_deadline(process, deadline, cancel_event)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.CANCEL_POLL_INTERVAL)
+
+    def _terminate(
+        self,
+        process: subprocess.Popen,
+        started: float,
+        usage: Dict[str, ResourceUsage],
+    ) -> None:
+        """
+        Terminate the command's whole process group.
+
+        The group gets SIGTERM, and SIGKILL once `kill_grace_seconds` have
+        passed without it exiting.
+        """
+        deadline = time.monotonic() + self.kill_grace_seconds
+        signal_process_group(process.pid, signal.SIGTERM)
+        delay = self.MIN_WAIT_INTERVAL
+        while time.monotonic() < deadline:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                self._set_exit(process, status, rusage, started, usage)
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, self.CANCEL_POLL_INTERVAL)
+        if not wait_for_process_group(process.pid, deadline):
+            logger.warning(f"Process group {process.pid} ignored SIGTERM, killing it")
+        signal_process_group(process.pid, signal.SIGKILL)
+        self._reap(process, started, usage)
+        kill_process_group(process.pid)
+
+    def _handle_background_processes(self, pgid: int, run_id: Optional[str]) -> None:
+        """Keep processes left running by a command for its run, or stop them."""
+        if not signal_process_group(pgid, 0):
+            return
+        if run_id is not None:
+            self.reaper.track(run_id, pgid)
+            return
+        leftover = list_process_group(pgid)
+        if leftover:
+            logger.warning(
+                f"Command left {len(leftover)} process(es) running, terminating them"
+            )
+            self.reaper.terminate_groups({pgid})
+
+    def _reap(
+        self,
+        process: subprocess.Popen,
+        started: float,
+        usage: Dict[str, ResourceUsage],
+    ) -> int:
+        """Block until the process exits and record its resource usage."""
+        if process.returncode is not None:
+            return process.returncode
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            return process.wait()
+        return self._set_exit(process, status, rusage, started, usage)
+
+    @staticmethod
+    def _set_exit(
+        process: subprocess.Popen,
+        status: int,
+        rusage: Any,
+        started: float,
+        usage: Dict[str, ResourceUsage],
+    ) -> int:
+        # Popen does not wait again once returncode is set
+        process.returncode = os.waitstatus_to_exitcode(status)
+        usage["usage"] = get_resource_usage(rusage, time.monotonic() - started)
+        return process.returncode
+
+    def _record_usage(
+        self,
+        output: CommandOutput,
+        usage: Dict[str, ResourceUsage],
+        limits: Optional[ResourceLimits] = None,
+    ) -> None:
+        """Add the resource usage to the output and the tool metrics."""
+        resources = usage.get("usage")
+        if limits and limits.cpu_exceeded(output["returncode"], resources):
+            output["stderr"] += (
+                f"\n[Command killed: CPU time limit of {limits.cpu_seconds} "
+                "seconds exceeded]\n"
+            )
+        if resources is None:
+            return
+        output["resources"] = resources
+        with self._metrics_lock:
+            self.metrics["commands"] += 1
+            self.metrics["cpu_user_seconds"] += resources["cpu_user_seconds"]
+            self.metrics["cpu_system_seconds"] += resources["cpu_system_seconds"]
+            self.metrics["wall_seconds"] += resources["wall_seconds"]
+            self.metrics["peak_rss_bytes"] = max(
+                self.metrics["peak_rss_bytes"], resources["max_rss_bytes"]
+            )
+        logger.info(f"Command resource usage: {resources}")
+
+    def _check_deadline(
+        self,
+        process: subprocess.Popen,
+        deadline: float,
+        cancel_event: Optional[threading.Event],
+    ) -> float:
+        """
+        Get how long to block before checking again.
+
+        Raises:
+            subprocess.TimeoutExpired: If the deadline has passed
+            CommandCancelled: If cancel_event is set
+        """
+        if cancel_event is not None and cancel_event.is_set():
+            raise CommandCancelled()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(process.args, remaining)
+        if cancel_event is not None:
+            return min(remaining, self.CANCEL_POLL_INTERVAL)
+        return remaining
+
+    def _emit_lines(
+        self,
+        name: str,
+        data: bytes,
+        buffers: Dict[str, OutputBuffer],
+        on_output: Optional[OutputCallback],
+    ) -> bytes:
+        """Emit complete lines from data and return the unfinished remainder."""
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end == -1:
+                if len(data) - start < self.MAX_LINE_BYTES:
+                    return data[start:]
+                end = start + self.MAX_LINE_BYTES - 1
+            self._emit_line(name, data[start : end + 1], buffers, on_output)
+            start = end + 1
+
+    def _emit_line(
+        self,
+        name: str,
+        data: bytes,
+        buffers: Dict[str, OutputBuffer],
+        on_output: Optional[OutputCallback],
+    ) -> None:
+        line = data.decode("utf-8", errors="replace")
+        buffers[name].append(line, len(data))
+        if on_output:
+            on_output(name, line)
+
+    def _build_output(
+        self,
+        returncode: int,
+        buffers: Dict[str, OutputBuffer],
+        run_id: Optional[str] = None,
+    ) -> CommandOutput:
+        if self.artifact_store and run_id is not None:
+            self._store_logs(buffers, run_id)
+        stdout, stderr = buffers["stdout"], buffers["stderr"]
+        output = CommandOutput(
+            returncode=returncode,
+            stdout=stdout.get_text(),
+            stderr=stderr.get_text(),
+            success=returncode == 0,
+            stdout_bytes=stdout.total_bytes,
+            stderr_bytes=stderr.total_bytes,
+            truncated=stdout.truncated or stderr.truncated,
+            stdout_log=stdout.log_path,
+            stderr_log=stderr.log_path,
+        )
+        if self.artifact_store:
+            output["stdout_log_artifact"] = stdout.log_artifact
+            output["stderr_log_artifact"] = stderr.log_artifact
+        if self.reducer:
+            self._reduce_output(output, self.reducer)
+        return output
+
+    def _store_logs(self, buffers: Dict[str, OutputBuffer], run_id: str) -> None:
+        """Move spilled logs into the artifact store, referenced by the run."""
+        artifact_store = self.artifact_store
+        if artifact_store is None:
+            return
+        for buffer in buffers.values():
+            if not buffer.log_path:
+                continue
+            buffer.close()
+            try:
+                ref = artifact_store.put_file(buffer.log_path)
+                os.remove(buffer.log_path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not store log '{buffer.log_path}': {e}")
+                continue
+            buffer.log_path = None
+            buffer.log_artifact = ref["sha256"]
+            with self._run_artifacts_lock:
+                self._run_artifacts.setdefault(run_id, []).append(ref["sha256"])
+
+    def _release_logs(self, run_id: str) -> None:
+        """Give back the references a run's logs took in the artifact store."""
+        artifact_store = self.artifact_store
+        if artifact_store is None:
+            return
+        with self._run_artifacts_lock:
+            artifacts = self._run_artifacts.pop(run_id, [])
+        for sha256 in artifacts:
+            try:
+                artifact_store.release(sha256)
+            except OSError as e:
+                logger.error(f"Could not release log artifact {sha256}: {e}")
+
+    def _reduce_output(self, output: CommandOutput, reducer: OutputReducer) -> None:
+        """Replace stdout/stderr with their reduced form and record the ratio."""
+        reduction: Dict[str, ReductionStats] = {}
+        for name in ("stdout", "stderr"):
+            output[name], reduction[name] = reducer.reduce(output[name])
+        output["reduction"] = reduction
+        original = sum(stats["original_bytes"] for stats in reduction.values())
+        reduced = sum(stats["reduced_bytes"] for stats in reduction.values())
+        with self._metrics_lock:
+            self.metrics["reduced_commands"] += 1
+            self.metrics["original_bytes"] += original
+            self.metrics["reduced_bytes"] += reduced
+        logger.info(f"Command output reduced from {original} to {reduced} bytes")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get output reduction and resource usage metrics of this tool.
+
+        Returns:
+            Dictionary with reduced command count, total bytes before and after
+            reduction, the overall reduction ratio, the number of commands run
+            with their total CPU and wall seconds and the peak RSS in bytes
+        """
+        with self._metrics_lock:
+            metrics: Dict[str, Any] = dict(self.metrics)
+        for name in ("cpu_user_seconds", "cpu_system_seconds", "wall_seconds"):
+            metrics[name] = round(metrics[name], 3)
+        metrics["ratio"] = (
+            round(metrics["reduced_bytes"] / metrics["original_bytes"], 4)
+            if metrics["original_bytes"]
+            else 1.0
+        )
+        return metrics
+
+    def validate_input(self, input_data: Mapping[str, Any]) -> tuple[bool, str]:
         """
         Validate input against schema.
 
@@ -294,6 +1383,27 @@ class CommandTool:
             if not isinstance(input_data["shell"], bool):
                 return False, "'shell' must be a boolean"
 
+        return self._validate_options(input_data)
+
+    def _validate_options(self, input_data: Mapping[str, Any]) -> tuple[bool, str]:
+        timeout = input_data.get("timeout")
+        if timeout is not None:
+            if not isinstance(timeout, int) or isinstance(timeout, bool):
+                return False, "'timeout' must be an integer"
+            if not 0 < timeout <= self.MAX_TIMEOUT:
+                return False, f"'timeout' must be between 1 and {self.MAX_TIMEOUT}"
+
+        for name in ("cache_inputs", "cache_artifacts"):
+            paths = input_data.get(name) or []
+            if not isinstance(paths, list) or not all(
+                isinstance(path, str) for path in paths
+            ):
+                return False, f"'{name}' must be a list of strings"
+            if any(
+                os.path.isabs(path) or os.path.normpath(path).startswith("..")
+                for path in paths
+            ):
+                return False, f"'{name}' must be paths relative to cwd"
         return True, ""
 
     def invoke(self, input_data: Union[Dict[str, Any], CommandInput]) -> CommandOutput:
@@ -320,8 +1430,68 @@ class CommandTool:
             )
 
         # Execute command
+        return self._execute_input(input_data)
+
+    def _execute_input(
+        self,
+        input_data: Union[Dict[str, Any], CommandInput],
+        cancel_event: Optional[threading.Event] = None,
+        run_id: Optional[str] = None,
+        cache_root: Optional[str] = None,
+    ) -> CommandOutput:
         return self.execute_command(
             command=input_data.get("command", ""),
             cwd=input_data.get("cwd"),
             shell=input_data.get("shell", False),
+            timeout=input_data.get("timeout"),
+            cancel_event=cancel_event,
+            cache=input_data.get("cache", False),
+            cache_inputs=input_data.get("cache_inputs"),
+            cache_artifacts=input_data.get("cache_artifacts"),
+            cache_root=cache_root,
+            run_id=run_id,
+        )
+
+    def invoke_batch(
+        self,
+        input_data: Union[Dict[str, Any], BatchCommandInput],
+        run_id: Optional[str] = None,
+        cache_root: Optional[str] = None,
+    ) -> BatchCommandOutput:
+        """
+        Invoke batch execution with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with the list of commands to run
+            run_id: Agent run that background processes are kept for until
+                reap_run (optional)
+            cache_root: Directory cached commands key their cwd relative to
+                (optional)
+
+        Returns:
+            BatchCommandOutput with the result of each command
+        """
+        commands = input_data.get("commands") if isinstance(input_data, dict) else None
+        if not isinstance(commands, list) or not commands:
+            error_msg = "'commands' must be a non-empty list"
+        elif len(commands) > self.MAX_BATCH_COMMANDS:
+            error_msg = (
+                f"'commands' cannot have more than {self.MAX_BATCH_COMMANDS} entries"
+            )
+        else:
+            results = self.run_batch(commands, run_id=run_id, cache_root=cache_root)
+            return BatchCommandOutput(
+                results=results, success=all(result["success"] for result in results)
+            )
+        logger.error(f"Input validation failed: {error_msg}")
+        return BatchCommandOutput(
+            results=[
+                CommandOutput(
+                    returncode=-1,
+                    stdout="",
+                    stderr=f"Input validation failed: {error_msg}",
+                    success=False,
+                )
+            ],
+            success=False,
         )
@@ -0,0 +1,430 @@
+import logging
+import os
+import threading
+import time
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    NotRequired,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+)
+
+from backend.services.tool.language_daemon import (
+    DaemonError,
+    Diagnostic,
+    EslintDaemon,
+    LanguageDaemon,
+    TsServerDaemon,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DiagnosticsInput(TypedDict, total=False):
+    """Input schema for DiagnosticsTool."""
+
+    cwd: str  # Optional: Workspace to check
+    files: List[str]  # Optional: Files to check (default: changed files)
+    checkers: List[str]  # Optional: Checkers to run (default: all)
+
+
+class DiagnosticsOutput(TypedDict):
+    """Output schema for DiagnosticsTool."""
+
+    success: bool  # Whether no errors were found and every checker ran
+    diagnostics: List[Diagnostic]  # Findings, errors first
+    files_checked: List[str]  # Files checked, relative to cwd
+    error_count: int
+    warning_count: int
+    truncated: NotRequired[bool]  # Whether diagnostics were capped
+    failures: NotRequired[Dict[str, str]]  # Checker name -> why it did not run
+
+
+class DiagnosticsTool:
+    """
+    Tool for type-checking and linting through long-lived daemons.
+
+    Instead of starting `tsc` or `eslint` for every check, each workspace gets
+    a tsserver and an ESLint daemon that stay loaded between checks. Without
+    an explicit file list only the files changed since the previous check are
+    checked. Daemons idle for `idle_timeout` seconds are shut down.
+    """
+
+    # Tool Metadata
+    TOOL_NAME = "code_diagnostics"
+    TOOL_VERSION = "1.0.0"
+    TOOL_DESCRIPTION = (
+        "Type-check (tsc) and lint (eslint) project files through persistent "
+        "daemons and return structured diagnostics. Checks the files changed "
+        "since the previous check unless files are given. Much faster than "
+        "running tsc or eslint as commands."
+    )
+    TOOL_CATEGORY = "analysis"
+
+    # Configuration
+    DAEMONS = {"tsc": TsServerDaemon, "eslint": EslintDaemon}
+    DEFAULT_IDLE_TIMEOUT = 600  # seconds
+    IDLE_CHECK_INTERVAL = 30  # seconds
+    MAX_DIAGNOSTICS = 200
+    MAX_FILES = 500
+    SKIPPED_DIRS = {"node_modules", ".git", "dist", "build", ".next", "coverage"}
+
+    # Tool Schema
+    INPUT_SCHEMA = {
+        "type": "object",
+        "title": "DiagnosticsToolInput",
+        "description": "Input parameters for code diagnostics",
+        "properties": {
+            "cwd": {
+                "type": "string",
+                "description": "Project directory (default: the task workspace)",
+                "examples": ["/home/user/project"],
+            },
+            "files": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": (
+                    "Files to check, relative to cwd (default: files changed "
+                    "since the previous check)"
+                ),
+                "examples": [["src/App.tsx", "src/index.ts"]],
+            },
+            "checkers": {
+                "type": "array",
+                "items": {"type": "string", "enum": ["tsc", "eslint"]},
+                "description": "Checkers to run (default: all)",
+                "examples": [["tsc"]],
+            },
+        },
+        "required": [],
+    }
+
+    OUTPUT_SCHEMA = {
+        "type": "object",
+        "title": "DiagnosticsToolOutput",
+        "description": "Diagnostics found in the checked files",
+        "properties": {
+            "success": {
+                "type": "boolean",
+                "description": "Whether no errors were found and every checker ran",
+            },
+            "diagnostics": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "file": {"type": "string"},
+                        "line": {"type": "integer"},
+                        "column": {"type": "integer"},
+                        "severity": {"type": "string"},
+                        "code": {"type": ["string", "null"]},
+                        "message": {"type": "string"},
+                        "source": {"type": "string"},
+                    },
+                },
+                "description": "Findings, errors first",
+            },
+            "files_checked": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Files that were checked",
+            },
+            "error_count": {"type": "integer"},
+            "warning_count": {"type": "integer"},
+            "truncated": {
+                "type": "boolean",
+                "description": "Whether the diagnostics list was capped",
+            },
+            "failures": {
+                "type": "object",
+                "description": "Checkers that could not run and why",
+            },
+        },
+        "required": [
+            "success",
+            "diagnostics",
+            "files_checked",
+            "error_count",
+            "warning_count",
+        ],
+    }
+
+    def __init__(
+        self,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        daemon_commands: Optional[Dict[str, List[str]]] = None,
+    ):
+        """
+        Initialize DiagnosticsTool.
+
+        Args:
+            idle_timeout: Seconds after which an unused daemon is shut down
+                (default: 600)
+            daemon_commands: Commands starting the daemons, by checker name
+                (default: found in each workspace's node_modules)
+        """
+        if idle_timeout <= 0:
+            raise ValueError(f"Idle timeout must be positive, got {idle_timeout}")
+        self.idle_timeout = idle_timeout
+        self.daemon_commands = daemon_commands or {}
+        self._daemons: Dict[Tuple[str, str], LanguageDaemon] = {}
+        self._checked: Dict[str, Dict[str, int]] = {}  # cwd -> path -> mtime_ns
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for registration.
+
+        Returns:
+            Dictionary with full tool definition including metadata and schemas
+        """
+        return {
+            "name": self.TOOL_NAME,
+            "version": self.TOOL_VERSION,
+            "description": self.TOOL_DESCRIPTION,
+            "category": self.TOOL_CATEGORY,
+            "inputSchema": self.INPUT_SCHEMA,
+            "outputSchema": self.OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Check changed files",
+                    "input": {"cwd": "/home/user/project"},
+                    "output": {
+                        "success": False,
+                        "diagnostics": [
+                            {
+                                "file": "src/App.tsx",
+                                "line": 4,
+                                "column": 7,
+                                "severity": "error",
+                                "code": "TS2322",
+                                "message": "Type 'number' is not assignable to type 'string'.",
+                                "source": "tsc",
+                            }
+                        ],
+                        "files_checked": ["src/App.tsx"],
+                        "error_count": 1,
+                        "warning_count": 0,
+                    },
+                }
+            ],
+        }
+
+    def check(
+        self,
+        cwd: str,
+        files: Optional[List[str]] = None,
+        checkers: Optional[List[str]] = None,
+    ) -> DiagnosticsOutput:
+        """
+        Check files of a workspace with its daemons.
+
+        Args:
+            cwd: Workspace directory
+            files: Files to check, relative to cwd (default: files changed
+                since the previous check of the workspace)
+            checkers: Names of the checkers to run (default: all)
+
+        Returns:
+            DiagnosticsOutput with the findings of every checker
+        """
+        cwd = os.path.abspath(cwd)
+        paths = (
+            [os.path.join(cwd, path) for path in files]
+            if files is not None
+            else self._changed_files(cwd)
+        )
+        paths = [path for path in paths if os.path.isfile(path)]
+        diagnostics: List[Diagnostic] = []
+        failures: Dict[str, str] = {}
+        unchecked: Set[str] = set()
+        for name in checkers or list(self.DAEMONS):
+            daemon = self._get_daemon(name, cwd)
+            handled = [path for path in paths if daemon.handles(path)]
+            if not handled:
+                continue
+            try:
+                diagnostics.extend(daemon.check(handled))
+            except DaemonError as e:
+                logger.error(f"Diagnostics failed in {cwd}: {e}")
+                failures[name] = str(e)
+                unchecked.update(handled)
+        # Files a checker failed on stay changed, so the next check retries them
+        self._record_checked(cwd, [path for path in paths if path not in unchecked])
+        return self._build_output(cwd, paths, diagnostics, failures)
+
+    def close_workspace(self, cwd: str) -> None:
+        """
+        Shut down the daemons of a workspace.
+
+        Args:
+            cwd: Workspace directory
+        """
+        cwd = os.path.abspath(cwd)
+        with self._lock:
+            keys = [key for key in self._daemons if key[1] == cwd]
+            daemons = [self._daemons.pop(key) for key in keys]
+            self._checked.pop(cwd, None)
+        for daemon in daemons:
+            daemon.close()
+
+    def close(self) -> None:
+        """Shut down every daemon and the idle check thread."""
+        self._stopped.set()
+        with self._lock:
+            daemons, self._daemons = list(self._daemons.values()), {}
+        for daemon in daemons:
+            daemon.close()
+
+    def validate_input(self, input_data: Mapping[str, Any]) -> tuple[bool, str]:
+        """
+        Validate input data against schema.
+
+        Args:
+            input_data: Input dictionary to validate
+
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if not isinstance(input_data, dict):
+            return False, "Input must be a dictionary"
+        cwd = input_data.get("cwd")
+        if not isinstance(cwd, str) or not os.path.isdir(cwd):
+            return False, f"'cwd' must be an existing directory, got {cwd!r}"
+        files = input_data.get("files")
+        if files is not None:
+            if not isinstance(files, list) or not all(
+                isinstance(path, str) for path in files
+            ):
+                return False, "'files' must be a list of strings"
+            if len(files) > self.MAX_FILES:
+                return False, f"'files' cannot have more than {self.MAX_FILES} entries"
+        checkers = input_data.get("checkers")
+        if checkers is not None and (
+            not isinstance(checkers, list)
+            or not all(name in self.DAEMONS for name in checkers)
+        ):
+            return False, f"'checkers' must be a list of {', '.join(self.DAEMONS)}"
+        return True, ""
+
+    def invoke(
+        self, input_data: Union[Dict[str, Any], DiagnosticsInput]
+    ) -> DiagnosticsOutput:
+        """
+        Invoke the tool with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with cwd, files and checkers parameters
+
+        Returns:
+            DiagnosticsOutput with the findings
+        """
+        is_valid, error_msg = self.validate_input(input_data)
+        if not is_valid:
+            logger.error(f"Input validation failed: {error_msg}")
+            return DiagnosticsOutput(
+                success=False,
+                diagnostics=[],
+                files_checked=[],
+                error_count=0,
+                warning_count=0,
+                failures={"input": f"Input validation failed: {error_msg}"},
+            )
+        return self.check(
+            input_data["cwd"], input_data.get("files"), input_data.get("checkers")
+        )
+
+    def _get_daemon(self, name: str, cwd: str) -> LanguageDaemon:
+        with self._lock:
+            daemon = self._daemons.get((name, cwd))
+            if daemon is None:
+                daemon = self._daemons[(name, cwd)] = self.DAEMONS[name](
+                    cwd, self.daemon_commands.get(name)
+                )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="diagnostics-idle", daemon=True
+                )
+                self._thread.start()
+        return daemon
+
+    def _changed_files(self, cwd: str) -> List[str]:
+        with self._lock:
+            checked = self._checked.get(cwd, {})
+        extensions = tuple(
+            {
+                extension
+                for daemon in self.DAEMONS.values()
+                for extension in daemon.EXTENSIONS
+            }
+        )
+        changed = []
+        for root, dirs, files in os.walk(cwd):
+            dirs[:] = [name for name in dirs if name not in self.SKIPPED_DIRS]
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(extensions) and checked.get(path) != _mtime(path):
+                    changed.append(path)
+        return sorted(changed)[: self.MAX_FILES]
+
+    def _record_checked(self, cwd: str, paths: List[str]) -> None:
+        with self._lock:
+            checked = self._checked.setdefault(cwd, {})
+            for path in paths:
+                checked[path] = _mtime(path)
+
+    def _build_output(
+        self,
+        cwd: str,
+        paths: List[str],
+        diagnostics: List[Diagnostic],
+        failures: Dict[str, str],
+    ) -> DiagnosticsOutput:
+        diagnostics.sort(
+            key=lambda d: (d["severity"] != "error", d["file"], d["line"], d["column"])
+        )
+        error_count = sum(1 for d in diagnostics if d["severity"] == "error")
+        output = DiagnosticsOutput(
+            success=error_count == 0 and not failures,
+            diagnostics=diagnostics[: self.MAX_DIAGNOSTICS],
+            files_checked=[os.path.relpath(path, cwd) for path in paths],
+            error_count=error_count,
+            warning_count=sum(1 for d in diagnostics if d["severity"] == "warning"),
+        )
+        if len(diagnostics) > self.MAX_DIAGNOSTICS:
+            output["truncated"] = True
+        if failures:
+            output["failures"] = failures
+        return output
+
+    def _run(self) -> None:
+        while not self._stopped.wait(min(self.idle_timeout, self.IDLE_CHECK_INTERVAL)):
+            self._close_idle()
+
+    def _close_idle(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                key
+                for key, daemon in self._daemons.items()
+                if daemon.alive and now - daemon.last_used > self.idle_timeout
+            ]
+            daemons = [self._daemons.pop(key) for key in idle]
+        for daemon in daemons:
+            logger.info(f"Shutting down idle {daemon.NAME} daemon for {daemon.cwd}")
+            daemon.close()
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
@@ -0,0 +1,289 @@
+import logging
+import os
+import threading
+from typing import Dict, List, NotRequired, Optional, Tuple, TypedDict
+
+from backend.services.tool.artifact_store import ArtifactStore
+from backend.services.tool.atomic_file import AtomicFile, SyncBatch, has_content
+
+logger = logging.getLogger(__name__)
+
+
+class OverlayChange(TypedDict):
+    """A file written to or deleted from disk by an overlay."""
+
+    path: str
+    action: str  # "created", "modified" or "deleted"
+    bytes: int
+    sha256: NotRequired[str]  # Artifact of the new content
+    previous_sha256: NotRequired[str]  # Artifact of the content it replaced
+
+
+class FileOverlay:
+    """
+    In-memory layer of file changes over a directory.
+
+    Writes and deletes of files under root are kept in memory instead of
+    going to disk, and reads see them before the files on disk. `flush`
+    writes the pending changes out in one go, e.g. at a checkpoint, so a file
+    rewritten many times in between is written once; `discard` drops them and
+    leaves the disk as it was.
+
+    Every method holds the overlay's lock, so a read never falls through to
+    disk while a flush is halfway.
+
+    Examples:
+        >>> overlay = FileOverlay("/home/user/project")
+        >>> overlay.write("/home/user/project/src/app.ts", b"export {};")
+        >>> [change["action"] for change in overlay.flush()[0]]
+        ['created']
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize FileOverlay.
+
+        Args:
+            root: Directory whose files the overlay covers
+        """
+        self.root = os.path.realpath(root)
+        self.pending_bytes = 0
+        self._files: Dict[str, Optional[bytes]] = {}  # None: deleted
+        self._flushed: Dict[str, OverlayChange] = {}
+        self._artifacts: List[str] = []  # references taken in an artifact store
+        self._lock = threading.RLock()
+
+    def contains(self, path: str) -> bool:
+        """Check whether a path is under the overlay's root."""
+        path = os.path.realpath(path)
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def lookup(self, path: str) -> Tuple[bool, Optional[bytes]]:
+        """
+        Look a file up in the overlay only.
+
+        Returns:
+            Tuple of (whether the overlay has the file, its content or None
+            if it was deleted)
+        """
+        path = os.path.realpath(path)
+        with self._lock:
+            if path in self._files:
+                return True, self._files[path]
+            return False, None
+
+    def exists(self, path: str) -> bool:
+        """Check whether a file exists, in the overlay or else on disk."""
+        overlaid, data = self.lookup(path)
+        return data is not None if overlaid else os.path.isfile(path)
+
+    def read(self, path: str) -> bytes:
+        """
+        Read a file from the overlay, or else from disk.
+
+        Raises:
+            FileNotFoundError: If the file does not exist or was deleted
+        """
+        with self._lock:
+            overlaid, data = self.lookup(path)
+            if not overlaid:
+                with open(path, "rb") as f:
+                    return f.read()
+        if data is None:
+            raise FileNotFoundError(f"File not found: '{path}'")
+        return data
+
+    def size(self, path: str) -> int:
+        """Size of a file, in the overlay or else on disk."""
+        overlaid, data = self.lookup(path)
+        return len(data or b"") if overlaid else os.path.getsize(path)
+
+    def has_content(self, path: str, data: bytes) -> bool:
+        """Check whether a file already holds exactly data."""
+        overlaid, current = self.lookup(path)
+        return current == data if overlaid else has_content(path, data)
+
+    def write(self, path: str, data: bytes) -> None:
+        """Replace the content of a file."""
+        self._set(path, data)
+
+    def append(self, path: str, data: bytes) -> None:
+        """Append to a file, which is created if it does not exist."""
+        with self._lock:
+            current = self.read(path) if self.exists(path) else b""
+            self._set(path, current + data)
+
+    def delete(self, path: str) -> None:
+        """
+        Delete a file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        with self._lock:
+            if not self.exists(path):
+                raise FileNotFoundError(f"File not found: '{path}'")
+            self._set(path, None)
+
+    def changes(self) -> List[OverlayChange]:
+        """Describe the pending changes a flush would make, by path."""
+        with self._lock:
+            changes = [
+                self._describe(path, data) for path, data in sorted(self._files.items())
+            ]
+        return [change for change in changes if change is not None]
+
+    def flush(
+        self, durability: str = "none", artifact_store: Optional[ArtifactStore] = None
+    ) -> Tuple[List[OverlayChange], Dict[str, str]]:
+        """
+        Write the pending changes to disk.
+
+        Files are replaced atomically, parent directories are created as
+        needed, and files whose content did not change are left alone. A file
+        that cannot be written stays pending, so a later flush retries it.
+
+        Args:
+            durability: One of DURABILITY_MODES; with 'batch', the files are
+                synced together and renamed into place at the end
+            artifact_store: Store the new content of written files, and the
+                old content of replaced or deleted ones, is kept in, so
+                changes can be rolled back by hash until `release_artifacts`
+
+        Returns:
+            Tuple of (changes made, error message by path of failed files)
+        """
+        changes: List[OverlayChange] = []
+        errors: Dict[str, str] = {}
+        sync_batch = SyncBatch()
+        with self._lock:
+            flushed = []
+            for path, data in sorted(self._files.items()):
+                try:
+                    change = self._flush_file(
+                        path, data, durability, sync_batch, artifact_store
+                    )
+                except (OSError, ValueError) as e:
+                    errors[path] = str(e)
+                    continue
+                flushed.append((path, change))
+            errors.update(sync_batch.flush()[1])
+            for path, change in flushed:
+                if path in errors:
+                    continue  # stays pending
+                self._set(path, None, pending=False)
+                if change is not None:
+                    changes.append(change)
+                    self._record(change)
+        return changes, errors
+
+    def discard(self) -> List[OverlayChange]:
+        """
+        Drop the pending changes.
+
+        Returns:
+            The changes that were dropped
+        """
+        with self._lock:
+            changes = self.changes()
+            self._files.clear()
+            self.pending_bytes = 0
+        return changes
+
+    def release_artifacts(self, artifact_store: ArtifactStore) -> int:
+        """
+        Give back the references flushes took in an artifact store.
+
+        The hashes of the flushed changes may not be found afterwards.
+
+        Args:
+            artifact_store: Store the overlay was flushed with
+
+        Returns:
+            Number of references given back
+        """
+        with self._lock:
+            artifacts, self._artifacts = self._artifacts, []
+        for sha256 in artifacts:
+            try:
+                artifact_store.release(sha256)
+            except OSError as e:
+                logger.error(f"Could not release artifact {sha256}: {e}")
+        return len(artifacts)
+
+    def flushed_changes(self) -> List[OverlayChange]:
+        """
+        Net changes of every flush so far, by path.
+
+        A file created and then modified is reported as created, and a file
+        created and then deleted is not reported.
+        """
+        with self._lock:
+            return [change for _, change in sorted(self._flushed.items())]
+
+    def _set(self, path: str, data: Optional[bytes], pending: bool = True) -> None:
+        """Record the content of a file, or remove it from the overlay."""
+        path = os.path.realpath(path)
+        with self._lock:
+            self.pending_bytes -= len(self._files.pop(path, None) or b"")
+            if pending:
+                self._files[path] = data
+                self.pending_bytes += len(data or b"")
+
+    @staticmethod
+    def _describe(path: str, data: Optional[bytes]) -> Optional[OverlayChange]:
+        """Compare a pending file with disk; None if it makes no change."""
+        if data is None:
+            if not os.path.lexists(path):
+                return None
+            return OverlayChange(path=path, action="deleted", bytes=0)
+        if not os.path.exists(path):
+            return OverlayChange(path=path, action="created", bytes=len(data))
+        if has_content(path, data):
+            return None
+        return OverlayChange(path=path, action="modified", bytes=len(data))
+
+    def _flush_file(
+        self,
+        path: str,
+        data: Optional[bytes],
+        durability: str,
+        sync_batch: SyncBatch,
+        artifact_store: Optional[ArtifactStore] = None,
+    ) -> Optional[OverlayChange]:
+        """Write or delete one pending file on disk."""
+        change = self._describe(path, data)
+        if change is None:
+            return None
+        if artifact_store is not None:
+            if change["action"] != "created":
+                change["previous_sha256"] = artifact_store.put_file(path)["sha256"]
+                self._artifacts.append(change["previous_sha256"])
+            if data is not None:
+                change["sha256"] = artifact_store.put_bytes(data)["sha256"]
+                self._artifacts.append(change["sha256"])
+        if data is None:
+            os.remove(path)
+            return change
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with AtomicFile(path, durability, sync_batch) as target:
+            target.file.write(data)
+            target.commit()
+        return change
+
+    def _record(self, change: OverlayChange) -> None:
+        """Merge a flushed change into the net changes."""
+        previous = self._flushed.get(change["path"])
+        change = OverlayChange(**change)
+        if previous is not None and previous["action"] == "created":
+            if change["action"] == "deleted":
+                del self._flushed[change["path"]]
+                return
+            change["action"] = "created"
+            change.pop("previous_sha256", None)
+        elif previous is not None:
+            if previous["action"] == "deleted":
+                change["action"] = "modified"
+            if "previous_sha256" in previous:
+                change["previous_sha256"] = previous["previous_sha256"]
+        self._flushed[change["path"]] = change
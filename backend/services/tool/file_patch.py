@@ -0,0 +1,323 @@
+import mmap
+import re
+from dataclasses import dataclass, field
+from typing import IO, List, Optional, Sequence, Tuple, TypedDict, Union
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+\d+(?:,(\d+))? @@")
+NO_NEWLINE_MARKER = "\\ No newline at end of file"
+FUZZ_LINES = 200  # How far a hunk may have moved from its line numbers
+COPY_CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+
+class PatchError(ValueError):
+    """Raised when a diff or a list of edits is malformed."""
+
+
+class HunkFailure(TypedDict):
+    """A hunk or edit that could not be applied."""
+
+    index: int  # Position of the hunk or edit in the patch, 0-based
+    header: str  # Hunk header, or the start of the search text
+    reason: str  # Why it did not apply
+
+
+@dataclass
+class Hunk:
+    """One hunk of a unified diff."""
+
+    header: str
+    old_start: int  # 1-based; 0 for an insertion at the start of the file
+    old_lines: List[str] = field(default_factory=list)  # Without line endings
+    new_lines: List[str] = field(default_factory=list)
+    no_newline_at_end: bool = False  # New side ends without a newline
+    old_count: int = 1  # Line counts declared by the header
+    new_count: int = 1
+    trailing_blanks: int = 0  # Empty diff lines at the end of the hunk so far
+
+    def add_line(self, line: str) -> None:
+        """Add a context, removed or added line of the diff."""
+        kind, text = line[:1] or " ", line[1:]  # blank lines are context
+        self.trailing_blanks = 0 if line else self.trailing_blanks + 1
+        if kind != "+":
+            self.old_lines.append(text)
+        if kind != "-":
+            self.new_lines.append(text)
+
+    def drop_extra_blanks(self) -> None:
+        """Drop empty diff lines at the end past the header's line counts."""
+        while (
+            self.trailing_blanks
+            and len(self.old_lines) > self.old_count
+            and len(self.new_lines) > self.new_count
+        ):
+            self.old_lines.pop()
+            self.new_lines.pop()
+            self.trailing_blanks -= 1
+
+    @property
+    def position(self) -> int:
+        """Index of the first line the hunk replaces, per its header."""
+        if not self.old_lines:
+            return self.old_start  # an insertion goes after line old_start
+        return max(self.old_start - 1, 0)
+
+
+def parse_unified_diff(diff: str) -> List[Hunk]:
+    """
+    Parse the hunks of a unified diff of one file.
+
+    File headers (---/+++) are optional. Hunk line counts are not checked,
+    since hand-written diffs often get them wrong; a hunk ends at the next
+    hunk header or at the end of the diff. Empty lines inside a hunk are
+    context, but empty lines at its end past the header's line counts, e.g.
+    the blank line a diff often ends with, are dropped.
+
+    Args:
+        diff: Unified diff text
+
+    Returns:
+        Hunks in the order of the diff
+
+    Raises:
+        PatchError: If the diff has no hunks or covers more than one file
+    """
+    hunks: List[Hunk] = []
+    lines = diff.splitlines()
+    for number, (line, next_line) in enumerate(zip(lines, lines[1:] + [""])):
+        match = HUNK_HEADER.match(line)
+        if match:
+            old_count, new_count = match.group(2, 3)
+            hunks.append(
+                Hunk(
+                    header=match.group(0),
+                    old_start=int(match.group(1)),
+                    old_count=1 if old_count is None else int(old_count),
+                    new_count=1 if new_count is None else int(new_count),
+                )
+            )
+        elif not hunks:
+            continue  # file headers and preamble
+        elif line.startswith("--- ") and next_line.startswith("+++ "):
+            raise PatchError("Diff covers more than one file")
+        elif line == NO_NEWLINE_MARKER:
+            # After a removed line the marker is about the old side only
+            hunks[-1].no_newline_at_end = not lines[number - 1].startswith("-")
+        elif line[:1] in ("", " ", "-", "+"):
+            hunks[-1].add_line(line)
+        else:
+            raise PatchError(f"Unexpected line in hunk {hunks[-1].header}: {line!r}")
+    if not hunks:
+        raise PatchError("Diff has no hunks")
+    for hunk in hunks:
+        hunk.drop_extra_blanks()
+    return hunks
+
+
+def apply_hunks(
+    source: IO[str], target: IO[str], hunks: Sequence[Hunk]
+) -> Tuple[int, List[HunkFailure]]:
+    """
+    Apply hunks while streaming a file from source to target.
+
+    The context and removed lines of a hunk must match the file exactly,
+    line endings aside. A hunk that moved is searched for up to FUZZ_LINES
+    lines from where its header (adjusted by the hunks before it) puts it,
+    so only that window of the file is held in memory. Hunks must be in
+    file order.
+
+    Args:
+        source: File to patch, opened with newline=""
+        target: File the result is written to, opened with newline=""
+        hunks: Hunks to apply
+
+    Returns:
+        Tuple of (number of hunks applied, failed hunks)
+    """
+    window = _LineWindow(source, target)
+    drift = 0  # How far applied hunks were from their headers
+    failures: List[HunkFailure] = []
+    for index, hunk in enumerate(hunks):
+        expected = hunk.position + drift
+        window.advance(expected - FUZZ_LINES)
+        window.fill(expected + FUZZ_LINES + len(hunk.old_lines))
+        found = window.find(hunk.old_lines, expected)
+        if found is None:
+            failures.append(
+                HunkFailure(
+                    index=index,
+                    header=hunk.header,
+                    reason=window.mismatch(hunk, expected),
+                )
+            )
+            continue
+        window.replace(found, len(hunk.old_lines), hunk)
+        drift = found - hunk.position
+    window.finish()
+    return len(hunks) - len(failures), failures
+
+
+def find_edits(
+    data: Union[mmap.mmap, bytes], edits: Sequence[Tuple[bytes, bytes]]
+) -> Tuple[List[Tuple[int, int, bytes]], List[HunkFailure]]:
+    """
+    Locate search/replace edits in the content of a file.
+
+    Every search text must occur exactly once, and edits must not overlap.
+
+    Args:
+        data: Content of the file (a memory map for large files)
+        edits: Pairs of (search, replace), UTF-8 encoded
+
+    Returns:
+        Tuple of (replacements as (start, end, replace) sorted by start,
+        edits that could not be applied)
+    """
+    found = []
+    failures: List[HunkFailure] = []
+    for index, (search, replace) in enumerate(edits):
+        header = search[:60].decode("utf-8", errors="replace")
+        start = data.find(search)
+        if start == -1:
+            reason = "Search text not found"
+        elif data.find(search, start + 1) != -1:
+            reason = "Search text is not unique; include more surrounding lines"
+        else:
+            found.append((start, start + len(search), replace, index, header))
+            continue
+        failures.append(HunkFailure(index=index, header=header, reason=reason))
+
+    replacements: List[Tuple[int, int, bytes]] = []
+    last_end, last_index = 0, None
+    for start, end, replace, index, header in sorted(found):
+        if replacements and start < last_end:
+            failures.append(
+                HunkFailure(
+                    index=index, header=header, reason=f"Overlaps edit {last_index}"
+                )
+            )
+            continue
+        replacements.append((start, end, replace))
+        last_end, last_index = end, index
+    failures.sort(key=lambda failure: failure["index"])
+    return replacements, failures
+
+
+def write_replacements(
+    data: Union[mmap.mmap, bytes],
+    target: IO[bytes],
+    replacements: Sequence[Tuple[int, int, bytes]],
+) -> None:
+    """
+    Copy data to target in chunks, with the replacements applied.
+
+    Args:
+        data: Content of the file
+        target: Binary file the result is written to
+        replacements: (start, end, replace) sorted by start, not overlapping
+    """
+    position = 0
+    for start, end, replace in [*replacements, (len(data), len(data), b"")]:
+        for chunk in range(position, start, COPY_CHUNK_SIZE):
+            target.write(data[chunk : min(chunk + COPY_CHUNK_SIZE, start)])
+        target.write(replace)
+        position = end
+
+
+class _LineWindow:
+    """Lines of a streamed file that are read but not yet written."""
+
+    def __init__(self, source: IO[str], target: IO[str]):
+        self.source = iter(source)
+        self.target = target
+        self.lines: List[str] = []
+        self.start = 0  # Index in the source of lines[0]
+        self.newline: Optional[str] = None
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.lines)
+
+    def advance(self, index: int) -> None:
+        """Write out the lines before index."""
+        count = max(min(index, self.end) - self.start, 0)
+        self.target.writelines(self.lines[:count])
+        del self.lines[:count]
+        self.start += count
+        while not self.lines and self.start < index:
+            line = next(self.source, None)
+            if line is None:
+                return
+            self.target.write(line)
+            self.start += 1
+
+    def fill(self, index: int) -> None:
+        """Read lines up to index."""
+        while self.end < index:
+            line = next(self.source, None)
+            if line is None:
+                return
+            self.lines.append(line)
+
+    def find(self, old_lines: List[str], expected: int) -> Optional[int]:
+        """Find old_lines, trying positions nearest to expected first."""
+        if not old_lines:
+            return expected if self.start <= expected <= self.end else None
+        last = self.end - len(old_lines)
+        for distance in range(FUZZ_LINES + 1):
+            for index in sorted({expected - distance, expected + distance}):
+                if self.start <= index <= last and self._matches(index, old_lines):
+                    return index
+        return None
+
+    def replace(self, index: int, count: int, hunk: Hunk) -> None:
+        """Write the lines before index, then hunk's new lines for count lines."""
+        self.advance(index)
+        if self.newline is None:
+            self.newline = _detect_newline(self.lines[: max(count, 1)])
+        for number, text in enumerate(hunk.new_lines, 1):
+            if number < len(hunk.new_lines) or not hunk.no_newline_at_end:
+                text += self.newline
+            self.target.write(text)
+        del self.lines[:count]
+        self.start += count
+
+    def mismatch(self, hunk: Hunk, expected: int) -> str:
+        """Describe why hunk was not found near expected."""
+        if expected < self.start:
+            return "Not found after the previous hunk; hunks must be in file order"
+        if not hunk.old_lines:
+            return f"Line {hunk.old_start} is past the end of the file"
+        for offset, wanted in enumerate(hunk.old_lines):
+            index = expected + offset
+            if not self.start <= index < self.end:
+                return f"Context {wanted!r} not found near line {index + 1}"
+            actual = self.lines[index - self.start].rstrip("\r\n")
+            if actual != wanted:
+                return (
+                    f"Context does not match at line {index + 1}: "
+                    f"expected {wanted!r}, found {actual!r}"
+                )
+        return f"Context not found near line {expected + 1}"
+
+    def finish(self) -> None:
+        """Write out the rest of the file."""
+        self.target.writelines(self.lines)
+        self.lines = []
+        for line in self.source:
+            self.target.write(line)
+
+    def _matches(self, index: int, old_lines: List[str]) -> bool:
+        offset = index - self.start
+        return all(
+            self.lines[offset + i].rstrip("\r\n") == text
+            for i, text in enumerate(old_lines)
+        )
+
+
+def _detect_newline(lines: List[str]) -> str:
+    for line in lines:
+        if line.endswith("\r\n"):
+            return "\r\n"
+        if line.endswith("\n"):
+            return "\n"
+    return "\n"
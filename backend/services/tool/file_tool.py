@@ -1,6 +1,44 @@
+import io
 import os
 import logging
-from typing import Optional, Dict, Any, TypedDict
+import mmap
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Optional,
+    Dict,
+    Any,
+    Iterator,
+    List,
+    Mapping,
+    NotRequired,
+    Tuple,
+    TypedDict,
+    Union,
+    cast,
+)
+
+from backend.services.tool.artifact_store import ArtifactStore
+from backend.services.tool.atomic_file import (
+    DURABILITY_MODES,
+    AtomicFile,
+    SyncBatch,
+    has_content,
+)
+from backend.services.tool.file_overlay import FileOverlay, OverlayChange
+from backend.services.tool.read_cache import ReadCache
+from backend.services.tool.file_patch import (
+    Hunk,
+    HunkFailure,
+    PatchError,
+    apply_hunks,
+    find_edits,
+    parse_unified_diff,
+    write_replacements,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +59,67 @@ class FileOutput(TypedDict):
     file_path: str  # The file path that was written to
     bytes_written: int  # Number of bytes written
     message: str  # Success or error message
+    total_bytes: NotRequired[int]  # Size of the file (ranged reads and peeks)
+    total_lines: NotRequired[int]  # Number of lines in the file (peeks)
+    line_range: NotRequired[List[int]]  # First and last line returned, 1-based
+    byte_range: NotRequired[List[int]]  # Start and end byte returned
+    truncated: NotRequired[bool]  # Whether the file continues after the range
+    unchanged: NotRequired[bool]  # Write skipped, or file unchanged since read
+    hunks_applied: NotRequired[int]  # Hunks or edits that applied (patches)
+    failed_hunks: NotRequired[List[HunkFailure]]  # Hunks or edits that did not
+
+
+class PatchEdit(TypedDict):
+    """One anchored search/replace edit."""
+
+    search: str  # Exact text to replace; must occur once in the file
+    replace: str  # Text to put in its place
+
+
+class PatchFileInput(TypedDict, total=False):
+    """Input schema for patching a file."""
+
+    file_path: str  # Required: The file to patch
+    diff: str  # Unified diff of the file (either this or edits)
+    edits: List[PatchEdit]  # Search/replace edits (either this or diff)
+    cwd: str  # Optional: Directory a relative file_path is resolved against
+
+
+class BatchFileOperation(TypedDict, total=False):
+    """One read or write of a batch file operation."""
+
+    operation: str  # Required: 'read' or 'write'
+    file_path: str  # Required: The file path, relative to the batch cwd
+    content: str  # Write: The content to write
+    mode: str  # Write: 'w' (overwrite), 'a' (append), default: 'w'
+    create_dirs: bool  # Write: Create parent directories, default: True
+    offset: int  # Read: Number of lines to skip
+    limit: int  # Read: Maximum number of lines
+    peek: bool  # Read: Only the size, line count and first/last lines
+    force: bool  # Read: Return the content even if unchanged since last read
+
+
+class BatchFileInput(TypedDict, total=False):
+    """Input schema for batch file operations."""
+
+    operations: List[BatchFileOperation]  # Required: Reads and writes to run
+    cwd: str  # Optional: Directory relative paths are resolved against
+
+
+class BatchFileOutput(TypedDict):
+    """Output schema for batch file operations."""
+
+    results: List[FileOutput]  # Results in the order of the operations
+    success: bool  # Whether every operation succeeded
+
+
+class OverlayOutput(TypedDict):
+    """Output schema for flushing or discarding an overlay."""
+
+    success: bool  # Whether every pending change was written out
+    changes: List[OverlayChange]  # Files created, modified or deleted on disk
+    bytes_written: int  # Number of bytes written
+    message: str  # Summary, with the files that failed to flush
 
 
 class FileTool:
@@ -41,7 +140,7 @@ class FileTool:
     TOOL_CATEGORY = "file_management"
 
     # Tool Schema for Writing
-    WRITE_INPUT_SCHEMA = {
+    WRITE_INPUT_SCHEMA: Dict[str, Any] = {
         "type": "object",
         "title": "FileWriteInput",
         "description": "Input parameters for file write operation",
@@ -78,7 +177,7 @@ class FileTool:
     }
 
     # Tool Schema for Reading
-    READ_INPUT_SCHEMA = {
+    READ_INPUT_SCHEMA: Dict[str, Any] = {
         "type": "object",
         "title": "FileReadInput",
         "description": "Input parameters for file read operation",
@@ -88,6 +187,55 @@ class FileTool:
                 "description": "The path to the file to read",
                 "examples": ["/path/to/file.tsx", "./src/components/Button.tsx"],
             },
+            "offset": {
+                "type": "integer",
+                "description": "Number of lines to skip before reading",
+                "examples": [0, 1000],
+            },
+            "limit": {
+                "type": "integer",
+                "description": "Maximum number of lines to read",
+                "examples": [100],
+            },
+            "byte_offset": {
+                "type": "integer",
+                "description": "Byte position to start reading at (instead of lines)",
+                "examples": [0, 1048576],
+            },
+            "byte_limit": {
+                "type": "integer",
+                "description": "Maximum number of bytes to read",
+                "examples": [65536],
+            },
+            "peek": {
+                "type": "boolean",
+                "description": "Only return the size, line count and first/last lines",
+                "examples": [True],
+            },
+            "peek_lines": {
+                "type": "integer",
+                "description": "Number of first and last lines in a peek (default: 20)",
+                "examples": [20],
+            },
+            "force": {
+                "type": "boolean",
+                "description": (
+                    "Return the content even if the file is unchanged since "
+                    "it was last read"
+                ),
+                "examples": [True],
+            },
+        },
+        "required": ["file_path"],
+    }
+
+    # Tool Schema for operations that only take a path
+    PATH_INPUT_SCHEMA = {
+        "type": "object",
+        "title": "FilePathInput",
+        "description": "Input parameters for file operations on a path",
+        "properties": {
+            "file_path": READ_INPUT_SCHEMA["properties"]["file_path"],
         },
         "required": ["file_path"],
     }
@@ -117,8 +265,113 @@ class FileTool:
         "required": ["success", "file_path", "message"],
     }
 
+    # Tool Schema for patching
+    PATCH_INPUT_SCHEMA = {
+        "type": "object",
+        "title": "FilePatchInput",
+        "description": "Input parameters for patching a file with a diff or edits",
+        "properties": {
+            "file_path": READ_INPUT_SCHEMA["properties"]["file_path"],
+            "diff": {
+                "type": "string",
+                "description": (
+                    "Unified diff of the file. Context and removed lines must "
+                    "match the file exactly."
+                ),
+                "examples": [
+                    "@@ -1,3 +1,3 @@\n import React from 'react';\n"
+                    "-const title = 'Old';\n+const title = 'New';\n export default App;"
+                ],
+            },
+            "edits": {
+                "type": "array",
+                "description": (
+                    "Search/replace edits. Each search text must occur exactly "
+                    "once in the file; include surrounding lines to anchor it."
+                ),
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "search": {"type": "string"},
+                        "replace": {"type": "string"},
+                    },
+                    "required": ["search", "replace"],
+                },
+            },
+            "cwd": {
+                "type": "string",
+                "description": "Directory a relative file path is resolved against",
+                "examples": ["/home/user/project"],
+            },
+        },
+        "required": ["file_path"],
+    }
+
+    # Tool Schema for batch reads and writes
+    BATCH_INPUT_SCHEMA = {
+        "type": "object",
+        "title": "FileBatchInput",
+        "description": "Input parameters for reading and writing many files at once",
+        "properties": {
+            "operations": {
+                "type": "array",
+                "description": (
+                    "Reads and writes to run. Operations on different files run "
+                    "concurrently; operations on the same file run in order."
+                ),
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "operation": {"type": "string", "enum": ["read", "write"]},
+                        "file_path": WRITE_INPUT_SCHEMA["properties"]["file_path"],
+                        "content": WRITE_INPUT_SCHEMA["properties"]["content"],
+                        "mode": WRITE_INPUT_SCHEMA["properties"]["mode"],
+                        "create_dirs": WRITE_INPUT_SCHEMA["properties"]["create_dirs"],
+                        "offset": READ_INPUT_SCHEMA["properties"]["offset"],
+                        "limit": READ_INPUT_SCHEMA["properties"]["limit"],
+                        "peek": READ_INPUT_SCHEMA["properties"]["peek"],
+                        "force": READ_INPUT_SCHEMA["properties"]["force"],
+                    },
+                    "required": ["operation", "file_path"],
+                },
+            },
+            "cwd": {
+                "type": "string",
+                "description": "Directory relative file paths are resolved against",
+                "examples": ["/home/user/project"],
+            },
+        },
+        "required": ["operations"],
+    }
+
+    BATCH_OUTPUT_SCHEMA = {
+        "type": "object",
+        "title": "FileBatchOutput",
+        "description": "Results of a batch of file operations",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": OUTPUT_SCHEMA,
+                "description": "Result of each operation, in input order",
+            },
+            "success": {
+                "type": "boolean",
+                "description": "Whether every operation succeeded",
+            },
+        },
+        "required": ["results", "success"],
+    }
+
     # Configuration
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
+    MAX_BATCH_OPERATIONS = 100
+    MAX_BATCH_WORKERS = 8
+    MAX_PATCH_EDITS = 100
+    DEFAULT_DURABILITY = "none"
+    BATCH_READ_OPTIONS = ("offset", "limit", "peek", "force")
+    DEFAULT_PEEK_LINES = 20
+    MAX_PEEK_BYTES = 64 * 1024  # per side, for files with very long lines
+    MAX_OVERLAY_BYTES = 64 * 1024 * 1024  # pending in an overlay before a flush
     ALLOWED_EXTENSIONS = {
         ".py",
         ".js",
@@ -136,14 +389,42 @@ class FileTool:
         ".xml",
     }
 
-    def __init__(self, allowed_dirs: Optional[list] = None):
+    def __init__(
+        self,
+        allowed_dirs: Optional[list] = None,
+        durability: str = DEFAULT_DURABILITY,
+        change_listener: Optional[Callable[[str], None]] = None,
+        artifact_store: Optional[ArtifactStore] = None,
+    ):
         """
         Initialize FileTool.
 
         Args:
             allowed_dirs: List of allowed directories for file operations (optional)
+            durability: When writes are synced to disk: 'none' (default),
+                'batch' (files synced together at the end of a batch) or
+                'always'
+            change_listener: Called with the absolute path of every file
+                written, patched or deleted, e.g. to update a search index
+            artifact_store: Store the old and new content of files flushed
+                from an overlay is kept in until the overlay is closed; changes
+                then carry their hashes
+
+        Raises:
+            ValueError: If durability is not a known mode
         """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(
+                f"Durability must be one of {DURABILITY_MODES}, got {durability!r}"
+            )
         self.allowed_dirs = allowed_dirs or []
+        self.durability = durability
+        self.change_listener = change_listener
+        self.artifact_store = artifact_store
+        self._overlays: Dict[str, FileOverlay] = {}
+        self._overlays_lock = threading.Lock()
+        self._read_caches: Dict[str, ReadCache] = {}
+        self._read_caches_lock = threading.Lock()
         logger.info(f"FileTool initialized with allowed dirs: {allowed_dirs}")
 
     def get_write_tool_definition(self) -> Dict[str, Any]:
@@ -204,7 +485,11 @@ class FileTool:
         return {
             "name": "file_reader",
             "version": self.TOOL_VERSION,
-            "description": "Read the entire content of a file. Provide the absolute file path.",
+            "description": (
+                "Read the content of a file. Provide the absolute file path. "
+                "For large files, peek first, then read line ranges with "
+                "offset/limit (or byte ranges with byte_offset/byte_limit)."
+            ),
             "category": self.TOOL_CATEGORY,
             "operation": "read",
             "inputSchema": self.READ_INPUT_SCHEMA,
@@ -219,6 +504,19 @@ class FileTool:
                         "message": "File read successfully\n\nimport React from 'react';\n...",
                     },
                 },
+                {
+                    "name": "Read lines 1001-1050 of a log",
+                    "input": {"file_path": "./build.log", "offset": 1000, "limit": 50},
+                    "output": {
+                        "success": True,
+                        "file_path": "./build.log",
+                        "bytes_written": 3412,
+                        "message": "...",
+                        "line_range": [1001, 1050],
+                        "total_bytes": 7340032,
+                        "truncated": True,
+                    },
+                },
             ],
         }
 
@@ -235,7 +533,7 @@ class FileTool:
             "description": "Delete a file permanently. Provide the absolute file path.",
             "category": self.TOOL_CATEGORY,
             "operation": "delete",
-            "inputSchema": self.READ_INPUT_SCHEMA,  # Same as read - only needs file_path
+            "inputSchema": self.PATH_INPUT_SCHEMA,
             "outputSchema": self.OUTPUT_SCHEMA,
             "examples": [
                 {
@@ -250,6 +548,136 @@ class FileTool:
             ],
         }
 
+    def get_batch_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for batch reads and writes.
+
+        Returns:
+            Dictionary with full tool definition for batch file operations
+        """
+        return {
+            "name": "file_batch",
+            "version": self.TOOL_VERSION,
+            "description": (
+                "Read and write many files in one call, e.g. to scaffold a "
+                "component tree. Returns a result per operation."
+            ),
+            "category": self.TOOL_CATEGORY,
+            "operation": "batch",
+            "inputSchema": self.BATCH_INPUT_SCHEMA,
+            "outputSchema": self.BATCH_OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Scaffold a component",
+                    "input": {
+                        "cwd": "/home/user/project",
+                        "operations": [
+                            {
+                                "operation": "write",
+                                "file_path": "src/components/Button/Button.tsx",
+                                "content": "export const Button = () => <button />;",
+                            },
+                            {
+                                "operation": "write",
+                                "file_path": "src/components/Button/index.ts",
+                                "content": "export * from './Button';",
+                            },
+                            {"operation": "read", "file_path": "src/App.tsx"},
+                        ],
+                    },
+                    "output": {
+                        "results": [
+                            {
+                                "success": True,
+                                "file_path": "/home/user/project/src/components/Button/Button.tsx",
+                                "bytes_written": 39,
+                                "message": "Content written to file ... (39 bytes)",
+                            },
+                            {
+                                "success": True,
+                                "file_path": "/home/user/project/src/components/Button/index.ts",
+                                "bytes_written": 25,
+                                "message": "Content written to file ... (25 bytes)",
+                            },
+                            {
+                                "success": True,
+                                "file_path": "/home/user/project/src/App.tsx",
+                                "bytes_written": 120,
+                                "message": "import { Button } from './components/Button';...",
+                            },
+                        ],
+                        "success": True,
+                    },
+                },
+            ],
+        }
+
+    def get_patch_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for patching files.
+
+        Returns:
+            Dictionary with full tool definition for patching files
+        """
+        return {
+            "name": "file_patcher",
+            "version": self.TOOL_VERSION,
+            "description": (
+                "Change part of a file with a unified diff or search/replace "
+                "edits instead of rewriting it. The patch applies only if every "
+                "hunk matches; failed hunks are reported and the file is left "
+                "unchanged."
+            ),
+            "category": self.TOOL_CATEGORY,
+            "operation": "patch",
+            "inputSchema": self.PATCH_INPUT_SCHEMA,
+            "outputSchema": self.OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Rename a prop with a search/replace edit",
+                    "input": {
+                        "file_path": "./src/components/Button.tsx",
+                        "edits": [
+                            {
+                                "search": "export const Button = ({ label }) => {",
+                                "replace": "export const Button = ({ text }) => {",
+                            }
+                        ],
+                    },
+                    "output": {
+                        "success": True,
+                        "file_path": "./src/components/Button.tsx",
+                        "bytes_written": 86,
+                        "message": "Applied 1 edit(s) to './src/components/Button.tsx'",
+                        "hunks_applied": 1,
+                        "failed_hunks": [],
+                    },
+                },
+                {
+                    "name": "Diff whose context does not match",
+                    "input": {
+                        "file_path": "./src/App.tsx",
+                        "diff": "@@ -3,1 +3,1 @@\n-const title = 'Old';\n+const title = 'New';",
+                    },
+                    "output": {
+                        "success": False,
+                        "file_path": "./src/App.tsx",
+                        "bytes_written": 0,
+                        "message": "Patch not applied, 1 of 1 hunk(s) failed ...",
+                        "hunks_applied": 0,
+                        "failed_hunks": [
+                            {
+                                "index": 0,
+                                "header": "@@ -3,1 +3,1 @@",
+                                "reason": "Context 'const title = 'Old';' not "
+                                "found near line 3",
+                            }
+                        ],
+                    },
+                },
+            ],
+        }
+
     def _is_path_allowed(self, file_path: str) -> bool:
         """
         Check if the file path is in an allowed directory.
@@ -306,6 +734,11 @@ class FileTool:
         """
         Write content to a file.
 
+        Overwrites are atomic: the content goes to a temporary file in the
+        same directory, which is then renamed over the target, so readers
+        never see a truncated file. A file that already has the content is
+        left alone, keeping its mtime for watchers and incremental builds.
+
         Args:
             file_path: Path to the file to write
             content: Content to write to the file
@@ -325,65 +758,78 @@ class FileTool:
             >>> print(result['message'])
             Content appended successfully
         """
-        # Validate inputs
+        error_msg = self._check_write(file_path, content, mode)
+        if error_msg:
+            return self._error_output(file_path, error_msg)
+        return self._write_checked(file_path, content, mode, create_dirs)
+
+    def _check_write(
+        self, file_path: Optional[str], content: str, mode: str
+    ) -> Optional[str]:
+        """
+        Validate the inputs of a write.
+
+        Returns:
+            Error message, or None if the write can go ahead
+        """
         if not file_path or not isinstance(file_path, str):
-            return FileOutput(
-                success=False,
-                file_path=file_path or "unknown",
-                bytes_written=0,
-                message="Invalid file path: must be a non-empty string",
-            )
+            return "Invalid file path: must be a non-empty string"
 
         if not content or not isinstance(content, str):
-            return FileOutput(
-                success=False,
-                file_path=file_path,
-                bytes_written=0,
-                message="Invalid content: must be a non-empty string",
-            )
+            return "Invalid content: must be a non-empty string"
 
         if mode not in ["w", "a"]:
-            return FileOutput(
-                success=False,
-                file_path=file_path,
-                bytes_written=0,
-                message=f"Invalid mode: '{mode}'. Must be 'w' (write) or 'a' (append)",
-            )
+            return f"Invalid mode: '{mode}'. Must be 'w' (write) or 'a' (append)"
 
         # Validate file path
         is_valid, error_msg = self._validate_file_path(file_path)
         if not is_valid:
-            return FileOutput(
-                success=False,
-                file_path=file_path,
-                bytes_written=0,
-                message=f"Path validation failed: {error_msg}",
-            )
+            return f"Path validation failed: {error_msg}"
 
         # Check content size
         content_size = len(content.encode("utf-8"))
         if content_size > self.MAX_FILE_SIZE:
-            return FileOutput(
-                success=False,
-                file_path=file_path,
-                bytes_written=0,
-                message=f"Content too large: {content_size} bytes exceeds limit of {self.MAX_FILE_SIZE}",
-            )
-
+            return f"Content too large: {content_size} bytes exceeds limit of {self.MAX_FILE_SIZE}"
+        return None
+
+    def _write_checked(
+        self,
+        file_path: str,
+        content: str,
+        mode: str,
+        create_dirs: bool,
+        sync_batch: Optional[SyncBatch] = None,
+    ) -> FileOutput:
+        """Write content to a file whose inputs passed `_check_write`."""
         try:
             # Expand user path
             expanded_path = os.path.expanduser(file_path)
+            overlay = self._overlay_for(expanded_path)
 
-            # Create parent directories if needed
-            if create_dirs:
+            # Create parent directories if needed; an overlay creates them
+            # when it is flushed
+            if create_dirs and overlay is None:
                 parent_dir = os.path.dirname(expanded_path)
                 if parent_dir:
                     os.makedirs(parent_dir, exist_ok=True)
                     logger.info(f"Created directories: {parent_dir}")
 
-            # Write or append to file
-            with open(expanded_path, mode, encoding="utf-8") as f:
-                bytes_written = f.write(content)
+            data = content.encode("utf-8")
+            same = overlay.has_content if overlay is not None else has_content
+            if mode == "w" and same(expanded_path, data):
+                logger.info(f"File '{expanded_path}' unchanged, not rewritten")
+                return FileOutput(
+                    success=True,
+                    file_path=expanded_path,
+                    bytes_written=0,
+                    message=f"File '{expanded_path}' already has this content",
+                    unchanged=True,
+                )
+            if overlay is not None:
+                self._write_overlay(overlay, expanded_path, data, mode)
+            elif not self._write_data(expanded_path, data, mode, sync_batch):
+                self._notify_change(expanded_path)
+            bytes_written = len(data)
 
             logger.info(
                 f"File '{expanded_path}' written successfully ({bytes_written} bytes, mode='{mode}')"
@@ -425,12 +871,67 @@ class FileTool:
                 message=error_msg,
             )
 
-    def read_file(self, file_path: str) -> FileOutput:
+    def _write_data(
+        self, path: str, data: bytes, mode: str, sync_batch: Optional[SyncBatch]
+    ) -> bool:
+        """
+        Replace a file atomically, or append to it in place.
+
+        Returns:
+            True if the replacement was deferred to sync_batch
         """
-        Read content from a file.
+        if mode == "w":
+            with AtomicFile(path, self.durability, sync_batch) as target:
+                target.file.write(data)
+                target.commit()
+            return self.durability == "batch" and sync_batch is not None
+        with open(path, "ab") as f:
+            f.write(data)
+            if self.durability != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        return False
+
+    def _write_overlay(
+        self, overlay: FileOverlay, path: str, data: bytes, mode: str
+    ) -> None:
+        """Replace or append to a file in an overlay."""
+        if mode == "w":
+            overlay.write(path, data)
+        else:
+            overlay.append(path, data)
+        self._limit_overlay(overlay)
+
+    def read_file(
+        self,
+        file_path: str,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        byte_offset: Optional[int] = None,
+        byte_limit: Optional[int] = None,
+        peek: bool = False,
+        peek_lines: int = DEFAULT_PEEK_LINES,
+        force: bool = False,
+    ) -> FileOutput:
+        """
+        Read content from a file, whole or in part.
+
+        Without range options the whole file is returned, up to MAX_FILE_SIZE.
+        Line and byte ranges and peeks are served from a memory map, so only
+        the requested part of a large file is read and decoded. Under a read
+        cache, see `open_read_cache`, a repeated read of an unchanged file is
+        served from the cache.
 
         Args:
             file_path: Path to the file to read
+            offset: Number of lines to skip (line range)
+            limit: Maximum number of lines to return (line range)
+            byte_offset: Byte position to start at (byte range)
+            byte_limit: Maximum number of bytes to return (byte range)
+            peek: Return only the size, line count and first/last lines
+            peek_lines: Number of first and last lines in a peek (default: 20)
+            force: Return the content even if a read cache would answer that
+                the file is unchanged since it was last read
 
         Returns:
             Dictionary containing file content and operation result
@@ -441,32 +942,79 @@ class FileTool:
             >>> print(result['success'])
             True
             >>> print(result['message'])  # Contains the file content
+
+            >>> result = tool.read_file('./build.log', offset=1000, limit=50)
+            >>> print(result['line_range'])
+            [1001, 1050]
+        """
+        error_msg = self._check_read(
+            file_path, offset, limit, byte_offset, byte_limit, peek, peek_lines, force
+        )
+        if error_msg:
+            return self._error_output(file_path, error_msg)
+        return self._read_checked(
+            file_path, offset, limit, byte_offset, byte_limit, peek, peek_lines, force
+        )
+
+    def _check_read(
+        self,
+        file_path: Optional[str],
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        byte_offset: Optional[int] = None,
+        byte_limit: Optional[int] = None,
+        peek: bool = False,
+        peek_lines: int = DEFAULT_PEEK_LINES,
+        force: Any = False,
+    ) -> Optional[str]:
+        """
+        Validate the inputs of a read.
+
+        Returns:
+            Error message, or None if the read can go ahead
         """
-        # Validate inputs
         if not file_path or not isinstance(file_path, str):
-            return FileOutput(
-                success=False,
-                file_path=file_path or "unknown",
-                bytes_written=0,
-                message="Invalid file path: must be a non-empty string",
-            )
+            return "Invalid file path: must be a non-empty string"
 
         # Validate file path
         is_valid, error_msg = self._validate_file_path(file_path)
-        if not is_valid:
-            return FileOutput(
-                success=False,
-                file_path=file_path,
-                bytes_written=0,
-                message=f"Path validation failed: {error_msg}",
+        if is_valid:
+            error_msg = self._validate_read_options(
+                offset, limit, byte_offset, byte_limit, peek, peek_lines
             )
-
+        if not error_msg and not isinstance(force, bool):
+            error_msg = "'force' must be a boolean"
+        if error_msg:
+            return f"Path validation failed: {error_msg}"
+        return None
+
+    def _read_checked(
+        self,
+        file_path: str,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        byte_offset: Optional[int] = None,
+        byte_limit: Optional[int] = None,
+        peek: bool = False,
+        peek_lines: int = DEFAULT_PEEK_LINES,
+        force: bool = False,
+    ) -> FileOutput:
+        """Read a file whose inputs passed `_check_read`."""
         try:
             # Expand user path
             expanded_path = os.path.expanduser(file_path)
+            overlay = self._overlay_for(expanded_path)
+            overlaid, data = (
+                overlay.lookup(expanded_path) if overlay is not None else (False, None)
+            )
+            cache = None if overlaid else self._read_cache_for(expanded_path)
+            if cache is not None:
+                options = (offset, limit, byte_offset, byte_limit, peek, peek_lines)
+                return self._read_cached(cache, expanded_path, options, force)
 
             # Check if file exists
-            if not os.path.exists(expanded_path):
+            exists = data is not None if overlaid else os.path.exists(expanded_path)
+            if not exists:
                 return FileOutput(
                     success=False,
                     file_path=file_path,
@@ -475,7 +1023,7 @@ class FileTool:
                 )
 
             # Check if it's a file (not a directory)
-            if not os.path.isfile(expanded_path):
+            if not overlaid and not os.path.isfile(expanded_path):
                 return FileOutput(
                     success=False,
                     file_path=file_path,
@@ -483,21 +1031,24 @@ class FileTool:
                     message=f"Path is not a file: '{expanded_path}'",
                 )
 
-            # Read file
-            with open(expanded_path, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            bytes_read = len(content.encode("utf-8"))
-            logger.info(
-                f"File '{expanded_path}' read successfully ({bytes_read} bytes)"
+            result = self._read_content(
+                expanded_path,
+                data,
+                offset,
+                limit,
+                byte_offset,
+                byte_limit,
+                peek,
+                peek_lines,
             )
+            if not result["success"]:
+                return result
 
-            return FileOutput(
-                success=True,
-                file_path=expanded_path,
-                bytes_written=bytes_read,
-                message=content,
+            logger.info(
+                f"File '{expanded_path}' read successfully "
+                f"({result['bytes_written']} bytes)"
             )
+            return result
 
         except PermissionError as e:
             error_msg = f"Permission denied when reading '{file_path}': {str(e)}"
@@ -518,6 +1069,227 @@ class FileTool:
                 message=error_msg,
             )
 
+    def _read_cached(
+        self, cache: ReadCache, path: str, options: Tuple, force: bool
+    ) -> FileOutput:
+        """
+        Read a file through a read cache.
+
+        One stat replaces the existence and type checks, and tells whether
+        an earlier result of the same read is still valid.
+        """
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return self._error_output(path, f"File not found: '{path}'")
+        if not stat.S_ISREG(st.st_mode):
+            return self._error_output(path, f"Path is not a file: '{path}'")
+        real_path = os.path.realpath(path)
+        cached = cache.get(real_path, st, options)
+        if cached is None:
+            result = self._read_content(path, None, *options)
+            if result["success"]:
+                cache.put(real_path, st, options, result)
+                logger.info(
+                    f"File '{path}' read successfully ({result['bytes_written']} bytes)"
+                )
+            return result
+        if cache.skip_unchanged and not force:
+            return FileOutput(
+                success=True,
+                file_path=path,
+                bytes_written=0,
+                message=(
+                    f"File '{path}' is unchanged since it was last read; "
+                    "read it with 'force' to get its content again"
+                ),
+                unchanged=True,
+            )
+        logger.debug(f"File '{path}' read from cache")
+        return cast(FileOutput, {**cached, "file_path": path})
+
+    def _notify_change(self, path: str) -> None:
+        """Drop cached reads of a changed file and tell the change listener."""
+        self.invalidate_reads(path)
+        if self.change_listener is None:
+            return
+        try:
+            self.change_listener(os.path.abspath(path))
+        except Exception as e:
+            logger.error(f"Change listener failed for '{path}': {e}")
+
+    @staticmethod
+    def _error_output(file_path: Optional[str], message: str) -> FileOutput:
+        return FileOutput(
+            success=False,
+            file_path=file_path or "unknown",
+            bytes_written=0,
+            message=message,
+        )
+
+    @staticmethod
+    def _validate_read_options(
+        offset: Optional[int],
+        limit: Optional[int],
+        byte_offset: Optional[int],
+        byte_limit: Optional[int],
+        peek: bool,
+        peek_lines: int,
+    ) -> Optional[str]:
+        """
+        Validate the range options of a read.
+
+        Returns:
+            Error message, or None if the options are valid
+        """
+        options = {
+            "offset": offset,
+            "limit": limit,
+            "byte_offset": byte_offset,
+            "byte_limit": byte_limit,
+            "peek_lines": peek_lines,
+        }
+        for name, value in options.items():
+            if value is not None and (
+                not isinstance(value, int) or isinstance(value, bool) or value < 0
+            ):
+                return f"'{name}' must be a non-negative integer"
+        line_range = offset is not None or limit is not None
+        byte_range = byte_offset is not None or byte_limit is not None
+        if line_range and byte_range:
+            return "Use either a line range or a byte range, not both"
+        if peek and (line_range or byte_range):
+            return "'peek' cannot be combined with a range"
+        return None
+
+    def _read_content(
+        self,
+        path: str,
+        data: Optional[bytes],
+        offset: Optional[int],
+        limit: Optional[int],
+        byte_offset: Optional[int],
+        byte_limit: Optional[int],
+        peek: bool,
+        peek_lines: int,
+    ) -> FileOutput:
+        """Read the whole file, or the requested range or peek of it."""
+        with self._open_content(path, data) as content:
+            if peek:
+                return self._peek_file(path, content, peek_lines)
+            if offset is not None or limit is not None:
+                return self._read_lines(path, content, offset or 0, limit)
+            if byte_offset is not None or byte_limit is not None:
+                return self._read_bytes(path, content, byte_offset or 0, byte_limit)
+            size = len(content)
+            if size > self.MAX_FILE_SIZE:
+                return FileOutput(
+                    success=False,
+                    file_path=path,
+                    bytes_written=0,
+                    message=f"File too large: {size} bytes exceeds limit of "
+                    f"{self.MAX_FILE_SIZE}; read it in ranges or peek at it",
+                )
+            text = content[:size].decode("utf-8")
+        return FileOutput(
+            success=True,
+            file_path=path,
+            bytes_written=size,
+            message=text,
+        )
+
+    @staticmethod
+    @contextmanager
+    def _open_content(
+        path: str, data: Optional[bytes]
+    ) -> Iterator[Union[mmap.mmap, bytes]]:
+        """Content of a file from an overlay, or else mapped from disk."""
+        if data is not None:
+            yield data
+            return
+        with _map_file(path, os.path.getsize(path)) as mapped:
+            yield mapped
+
+    def _read_lines(
+        self,
+        path: str,
+        data: Union[mmap.mmap, bytes],
+        offset: int,
+        limit: Optional[int],
+    ) -> FileOutput:
+        """Read `limit` lines after the first `offset` lines."""
+        size = len(data)
+        start = _skip_lines(data, 0, offset)
+        end = _skip_lines(data, start, limit) if limit is not None else size
+        end = min(end, start + self.MAX_FILE_SIZE)
+        text = data[start:end].decode("utf-8", errors="replace")
+        lines = text.count("\n") + (1 if text and not text.endswith("\n") else 0)
+        return FileOutput(
+            success=True,
+            file_path=path,
+            bytes_written=end - start,
+            message=text,
+            line_range=[offset + 1, offset + lines] if lines else [],
+            total_bytes=size,
+            truncated=end < size,
+        )
+
+    def _read_bytes(
+        self,
+        path: str,
+        data: Union[mmap.mmap, bytes],
+        byte_offset: int,
+        byte_limit: Optional[int],
+    ) -> FileOutput:
+        """Read a byte range, moved inwards to whole UTF-8 characters."""
+        size = len(data)
+        start = min(byte_offset, size)
+        if byte_limit is None or byte_limit > self.MAX_FILE_SIZE:
+            byte_limit = self.MAX_FILE_SIZE
+        end = min(size, start + byte_limit)
+        while start < end and data[start] & 0xC0 == 0x80:
+            start += 1  # continuation byte of a character started before
+        while start < end < size and data[end] & 0xC0 == 0x80:
+            end -= 1  # character not complete within the range
+        text = data[start:end].decode("utf-8", errors="replace")
+        return FileOutput(
+            success=True,
+            file_path=path,
+            bytes_written=end - start,
+            message=text,
+            byte_range=[start, end],
+            total_bytes=size,
+            truncated=end < size,
+        )
+
+    def _peek_file(
+        self, path: str, data: Union[mmap.mmap, bytes], peek_lines: int
+    ) -> FileOutput:
+        """Summarize a file by its size, line count and first/last lines."""
+        size = len(data)
+        total_lines = _count_lines(data, size)
+        head_end = min(_skip_lines(data, 0, peek_lines), self.MAX_PEEK_BYTES)
+        tail_start = max(
+            _tail_start(data, size, peek_lines), size - self.MAX_PEEK_BYTES
+        )
+        if tail_start <= head_end:
+            text = data[:size].decode("utf-8", errors="replace")
+        else:
+            head = data[:head_end].decode("utf-8", errors="replace")
+            tail = data[tail_start:size].decode("utf-8", errors="replace")
+            omitted = total_lines - min(peek_lines, total_lines) * 2
+            if not head.endswith("\n"):
+                head += "\n"
+            text = f"{head}... [{max(omitted, 0)} lines omitted] ...\n{tail}"
+        return FileOutput(
+            success=True,
+            file_path=path,
+            bytes_written=len(text.encode("utf-8")),
+            message=text,
+            total_bytes=size,
+            total_lines=total_lines,
+        )
+
     def delete_file(self, file_path: str) -> FileOutput:
         """
         Delete a file.
@@ -551,8 +1323,15 @@ class FileTool:
             # Expand user path
             expanded_path = os.path.expanduser(file_path)
 
+            overlay = self._overlay_for(expanded_path)
+
             # Check if file exists
-            if not os.path.exists(expanded_path):
+            exists = (
+                overlay.exists(expanded_path)
+                if overlay is not None
+                else os.path.exists(expanded_path)
+            )
+            if not exists:
                 return FileOutput(
                     success=False,
                     file_path=file_path,
@@ -561,7 +1340,11 @@ class FileTool:
                 )
 
             # Delete file
-            os.remove(expanded_path)
+            if overlay is not None:
+                overlay.delete(expanded_path)
+            else:
+                os.remove(expanded_path)
+                self._notify_change(expanded_path)
             logger.info(f"File '{expanded_path}' deleted successfully")
 
             return FileOutput(
@@ -589,3 +1372,646 @@ class FileTool:
                 bytes_written=0,
                 message=error_msg,
             )
+
+    def patch_file(
+        self,
+        file_path: str,
+        diff: Optional[str] = None,
+        edits: Optional[List[PatchEdit]] = None,
+    ) -> FileOutput:
+        """
+        Patch a file with a unified diff or anchored search/replace edits.
+
+        The result is streamed to a temporary file next to the original, which
+        replaces it only if every hunk or edit applied; otherwise the failed
+        ones are reported and the file is left unchanged. Diffs are applied
+        line by line and edits are located in a memory map, so files over
+        MAX_FILE_SIZE can be patched without reading them into memory.
+
+        Args:
+            file_path: Path to the file to patch
+            diff: Unified diff of the file (either this or edits)
+            edits: Search/replace edits; each search text must occur exactly
+                once in the file (either this or diff)
+
+        Returns:
+            Dictionary containing operation result, with hunks_applied and
+            failed_hunks
+
+        Examples:
+            >>> tool = FileTool()
+            >>> result = tool.patch_file(
+            ...     './src/app.tsx',
+            ...     edits=[{'search': "title = 'Old'", 'replace': "title = 'New'"}],
+            ... )
+            >>> print(result['hunks_applied'])
+            1
+        """
+        error_msg = self._check_patch(file_path, diff, edits)
+        if error_msg:
+            return self._error_output(file_path, error_msg)
+        expanded_path = os.path.expanduser(file_path)
+        overlay = self._overlay_for(expanded_path)
+        exists = (
+            overlay.exists(expanded_path)
+            if overlay is not None
+            else os.path.isfile(expanded_path)
+        )
+        if not exists:
+            return self._error_output(file_path, f"File not found: '{expanded_path}'")
+
+        unit = "hunk" if diff is not None else "edit"
+        try:
+            if diff is not None:
+                hunks = parse_unified_diff(diff)
+                total = len(hunks)
+                applied, failures = self._apply_diff(expanded_path, hunks, overlay)
+            else:
+                edits = edits or []
+                total = len(edits)
+                applied, failures = self._apply_edits(expanded_path, edits, overlay)
+        except PatchError as e:
+            return self._error_output(file_path, f"Invalid diff: {e}")
+        except PermissionError as e:
+            error_msg = f"Permission denied when patching '{file_path}': {str(e)}"
+            logger.error(error_msg)
+            return self._error_output(file_path, error_msg)
+        except Exception as e:
+            error_msg = f"Error patching file '{file_path}': {str(e)}"
+            logger.error(error_msg)
+            return self._error_output(file_path, error_msg)
+
+        if failures:
+            details = "".join(
+                f"\n- {unit} {failure['index'] + 1} ({failure['header']}): "
+                f"{failure['reason']}"
+                for failure in failures
+            )
+            logger.info(
+                f"Patch of '{expanded_path}' not applied "
+                f"({len(failures)} of {total} {unit}(s) failed)"
+            )
+            return FileOutput(
+                success=False,
+                file_path=expanded_path,
+                bytes_written=0,
+                message=f"Patch not applied, {len(failures)} of {total} {unit}(s) "
+                f"failed; the file is unchanged:{details}",
+                hunks_applied=0,
+                failed_hunks=failures,
+            )
+        if overlay is not None:
+            size = overlay.size(expanded_path)
+            self._limit_overlay(overlay)
+        else:
+            size = os.path.getsize(expanded_path)
+            self._notify_change(expanded_path)
+        logger.info(f"File '{expanded_path}' patched ({applied} {unit}(s))")
+        return FileOutput(
+            success=True,
+            file_path=expanded_path,
+            bytes_written=size,
+            message=f"Applied {applied} {unit}(s) to '{expanded_path}'",
+            hunks_applied=applied,
+            failed_hunks=[],
+        )
+
+    def invoke_patch(
+        self, input_data: Union[Mapping[str, Any], PatchFileInput]
+    ) -> FileOutput:
+        """
+        Invoke a file patch with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with file_path, diff or edits, and an
+                optional cwd
+
+        Returns:
+            FileOutput with the result of the patch
+        """
+        if not isinstance(input_data, dict):
+            return self._error_output(
+                "unknown", "Input validation failed: input must be a dictionary"
+            )
+        file_path = input_data.get("file_path")
+        if not isinstance(file_path, str):
+            return self._error_output(
+                "unknown", "Invalid file path: must be a non-empty string"
+            )
+        cwd = input_data.get("cwd")
+        if cwd and isinstance(cwd, str) and file_path:
+            file_path = os.path.join(cwd, os.path.expanduser(file_path))
+        return self.patch_file(
+            file_path, diff=input_data.get("diff"), edits=input_data.get("edits")
+        )
+
+    def _check_patch(
+        self, file_path: str, diff: Optional[str], edits: Optional[List[PatchEdit]]
+    ) -> Optional[str]:
+        """
+        Validate the inputs of a patch.
+
+        Returns:
+            Error message, or None if the patch can go ahead
+        """
+        if not file_path or not isinstance(file_path, str):
+            return "Invalid file path: must be a non-empty string"
+        if (diff is None) == (edits is None):
+            return "Provide either 'diff' or 'edits'"
+        if diff is not None and (not isinstance(diff, str) or not diff.strip()):
+            return "Invalid diff: must be a non-empty string"
+        if edits is not None:
+            error_msg = self._validate_edits(edits)
+            if error_msg:
+                return f"Invalid edits: {error_msg}"
+
+        is_valid, error_msg = self._validate_file_path(file_path)
+        if not is_valid:
+            return f"Path validation failed: {error_msg}"
+        return None
+
+    def _validate_edits(self, edits: Any) -> Optional[str]:
+        """Check edits is a list of search/replace pairs."""
+        if not isinstance(edits, list) or not edits:
+            return "must be a non-empty list"
+        if len(edits) > self.MAX_PATCH_EDITS:
+            return f"cannot have more than {self.MAX_PATCH_EDITS} entries"
+        for number, edit in enumerate(edits, 1):
+            if not isinstance(edit, dict):
+                return f"edit {number} must be a dictionary"
+            if not isinstance(edit.get("search"), str) or not edit["search"]:
+                return f"edit {number} needs a non-empty 'search' string"
+            if not isinstance(edit.get("replace"), str):
+                return f"edit {number} needs a 'replace' string"
+        return None
+
+    def _apply_diff(
+        self, path: str, hunks: List[Hunk], overlay: Optional[FileOverlay] = None
+    ) -> Tuple[int, List[HunkFailure]]:
+        """Stream path through the diff's hunks; replace it if all applied."""
+        if overlay is not None:
+            text = io.StringIO(overlay.read(path).decode("utf-8"), newline="")
+            patched = io.StringIO(newline="")
+            applied, failures = apply_hunks(text, patched, hunks)
+            if not failures:
+                overlay.write(path, patched.getvalue().encode("utf-8"))
+            return applied, failures
+        with (
+            open(path, encoding="utf-8", newline="") as source,
+            AtomicFile(path, self.durability, encoding="utf-8") as target,
+        ):
+            applied, failures = apply_hunks(source, target.file, hunks)
+            if not failures:
+                target.commit()
+        return applied, failures
+
+    def _apply_edits(
+        self,
+        path: str,
+        edits: List[PatchEdit],
+        overlay: Optional[FileOverlay] = None,
+    ) -> Tuple[int, List[HunkFailure]]:
+        """Locate the edits in path; replace it with them applied if all match."""
+        pairs = [
+            (edit["search"].encode("utf-8"), edit["replace"].encode("utf-8"))
+            for edit in edits
+        ]
+        if overlay is not None:
+            content = overlay.read(path)
+            replacements, failures = find_edits(content, pairs)
+            if not failures:
+                patched = io.BytesIO()
+                write_replacements(content, patched, replacements)
+                overlay.write(path, patched.getvalue())
+            return len(replacements), failures
+        with _map_file(path, os.path.getsize(path)) as data:
+            replacements, failures = find_edits(data, pairs)
+            if not failures:
+                with AtomicFile(path, self.durability) as target:
+                    write_replacements(data, target.file, replacements)
+                    target.commit()
+        return len(replacements), failures
+
+    def batch(
+        self, operations: List[BatchFileOperation], cwd: Optional[str] = None
+    ) -> BatchFileOutput:
+        """
+        Read and write many files in one call.
+
+        Every operation is validated up front, parent directories of all
+        writes are created once, and then the files are processed
+        concurrently. Operations on the same file run one after another in
+        input order, so a write followed by a read of that file sees the
+        write. An invalid operation fails on its own without stopping others.
+        With 'batch' durability, written files are synced together once all
+        of them are written, then renamed into place, and each directory is
+        synced once, rather than syncing file by file.
+
+        Args:
+            operations: Reads and writes, each with operation and file_path
+            cwd: Directory relative file paths are resolved against (optional)
+
+        Returns:
+            BatchFileOutput with a result per operation, in input order
+
+        Examples:
+            >>> tool = FileTool()
+            >>> result = tool.batch(
+            ...     [
+            ...         {"operation": "write", "file_path": "src/a.ts", "content": "a"},
+            ...         {"operation": "read", "file_path": "src/b.ts"},
+            ...     ],
+            ...     cwd="/home/user/project",
+            ... )
+            >>> [r["success"] for r in result["results"]]
+            [True, True]
+        """
+        results: Dict[int, FileOutput] = {}
+        groups: Dict[str, List[Tuple[int, BatchFileOperation]]] = {}
+        for index, entry in enumerate(operations):
+            operation, error_msg = self._prepare_batch_operation(entry, cwd)
+            if error_msg:
+                results[index] = self._error_output(
+                    operation.get("file_path"), error_msg
+                )
+            else:
+                path = os.path.expanduser(operation["file_path"])
+                groups.setdefault(path, []).append((index, operation))
+
+        self._create_parent_dirs(
+            operation
+            for group in groups.values()
+            for _, operation in group
+            if operation["operation"] == "write"
+            and operation.get("create_dirs", True)
+            and self._overlay_for(operation["file_path"]) is None
+        )
+        sync_batch = SyncBatch()
+        if groups:
+            workers = min(self.MAX_BATCH_WORKERS, len(groups))
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="file"
+            ) as executor:
+                for group_results in executor.map(
+                    self._run_batch_group,
+                    groups.values(),
+                    [sync_batch] * len(groups),
+                ):
+                    for index, output in group_results:
+                        results[index] = output
+        self._flush_sync_batch(sync_batch, groups, results)
+
+        outputs = [results[index] for index in range(len(operations))]
+        logger.info(
+            f"Batch of {len(operations)} file operation(s) done "
+            f"({sum(1 for r in outputs if r['success'])} succeeded)"
+        )
+        return BatchFileOutput(
+            results=outputs, success=all(output["success"] for output in outputs)
+        )
+
+    def invoke_batch(
+        self, input_data: Union[Dict[str, Any], BatchFileInput]
+    ) -> BatchFileOutput:
+        """
+        Invoke batch file operations with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with operations and an optional cwd
+
+        Returns:
+            BatchFileOutput with the result of each operation
+        """
+        operations = (
+            input_data.get("operations") if isinstance(input_data, dict) else None
+        )
+        cwd = input_data.get("cwd") if isinstance(input_data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            error_msg = "'operations' must be a non-empty list"
+        elif len(operations) > self.MAX_BATCH_OPERATIONS:
+            error_msg = (
+                f"'operations' cannot have more than "
+                f"{self.MAX_BATCH_OPERATIONS} entries"
+            )
+        elif cwd is not None and not isinstance(cwd, str):
+            error_msg = "'cwd' must be a string"
+        else:
+            return self.batch(operations, cwd)
+        logger.error(f"Input validation failed: {error_msg}")
+        return BatchFileOutput(
+            results=[
+                self._error_output("unknown", f"Input validation failed: {error_msg}")
+            ],
+            success=False,
+        )
+
+    def _prepare_batch_operation(
+        self, operation: Any, cwd: Optional[str]
+    ) -> Tuple[BatchFileOperation, Optional[str]]:
+        """
+        Resolve the path of a batch operation and validate it.
+
+        Returns:
+            Tuple of (operation with resolved file_path, error message or None)
+        """
+        if not isinstance(operation, dict):
+            return {}, "Invalid operation: must be a dictionary"
+        file_path = operation.get("file_path")
+        if cwd and isinstance(file_path, str) and file_path:
+            file_path = os.path.join(cwd, os.path.expanduser(file_path))
+            operation = {**operation, "file_path": file_path}
+        kind = operation.get("operation")
+        if kind == "write":
+            error_msg = self._check_write(
+                file_path, operation.get("content"), operation.get("mode", "w")
+            )
+        elif kind == "read":
+            options = {
+                name: operation[name]
+                for name in self.BATCH_READ_OPTIONS
+                if name in operation
+            }
+            error_msg = self._check_read(file_path, **options)
+        else:
+            error_msg = f"Invalid operation: '{kind}'. Must be 'read' or 'write'"
+        return operation, error_msg
+
+    @staticmethod
+    def _create_parent_dirs(operations: Iterator[BatchFileOperation]) -> None:
+        """Create the parent directories of writes, each once."""
+        parent_dirs = {
+            os.path.dirname(os.path.expanduser(operation["file_path"]))
+            for operation in operations
+        }
+        for parent_dir in sorted(parent_dirs - {""}):
+            try:
+                os.makedirs(parent_dir, exist_ok=True)
+            except OSError as e:
+                # The writes into it fail and report the error
+                logger.error(f"Could not create directory '{parent_dir}': {e}")
+
+    def _run_batch_group(
+        self, group: List[Tuple[int, BatchFileOperation]], sync_batch: SyncBatch
+    ) -> List[Tuple[int, FileOutput]]:
+        """Run the operations on one file, in order."""
+        results = []
+        for position, (index, operation) in enumerate(group):
+            if position and self._commit_deferred(sync_batch, operation["file_path"]):
+                # A later operation on the file needs the earlier write on disk
+                self._notify_change(operation["file_path"])
+            if operation["operation"] == "write":
+                output = self._write_checked(
+                    operation["file_path"],
+                    operation["content"],
+                    operation.get("mode", "w"),
+                    create_dirs=False,
+                    sync_batch=sync_batch,
+                )
+            else:
+                options: Dict[str, Any] = {
+                    name: value
+                    for name, value in operation.items()
+                    if name in self.BATCH_READ_OPTIONS
+                }
+                output = self._read_checked(operation["file_path"], **options)
+            results.append((index, output))
+        return results
+
+    def _commit_deferred(self, sync_batch: SyncBatch, path: str) -> bool:
+        """Put a file's deferred write in place; False if it had none or failed."""
+        try:
+            return sync_batch.commit(path)
+        except OSError as e:
+            logger.error(f"Could not commit the write of '{path}': {e}")
+            return False
+
+    def _flush_sync_batch(
+        self,
+        sync_batch: SyncBatch,
+        groups: Dict[str, List[Tuple[int, BatchFileOperation]]],
+        results: Dict[int, FileOutput],
+    ) -> None:
+        """Put the deferred writes of a batch in place and report failures."""
+        replaced, errors = sync_batch.flush()
+        for path in replaced:
+            self._notify_change(path)
+        if not errors:
+            return
+        for path, group in groups.items():
+            error = errors.get(os.path.realpath(path))
+            writes = [index for index, op in group if op["operation"] == "write"]
+            if error and writes:
+                results[writes[-1]] = self._error_output(
+                    path, f"Could not write to file '{path}': {error}"
+                )
+
+    def open_overlay(self, root: str) -> FileOverlay:
+        """
+        Keep writes, patches and deletes of files under root in memory.
+
+        Until the overlay is flushed, changes to its files are invisible to
+        anything reading the disk directly, such as shell commands; reads
+        through this tool see them. The change listener is told about files
+        when they are flushed. Once more than MAX_OVERLAY_BYTES are pending,
+        the overlay is flushed automatically.
+
+        Args:
+            root: Directory whose files are overlaid, e.g. a run's workspace
+
+        Returns:
+            The overlay of root, which is reused if it is already open
+        """
+        overlay = FileOverlay(root)
+        with self._overlays_lock:
+            overlay = self._overlays.setdefault(overlay.root, overlay)
+        logger.info(f"File overlay opened for '{overlay.root}'")
+        return overlay
+
+    def flush_overlay(self, root: str) -> Optional[OverlayOutput]:
+        """
+        Write the pending changes of an overlay to disk, e.g. at a checkpoint.
+
+        Args:
+            root: Directory the overlay was opened for
+
+        Returns:
+            OverlayOutput with the changes made, or None if no overlay is open
+            for root
+        """
+        overlay = self._overlays.get(os.path.realpath(root))
+        return self._flush(overlay) if overlay is not None else None
+
+    def _flush(self, overlay: FileOverlay) -> OverlayOutput:
+        """Flush an overlay and tell the change listener what changed."""
+        changes, errors = overlay.flush(self.durability, self.artifact_store)
+        for change in changes:
+            self._notify_change(change["path"])
+        bytes_written = sum(change["bytes"] for change in changes)
+        message = f"Flushed {len(changes)} change(s) ({bytes_written} bytes)"
+        if errors:
+            message += ", failed:" + "".join(
+                f"\n- {path}: {error}" for path, error in errors.items()
+            )
+            logger.error(f"File overlay of '{overlay.root}': {message}")
+        elif changes:
+            logger.info(f"File overlay of '{overlay.root}': {message}")
+        return OverlayOutput(
+            success=not errors,
+            changes=changes,
+            bytes_written=bytes_written,
+            message=message,
+        )
+
+    def close_overlay(self, root: str, flush: bool = True) -> Optional[OverlayOutput]:
+        """
+        Flush or discard the pending changes of an overlay and close it.
+
+        The references the overlay's flushes took in the artifact store are
+        given back, so the hashes of its changes may no longer be found.
+
+        Args:
+            root: Directory the overlay was opened for
+            flush: Write the pending changes to disk (default), or drop them,
+                e.g. when the run that made them failed
+
+        Returns:
+            OverlayOutput whose changes are the net changes of every flush of
+            the overlay, or None if no overlay is open for root
+        """
+        overlay = self._overlays.get(os.path.realpath(root))
+        if overlay is None:
+            return None
+        if flush:
+            result = self._flush(overlay)
+        else:
+            result = OverlayOutput(
+                success=True,
+                changes=[],
+                bytes_written=0,
+                message=f"Discarded {len(overlay.changes())} change(s)",
+            )
+        with self._overlays_lock:
+            self._overlays.pop(overlay.root, None)
+        discarded = overlay.discard()  # all of them, or those that failed to flush
+        if self.artifact_store is not None:
+            overlay.release_artifacts(self.artifact_store)
+        logger.info(
+            f"File overlay of '{overlay.root}' closed, "
+            f"{len(discarded)} pending change(s) discarded"
+        )
+        return OverlayOutput(**{**result, "changes": overlay.flushed_changes()})
+
+    def open_read_cache(self, root: str, skip_unchanged: bool = False) -> ReadCache:
+        """
+        Cache reads of files under root, e.g. for the length of a run.
+
+        Writes and deletes through this tool invalidate the cached reads of
+        a file; other changes are noticed by its mtime, size and inode.
+
+        Args:
+            root: Directory whose files are cached, e.g. a run's workspace
+            skip_unchanged: Answer a repeated read of an unchanged file with a
+                short note instead of the content again, unless it is forced
+
+        Returns:
+            The read cache of root, which is reused if it is already open
+        """
+        cache = ReadCache(root, skip_unchanged=skip_unchanged)
+        with self._read_caches_lock:
+            cache = self._read_caches.setdefault(cache.root, cache)
+        logger.info(f"Read cache opened for '{cache.root}'")
+        return cache
+
+    def close_read_cache(self, root: str) -> Optional[Dict[str, int]]:
+        """
+        Close the read cache of root.
+
+        Returns:
+            Statistics of the cache, or None if no cache is open for root
+        """
+        with self._read_caches_lock:
+            cache = self._read_caches.pop(os.path.realpath(root), None)
+        if cache is None:
+            return None
+        stats = cache.get_stats()
+        logger.info(f"Read cache of '{cache.root}' closed: {stats}")
+        return stats
+
+    def invalidate_reads(self, path: str) -> None:
+        """
+        Drop the cached reads of a file changed outside this tool.
+
+        Args:
+            path: Absolute path of the file, e.g. from a change feed
+        """
+        for cache in list(self._read_caches.values()):
+            cache.invalidate(path)
+
+    def _read_cache_for(self, path: str) -> Optional[ReadCache]:
+        """Read cache covering a file, if any."""
+        if not self._read_caches:
+            return None
+        path = os.path.realpath(path)
+        for cache in list(self._read_caches.values()):
+            if cache.contains(path):
+                return cache
+        return None
+
+    def _overlay_for(self, path: str) -> Optional[FileOverlay]:
+        """Overlay covering a file, if any."""
+        if not self._overlays:
+            return None
+        for overlay in list(self._overlays.values()):
+            if overlay.contains(path):
+                return overlay
+        return None
+
+    def _limit_overlay(self, overlay: FileOverlay) -> None:
+        """Flush an overlay once too much content is pending in it."""
+        if overlay.pending_bytes > self.MAX_OVERLAY_BYTES:
+            logger.info(
+                f"File overlay of '{overlay.root}' holds "
+                f"{overlay.pending_bytes} bytes, flushing"
+            )
+            self._flush(overlay)
+
+
+@contextmanager
+def _map_file(path: str, size: int) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Map a file read-only; empty files, which cannot be mapped, give b''."""
+    if size == 0:
+        yield b""
+        return
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def _skip_lines(data: Union[mmap.mmap, bytes], start: int, count: int) -> int:
+    """Position after `count` lines from start, or the end of the data."""
+    for _ in range(count):
+        newline = data.find(b"\n", start)
+        if newline == -1:
+            return len(data)
+        start = newline + 1
+    return start
+
+
+def _tail_start(data: Union[mmap.mmap, bytes], size: int, count: int) -> int:
+    """Position of the first of the last `count` lines."""
+    end = size - 1 if size and data[size - 1] == ord("\n") else size
+    for _ in range(count):
+        newline = data.rfind(b"\n", 0, end)
+        if newline == -1:
+            return 0
+        end = newline
+    return end + 1
+
+
+def _count_lines(data: Union[mmap.mmap, bytes], size: int, chunk_size=1 << 20) -> int:
+    """Count lines, including a last line without a newline."""
+    lines = sum(
+        data[start : start + chunk_size].count(b"\n")
+        for start in range(0, size, chunk_size)
+    )
+    return lines + (1 if size and data[size - 1] != ord("\n") else 0)
@@ -0,0 +1,332 @@
+import json
+import logging
+import os
+import selectors
+import subprocess
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Tuple, TypedDict
+
+from backend.services.tool.process_tree import terminate_process_group
+
+logger = logging.getLogger(__name__)
+
+
+class Diagnostic(TypedDict):
+    """One compiler or linter finding."""
+
+    file: str  # Path of the file, relative to the workspace
+    line: int  # 1-based line
+    column: int  # 1-based column
+    severity: str  # "error", "warning" or "suggestion"
+    code: Optional[str]  # e.g. "TS2322" or "no-unused-vars"
+    message: str
+    source: str  # Checker that reported it, e.g. "tsc"
+
+
+class DaemonError(Exception):
+    """Raised when a language daemon is not installed, crashes or hangs."""
+
+
+class LanguageDaemon:
+    """
+    Long-lived checker process serving diagnostics for one workspace.
+
+    The process is started on first use and kept running, so its startup and
+    the parsing of unchanged files are paid once instead of per check.
+    Requests are serialized; a daemon that fails or times out is stopped and
+    restarted on the next check.
+    """
+
+    NAME = ""
+    EXTENSIONS: tuple = ()  # Source files the checker handles
+    REQUEST_TIMEOUT = 120  # seconds; the first request also loads the project
+    READ_CHUNK_SIZE = 64 * 1024  # 64 KB
+    KILL_GRACE_SECONDS = 2
+
+    def __init__(self, cwd: str, command: Optional[List[str]] = None):
+        """
+        Initialize LanguageDaemon. The process is started on first check.
+
+        Args:
+            cwd: Workspace the daemon serves
+            command: Command starting the daemon (default: found in the
+                workspace's node_modules)
+        """
+        self.cwd = os.path.abspath(cwd)
+        self.command = command
+        self.requests = 0
+        self.last_used = time.monotonic()
+        self._process: Optional[subprocess.Popen] = None
+        self._buffer = b""
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def handles(self, path: str) -> bool:
+        return path.endswith(self.EXTENSIONS)
+
+    def check(self, files: List[str]) -> List[Diagnostic]:
+        """
+        Get the diagnostics of files, starting the daemon if needed.
+
+        Args:
+            files: Absolute paths of the files to check
+
+        Returns:
+            Diagnostics of the files
+
+        Raises:
+            DaemonError: If the daemon cannot be started or fails
+        """
+        with self._lock:
+            self.last_used = time.monotonic()
+            if not self.alive:
+                self._start()
+            deadline = time.monotonic() + self.REQUEST_TIMEOUT
+            try:
+                diagnostics = self._check(files, deadline)
+            except (OSError, ValueError, KeyError, DaemonError) as e:
+                self._stop()
+                raise DaemonError(f"{self.NAME} failed: {e}")
+            self.requests += 1
+            self.last_used = time.monotonic()
+            return diagnostics
+
+    def close(self) -> None:
+        """Stop the daemon process."""
+        with self._lock:
+            self._stop()
+
+    def find_command(self) -> Optional[List[str]]:
+        """Get the command starting the daemon, or None if not installed."""
+        raise NotImplementedError
+
+    def _check(self, files: List[str], deadline: float) -> List[Diagnostic]:
+        raise NotImplementedError
+
+    def _start(self) -> None:
+        command = self.command or self.find_command()
+        if not command:
+            raise DaemonError(f"{self.NAME} is not installed in {self.cwd}")
+        try:
+            self._process = subprocess.Popen(
+                command,
+                cwd=self.cwd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+                start_new_session=True,
+            )
+        except OSError as e:
+            raise DaemonError(f"Could not start {self.NAME}: {e}")
+        self._buffer = b""
+        logger.info(f"Started {self.NAME} daemon for {self.cwd}")
+
+    def _stop(self) -> None:
+        if self._process is None:
+            return
+        stdin, stdout = self._process.stdin, self._process.stdout
+        try:
+            if stdin is not None:
+                stdin.close()  # daemons exit at the end of their input
+        except OSError:
+            pass
+        terminate_process_group(self._process, self.KILL_GRACE_SECONDS)
+        if stdout is not None:
+            stdout.close()
+        self._process = None
+        logger.info(f"Stopped {self.NAME} daemon for {self.cwd}")
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        stdin = self._pipes()[0]
+        stdin.write(json.dumps(message).encode("utf-8") + b"\n")
+        stdin.flush()
+
+    def _read_line(self, deadline: float) -> bytes:
+        while b"\n" not in self._buffer:
+            self._fill(deadline)
+        line, self._buffer = self._buffer.split(b"\n", 1)
+        return line
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        while len(self._buffer) < size:
+            self._fill(deadline)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def _fill(self, deadline: float) -> None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DaemonError("request timed out")
+        stdout = self._pipes()[1]
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdout, selectors.EVENT_READ)
+            if not selector.select(timeout=remaining):
+                raise DaemonError("request timed out")
+        data = os.read(stdout.fileno(), self.READ_CHUNK_SIZE)
+        if not data:
+            raise DaemonError("daemon exited")
+        self._buffer += data
+
+    def _pipes(self) -> Tuple[IO[bytes], IO[bytes]]:
+        """stdin and stdout of the running daemon."""
+        process = self._process
+        if process is None or process.stdin is None or process.stdout is None:
+            raise DaemonError("daemon is not running")
+        return process.stdin, process.stdout
+
+    def _find_bin(self, name: str) -> Optional[str]:
+        """Find an executable in node_modules/.bin of the workspace or a parent."""
+        directory = self.cwd
+        while True:
+            path = os.path.join(directory, "node_modules", ".bin", name)
+            if os.access(path, os.X_OK):
+                return path
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return None
+            directory = parent
+
+
+class TsServerDaemon(LanguageDaemon):
+    """
+    TypeScript diagnostics from tsserver, the language service behind editors.
+
+    Files are opened once and reloaded from disk when they change, so tsserver
+    only re-checks what the change affects.
+    """
+
+    NAME = "tsc"
+    EXTENSIONS = (".ts", ".tsx", ".mts", ".cts")
+
+    def __init__(self, cwd: str, command: Optional[List[str]] = None):
+        super().__init__(cwd, command)
+        self._seq = 0
+        self._opened: Dict[str, int] = {}  # path -> mtime_ns when last loaded
+
+    def find_command(self) -> Optional[List[str]]:
+        path = self._find_bin("tsserver")
+        return [path, "--disableAutomaticTypingAcquisition"] if path else None
+
+    def _start(self) -> None:
+        super()._start()
+        self._opened = {}
+
+    def _check(self, files: List[str], deadline: float) -> List[Diagnostic]:
+        diagnostics: List[Diagnostic] = []
+        for path in files:
+            self._load(path, deadline)
+            for command in ("syntacticDiagnosticsSync", "semanticDiagnosticsSync"):
+                body = self._request(command, {"file": path}, deadline)
+                diagnostics.extend(self._to_diagnostic(path, item) for item in body)
+        return diagnostics
+
+    def _load(self, path: str, deadline: float) -> None:
+        mtime = os.stat(path).st_mtime_ns
+        if path not in self._opened:
+            self._request("open", {"file": path, "projectRootPath": self.cwd}, deadline)
+        elif self._opened[path] != mtime:
+            self._request("reload", {"file": path, "tmpfile": path}, deadline)
+        self._opened[path] = mtime
+
+    def _request(self, command: str, arguments: Dict[str, Any], deadline: float) -> Any:
+        self._seq += 1
+        seq = self._seq
+        self._send(
+            {"seq": seq, "type": "request", "command": command, "arguments": arguments}
+        )
+        if command == "open":
+            return None  # tsserver sends no response to open
+        while True:
+            message = self._read_message(deadline)
+            if message.get("type") == "response" and message["request_seq"] == seq:
+                if not message.get("success", False):
+                    raise DaemonError(message.get("message", f"{command} failed"))
+                return message.get("body") or []
+
+    def _read_message(self, deadline: float) -> Dict[str, Any]:
+        header = self._read_line(deadline).strip()
+        while not header:
+            header = self._read_line(deadline).strip()
+        name, _, value = header.partition(b":")
+        if name.strip().lower() != b"content-length":
+            raise DaemonError(f"unexpected header {header[:80]!r}")
+        self._read_line(deadline)  # blank line ending the headers
+        message: Dict[str, Any] = json.loads(self._read_exact(int(value), deadline))
+        return message
+
+    def _to_diagnostic(self, path: str, item: Dict[str, Any]) -> Diagnostic:
+        return Diagnostic(
+            file=os.path.relpath(path, self.cwd),
+            line=item["start"]["line"],
+            column=item["start"]["offset"],
+            severity=item.get("category", "error"),
+            code=f"TS{item['code']}" if item.get("code") else None,
+            message=item["text"],
+            source=self.NAME,
+        )
+
+
+ESLINT_SERVER = r"""
+const path = require("path");
+const readline = require("readline");
+const { createRequire } = require("module");
+const { ESLint } = createRequire(path.join(process.cwd(), "package.json"))("eslint");
+const eslint = new ESLint({ cwd: process.cwd() });
+const lines = readline.createInterface({ input: process.stdin });
+let queue = Promise.resolve();
+lines.on("line", (line) => {
+  queue = queue.then(async () => {
+    let reply;
+    try {
+      const results = await eslint.lintFiles(JSON.parse(line).files);
+      reply = { results: results.map((r) => ({ filePath: r.filePath, messages: r.messages })) };
+    } catch (e) {
+      reply = { error: String((e && e.message) || e) };
+    }
+    process.stdout.write(JSON.stringify(reply) + "\n");
+  });
+});
+lines.on("close", () => queue.then(() => process.exit(0)));
+"""
+
+
+class EslintDaemon(LanguageDaemon):
+    """
+    ESLint diagnostics from a node process that keeps ESLint loaded.
+
+    Works like eslint_d: the workspace's own eslint package and its config
+    are loaded once, and each check only lints the given files.
+    """
+
+    NAME = "eslint"
+    EXTENSIONS = (".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx")
+    SEVERITIES = {1: "warning", 2: "error"}
+
+    def find_command(self) -> Optional[List[str]]:
+        if not self._find_bin("eslint"):
+            return None
+        return ["node", "-e", ESLINT_SERVER]
+
+    def _check(self, files: List[str], deadline: float) -> List[Diagnostic]:
+        self._send({"files": files})
+        reply = json.loads(self._read_line(deadline))
+        if "error" in reply:
+            raise DaemonError(reply["error"])
+        return [
+            Diagnostic(
+                file=os.path.relpath(result["filePath"], self.cwd),
+                line=message.get("line", 1),
+                column=message.get("column", 1),
+                severity=self.SEVERITIES.get(message.get("severity"), "warning"),
+                code=message.get("ruleId"),
+                message=message["message"],
+                source=self.NAME,
+            )
+            for result in reply["results"]
+            for message in result["messages"]
+        ]
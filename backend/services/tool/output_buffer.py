@@ -0,0 +1,121 @@
+import logging
+import os
+import tempfile
+from collections import deque
+from typing import Deque, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+class OutputBuffer:
+    """
+    Memory-bounded capture of one output stream of a command.
+
+    The first `max_head_bytes` of output are kept as the head and the most
+    recent `max_tail_bytes` in a ring buffer as the tail; lines in between are
+    dropped from memory. Once output no longer fits, the full log is spilled
+    to a file on disk so nothing is lost.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_head_bytes: int,
+        max_tail_bytes: int,
+        log_dir: Optional[str] = None,
+    ):
+        """
+        Initialize OutputBuffer.
+
+        Args:
+            name: Stream name, used in the spill file name (e.g. 'stdout')
+            max_head_bytes: Bytes kept from the start of the output
+            max_tail_bytes: Bytes kept from the end of the output
+            log_dir: Directory for spill files (default: system temp dir)
+        """
+        self.name = name
+        self.max_head_bytes = max_head_bytes
+        self.max_tail_bytes = max_tail_bytes
+        self.log_dir = log_dir
+        self.total_bytes = 0
+        self.total_lines = 0
+        self.log_path: Optional[str] = None
+        self.log_artifact: Optional[str] = None  # Hash of the stored full log
+        self._head: List[str] = []
+        self._head_bytes = 0
+        self._tail: Deque[tuple[str, int]] = deque()
+        self._tail_bytes = 0
+        self._dropped_lines = 0
+        self._dropped_bytes = 0
+        self._log_file: Optional[TextIO] = None
+        self._spill_started = False
+
+    @property
+    def truncated(self) -> bool:
+        return self._dropped_lines > 0
+
+    def append(self, line: str, size: int) -> None:
+        """
+        Add a line of output.
+
+        Args:
+            line: Decoded line, including its line ending
+            size: Size of the line in bytes
+        """
+        self.total_bytes += size
+        self.total_lines += 1
+        if self._log_file:
+            self._log_file.write(line)
+
+        if self._head_bytes + size <= self.max_head_bytes and not self._tail:
+            self._head.append(line)
+            self._head_bytes += size
+            return
+
+        self._tail.append((line, size))
+        self._tail_bytes += size
+        while self._tail_bytes > self.max_tail_bytes and self._tail:
+            if not self._spill_started:
+                self._start_spill()
+            _, dropped_size = self._tail.popleft()
+            self._tail_bytes -= dropped_size
+            self._dropped_lines += 1
+            self._dropped_bytes += dropped_size
+
+    def get_text(self) -> str:
+        """
+        Get the capped head/tail view of the output.
+
+        Returns:
+            Head and tail of the output with a marker for the dropped middle
+        """
+        text = "".join(self._head)
+        if self.truncated:
+            marker = f"\n... [{self._dropped_lines} lines ({self._dropped_bytes} bytes) truncated"
+            if self.log_path:
+                marker += f", full log: {self.log_path}"
+            elif self.log_artifact:
+                marker += f", full log: artifact {self.log_artifact}"
+            text += marker + "] ...\n"
+        return text + "".join(line for line, _ in self._tail)
+
+    def close(self) -> None:
+        """Close the spill file, if one was opened."""
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
+
+    def _start_spill(self) -> None:
+        # Nothing has been dropped yet, so head + tail is the full output so far
+        self._spill_started = True
+        try:
+            fd, self.log_path = tempfile.mkstemp(
+                prefix="command-", suffix=f".{self.name}.log", dir=self.log_dir
+            )
+            self._log_file = os.fdopen(fd, "w", encoding="utf-8")
+            self._log_file.writelines(self._head)
+            self._log_file.writelines(line for line, _ in self._tail)
+        except OSError as e:
+            logger.error(f"Could not open spill file for {self.name}: {e}")
+            self.log_path = None
+            self._log_file = None
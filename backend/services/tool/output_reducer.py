@@ -0,0 +1,187 @@
+import re
+from typing import Dict, List, Optional, Pattern, Tuple, TypedDict
+
+
+class ReductionStats(TypedDict):
+    """Size of a command output before and after reduction."""
+
+    original_bytes: int
+    reduced_bytes: int
+    ratio: float  # reduced / original
+    error_lines: int  # Lines extracted into the error summary
+
+
+class OutputReducer:
+    """
+    Reduce command output to what an LLM needs to see.
+
+    Reduction strips ANSI escape codes, keeps only the final state of lines
+    redrawn with carriage returns, collapses progress bars and repeated
+    lines, pulls error blocks of known tools (npm, tsc, pytest, eslint) to
+    the top and finally caps the result to a byte and token budget by
+    keeping its head and tail.
+    """
+
+    DEFAULT_MAX_BYTES = 16 * 1024  # 16 KB
+    DEFAULT_MAX_TOKENS = 4000
+    CHARS_PER_TOKEN = 4  # rough estimate used for the token cap
+    HEAD_RATIO = 0.3  # share of the cap given to the head; the rest to the tail
+    ERROR_CONTEXT_LINES = 3  # continuation lines kept after an error line
+    MAX_ERROR_LINES = 100
+
+    ANSI_PATTERN = re.compile(
+        r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07]*\x07|\x1b[()][A-Z0-9]"
+    )
+    PROGRESS_PATTERN = re.compile(
+        r"\[[#=>\-\s.]{5,}\]|[█▓▒░■□]{3,}|^\s*[⠁-⣿]|^\s*\d{1,3}(\.\d+)?%"
+        r"|^\s*[|/\\-]\s*$"
+    )
+    ERROR_PATTERNS: Dict[str, Pattern[str]] = {
+        "npm": re.compile(r"^npm (ERR!|error)"),
+        "tsc": re.compile(r"(\(\d+,\d+\):|:\d+:\d+ -) error TS\d+:"),
+        "pytest": re.compile(r"^(FAILED |ERROR |E\s{2,}|_{3,} .+ _{3,}$)"),
+        "eslint": re.compile(r"^\s+\d+:\d+\s+error\s+"),
+    }
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+    ):
+        """
+        Initialize OutputReducer.
+
+        Args:
+            max_bytes: Maximum size of the reduced output in bytes (default: 16 KB)
+            max_tokens: Maximum estimated tokens of the reduced output
+                (default: 4000)
+        """
+        if max_bytes <= 0:
+            raise ValueError(f"Max bytes must be positive, got {max_bytes}")
+        if max_tokens <= 0:
+            raise ValueError(f"Max tokens must be positive, got {max_tokens}")
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+
+    @property
+    def max_chars(self) -> int:
+        return min(self.max_bytes, self.max_tokens * self.CHARS_PER_TOKEN)
+
+    def reduce(self, text: str) -> Tuple[str, ReductionStats]:
+        """
+        Reduce command output.
+
+        Args:
+            text: Raw output of a command
+
+        Returns:
+            Tuple of (reduced text, reduction stats)
+        """
+        lines = self._clean_lines(text)
+        errors = self._extract_errors(lines)
+        reduced = "".join(self._collapse(lines))
+        if errors:
+            summary = f"[errors: {', '.join(errors)}]\n" + "".join(
+                line for block in errors.values() for line in block
+            )
+            summary = self._cap(summary, self.max_chars // 2) + "[output]\n"
+            reduced = summary + self._cap(reduced, self.max_chars - len(summary))
+        else:
+            reduced = self._cap(reduced, self.max_chars)
+
+        original_bytes = len(text.encode("utf-8"))
+        reduced_bytes = len(reduced.encode("utf-8"))
+        return reduced, ReductionStats(
+            original_bytes=original_bytes,
+            reduced_bytes=reduced_bytes,
+            ratio=round(reduced_bytes / original_bytes, 4) if original_bytes else 1.0,
+            error_lines=sum(len(block) for block in errors.values()),
+        )
+
+    def _clean_lines(self, text: str) -> List[str]:
+        """Strip ANSI codes and keep the last redraw of carriage-return lines."""
+        text = self.ANSI_PATTERN.sub("", text)
+        lines = []
+        for line in text.splitlines(keepends=True):
+            body = line.rstrip("\r\n")
+            if "\r" in body:
+                body = body.rsplit("\r", 1)[-1]
+                line = body + line[len(line.rstrip("\r\n")) :]
+            lines.append(line)
+        return lines
+
+    def _collapse(self, lines: List[str]) -> List[str]:
+        """Collapse progress bars to their last state and count repeated lines."""
+        collapsed: List[str] = []
+        previous: Optional[str] = None
+        repeats = 0
+        for line in lines:
+            if (
+                collapsed
+                and self.PROGRESS_PATTERN.search(line)
+                and previous is not None
+                and self.PROGRESS_PATTERN.search(previous)
+            ):
+                collapsed[-1] = line
+                previous = line
+                continue
+            if line == previous:
+                repeats += 1
+                continue
+            if repeats:
+                collapsed.append(f"... (previous line repeated {repeats} more times)\n")
+                repeats = 0
+            collapsed.append(line)
+            previous = line
+        if repeats:
+            collapsed.append(f"... (previous line repeated {repeats} more times)\n")
+        return collapsed
+
+    def _extract_errors(self, lines: List[str]) -> Dict[str, List[str]]:
+        """Collect error lines of known tools with their continuation lines."""
+        errors: Dict[str, List[str]] = {}
+        total = 0
+        index = 0
+        header: Optional[str] = None  # eslint prints the file name above its errors
+        header_added: Optional[str] = None
+        while index < len(lines) and total < self.MAX_ERROR_LINES:
+            tool = self._match_error(lines[index])
+            if tool is None:
+                if lines[index].strip() and not lines[index][:1].isspace():
+                    header = lines[index]
+                index += 1
+                continue
+            block = [lines[index]]
+            if tool == "eslint" and header and header is not header_added:
+                block.insert(0, header)
+                header_added = header
+            index += 1
+            while (
+                index < len(lines)
+                and len(block) <= self.ERROR_CONTEXT_LINES
+                and lines[index].strip()
+                and lines[index][:1].isspace()
+                and self._match_error(lines[index]) is None
+            ):
+                block.append(lines[index])
+                index += 1
+            errors.setdefault(tool, []).extend(block)
+            total += len(block)
+        return errors
+
+    def _match_error(self, line: str) -> Optional[str]:
+        for tool, pattern in self.ERROR_PATTERNS.items():
+            if pattern.search(line):
+                return tool
+        return None
+
+    def _cap(self, text: str, max_chars: int) -> str:
+        """Keep the head and tail of text so that it fits in max_chars."""
+        if len(text) <= max_chars:
+            return text
+        marker = "\n... [{} characters omitted] ...\n"
+        budget = max(max_chars - len(marker) - 10, 0)
+        head = int(budget * self.HEAD_RATIO)
+        tail = budget - head
+        omitted = len(text) - head - tail
+        return text[:head] + marker.format(omitted) + (text[-tail:] if tail else "")
@@ -0,0 +1,209 @@
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, List, Set, TypedDict
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05  # seconds between checks while waiting for processes
+KILL_WAIT_SECONDS = 1  # time SIGKILLed processes are given to disappear
+
+
+class LeakedProcess(TypedDict):
+    """Process left running in the process group of a finished command."""
+
+    pid: int
+    pgid: int
+    command: str
+
+
+def signal_process_group(pgid: int, sig: int) -> bool:
+    """
+    Send a signal to every process in a process group.
+
+    Args:
+        pgid: Process group id
+        sig: Signal to send; 0 only checks that the group exists
+
+    Returns:
+        False if the group no longer exists
+    """
+    try:
+        os.killpg(pgid, sig)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def list_process_group(pgid: int) -> List[LeakedProcess]:
+    """
+    List the live processes of a process group from /proc.
+
+    Zombies are skipped. Returns an empty list where /proc is not available.
+
+    Args:
+        pgid: Process group id
+
+    Returns:
+        Processes in the group
+    """
+    processes: List[LeakedProcess] = []
+    try:
+        pids = [name for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return processes
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+            # comm may contain spaces and parentheses, so split after the last ')'
+            comm = stat[stat.index("(") + 1 : stat.rindex(")")]
+            fields = stat[stat.rindex(")") + 2 :].split()
+            if int(fields[2]) != pgid or fields[0] == "Z":
+                continue
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        except (OSError, ValueError, IndexError):
+            continue  # exited while listing
+        processes.append(
+            LeakedProcess(pid=int(pid), pgid=pgid, command=cmdline.strip() or comm)
+        )
+    return processes
+
+
+def wait_for_process_group(pgid: int, deadline: float) -> bool:
+    """
+    Wait until a process group has no live processes left.
+
+    Args:
+        pgid: Process group id
+        deadline: time.monotonic() value to stop waiting at
+
+    Returns:
+        True if the group is empty
+    """
+    while list_process_group(pgid):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(POLL_INTERVAL)
+    return True
+
+
+def kill_process_group(pgid: int) -> None:
+    """
+    Send SIGKILL to a process group and wait briefly for it to die.
+
+    The signal is delivered asynchronously, so children that outlive the
+    reaped leader may still show up for a moment after it is sent.
+
+    Args:
+        pgid: Process group id
+    """
+    if signal_process_group(pgid, signal.SIGKILL):
+        wait_for_process_group(pgid, time.monotonic() + KILL_WAIT_SECONDS)
+
+
+def terminate_process_group(process: subprocess.Popen, grace_seconds: float) -> None:
+    """
+    Terminate a process started in its own session and its whole group.
+
+    The group gets SIGTERM and is given `grace_seconds` to exit, then the
+    remaining processes get SIGKILL, children that outlive the leader too.
+
+    Args:
+        process: Leader of the process group
+        grace_seconds: Time the group is given to exit after SIGTERM
+    """
+    deadline = time.monotonic() + grace_seconds
+    signal_process_group(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=grace_seconds)
+    except subprocess.TimeoutExpired:
+        pass
+    if not wait_for_process_group(process.pid, deadline):
+        logger.warning(f"Process group {process.pid} ignored SIGTERM, killing it")
+    signal_process_group(process.pid, signal.SIGKILL)
+    process.wait()
+    kill_process_group(process.pid)
+
+
+class ProcessReaper:
+    """
+    Tracks process groups of commands that left processes running.
+
+    Commands of an agent run may start background processes (dev servers,
+    watchers) that are meant to outlive the command. Their groups are kept
+    per run and terminated when the run ends (SIGTERM, then SIGKILL after a
+    grace period), and the processes found are reported as leaked.
+    """
+
+    DEFAULT_GRACE_SECONDS = 2
+
+    def __init__(self, grace_seconds: float = DEFAULT_GRACE_SECONDS):
+        """
+        Initialize ProcessReaper.
+
+        Args:
+            grace_seconds: Time leaked processes are given to exit after
+                SIGTERM (default: 2)
+        """
+        self.grace_seconds = grace_seconds
+        self.leaked_total = 0
+        self._groups: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def track(self, run_id: str, pgid: int) -> None:
+        """
+        Track a process group until the run is reaped.
+
+        Args:
+            run_id: Identifier of the agent run
+            pgid: Process group id of a command of the run
+        """
+        with self._lock:
+            self._groups.setdefault(run_id, set()).add(pgid)
+
+    def reap(self, run_id: str) -> List[LeakedProcess]:
+        """
+        Terminate the process groups left by a run.
+
+        Args:
+            run_id: Identifier of the agent run
+
+        Returns:
+            Processes that were still running
+        """
+        with self._lock:
+            pgids = self._groups.pop(run_id, set())
+        leaked = self.terminate_groups(pgids)
+        if leaked:
+            self.leaked_total += len(leaked)
+            logger.warning(
+                f"Run {run_id} leaked {len(leaked)} process(es): "
+                + ", ".join(f"{p['pid']} ({p['command'][:80]})" for p in leaked)
+            )
+        return leaked
+
+    def terminate_groups(self, pgids: Set[int]) -> List[LeakedProcess]:
+        """
+        Terminate process groups: SIGTERM, then SIGKILL after the grace period.
+
+        Args:
+            pgids: Process group ids
+
+        Returns:
+            Processes that were running in the groups
+        """
+        leaked: List[LeakedProcess] = []
+        for pgid in sorted(pgids):
+            leaked.extend(list_process_group(pgid))
+            signal_process_group(pgid, signal.SIGTERM)
+        deadline = time.monotonic() + self.grace_seconds
+        for pgid in pgids:
+            wait_for_process_group(pgid, deadline)
+        for pgid in pgids:
+            kill_process_group(pgid)
+        return leaked
@@ -0,0 +1,168 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (mtime_ns, size, inode): a file replaced or rewritten gets a new signature
+Signature = Tuple[int, int, int]
+
+
+@dataclass
+class _CachedFile:
+    signature: Signature
+    results: Dict[Hashable, Dict[str, Any]] = field(default_factory=dict)
+    size: int = 0  # Characters of the cached results
+
+
+class ReadCache:
+    """
+    Results of file reads under a directory, for the length of a run.
+
+    Results are keyed on the resolved path and the read options, and are
+    only valid while the file's mtime, size and inode match those it had
+    when it was read, so files changed behind the cache's back, e.g. by a
+    build command, are read again. Writes and deletes through FileTool
+    invalidate the file's results right away. Files are evicted least
+    recently read first once the cached results exceed max_bytes.
+
+    Examples:
+        >>> cache = ReadCache("/home/user/project")
+        >>> st = os.stat("/home/user/project/src/app.ts")
+        >>> cache.get("/home/user/project/src/app.ts", st, ()) is None
+        True
+    """
+
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # 32 MB
+
+    def __init__(
+        self,
+        root: str,
+        skip_unchanged: bool = False,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """
+        Initialize ReadCache.
+
+        Args:
+            root: Directory whose files are cached, e.g. a run's workspace
+            skip_unchanged: Answer a repeated read of an unchanged file with
+                a short note instead of the content again (default: False)
+            max_bytes: Maximum size of the cached results (default: 32 MB)
+
+        Raises:
+            ValueError: If max_bytes is not positive
+        """
+        if max_bytes <= 0:
+            raise ValueError(f"Max bytes must be positive, got {max_bytes}")
+        self.root = os.path.realpath(root)
+        self.skip_unchanged = skip_unchanged
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+        self._files: "OrderedDict[str, _CachedFile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contains(self, path: str) -> bool:
+        """Check whether a resolved path is under the cache's root."""
+        return path == self.root or path.startswith(self.root + os.sep)
+
+    def get(
+        self, path: str, st: os.stat_result, key: Hashable
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the result of an earlier read of a file.
+
+        Args:
+            path: Resolved path of the file
+            st: Current stat of the file
+            key: Options of the read
+
+        Returns:
+            Copy of the cached result, or None if the read was not cached or
+            the file changed since
+        """
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is not None and cached.signature != signature(st):
+                self._drop(path)
+                cached = None
+            result = cached.results.get(key) if cached is not None else None
+            if result is None:
+                self.stats["misses"] += 1
+                return None
+            self._files.move_to_end(path)
+            self.stats["hits"] += 1
+            return dict(result)
+
+    def put(
+        self,
+        path: str,
+        st: os.stat_result,
+        key: Hashable,
+        result: Mapping[str, Any],
+    ) -> None:
+        """
+        Cache the result of a read.
+
+        Args:
+            path: Resolved path of the file
+            st: Stat of the file taken before it was read
+            key: Options of the read
+            result: The read's result
+        """
+        size = len(result.get("message", ""))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            cached = self._files.get(path)
+            if cached is None or cached.signature != signature(st):
+                self._drop(path)
+                cached = self._files[path] = _CachedFile(signature(st))
+            previous = cached.results.get(key)
+            if previous is not None:
+                cached.size -= len(previous.get("message", ""))
+                self.total_bytes -= len(previous.get("message", ""))
+            cached.results[key] = dict(result)
+            cached.size += size
+            self.total_bytes += size
+            self._files.move_to_end(path)
+            while self.total_bytes > self.max_bytes:
+                self._drop(next(iter(self._files)))
+                self.stats["evictions"] += 1
+
+    def invalidate(self, path: str) -> None:
+        """Drop the cached reads of a file that was written or deleted."""
+        with self._lock:
+            if self._drop(os.path.realpath(path)):
+                self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics.
+
+        Returns:
+            Dictionary with hits, misses, invalidations, evictions and the
+            number of files and bytes cached
+        """
+        with self._lock:
+            return {
+                **self.stats,
+                "files": len(self._files),
+                "bytes": self.total_bytes,
+            }
+
+    def _drop(self, path: str) -> bool:
+        cached = self._files.pop(path, None)
+        if cached is None:
+            return False
+        self.total_bytes -= cached.size
+        return True
+
+
+def signature(st: os.stat_result) -> Signature:
+    """Signature of a file's stat that changes whenever the file does."""
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
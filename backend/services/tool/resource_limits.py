@@ -0,0 +1,114 @@
+import logging
+import resource
+import signal
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, TypedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ResourceUsage(TypedDict):
+    """Resources used by one command."""
+
+    cpu_user_seconds: float  # CPU time in user mode
+    cpu_system_seconds: float  # CPU time in kernel mode
+    max_rss_bytes: int  # Peak resident memory of the largest process, 0 if unknown
+    wall_seconds: float  # Elapsed time from start to exit
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """
+    Per-command rlimits; None leaves a limit as inherited.
+
+    Limits apply to the command and are inherited by its children. Note that
+    the process limit (RLIMIT_NPROC) counts every process of the user, not
+    only those of the command, and is not enforced for root.
+    """
+
+    cpu_seconds: Optional[int] = None
+    address_space_bytes: Optional[int] = None
+    open_files: Optional[int] = None
+    processes: Optional[int] = None
+
+    def get_rlimits(self) -> List[Tuple[int, int]]:
+        """
+        Get the configured limits.
+
+        Returns:
+            List of (resource, limit) pairs
+        """
+        limits = [
+            (resource.RLIMIT_CPU, self.cpu_seconds),
+            (resource.RLIMIT_AS, self.address_space_bytes),
+            (resource.RLIMIT_NOFILE, self.open_files),
+            (resource.RLIMIT_NPROC, self.processes),
+        ]
+        return [(res, value) for res, value in limits if value is not None]
+
+    def cpu_exceeded(self, returncode: int, usage: Optional[ResourceUsage]) -> bool:
+        """
+        Check whether a command was killed for exceeding its CPU limit.
+
+        Args:
+            returncode: Exit code of the command; a shell reports a command
+                killed by a signal as 128 + the signal
+            usage: Resources used by the command (optional)
+
+        Returns:
+            True if the command died of SIGXCPU, or of SIGKILL after using
+            its CPU seconds
+        """
+        if self.cpu_seconds is None:
+            return False
+        killed_by = -returncode if returncode < 0 else returncode - 128
+        if killed_by == signal.SIGXCPU:
+            return True
+        return (
+            killed_by == signal.SIGKILL
+            and usage is not None
+            and usage["cpu_user_seconds"] + usage["cpu_system_seconds"]
+            >= self.cpu_seconds * 0.9
+        )
+
+    def apply(self, pid: int) -> None:
+        """
+        Apply the limits to a running process.
+
+        Limits above the current hard limit are lowered to it, since raising
+        a hard limit needs privileges. The CPU hard limit is one second above
+        the soft one so the command gets SIGXCPU before SIGKILL.
+
+        Args:
+            pid: Process id of the command
+        """
+        for res, value in self.get_rlimits():
+            try:
+                _, hard = resource.prlimit(pid, res)
+                new_hard = value + 1 if res == resource.RLIMIT_CPU else value
+                if hard != resource.RLIM_INFINITY:
+                    value, new_hard = min(value, hard), min(new_hard, hard)
+                resource.prlimit(pid, res, (value, new_hard))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not set rlimit {res}={value} on {pid}: {e}")
+
+
+def get_resource_usage(
+    rusage: resource.struct_rusage, wall_seconds: float
+) -> ResourceUsage:
+    """
+    Convert the rusage of a reaped command into ResourceUsage.
+
+    Args:
+        rusage: Resource usage returned by os.wait4
+        wall_seconds: Elapsed time of the command
+
+    Returns:
+        ResourceUsage of the command and its waited-for children
+    """
+    return ResourceUsage(
+        cpu_user_seconds=round(rusage.ru_utime, 3),
+        cpu_system_seconds=round(rusage.ru_stime, 3),
+        max_rss_bytes=rusage.ru_maxrss * 1024,  # kilobytes on Linux
+        wall_seconds=round(wall_seconds, 3),
+    )
@@ -0,0 +1,607 @@
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Mapping, NotRequired, Optional, TypedDict, Union
+
+from backend.services.tool.workspace_index import GrepMatch, Symbol, WorkspaceIndex
+
+logger = logging.getLogger(__name__)
+
+
+class SearchInput(TypedDict, total=False):
+    """Input schema for SearchTool."""
+
+    cwd: str  # Optional: Workspace to search
+    pattern: str  # Glob and grep: What to look for
+    query: str  # Symbols: Name or part of a name
+    regex: bool  # Grep: Treat pattern as a regular expression
+    ignore_case: bool  # Grep: Match case-insensitively
+    glob: str  # Grep: Only search files matching this glob
+    kind: str  # Symbols: Only this kind of symbol
+    limit: int  # Optional: Maximum number of results
+
+
+class GlobOutput(TypedDict):
+    """Output schema for file glob."""
+
+    success: bool
+    files: List[str]  # Matching paths, relative to cwd
+    total: int  # Number of matches before the limit
+    truncated: bool
+    error: NotRequired[str]
+
+
+class GrepOutput(TypedDict):
+    """Output schema for code grep."""
+
+    success: bool
+    matches: List[GrepMatch]
+    files_searched: int  # Files read after the index narrowed them down
+    truncated: bool
+    error: NotRequired[str]
+
+
+class SymbolOutput(TypedDict):
+    """Output schema for symbol lookup."""
+
+    success: bool
+    symbols: List[Symbol]
+    total: int  # Number of matches before the limit
+    truncated: bool
+    error: NotRequired[str]
+
+
+class SearchTool:
+    """
+    Tool for finding files, text and definitions in a workspace.
+
+    Backed by a WorkspaceIndex per workspace, so searches answer from memory
+    and only read the files that can match, instead of walking the tree with
+    `find` or `grep` for every question. FileTool writes update the index
+    through `file_changed`; other changes (e.g. commands) call `mark_stale`.
+    """
+
+    # Tool Metadata
+    TOOL_NAME = "workspace_search"
+    TOOL_VERSION = "1.0.0"
+    TOOL_DESCRIPTION = (
+        "Search the workspace through an index: find files by glob, lines by "
+        "text or regex, and definitions by name."
+    )
+    TOOL_CATEGORY = "search"
+
+    # Configuration
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 500
+    SYMBOL_KINDS = ("function", "class", "interface", "type", "enum", "variable")
+
+    CWD_PROPERTY = {
+        "type": "string",
+        "description": "Project directory (default: the task workspace)",
+        "examples": ["/home/user/project"],
+    }
+    LIMIT_PROPERTY = {
+        "type": "integer",
+        "description": "Maximum number of results (default: 50)",
+        "examples": [20],
+    }
+
+    # Tool Schemas
+    GLOB_INPUT_SCHEMA = {
+        "type": "object",
+        "title": "FileGlobInput",
+        "description": "Input parameters for finding files by name",
+        "properties": {
+            "pattern": {
+                "type": "string",
+                "description": (
+                    "Glob with *, ?, [...], {a,b} and **. Without a slash it "
+                    "matches file names at any depth."
+                ),
+                "examples": ["src/**/*.tsx", "*.test.{ts,tsx}"],
+            },
+            "cwd": CWD_PROPERTY,
+            "limit": LIMIT_PROPERTY,
+        },
+        "required": ["pattern"],
+    }
+
+    GREP_INPUT_SCHEMA = {
+        "type": "object",
+        "title": "CodeGrepInput",
+        "description": "Input parameters for searching file contents",
+        "properties": {
+            "pattern": {
+                "type": "string",
+                "description": "Text to find, or a regular expression with regex",
+                "examples": ["useState(", r"export\s+default"],
+            },
+            "regex": {
+                "type": "boolean",
+                "description": "Treat pattern as a regular expression",
+                "examples": [True],
+            },
+            "ignore_case": {
+                "type": "boolean",
+                "description": "Match case-insensitively",
+                "examples": [True],
+            },
+            "glob": {
+                "type": "string",
+                "description": "Only search files matching this glob",
+                "examples": ["*.tsx", "src/components/**"],
+            },
+            "cwd": CWD_PROPERTY,
+            "limit": LIMIT_PROPERTY,
+        },
+        "required": ["pattern"],
+    }
+
+    SYMBOL_INPUT_SCHEMA = {
+        "type": "object",
+        "title": "SymbolLookupInput",
+        "description": "Input parameters for finding definitions",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "Name of the function, class, type or variable, "
+                "or part of it",
+                "examples": ["Button", "useAuth"],
+            },
+            "kind": {
+                "type": "string",
+                "enum": list(SYMBOL_KINDS),
+                "description": "Only return this kind of definition",
+            },
+            "cwd": CWD_PROPERTY,
+            "limit": LIMIT_PROPERTY,
+        },
+        "required": ["query"],
+    }
+
+    GLOB_OUTPUT_SCHEMA = {
+        "type": "object",
+        "title": "FileGlobOutput",
+        "description": "Files matching the pattern",
+        "properties": {
+            "success": {"type": "boolean"},
+            "files": {
+                "type": "array",
+                "items": {"type": "string"},
+                "description": "Matching paths relative to cwd, sorted",
+            },
+            "total": {"type": "integer", "description": "Matches before the limit"},
+            "truncated": {"type": "boolean"},
+            "error": {"type": "string"},
+        },
+        "required": ["success", "files", "total", "truncated"],
+    }
+
+    GREP_OUTPUT_SCHEMA = {
+        "type": "object",
+        "title": "CodeGrepOutput",
+        "description": "Lines matching the pattern",
+        "properties": {
+            "success": {"type": "boolean"},
+            "matches": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "file": {"type": "string"},
+                        "line": {"type": "integer"},
+                        "text": {"type": "string"},
+                    },
+                },
+                "description": "Matching lines by file and line number",
+            },
+            "files_searched": {
+                "type": "integer",
+                "description": "Files read after the index narrowed them down",
+            },
+            "truncated": {"type": "boolean"},
+            "error": {"type": "string"},
+        },
+        "required": ["success", "matches", "files_searched", "truncated"],
+    }
+
+    SYMBOL_OUTPUT_SCHEMA = {
+        "type": "object",
+        "title": "SymbolLookupOutput",
+        "description": "Definitions matching the query",
+        "properties": {
+            "success": {"type": "boolean"},
+            "symbols": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "name": {"type": "string"},
+                        "kind": {"type": "string"},
+                        "file": {"type": "string"},
+                        "line": {"type": "integer"},
+                    },
+                },
+                "description": "Definitions, exact name matches first",
+            },
+            "total": {"type": "integer", "description": "Matches before the limit"},
+            "truncated": {"type": "boolean"},
+            "error": {"type": "string"},
+        },
+        "required": ["success", "symbols", "total", "truncated"],
+    }
+
+    def __init__(self):
+        """Initialize SearchTool. Workspaces are indexed on first search."""
+        self._indexes: Dict[str, WorkspaceIndex] = {}
+        self._lock = threading.Lock()
+
+    def get_glob_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for finding files by glob.
+
+        Returns:
+            Dictionary with full tool definition for file glob
+        """
+        return {
+            "name": "file_glob",
+            "version": self.TOOL_VERSION,
+            "description": (
+                "Find files by glob pattern from the workspace index. Faster "
+                "than running find or ls; skips node_modules, .git and build "
+                "output."
+            ),
+            "category": self.TOOL_CATEGORY,
+            "operation": "glob",
+            "inputSchema": self.GLOB_INPUT_SCHEMA,
+            "outputSchema": self.GLOB_OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Find components",
+                    "input": {"pattern": "src/components/**/*.tsx"},
+                    "output": {
+                        "success": True,
+                        "files": [
+                            "src/components/Button.tsx",
+                            "src/components/Card/Card.tsx",
+                        ],
+                        "total": 2,
+                        "truncated": False,
+                    },
+                }
+            ],
+        }
+
+    def get_grep_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for searching file contents.
+
+        Returns:
+            Dictionary with full tool definition for code grep
+        """
+        return {
+            "name": "code_grep",
+            "version": self.TOOL_VERSION,
+            "description": (
+                "Find lines containing a text or matching a regex. Returns "
+                "file, line number and line, so only the relevant parts of "
+                "files need to be read."
+            ),
+            "category": self.TOOL_CATEGORY,
+            "operation": "grep",
+            "inputSchema": self.GREP_INPUT_SCHEMA,
+            "outputSchema": self.GREP_OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Find uses of a hook",
+                    "input": {"pattern": "useAuth(", "glob": "*.tsx"},
+                    "output": {
+                        "success": True,
+                        "matches": [
+                            {
+                                "file": "src/pages/Login.tsx",
+                                "line": 12,
+                                "text": "const { login } = useAuth();",
+                            }
+                        ],
+                        "files_searched": 1,
+                        "truncated": False,
+                    },
+                }
+            ],
+        }
+
+    def get_symbol_tool_definition(self) -> Dict[str, Any]:
+        """
+        Get complete tool definition for finding definitions.
+
+        Returns:
+            Dictionary with full tool definition for symbol lookup
+        """
+        return {
+            "name": "symbol_lookup",
+            "version": self.TOOL_VERSION,
+            "description": (
+                "Find where functions, classes, types and variables are "
+                "defined in JavaScript, TypeScript and Python files."
+            ),
+            "category": self.TOOL_CATEGORY,
+            "operation": "symbols",
+            "inputSchema": self.SYMBOL_INPUT_SCHEMA,
+            "outputSchema": self.SYMBOL_OUTPUT_SCHEMA,
+            "examples": [
+                {
+                    "name": "Find a component",
+                    "input": {"query": "Button"},
+                    "output": {
+                        "success": True,
+                        "symbols": [
+                            {
+                                "name": "Button",
+                                "kind": "function",
+                                "file": "src/components/Button.tsx",
+                                "line": 3,
+                            }
+                        ],
+                        "total": 1,
+                        "truncated": False,
+                    },
+                }
+            ],
+        }
+
+    def glob(self, cwd: str, pattern: str, limit: int = DEFAULT_LIMIT) -> GlobOutput:
+        """
+        Find files by glob pattern.
+
+        Args:
+            cwd: Workspace directory
+            pattern: Glob pattern
+            limit: Maximum number of paths (default: 50)
+
+        Returns:
+            GlobOutput with the matching paths
+        """
+        files, total = self.index_for(cwd).glob(pattern, limit)
+        return GlobOutput(
+            success=True, files=files, total=total, truncated=total > len(files)
+        )
+
+    def grep(
+        self,
+        cwd: str,
+        pattern: str,
+        regex: bool = False,
+        ignore_case: bool = False,
+        glob: Optional[str] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> GrepOutput:
+        """
+        Find lines containing a text or matching a regular expression.
+
+        Args:
+            cwd: Workspace directory
+            pattern: Text, or regular expression if regex is set
+            regex: Treat pattern as a regular expression
+            ignore_case: Match case-insensitively
+            glob: Only search files matching this glob
+            limit: Maximum number of matches (default: 50)
+
+        Returns:
+            GrepOutput with the matching lines
+        """
+        try:
+            matches, files_searched, truncated = self.index_for(cwd).grep(
+                pattern, regex, ignore_case, glob, limit
+            )
+        except re.error as e:
+            return GrepOutput(
+                success=False,
+                matches=[],
+                files_searched=0,
+                truncated=False,
+                error=f"Invalid regular expression: {e}",
+            )
+        return GrepOutput(
+            success=True,
+            matches=matches,
+            files_searched=files_searched,
+            truncated=truncated,
+        )
+
+    def find_symbols(
+        self,
+        cwd: str,
+        query: str,
+        kind: Optional[str] = None,
+        limit: int = DEFAULT_LIMIT,
+    ) -> SymbolOutput:
+        """
+        Find definitions by name.
+
+        Args:
+            cwd: Workspace directory
+            query: Name or part of a name
+            kind: Only return this kind of symbol
+            limit: Maximum number of symbols (default: 50)
+
+        Returns:
+            SymbolOutput with the definitions, best matches first
+        """
+        symbols, total = self.index_for(cwd).find_symbols(query, kind, limit)
+        return SymbolOutput(
+            success=True, symbols=symbols, total=total, truncated=total > len(symbols)
+        )
+
+    def index_for(self, cwd: str) -> WorkspaceIndex:
+        """Get the index of a workspace, creating it if needed."""
+        root = os.path.realpath(cwd)
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                index = self._indexes[root] = WorkspaceIndex(root)
+        return index
+
+    def file_changed(self, path: str) -> None:
+        """
+        Update the indexes containing a file that was written or deleted.
+
+        Args:
+            path: Absolute path of the file
+        """
+        path = os.path.realpath(path)
+        with self._lock:
+            indexes = [
+                index
+                for root, index in self._indexes.items()
+                if path.startswith(root + os.sep)
+            ]
+        for index in indexes:
+            if not index.stale:
+                index.update_file(path)
+
+    def mark_stale(self, cwd: Optional[str] = None) -> None:
+        """
+        Make the next search of a workspace refresh its index.
+
+        Args:
+            cwd: Workspace directory (default: every workspace)
+        """
+        with self._lock:
+            indexes = list(self._indexes.values())
+        root = os.path.realpath(cwd) if cwd else None
+        for index in indexes:
+            if root is None or index.root == root:
+                index.mark_stale()
+
+    def close_workspace(self, cwd: str) -> None:
+        """
+        Drop the index of a workspace.
+
+        Args:
+            cwd: Workspace directory
+        """
+        with self._lock:
+            self._indexes.pop(os.path.realpath(cwd), None)
+
+    def validate_input(
+        self, input_data: Mapping[str, Any], text_field: str
+    ) -> tuple[bool, str]:
+        """
+        Validate input data against schema.
+
+        Args:
+            input_data: Input dictionary to validate
+            text_field: Required text field, 'pattern' or 'query'
+
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if not isinstance(input_data, dict):
+            return False, "Input must be a dictionary"
+        cwd = input_data.get("cwd")
+        if not isinstance(cwd, str) or not os.path.isdir(cwd):
+            return False, f"'cwd' must be an existing directory, got {cwd!r}"
+        text = input_data.get(text_field)
+        if not isinstance(text, str) or not text:
+            return False, f"'{text_field}' must be a non-empty string"
+        limit = input_data.get("limit", self.DEFAULT_LIMIT)
+        if not isinstance(limit, int) or isinstance(limit, bool):
+            return False, "'limit' must be an integer"
+        if not 1 <= limit <= self.MAX_LIMIT:
+            return False, f"'limit' must be between 1 and {self.MAX_LIMIT}"
+        for name in ("regex", "ignore_case"):
+            if not isinstance(input_data.get(name, False), bool):
+                return False, f"'{name}' must be a boolean"
+        if not isinstance(input_data.get("glob", ""), str):
+            return False, "'glob' must be a string"
+        kind = input_data.get("kind")
+        if kind is not None and kind not in self.SYMBOL_KINDS:
+            return False, f"'kind' must be one of {', '.join(self.SYMBOL_KINDS)}"
+        return True, ""
+
+    def invoke_glob(self, input_data: Union[Dict[str, Any], SearchInput]) -> GlobOutput:
+        """
+        Invoke file glob with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with pattern, cwd and limit
+
+        Returns:
+            GlobOutput with the matching paths
+        """
+        is_valid, error_msg = self.validate_input(input_data, "pattern")
+        if not is_valid:
+            logger.error(f"Input validation failed: {error_msg}")
+            return GlobOutput(
+                success=False,
+                files=[],
+                total=0,
+                truncated=False,
+                error=f"Input validation failed: {error_msg}",
+            )
+        return self.glob(
+            input_data["cwd"],
+            input_data["pattern"],
+            input_data.get("limit", self.DEFAULT_LIMIT),
+        )
+
+    def invoke_grep(self, input_data: Union[Dict[str, Any], SearchInput]) -> GrepOutput:
+        """
+        Invoke code grep with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with pattern, regex, ignore_case, glob, cwd
+                and limit
+
+        Returns:
+            GrepOutput with the matching lines
+        """
+        is_valid, error_msg = self.validate_input(input_data, "pattern")
+        if not is_valid:
+            logger.error(f"Input validation failed: {error_msg}")
+            return GrepOutput(
+                success=False,
+                matches=[],
+                files_searched=0,
+                truncated=False,
+                error=f"Input validation failed: {error_msg}",
+            )
+        return self.grep(
+            input_data["cwd"],
+            input_data["pattern"],
+            regex=input_data.get("regex", False),
+            ignore_case=input_data.get("ignore_case", False),
+            glob=input_data.get("glob") or None,
+            limit=input_data.get("limit", self.DEFAULT_LIMIT),
+        )
+
+    def invoke_symbols(
+        self, input_data: Union[Dict[str, Any], SearchInput]
+    ) -> SymbolOutput:
+        """
+        Invoke symbol lookup with langchain-compatible interface.
+
+        Args:
+            input_data: Dictionary with query, kind, cwd and limit
+
+        Returns:
+            SymbolOutput with the definitions
+        """
+        is_valid, error_msg = self.validate_input(input_data, "query")
+        if not is_valid:
+            logger.error(f"Input validation failed: {error_msg}")
+            return SymbolOutput(
+                success=False,
+                symbols=[],
+                total=0,
+                truncated=False,
+                error=f"Input validation failed: {error_msg}",
+            )
+        return self.find_symbols(
+            input_data["cwd"],
+            input_data["query"],
+            kind=input_data.get("kind"),
+            limit=input_data.get("limit", self.DEFAULT_LIMIT),
+        )
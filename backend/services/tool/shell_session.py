@@ -0,0 +1,263 @@
+import logging
+import os
+import selectors
+import subprocess
+import threading
+import time
+import uuid
+from typing import IO, Callable, Dict, List, Optional, Tuple
+
+from backend.services.tool.process_tree import (
+    LeakedProcess,
+    list_process_group,
+    terminate_process_group,
+)
+from backend.services.tool.resource_limits import ResourceLimits, ResourceUsage
+
+logger = logging.getLogger(__name__)
+
+LineCallback = Callable[[str, bytes], None]  # (stream name, raw line)
+
+
+class ShellSessionError(Exception):
+    """Raised when the shell of a session exits or cannot be used."""
+
+
+class ShellSession:
+    """
+    Long-lived bash process that runs commands one after another.
+
+    Commands share the shell's state, so `cd`, exported variables and
+    activated environments carry over to the next command. Each command is
+    run through `eval` with stdin from /dev/null, followed by a unique marker
+    on stdout (with the exit code) and on stderr; output up to the markers
+    belongs to the command.
+
+    Resource limits are set on the shell before it reads its first command,
+    and every command inherits them. The shell reaps its commands, so their
+    CPU time is read from the shell's children totals in /proc; their peak
+    memory is not known.
+    """
+
+    DEFAULT_SHELL = "/bin/bash"
+    READ_CHUNK_SIZE = 64 * 1024  # 64 KB
+    MAX_LINE_BYTES = 64 * 1024  # longer lines are split
+    CLOSE_TIMEOUT = 2  # seconds to wait for the shell to exit on close
+    KILL_GRACE_SECONDS = 2  # between SIGTERM and SIGKILL of the shell's group
+
+    def __init__(
+        self,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        shell: str = DEFAULT_SHELL,
+        resource_limits: Optional[ResourceLimits] = None,
+    ):
+        """
+        Initialize ShellSession. The shell is started on first use.
+
+        Args:
+            cwd: Initial working directory of the shell (optional)
+            env: Environment of the shell (default: inherited)
+            shell: Shell executable (default: /bin/bash)
+            resource_limits: rlimits of the shell, inherited by its commands
+                (optional)
+        """
+        self.cwd = cwd
+        self.env = env
+        self.shell = shell
+        self.resource_limits = resource_limits
+        self.commands_run = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self) -> None:
+        """Start the shell process if it is not running."""
+        if self.alive:
+            return
+        self._process = subprocess.Popen(
+            [self.shell],
+            cwd=self.cwd,
+            env=self.env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+            start_new_session=True,
+        )
+        if self.resource_limits:
+            # The shell waits on stdin, so no command runs before the limits
+            self.resource_limits.apply(self._process.pid)
+        logger.info(f"Shell session started (pid={self._process.pid}, cwd={self.cwd})")
+
+    def run(
+        self,
+        command: str,
+        timeout: float,
+        on_line: LineCallback,
+        usage: Optional[Dict[str, ResourceUsage]] = None,
+    ) -> int:
+        """
+        Run a command in the shell and wait for it to finish.
+
+        Args:
+            command: Shell command to run
+            timeout: Timeout in seconds
+            on_line: Called with (stream name, raw line) for each line of output
+            usage: Filled with the command's ResourceUsage under "usage" when
+                /proc is available (optional)
+
+        Returns:
+            Exit code of the command
+
+        Raises:
+            subprocess.TimeoutExpired: If the command runs past the timeout; the
+                shell is killed and restarted on the next run
+            ShellSessionError: If the shell exits while running the command
+        """
+        with self._lock:
+            self.start()
+            marker = f"__SHELL_SESSION_{uuid.uuid4().hex}__"
+            quoted = command.replace("'", "'\\''")
+            script = (
+                f"eval '{quoted}' < /dev/null\n"
+                f"printf '%s %s\\n' '{marker}' \"$?\"\n"
+                f"printf '%s\\n' '{marker}' >&2\n"
+            )
+            started = time.monotonic()
+            cpu_before = self._children_cpu_seconds()
+            try:
+                stdin = self._pipes()[0]
+                stdin.write(script.encode("utf-8"))
+                stdin.flush()
+                returncode = self._read_until_marker(
+                    marker.encode("utf-8"), started + timeout, on_line
+                )
+            except subprocess.TimeoutExpired:
+                self._kill()  # also stops the command and its children
+                raise subprocess.TimeoutExpired(command, timeout)
+            except (OSError, ShellSessionError) as e:
+                self._kill()
+                raise ShellSessionError(f"Shell session exited: {e}")
+            self.commands_run += 1
+            cpu_after = self._children_cpu_seconds()
+            if usage is not None and cpu_before and cpu_after:
+                usage["usage"] = ResourceUsage(
+                    cpu_user_seconds=round(cpu_after[0] - cpu_before[0], 3),
+                    cpu_system_seconds=round(cpu_after[1] - cpu_before[1], 3),
+                    max_rss_bytes=0,  # not reported for children of the shell
+                    wall_seconds=round(time.monotonic() - started, 3),
+                )
+            return returncode
+
+    def close(self) -> List[LeakedProcess]:
+        """
+        Exit the shell and terminate processes still running in its group.
+
+        Returns:
+            Processes other than the shell left running by its commands
+        """
+        with self._lock:
+            if self._process is None:
+                return []
+            pid = self._process.pid
+            try:
+                if self._process.poll() is None:
+                    stdin = self._pipes()[0]
+                    stdin.write(b"exit\n")
+                    stdin.flush()
+                    self._process.wait(timeout=self.CLOSE_TIMEOUT)
+            except (OSError, subprocess.TimeoutExpired, ShellSessionError):
+                pass
+            leaked = [p for p in list_process_group(pid) if p["pid"] != pid]
+            self._kill()
+            logger.info(f"Shell session closed after {self.commands_run} command(s)")
+            return leaked
+
+    def _read_until_marker(
+        self, marker: bytes, deadline: float, on_line: LineCallback
+    ) -> int:
+        pending = {"stdout": b"", "stderr": b""}
+        results: Dict[str, Optional[bytes]] = {"stdout": None, "stderr": None}
+        _, stdout, stderr = self._pipes()
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdout, selectors.EVENT_READ, "stdout")
+            selector.register(stderr, selectors.EVENT_READ, "stderr")
+            while results["stdout"] is None or results["stderr"] is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(self.shell, remaining)
+                for key, _ in selector.select(timeout=remaining):
+                    name = key.data
+                    data = os.read(key.fd, self.READ_CHUNK_SIZE)
+                    if not data:
+                        raise ShellSessionError(f"{name} closed")
+                    pending[name], result = self._emit_lines(
+                        name, pending[name] + data, marker, on_line
+                    )
+                    if result is not None:
+                        results[name] = result
+                        selector.unregister(key.fileobj)
+        try:
+            return int(results["stdout"].strip())
+        except ValueError:
+            raise ShellSessionError(f"Invalid exit code {results['stdout']!r}")
+
+    def _emit_lines(
+        self, name: str, data: bytes, marker: bytes, on_line: LineCallback
+    ) -> Tuple[bytes, Optional[bytes]]:
+        """
+        Emit complete lines from data until the marker line.
+
+        Returns:
+            Tuple of (unfinished remainder, text after the marker or None)
+        """
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end == -1:
+                # Keep enough bytes back to not split a marker across chunks
+                if len(data) - start < self.MAX_LINE_BYTES:
+                    return data[start:], None
+                end = start + self.MAX_LINE_BYTES - len(marker) - 1
+            line = data[start : end + 1]
+            index = line.find(marker)
+            if index != -1:
+                if index:
+                    # Output that did not end with a newline
+                    on_line(name, line[:index])
+                return b"", line[index + len(marker) :]
+            on_line(name, line)
+            start = end + 1
+
+    def _children_cpu_seconds(self) -> Optional[Tuple[float, float]]:
+        """User and system CPU seconds of the shell's reaped children."""
+        if self._process is None:
+            return None
+        try:
+            with open(f"/proc/{self._process.pid}/stat") as f:
+                # Fields after the command name; cutime and cstime are 16 and 17
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            return int(fields[13]) / ticks, int(fields[14]) / ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def _kill(self) -> None:
+        if self._process is None:
+            return
+        terminate_process_group(self._process, self.KILL_GRACE_SECONDS)
+        for stream in (self._process.stdin, self._process.stdout, self._process.stderr):
+            if stream is not None:
+                stream.close()
+        self._process = None
+
+    def _pipes(self) -> Tuple[IO[bytes], IO[bytes], IO[bytes]]:
+        """stdin, stdout and stderr of the running shell."""
+        process = self._process
+        if process is None or not (process.stdin and process.stdout and process.stderr):
+            raise ShellSessionError("Shell is not running")
+        return process.stdin, process.stdout, process.stderr
@@ -0,0 +1,538 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple, TypedDict
+
+logger = logging.getLogger(__name__)
+
+
+class Symbol(TypedDict):
+    """A definition found in a source file."""
+
+    name: str
+    kind: str  # "function", "class", "interface", "type", "enum" or "variable"
+    file: str  # Path relative to the workspace
+    line: int  # 1-based
+
+
+class GrepMatch(TypedDict):
+    """A line matching a search."""
+
+    file: str  # Path relative to the workspace
+    line: int  # 1-based
+    text: str  # The line, stripped and cut to MAX_LINE_LENGTH
+
+
+@dataclass
+class _Entry:
+    size: int
+    mtime_ns: int
+    digest: Optional[str] = None  # BLAKE2 of the content, if it was read
+    trigrams: FrozenSet[str] = frozenset()
+    symbols: List[Tuple[str, str, int]] = field(default_factory=list)
+    searchable: bool = False  # Content is in the trigram index
+
+
+JS_SYMBOL = re.compile(
+    r"^[ \t]*(?:export[ \t]+)?(?:default[ \t]+)?(?:declare[ \t]+)?"
+    r"(?:abstract[ \t]+)?(?:async[ \t]+)?"
+    r"(function\*?|class|interface|type|enum|const|let|var)[ \t]+([A-Za-z_$][\w$]*)",
+    re.MULTILINE,
+)
+PY_SYMBOL = re.compile(r"^[ \t]*(?:async[ \t]+)?(def|class)[ \t]+([A-Za-z_]\w*)", re.M)
+SYMBOL_PATTERNS = {
+    ".js": JS_SYMBOL,
+    ".jsx": JS_SYMBOL,
+    ".mjs": JS_SYMBOL,
+    ".cjs": JS_SYMBOL,
+    ".ts": JS_SYMBOL,
+    ".tsx": JS_SYMBOL,
+    ".mts": JS_SYMBOL,
+    ".cts": JS_SYMBOL,
+    ".py": PY_SYMBOL,
+}
+SYMBOL_KINDS = {
+    "function*": "function",
+    "def": "function",
+    "const": "variable",
+    "let": "variable",
+    "var": "variable",
+}
+WORD = re.compile(r"\w{3,}")
+REGEX_SPECIAL = set(".^$*+?{}[]()|\\")
+GLOB_TOKEN = re.compile(r"\*\*/|\*\*|\*|\?|\[[^\]]+\]|[{},\[]|[^*?\[{},]+")
+GLOB_WILDCARDS = {"**/": "(?:.*/)?", "**": ".*", "*": "[^/]*", "?": "[^/]"}
+
+
+class WorkspaceIndex:
+    """
+    Incrementally maintained index of the files in a workspace.
+
+    Keeps each file's size, mtime and content hash, the definitions it
+    contains, and a trigram index of the (lowercased) words in it. A search
+    only reads the files that have every trigram of the words in its literal
+    text, so grep on a large tree touches a handful of files instead of all
+    of them. Indexing words rather than the raw text lets the trigrams of a
+    word be computed once for the whole tree.
+
+    `refresh` only re-reads files whose size or mtime changed. Writers that
+    know what they changed call `update_file`/`remove_file` instead, and
+    anything else (e.g. a shell command) marks the index stale so the next
+    query refreshes it first.
+    """
+
+    SKIPPED_DIRS = frozenset(
+        {".git", "node_modules", "dist", "build", ".next", "coverage", "__pycache__"}
+    )
+    MAX_FILES = 200_000
+    MAX_INDEXED_FILE_SIZE = 1024 * 1024  # 1 MB; larger files are scanned on search
+    BINARY_CHECK_BYTES = 8192
+    MAX_LINE_LENGTH = 200
+    MAX_CACHED_WORDS = 500_000
+
+    def __init__(self, root: str):
+        """
+        Initialize WorkspaceIndex. The tree is read on the first query.
+
+        Args:
+            root: Workspace directory to index
+        """
+        self.root = os.path.realpath(root)
+        self.stale = True
+        self.last_refresh = 0.0
+        self._files: Dict[str, _Entry] = {}
+        self._postings: Dict[str, Set[str]] = {}  # trigram -> paths
+        self._word_trigrams: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def mark_stale(self) -> None:
+        """Make the next query refresh the index first."""
+        self.stale = True
+
+    def ensure_fresh(self) -> None:
+        """Refresh the index if it was marked stale."""
+        if self.stale:
+            self.refresh()
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the tree.
+
+        Returns:
+            Number of files added, updated and removed
+        """
+        with self._lock:
+            started = time.monotonic()
+            self.stale = False
+            seen = {}
+            for path, stat in self._walk():
+                seen[path] = stat
+            counts = {"added": 0, "updated": 0, "removed": 0}
+            for path in set(self._files) - set(seen):
+                self._remove(path)
+                counts["removed"] += 1
+            for path, stat in seen.items():
+                entry = self._files.get(path)
+                if entry and (entry.size, entry.mtime_ns) == stat:
+                    continue
+                counts["updated" if entry else "added"] += 1
+                self._index(path, *stat)
+            self.last_refresh = time.time()
+        logger.info(
+            f"Indexed {self.root} in {time.monotonic() - started:.3f}s "
+            f"({len(self._files)} files, {counts})"
+        )
+        return counts
+
+    def update_file(self, path: str) -> None:
+        """
+        Re-index one file after it was written.
+
+        Args:
+            path: Absolute path, or path relative to the workspace
+        """
+        relative = self._relative(path)
+        if relative is None:
+            return
+        with self._lock:
+            try:
+                stat = os.stat(os.path.join(self.root, relative))
+            except OSError:
+                self._remove(relative)
+                return
+            self._index(relative, stat.st_size, stat.st_mtime_ns)
+
+    def remove_file(self, path: str) -> None:
+        """
+        Drop one file after it was deleted.
+
+        Args:
+            path: Absolute path, or path relative to the workspace
+        """
+        relative = self._relative(path)
+        if relative is not None:
+            with self._lock:
+                self._remove(relative)
+
+    def digest(self, path: str) -> Optional[str]:
+        """Get the indexed content hash of a file, if it was read."""
+        entry = self._files.get(self._relative(path) or "")
+        return entry.digest if entry else None
+
+    def glob(self, pattern: str, limit: int) -> Tuple[List[str], int]:
+        """
+        Find files by glob pattern.
+
+        Supports `*`, `?`, `[...]`, `{a,b}` and `**` for any number of
+        directories. A pattern without a slash matches file names at any
+        depth, like .gitignore patterns.
+
+        Args:
+            pattern: Glob pattern, e.g. "src/**/*.tsx" or "*.test.ts"
+            limit: Maximum number of paths to return
+
+        Returns:
+            Tuple of (sorted matching paths, total number of matches)
+        """
+        self.ensure_fresh()
+        regex = re.compile(glob_to_regex(pattern))
+        basename_only = "/" not in pattern
+        with self._lock:
+            paths = [
+                path
+                for path in self._files
+                if regex.match(path.rsplit("/", 1)[-1] if basename_only else path)
+            ]
+        paths.sort()
+        return paths[:limit], len(paths)
+
+    def grep(
+        self,
+        pattern: str,
+        regex: bool = False,
+        ignore_case: bool = False,
+        path_glob: Optional[str] = None,
+        limit: int = 50,
+    ) -> Tuple[List[GrepMatch], int, bool]:
+        """
+        Find lines containing a text or matching a regular expression.
+
+        Args:
+            pattern: Text, or regular expression if regex is set
+            regex: Treat pattern as a regular expression
+            ignore_case: Match case-insensitively
+            path_glob: Only search files matching this glob
+            limit: Maximum number of matches to return
+
+        Returns:
+            Tuple of (matches, number of files read, whether matches were
+            cut at limit)
+
+        Raises:
+            re.error: If pattern is not a valid regular expression
+        """
+        self.ensure_fresh()
+        compiled = re.compile(
+            pattern if regex else re.escape(pattern),
+            re.IGNORECASE if ignore_case else 0,
+        )
+        literals = required_literals(pattern) if regex else [pattern]
+        path_regex = re.compile(glob_to_regex(path_glob)) if path_glob else None
+        matches: List[GrepMatch] = []
+        candidates = self._candidates(literals, path_glob, path_regex)
+        for count, path in enumerate(candidates, 1):
+            for number, text in self._matching_lines(path, compiled):
+                if len(matches) == limit:
+                    return matches, count, True
+                matches.append(GrepMatch(file=path, line=number, text=text))
+        return matches, len(candidates), False
+
+    def find_symbols(
+        self, query: str, kind: Optional[str] = None, limit: int = 50
+    ) -> Tuple[List[Symbol], int]:
+        """
+        Find definitions by name.
+
+        Exact matches come first, then names starting with the query, then
+        names containing it, all case-insensitively.
+
+        Args:
+            query: Symbol name or part of it
+            kind: Only return this kind of symbol
+            limit: Maximum number of symbols to return
+
+        Returns:
+            Tuple of (symbols, total number of matches)
+        """
+        self.ensure_fresh()
+        wanted = query.lower()
+        found = []
+        with self._lock:
+            for path, entry in self._files.items():
+                for name, symbol_kind, line in entry.symbols:
+                    lowered = name.lower()
+                    if wanted not in lowered or (kind and symbol_kind != kind):
+                        continue
+                    rank = (
+                        0
+                        if name == query
+                        else (
+                            1
+                            if lowered == wanted
+                            else 2 if lowered.startswith(wanted) else 3
+                        )
+                    )
+                    found.append((rank, path, line, name, symbol_kind))
+        found.sort()
+        symbols = [
+            Symbol(name=name, kind=symbol_kind, file=path, line=line)
+            for _, path, line, name, symbol_kind in found[:limit]
+        ]
+        return symbols, len(found)
+
+    def _walk(self) -> Iterator[Tuple[str, Tuple[int, int]]]:
+        """Yield (relative path, (size, mtime_ns)) of the files in the tree."""
+        stack = [""]
+        count = 0
+        while stack:
+            directory = stack.pop()
+            for relative, stat in self._scan(directory):
+                if stat is None:
+                    stack.append(relative)
+                    continue
+                count += 1
+                if count > self.MAX_FILES:
+                    logger.warning(f"{self.root} has over {self.MAX_FILES} files")
+                    return
+                yield relative, stat
+
+    def _scan(self, directory: str) -> Iterator[Tuple[str, Optional[Tuple[int, int]]]]:
+        """Yield the files of a directory with their stat, and subdirectories."""
+        try:
+            entries = list(os.scandir(os.path.join(self.root, directory)))
+        except OSError:
+            return
+        for entry in entries:
+            relative = f"{directory}/{entry.name}" if directory else entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in self.SKIPPED_DIRS:
+                        yield relative, None
+                elif entry.is_file():
+                    stat = entry.stat()
+                    yield relative, (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                continue
+
+    def _index(self, path: str, size: int, mtime_ns: int) -> None:
+        """(Re-)index a file from disk."""
+        self._remove(path)
+        entry = _Entry(size=size, mtime_ns=mtime_ns)
+        self._files[path] = entry
+        if size > self.MAX_INDEXED_FILE_SIZE:
+            return
+        try:
+            with open(os.path.join(self.root, path), "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        entry.digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if b"\0" in data[: self.BINARY_CHECK_BYTES]:
+            return
+        text = data.decode("utf-8", errors="replace")
+        entry.trigrams = self._text_trigrams(text.lower())
+        entry.searchable = True
+        for trigram in entry.trigrams:
+            self._postings.setdefault(trigram, set()).add(path)
+        symbol_pattern = SYMBOL_PATTERNS.get(os.path.splitext(path)[1])
+        if symbol_pattern:
+            entry.symbols = list(_find_symbols(symbol_pattern, text))
+
+    def _text_trigrams(self, text: str) -> FrozenSet[str]:
+        """Trigrams of the words of text, with each word's cached."""
+        if len(self._word_trigrams) > self.MAX_CACHED_WORDS:
+            self._word_trigrams.clear()
+        result: Set[str] = set()
+        for word in set(WORD.findall(text)):
+            cached = self._word_trigrams.get(word)
+            if cached is None:
+                cached = self._word_trigrams[word] = frozenset(trigrams(word))
+            result |= cached
+        return frozenset(result)
+
+    def _remove(self, path: str) -> None:
+        entry = self._files.pop(path, None)
+        if entry is None:
+            return
+        for trigram in entry.trigrams:
+            paths = self._postings.get(trigram)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._postings[trigram]
+
+    def _candidates(
+        self,
+        literals: List[str],
+        path_glob: Optional[str],
+        path_regex: Optional[re.Pattern],
+    ) -> List[str]:
+        """Files that can contain a match: all literals' trigrams are in them."""
+        with self._lock:
+            required = set()
+            for literal in literals:
+                for word in WORD.findall(literal.lower()):
+                    required |= trigrams(word)
+            if required:
+                posting_lists = sorted(
+                    (self._postings.get(t, set()) for t in required), key=len
+                )
+                paths = set(posting_lists[0]).intersection(*posting_lists[1:])
+            else:
+                paths = {p for p, e in self._files.items() if e.searchable}
+            # Files too large for the trigram index are always searched
+            paths.update(
+                path
+                for path, entry in self._files.items()
+                if not entry.searchable and entry.size > self.MAX_INDEXED_FILE_SIZE
+            )
+        if path_glob and path_regex:
+            basename_only = "/" not in path_glob
+            paths = {
+                path
+                for path in paths
+                if path_regex.match(path.rsplit("/", 1)[-1] if basename_only else path)
+            }
+        return sorted(paths)
+
+    def _matching_lines(
+        self, path: str, compiled: re.Pattern
+    ) -> Iterator[Tuple[int, str]]:
+        try:
+            with open(
+                os.path.join(self.root, path), encoding="utf-8", errors="replace"
+            ) as f:
+                for number, line in enumerate(f, 1):
+                    if compiled.search(line):
+                        yield number, line.strip()[: self.MAX_LINE_LENGTH]
+        except OSError:
+            return
+
+    def _relative(self, path: str) -> Optional[str]:
+        """Path relative to the root with forward slashes, or None if outside."""
+        absolute = os.path.realpath(os.path.join(self.root, path))
+        if not absolute.startswith(self.root + os.sep):
+            return None
+        relative = os.path.relpath(absolute, self.root).replace(os.sep, "/")
+        if any(part in self.SKIPPED_DIRS for part in relative.split("/")[:-1]):
+            return None
+        return relative
+
+
+def trigrams(text: str) -> Set[str]:
+    """Get the set of three-character substrings of text."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _find_symbols(pattern: re.Pattern, text: str) -> Iterator[Tuple[str, str, int]]:
+    """Yield (name, kind, line) of the definitions pattern finds in text."""
+    line, position = 1, 0
+    for match in pattern.finditer(text):
+        line += text.count("\n", position, match.start(2))
+        position = match.start(2)
+        yield match.group(2), SYMBOL_KINDS.get(match.group(1), match.group(1)), line
+
+
+def required_literals(pattern: str) -> List[str]:
+    """
+    Get literal strings every match of a regular expression contains.
+
+    Conservative: patterns with alternation give no literals, so every file
+    is searched, and only text outside groups and classes is used.
+
+    Args:
+        pattern: Regular expression
+
+    Returns:
+        Literal runs of at least three characters
+    """
+    if "|" in pattern:
+        return []
+    literals = []
+    current = ""
+    depth = 0  # open groups
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\" and index + 1 < len(pattern):
+            escaped = pattern[index + 1]
+            if escaped.isalnum() or depth:
+                literals.append(current)
+                current = ""
+            else:
+                current += escaped
+            index += 2
+            continue
+        if char in "*?{":
+            current = current[:-1]  # the last character may not be present
+        if char in REGEX_SPECIAL:
+            literals.append(current)
+            current = ""
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            if char in "[{":
+                index = _skip_to(pattern, index, "]" if char == "[" else "}")
+        elif not depth:
+            current += char
+        index += 1
+    literals.append(current)
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a glob pattern into a regular expression matching whole paths.
+
+    Args:
+        pattern: Glob pattern with *, ?, [...], {a,b} and **
+
+    Returns:
+        Regular expression source
+    """
+    parts = []
+    depth = 0  # open {} groups
+    for token in GLOB_TOKEN.findall(pattern):
+        if token in GLOB_WILDCARDS:
+            parts.append(GLOB_WILDCARDS[token])
+        elif token.startswith("[") and token.endswith("]") and len(token) > 2:
+            body = token[1:-1].replace("\\", "\\\\")
+            parts.append(f"[^{body[1:]}]" if body.startswith("!") else f"[{body}]")
+        elif token == "{":
+            depth += 1
+            parts.append("(?:")
+        elif token == "}" and depth:
+            depth -= 1
+            parts.append(")")
+        elif token == "," and depth:
+            parts.append("|")
+        else:
+            parts.append(re.escape(token))
+    return "".join(parts) + "$"
+
+
+def _skip_to(pattern: str, index: int, closing: str) -> int:
+    """Index of the bracket closing the class or repeat opened at index."""
+    index += 1
+    if closing == "]" and pattern[index : index + 1] == "^":
+        index += 1
+    if closing == "]" and pattern[index : index + 1] == "]":
+        index += 1
+    while index < len(pattern) and pattern[index] != closing:
+        index += 2 if pattern[index] == "\\" else 1
+    return index
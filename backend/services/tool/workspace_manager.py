@@ -0,0 +1,286 @@
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Set
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+FICLONE = 0x40049409  # ioctl sharing the extents of one file with another
+REFLINK_UNSUPPORTED = {errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY}
+
+
+class WorkspaceManager:
+    """
+    Per-task workspaces cloned from pre-installed project templates.
+
+    A template is a project directory with its dependencies installed, e.g. a
+    React or Next.js app with node_modules. Creating a workspace clones it
+    instead of running a fresh install: files are reflinked (copy-on-write)
+    where the filesystem supports it, and copied otherwise, except inside
+    dependency directories such as node_modules, which are hardlinked. Package
+    managers replace files rather than write into them, but anything editing a
+    hardlinked dependency in place edits the template too.
+
+    Workspaces not in use are removed by `collect_garbage` once they are older
+    than `max_age_seconds`, oldest first beyond `max_workspaces`.
+    """
+
+    DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60  # 1 day
+    DEFAULT_MAX_WORKSPACES = 50
+    DEFAULT_SHARED_DIRS = ("node_modules",)
+    TEMPLATES_DIR = "templates"
+    WORKSPACES_DIR = "workspaces"
+    STAGING_PREFIX = ".staging-"
+
+    def __init__(
+        self,
+        root_dir: str,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+        max_workspaces: int = DEFAULT_MAX_WORKSPACES,
+        shared_dirs: Sequence[str] = DEFAULT_SHARED_DIRS,
+    ):
+        """
+        Initialize WorkspaceManager.
+
+        Args:
+            root_dir: Directory holding the templates and workspaces
+            max_age_seconds: Age after which unused workspaces are removed
+                (default: 1 day)
+            max_workspaces: Maximum number of workspaces kept (default: 50)
+            shared_dirs: Directory names whose files are hardlinked when
+                reflinks are not supported (default: node_modules)
+        """
+        if max_age_seconds <= 0:
+            raise ValueError(f"Max age must be positive, got {max_age_seconds}")
+        if max_workspaces <= 0:
+            raise ValueError(f"Max workspaces must be positive, got {max_workspaces}")
+        self.root_dir = root_dir
+        self.templates_dir = os.path.join(root_dir, self.TEMPLATES_DIR)
+        self.workspaces_dir = os.path.join(root_dir, self.WORKSPACES_DIR)
+        self.max_age_seconds = max_age_seconds
+        self.max_workspaces = max_workspaces
+        self.shared_dirs = frozenset(shared_dirs)
+        self.stats: Dict[str, int] = {"reflinked": 0, "hardlinked": 0, "copied": 0}
+        self._reflink_supported: Optional[bool] = None
+        self._active: Set[str] = set()
+        self._lock = threading.Lock()
+        os.makedirs(self.templates_dir, exist_ok=True)
+        os.makedirs(self.workspaces_dir, exist_ok=True)
+
+    def add_template(self, name: str, source_dir: str) -> str:
+        """
+        Store a provisioned project directory as a template.
+
+        The source is cloned into the templates directory and replaces any
+        template with the same name.
+
+        Args:
+            name: Template name, e.g. "react"
+            source_dir: Project directory with its dependencies installed
+
+        Returns:
+            Path of the template
+
+        Raises:
+            ValueError: If the name is invalid or source_dir is not a directory
+        """
+        self._check_name(name)
+        if not os.path.isdir(source_dir):
+            raise ValueError(f"Template source is not a directory: {source_dir}")
+        path = os.path.join(self.templates_dir, name)
+        staging_dir = self._clone_to_staging(source_dir, self.templates_dir)
+        with self._lock:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+            os.replace(staging_dir, path)
+        logger.info(f"Workspace template {name} added from {source_dir}")
+        return path
+
+    def list_templates(self) -> List[str]:
+        """
+        List the available templates.
+
+        Returns:
+            Template names, sorted
+        """
+        return sorted(
+            name
+            for name in os.listdir(self.templates_dir)
+            if not name.startswith(self.STAGING_PREFIX)
+            and os.path.isdir(os.path.join(self.templates_dir, name))
+        )
+
+    def create_workspace(
+        self, template: Optional[str] = None, workspace_id: Optional[str] = None
+    ) -> str:
+        """
+        Create a workspace, cloned from a template or empty.
+
+        Old workspaces are garbage collected first.
+
+        Args:
+            template: Name of the template to clone (optional)
+            workspace_id: Name of the workspace directory (default: random)
+
+        Returns:
+            Path of the workspace
+
+        Raises:
+            ValueError: If the template does not exist or the workspace does
+        """
+        workspace_id = workspace_id or uuid4().hex
+        self._check_name(workspace_id)
+        path = os.path.join(self.workspaces_dir, workspace_id)
+        if os.path.exists(path):
+            raise ValueError(f"Workspace already exists: {workspace_id}")
+        self.collect_garbage(reserve=1)
+
+        started = time.monotonic()
+        if template is None:
+            os.makedirs(path)
+        else:
+            self._check_name(template)
+            template_dir = os.path.join(self.templates_dir, template)
+            if not os.path.isdir(template_dir):
+                raise ValueError(f"Unknown workspace template: {template}")
+            os.replace(self._clone_to_staging(template_dir, self.workspaces_dir), path)
+        with self._lock:
+            self._active.add(workspace_id)
+        logger.info(
+            f"Workspace {workspace_id} created from {template or 'scratch'} "
+            f"in {time.monotonic() - started:.3f}s"
+        )
+        return path
+
+    def release_workspace(self, workspace_id: str, remove: bool = False) -> None:
+        """
+        Mark a workspace as no longer in use.
+
+        Released workspaces are kept, so their files can still be inspected,
+        until garbage collection removes them.
+
+        Args:
+            workspace_id: Name of the workspace directory
+            remove: Remove the workspace right away (default: False)
+        """
+        with self._lock:
+            self._active.discard(workspace_id)
+        path = os.path.join(self.workspaces_dir, workspace_id)
+        if remove:
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.isdir(path):
+            os.utime(path)  # age counts from the end of its use
+
+    def collect_garbage(self, reserve: int = 0) -> List[str]:
+        """
+        Remove workspaces that are not in use and too old or too many.
+
+        Args:
+            reserve: Number of workspaces about to be created to make room for
+
+        Returns:
+            Names of the removed workspaces
+        """
+        now = time.time()
+        with self._lock:
+            active = set(self._active)
+        candidates = []
+        for name in os.listdir(self.workspaces_dir):
+            path = os.path.join(self.workspaces_dir, name)
+            if name.startswith(self.STAGING_PREFIX):
+                # Left behind by an interrupted clone
+                if now - os.path.getmtime(path) > self.max_age_seconds:
+                    shutil.rmtree(path, ignore_errors=True)
+            elif name not in active and os.path.isdir(path):
+                candidates.append((os.path.getmtime(path), name))
+        candidates.sort()
+        excess = len(candidates) + len(active) + reserve - self.max_workspaces
+        removed = []
+        for index, (mtime, name) in enumerate(candidates):
+            if index >= excess and now - mtime <= self.max_age_seconds:
+                continue
+            shutil.rmtree(os.path.join(self.workspaces_dir, name), ignore_errors=True)
+            removed.append(name)
+        if removed:
+            logger.info(f"Removed {len(removed)} old workspace(s)")
+        return removed
+
+    def _clone_to_staging(self, source_dir: str, parent_dir: str) -> str:
+        staging_dir = tempfile.mkdtemp(prefix=self.STAGING_PREFIX, dir=parent_dir)
+        try:
+            self._clone_tree(source_dir, staging_dir)
+        except OSError:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+        return staging_dir
+
+    def _clone_tree(self, source_dir: str, target_dir: str) -> None:
+        for root, dirs, files in os.walk(source_dir):
+            relative = os.path.relpath(root, source_dir)
+            target_root = os.path.normpath(os.path.join(target_dir, relative))
+            shared = bool(self.shared_dirs.intersection(relative.split(os.sep)))
+            for name in list(dirs):
+                source, target = os.path.join(root, name), os.path.join(
+                    target_root, name
+                )
+                if os.path.islink(source):
+                    os.symlink(os.readlink(source), target)
+                    dirs.remove(name)  # os.walk does not follow it anyway
+                else:
+                    os.mkdir(target)
+            for name in files:
+                source, target = os.path.join(root, name), os.path.join(
+                    target_root, name
+                )
+                if os.path.islink(source):
+                    os.symlink(os.readlink(source), target)
+                else:
+                    self._clone_file(source, target, shared)
+            shutil.copystat(root, target_root)
+
+    def _clone_file(self, source: str, target: str, shared: bool) -> None:
+        if self._reflink_supported is not False and self._reflink(source, target):
+            self.stats["reflinked"] += 1
+            return
+        if shared:
+            try:
+                os.link(source, target)
+                self.stats["hardlinked"] += 1
+                return
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    raise
+        shutil.copy2(source, target)
+        self.stats["copied"] += 1
+
+    def _reflink(self, source: str, target: str) -> bool:
+        """Clone a file copy-on-write; False if the filesystem cannot."""
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError as e:
+                if e.errno not in REFLINK_UNSUPPORTED:
+                    raise
+                if self._reflink_supported is None:
+                    logger.info("Reflinks not supported, copying workspace files")
+                self._reflink_supported = False
+                reflinked = False
+            else:
+                self._reflink_supported = True
+                reflinked = True
+        if reflinked:
+            shutil.copystat(source, target)
+        else:
+            os.remove(target)
+        return reflinked
+
+    @staticmethod
+    def _check_name(name: str) -> None:
+        if not name or name in (".", "..") or os.sep in name or name.startswith("."):
+            raise ValueError(f"Invalid workspace or template name: {name!r}")
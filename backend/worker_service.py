@@ -0,0 +1,389 @@
+import json
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, Optional
+from uuid import UUID
+
+from langchain.messages import AIMessage, ToolMessage
+
+from backend.services.agent.agent_registry import agent_registry
+from backend.services.agent.budget import Budget
+from backend.services.agent.middleware.budget_middleware import STOP_MESSAGE_NAME
+from backend.services.aws.task_db import TaskDB, Task, StatusLevel
+from backend.services.task.task_events import task_events
+from backend.services.tool.command_audit_log import command_audit_log
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerStatus(str, Enum):
+    STARTING = "STARTING"
+    READY = "READY"
+    DRAINING = "DRAINING"
+    STOPPED = "STOPPED"
+
+
+class WorkerService:
+    """
+    Long-running worker that polls TaskDB for planned tasks and runs them.
+
+    Agents (with their LLM clients) and the DynamoDB connection are created
+    once at startup and kept warm for every task. SIGTERM/SIGINT stop polling
+    and wait for in-flight tasks to finish before exiting.
+
+    A task only starts once every task it depends on is done. A task whose run
+    raises is planned again, up to max_attempts runs, and then marked failed.
+    A task whose run exceeds its budget is paused with its partial result;
+    resume_task plans it again, and its next run continues from that result.
+    """
+
+    DEFAULT_POLL_INTERVAL = 10  # seconds
+    DEFAULT_MAX_WORKERS = 2
+    DEFAULT_DRAIN_TIMEOUT = 600  # 10 minutes
+    DEFAULT_MAX_ATTEMPTS = 3
+
+    def __init__(
+        self,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        drain_timeout: float = DEFAULT_DRAIN_TIMEOUT,
+        health_port: Optional[int] = None,
+        budget: Optional[Budget] = None,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        """
+        Initialize WorkerService.
+
+        Args:
+            poll_interval: Seconds between TaskDB polls (default: 10)
+            max_workers: Maximum number of tasks run concurrently (default: 2)
+            drain_timeout: Seconds to wait for in-flight tasks on shutdown
+            health_port: Port for the HTTP health endpoint (optional)
+            budget: Limits for each task run (default: the agent's budget)
+            max_attempts: Runs of a failing task before it is marked failed
+                (default: 3)
+        """
+        if poll_interval <= 0:
+            raise ValueError(f"Poll interval must be positive, got {poll_interval}")
+        if max_workers <= 0:
+            raise ValueError(f"Max workers must be positive, got {max_workers}")
+        if max_attempts <= 0:
+            raise ValueError(f"Max attempts must be positive, got {max_attempts}")
+        self.poll_interval = poll_interval
+        self.max_workers = max_workers
+        self.drain_timeout = drain_timeout
+        self.health_port = health_port
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.status = WorkerStatus.STARTING
+        self.task_db: Optional[TaskDB] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight: Dict[UUID, Future] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._health_server: Optional[ThreadingHTTPServer] = None
+        self._started_at = time.monotonic()
+        self._last_poll_at: Optional[float] = None
+        self._processed = 0
+        self._failed = 0
+
+    def warm_up(self) -> None:
+        """Create the DB connection and build every registered agent."""
+        self.task_db = TaskDB()
+        agent_registry.warm_up(list(agent_registry.agent_classes))
+        logger.info(f"Worker warmed up: {agent_registry.get_stats()}")
+
+    def run(self) -> None:
+        """Run the worker until a stop is requested, then drain."""
+        self._install_signal_handlers()
+        self._start_health_server()
+        self.warm_up()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="worker"
+        )
+        self.status = WorkerStatus.READY
+        logger.info(
+            f"Worker ready (poll_interval={self.poll_interval}s, max_workers={self.max_workers})"
+        )
+        task_events.subscribe(self.on_task_available)
+        try:
+            while not self._stop_event.is_set():
+                self.poll_once()
+                self._stop_event.wait(self.poll_interval)
+        finally:
+            task_events.unsubscribe(self.on_task_available)
+            self._drain()
+
+    def stop(self) -> None:
+        """Stop polling for new work; in-flight tasks are allowed to finish."""
+        if not self._stop_event.is_set():
+            logger.info("Worker stop requested, draining in-flight tasks")
+            self.status = WorkerStatus.DRAINING
+            self._stop_event.set()
+
+    def poll_once(self) -> int:
+        """
+        Fetch planned tasks and submit those not already running.
+
+        Returns:
+            Number of tasks submitted
+        """
+        self._last_poll_at = time.time()
+        if self.task_db is None:
+            return 0
+        try:
+            tasks = self.task_db.get_tasks() or []
+        except Exception as e:
+            logger.error(f"Error polling tasks: {e}", exc_info=True)
+            return 0
+
+        statuses = {str(task.task_id): task.status for task in tasks}
+        submitted = 0
+        for task in tasks:
+            if self._stop_event.is_set():
+                break
+            if self._submit(task, statuses):
+                submitted += 1
+        return submitted
+
+    def on_task_available(self, task: Task) -> None:
+        """
+        Start a task as soon as it is published, without waiting for a poll.
+
+        Args:
+            task: Task that became available
+        """
+        if not self._stop_event.is_set() and self._submit(task):
+            logger.info(f"Task {task.task_id} started from task available event")
+
+    def resume_task(self, task_id: UUID) -> bool:
+        """
+        Plan a paused task again and start it if a worker slot is free.
+
+        The run continues from the partial result the paused run saved. A
+        task that cannot start yet is left planned for the next poll.
+
+        Args:
+            task_id: ID of the paused task
+
+        Returns:
+            True if the task was planned again, False if it is not paused
+        """
+        if self.task_db is None:
+            raise RuntimeError("Task DB not warmed up")
+        task = self.task_db.get_task_by_id(task_id)
+        if task is None or task.status != StatusLevel.PAUSED:
+            return False
+        task.status = StatusLevel.PLANNED
+        self.task_db.update_task(task)
+        logger.info(f"Task {task_id} planned again to resume from its partial result")
+        if not self._stop_event.is_set():
+            self._submit(task)
+        return True
+
+    def _submit(
+        self, task: Task, statuses: Optional[Dict[str, StatusLevel]] = None
+    ) -> bool:
+        if self._executor is None or not self._is_runnable(task, statuses):
+            return False
+        with self._lock:
+            if len(self._in_flight) >= self.max_workers:
+                return False
+            if task.task_id in self._in_flight:
+                return False
+            self._in_flight[task.task_id] = self._executor.submit(self._run_task, task)
+        return True
+
+    def get_health(self) -> Dict[str, Any]:
+        """
+        Get the health and readiness status of the worker.
+
+        Returns:
+            Dictionary with status, readiness, in-flight and processed counts
+        """
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            "status": self.status.value,
+            "ready": self.status == WorkerStatus.READY,
+            "in_flight": in_flight,
+            "processed": self._processed,
+            "failed": self._failed,
+            "last_poll_at": self._last_poll_at,
+            "uptime_seconds": round(time.monotonic() - self._started_at, 3),
+        }
+
+    def _is_runnable(
+        self, task: Task, statuses: Optional[Dict[str, StatusLevel]] = None
+    ) -> bool:
+        return (
+            task.status == StatusLevel.PLANNED
+            and task.assigned_to in agent_registry.agent_classes
+            and self._dependencies_done(task.dependencies, statuses)
+        )
+
+    def _dependencies_done(
+        self,
+        dependencies: Iterable[Any],
+        statuses: Optional[Dict[str, StatusLevel]] = None,
+    ) -> bool:
+        """
+        Check whether every dependency of a task is done.
+
+        Args:
+            dependencies: IDs of the tasks depended on
+            statuses: Status by task ID from the current poll; dependencies
+                missing from it are looked up in TaskDB
+
+        Returns:
+            True if every dependency is done; a dependency that is not saved
+            yet, e.g. while the planner is still streaming, is not done
+        """
+        for dependency in dependencies:
+            status = (statuses or {}).get(str(dependency))
+            if status is None and self.task_db is not None:
+                saved = self.task_db.get_task_by_id(dependency)
+                status = saved.status if saved else None
+            if status != StatusLevel.DONE:
+                return False
+        return True
+
+    def _run_task(self, task: Task) -> None:
+        task_db = self.task_db
+        try:
+            if task_db is None or task.assigned_to is None:
+                raise RuntimeError("Task DB not warmed up or task not assigned")
+            task.status = StatusLevel.IN_PROGRESS
+            task_db.update_task(task)
+            agent = agent_registry.get_agent(task.assigned_to)
+            result = agent.start_task(
+                task=self._get_task_prompt(task), budget=self.budget
+            )
+            budget_usage = (result or {}).get("budget")
+            if budget_usage and budget_usage["exceeded"]:
+                # Pause the task with its partial result until it is resumed
+                task.status = StatusLevel.PAUSED
+                task_db.update_task(task)
+                task_db.save_run_result(
+                    task.task_id, budget_usage, self._get_partial_result(result)
+                )
+                logger.warning(
+                    f"Task {task.task_id} stopped early: {budget_usage['exceeded']}"
+                )
+            else:
+                task.status = StatusLevel.DONE
+                task_db.update_task(task)
+                if budget_usage:
+                    task_db.save_run_result(task.task_id, budget_usage)
+                logger.info(f"Task {task.task_id} completed")
+            with self._lock:
+                self._processed += 1
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            logger.error(f"Task {task.task_id} failed: {e}", exc_info=True)
+            if task_db is not None:
+                self._record_failure(task, task_db)
+        finally:
+            with self._lock:
+                self._in_flight.pop(task.task_id, None)
+
+    def _record_failure(self, task: Task, task_db: TaskDB) -> None:
+        """Plan a failed task again, or mark it failed after max_attempts."""
+        task.attempts += 1
+        if task.attempts < self.max_attempts:
+            task.status = StatusLevel.PLANNED
+        else:
+            task.status = StatusLevel.FAILED
+        try:
+            task_db.update_task(task)
+        except Exception as e:
+            logger.error(f"Could not record failure of task {task.task_id}: {e}")
+        else:
+            logger.info(
+                f"Task {task.task_id} is {task.status.value} after "
+                f"{task.attempts} attempt(s)"
+            )
+
+    @staticmethod
+    def _get_task_prompt(task: Task) -> str:
+        if not task.partial_result:
+            return task.description
+        return (
+            f"{task.description}\n\nAn earlier run of this task stopped when its "
+            f"budget ran out. Continue from its last output:\n{task.partial_result}"
+        )
+
+    @staticmethod
+    def _get_partial_result(result: Dict[str, Any]) -> Optional[str]:
+        """Get the last output of a run, skipping the note added when it stopped."""
+        for message in reversed(result.get("messages", [])):
+            if (
+                isinstance(message, (AIMessage, ToolMessage))
+                and message.content
+                and message.name != STOP_MESSAGE_NAME
+            ):
+                return str(message.content)
+        return None
+
+    def _drain(self) -> None:
+        self.status = WorkerStatus.DRAINING
+        if self._executor:
+            with self._lock:
+                futures = list(self._in_flight.values())
+            logger.info(f"Draining {len(futures)} in-flight task(s)")
+            deadline = time.monotonic() + self.drain_timeout
+            for future in futures:
+                try:
+                    future.result(timeout=max(deadline - time.monotonic(), 0))
+                except Exception as e:
+                    logger.error(f"In-flight task did not finish cleanly: {e}")
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        command_audit_log.close()
+        if self._health_server:
+            self._health_server.shutdown()
+        self.status = WorkerStatus.STOPPED
+        logger.info("Worker stopped")
+
+    def _install_signal_handlers(self) -> None:
+        if threading.current_thread() is not threading.main_thread():
+            return
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: self.stop())
+
+    def _start_health_server(self) -> None:
+        if self.health_port is None:
+            return
+        worker = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                health = worker.get_health()
+                if self.path == "/health":
+                    code = 200 if health["status"] != WorkerStatus.STOPPED else 503
+                elif self.path == "/ready":
+                    code = 200 if health["ready"] else 503
+                else:
+                    code = 404
+                body = json.dumps(health).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(format % args)
+
+        self._health_server = ThreadingHTTPServer(
+            ("0.0.0.0", self.health_port), HealthHandler
+        )
+        threading.Thread(
+            target=self._health_server.serve_forever, name="health", daemon=True
+        ).start()
+        logger.info(f"Health endpoint listening on port {self.health_port}")
@@ -1,8 +1,30 @@
+import argparse
+
 from backend.app_service import AppService
 
 
 def main():
-    AppService().start()
+    parser = argparse.ArgumentParser(description="Complete Automate backend")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Run as a long-lived worker that polls for planned tasks",
+    )
+    parser.add_argument("--poll-interval", type=float, default=10)
+    parser.add_argument("--max-workers", type=int, default=2)
+    parser.add_argument("--health-port", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.daemon:
+        from backend.worker_service import WorkerService
+
+        WorkerService(
+            poll_interval=args.poll_interval,
+            max_workers=args.max_workers,
+            health_port=args.health_port,
+        ).run()
+    else:
+        AppService().start()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+import pytest
+from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain.messages import AIMessage, HumanMessage
+from backend.config.enum import TeamEnum
+from backend.services.agent.agent_registry import AgentRegistry
+from backend.services.agent.base_agent import BaseAgent
+from backend.services.exception.app_exception import AppException
+
+
+class CountingAgent(BaseAgent):
+    instances = 0
+    builds = 0
+
+    def __init__(self):
+        CountingAgent.instances += 1
+
+    def _build_agent(self):
+        CountingAgent.builds += 1
+        return object()
+
+    def start_task(self, task: str):
+        return {"task": task, "agent": self.get_agent()}
+
+    def resume_task(self, task_id: str):
+        pass
+
+
+class DefaultAgent(BaseAgent):
+    name = "Default"
+
+    def __init__(self):
+        self.system_prompt = "You are a test agent."
+        self.model = GenericFakeChatModel(messages=iter([AIMessage(content="hi")]))
+
+    def start_task(self, task: str):
+        return self._invoke_agent({"messages": [HumanMessage(content=task)]})
+
+    def resume_task(self, task_id: str):
+        pass
+
+
+class TestAgentRegistry:
+    """Test cases for AgentRegistry caching."""
+
+    @pytest.fixture
+    def registry(self):
+        """Create an AgentRegistry backed by a counting agent."""
+        CountingAgent.instances = 0
+        CountingAgent.builds = 0
+        with patch.object(
+            AgentRegistry, "agent_classes", {TeamEnum.PLANNER: CountingAgent}
+        ):
+            yield AgentRegistry()
+
+    def test_agent_built_once(self, registry):
+        """Test the agent and its graph are built once for repeated tasks."""
+        first = registry.get_agent(TeamEnum.PLANNER)
+        second = registry.get_agent(TeamEnum.PLANNER)
+
+        assert first is second
+        assert CountingAgent.instances == 1
+        assert CountingAgent.builds == 1
+
+    def test_compiled_agent_reused_across_tasks(self, registry):
+        """Test every task runs on the same compiled graph."""
+        agent = registry.get_agent(TeamEnum.PLANNER)
+
+        result1 = agent.start_task("first")
+        result2 = agent.start_task("second")
+
+        assert result1["agent"] is result2["agent"]
+        assert result1["task"] == "first"
+        assert result2["task"] == "second"
+
+    def test_stats_record_builds_and_hits(self, registry):
+        """Test setup statistics are recorded per team."""
+        for _ in range(3):
+            registry.get_agent(TeamEnum.PLANNER)
+
+        stats = registry.get_stats()[TeamEnum.PLANNER.value]
+        assert stats["builds"] == 1
+        assert stats["hits"] == 2
+        assert stats["build_seconds"] >= 0
+
+    def test_clear_forces_rebuild(self, registry):
+        """Test clearing the registry rebuilds the agent on next use."""
+        registry.get_agent(TeamEnum.PLANNER)
+        registry.clear()
+        registry.get_agent(TeamEnum.PLANNER)
+
+        assert CountingAgent.instances == 2
+
+    def test_unknown_team(self, registry):
+        """Test requesting an unregistered team raises AppException."""
+        with pytest.raises(AppException):
+            registry.get_agent(TeamEnum.MANAGER)
+
+    def test_default_agent_built_from_model(self):
+        """Test agents without their own graph run on the default one."""
+        result = DefaultAgent().start_task("hello")
+
+        assert result["messages"][-1].content == "hi"
+        assert result["budget"]["llm_calls"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
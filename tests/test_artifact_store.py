@@ -0,0 +1,189 @@
+import pytest
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from botocore.exceptions import ClientError
+from backend.services.aws.s3_storage import S3Storage
+from backend.services.tool.artifact_store import (
+    ArtifactNotFound,
+    ArtifactStore,
+    LocalArtifactBackend,
+    S3ArtifactBackend,
+)
+
+LOG = b"".join(b"npm ERR! missing script: build %d\n" % i for i in range(2000))
+
+
+class FakeBody(io.BytesIO):
+    """Streaming body of an S3 object."""
+
+    def iter_chunks(self, chunk_size):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+
+class FakeS3Client:
+    """Keeps the objects S3Storage puts in memory."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **extra):
+        self.objects[Key] = Body
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "404"}}, "HeadObject")
+        return {}
+
+    def get_object(self, Bucket, Key):
+        return {"Body": FakeBody(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+class TestArtifactStore:
+    """Test cases for ArtifactStore."""
+
+    @pytest.fixture
+    def root(self):
+        """Create a temporary directory for artifacts."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield tmpdir
+
+    @pytest.fixture
+    def store(self, root):
+        """Create an ArtifactStore on the local backend."""
+        return ArtifactStore(LocalArtifactBackend(root))
+
+    def test_identical_content_stored_once(self, store, root):
+        """Test storing the same content again only adds a reference."""
+        first = store.put_bytes(LOG)
+        second = store.put_bytes(LOG)
+
+        expected = {"sha256": hashlib.sha256(LOG).hexdigest(), "bytes": len(LOG)}
+        assert first == second == expected
+        assert store.refcount(first["sha256"]) == 2
+        assert len(os.listdir(os.path.join(root, "objects"))) == 1
+        stats = store.get_stats()
+        assert (stats["stored"], stats["deduplicated"]) == (1, 1)
+        assert store.get(first["sha256"]) == LOG
+
+    def test_compression_depends_on_content(self, store):
+        """Test text is stored compressed and random bytes as they are."""
+        noise = os.urandom(100_000)
+
+        store.put_bytes(LOG)
+        compressed = store.get_stats()["bytes_stored"]
+        ref = store.put_bytes(noise)
+        raw = store.get_stats()["bytes_stored"] - compressed
+
+        assert compressed < len(LOG) / 5
+        assert raw == len(noise) + 1
+        assert store.get(ref["sha256"]) == noise
+
+    def test_put_file_and_copy_to(self, store, root):
+        """Test a file is stored by content and can be written back."""
+        store.CHUNK_SIZE = 1000
+        path = os.path.join(root, "build.log")
+        with open(path, "wb") as f:
+            f.write(LOG)
+
+        ref = store.put_file(path)
+        os.remove(path)
+        store.copy_to(ref["sha256"], path)
+
+        assert ref == store.put_bytes(LOG)
+        with open(path, "rb") as f:
+            assert f.read() == LOG
+
+    def test_last_release_deletes(self, store):
+        """Test an artifact is deleted with its last reference."""
+        sha256 = store.put_bytes(b"log")["sha256"]
+        store.put_bytes(b"log")
+
+        assert store.release(sha256) == 1
+        assert store.get(sha256) == b"log"
+        assert store.release(sha256) == 0
+        with pytest.raises(ArtifactNotFound):
+            store.get(sha256)
+        assert store.refcount(sha256) == 0
+
+    def test_uploads_not_serialized(self, root):
+        """Test a put does not wait for another put's upload to finish."""
+        uploading, resume = threading.Event(), threading.Event()
+        sha256 = hashlib.sha256(LOG).hexdigest()
+        slow_key = f"objects/{sha256[:2]}/{sha256}"
+
+        class SlowBackend(LocalArtifactBackend):
+            def write(self, key, chunks):
+                if key == slow_key:
+                    uploading.set()
+                    resume.wait(5)
+                return super().write(key, chunks)
+
+        store = ArtifactStore(SlowBackend(root))
+        slow = threading.Thread(target=store.put_bytes, args=(LOG,))
+        slow.start()
+        try:
+            assert uploading.wait(5)
+            ref = store.put_bytes(b"small")
+            still_uploading = not resume.is_set() and slow.is_alive()
+        finally:
+            resume.set()
+            slow.join(5)
+
+        assert still_uploading
+        assert store.get(ref["sha256"]) == b"small"
+        assert store.refcount(sha256) == 1
+
+    def test_object_released_during_upload_written_again(self, store, root):
+        """Test a put whose object is deleted before its reference is taken."""
+        sha256 = store.put_bytes(LOG)["sha256"]
+        exists = store.backend.exists
+        calls = []
+
+        def release_first(key):
+            calls.append(key)
+            if len(calls) == 1:
+                store.release(sha256)  # the last reference, as if concurrent
+            return exists(key)
+
+        store.backend.exists = release_first
+        store.put_bytes(LOG)
+
+        assert store.refcount(sha256) == 1
+        assert store.get(sha256) == LOG
+        assert store.get_stats()["stored"] == 2
+
+    def test_invalid_hash_rejected(self, store):
+        """Test hashes that are not hex digests cannot address a key."""
+        with pytest.raises(ArtifactNotFound):
+            store.get("../../etc/passwd")
+        with pytest.raises(ArtifactNotFound):
+            store.get("0" * 64)
+
+    def test_s3_backend(self):
+        """Test artifacts are kept under the prefix of an S3 bucket."""
+        storage = S3Storage("artifacts-bucket")
+        storage.s3 = FakeS3Client()
+        store = ArtifactStore(S3ArtifactBackend(storage))
+
+        sha256 = store.put_bytes(LOG)["sha256"]
+        store.put_bytes(LOG)
+
+        assert sorted(storage.s3.objects) == [
+            f"artifacts/objects/{sha256[:2]}/{sha256}",
+            f"artifacts/refs/{sha256[:2]}/{sha256}",
+        ]
+        assert store.get(sha256) == LOG
+        store.release(sha256)
+        store.release(sha256)
+        assert storage.s3.objects == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
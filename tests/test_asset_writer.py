@@ -0,0 +1,149 @@
+import pytest
+import base64
+import hashlib
+import os
+import tempfile
+from backend.services.aws.s3_storage import S3Storage
+from backend.services.tool.asset_writer import (
+    AssetWriter,
+    decode_base64,
+    detect_media_type,
+)
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+
+
+class FakeS3Client:
+    """Records the calls S3Storage makes to an S3 client."""
+
+    def __init__(self):
+        self.objects = {}
+        self.parts = []
+        self.aborted = False
+
+    def put_object(self, Bucket, Key, Body, **extra):
+        self.objects[Key] = (Body, extra)
+
+    def create_multipart_upload(self, Bucket, Key, **extra):
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.parts.append(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self.objects[Key] = (b"".join(self.parts), MultipartUpload)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.aborted = True
+
+
+class TestAssetWriter:
+    """Test cases for AssetWriter."""
+
+    @pytest.fixture
+    def storage(self):
+        """Create an S3Storage with a fake client."""
+        storage = S3Storage("assets-bucket")
+        storage.s3 = FakeS3Client()
+        return storage
+
+    def test_decode_in_chunks(self):
+        """Test chunks split anywhere, and wrapped lines, decode correctly."""
+        encoded = base64.encodebytes(PNG).decode()  # wrapped every 76 characters
+
+        for chunk_size in (1, 7, 64, 1000):
+            assert b"".join(decode_base64(encoded, 0, chunk_size)) == PNG
+
+        with pytest.raises(ValueError):
+            list(decode_base64("iVBORw0KGgo=!", 0, 4))
+        with pytest.raises(ValueError):
+            list(decode_base64("iVBORw0", 0, 4))
+
+    def test_detect_media_type(self):
+        """Test common image formats are recognized by their first bytes."""
+        assert detect_media_type(PNG) == "image/png"
+        assert detect_media_type(b"\xff\xd8\xff\xe0") == "image/jpeg"
+        assert detect_media_type(b"RIFF\0\0\0\0WEBPVP8") == "image/webp"
+        assert detect_media_type(b"\n<svg xmlns=''>") == "image/svg+xml"
+        assert detect_media_type(b"data") == "application/octet-stream"
+
+    def test_write_to_directory(self):
+        """Test a payload is written as a file named after its media type."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = AssetWriter(directory=tmpdir)
+            writer.DECODE_CHUNK_SIZE = 100
+
+            asset = writer.write_base64(base64.b64encode(PNG).decode(), name="ig_1")
+
+            assert asset == {
+                "uri": os.path.join(tmpdir, "ig_1.png"),
+                "media_type": "image/png",
+                "bytes": len(PNG),
+                "sha256": hashlib.sha256(PNG).hexdigest(),
+            }
+            with open(asset["uri"], "rb") as f:
+                assert f.read() == PNG
+
+    def test_invalid_payload_leaves_no_file(self):
+        """Test a payload that fails to decode part way is not stored."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            writer = AssetWriter(directory=tmpdir)
+            writer.DECODE_CHUNK_SIZE = 100
+            payload = base64.b64encode(PNG).decode()[:-3]
+
+            with pytest.raises(ValueError):
+                writer.write_base64(payload, name="broken")
+            with pytest.raises(ValueError):
+                writer.write_base64("aaaa", name="../escape")
+
+            assert os.listdir(tmpdir) == []
+
+    def test_data_url_to_s3(self, storage):
+        """Test a data URL is uploaded in one put with its media type."""
+        writer = AssetWriter(storage=storage)
+        payload = "data:image/jpeg;base64," + base64.b64encode(b"jpeg").decode()
+
+        asset = writer.write_base64(payload, name="photo")
+
+        assert asset["uri"] == "s3://assets-bucket/assets/photo.jpg"
+        assert storage.s3.objects["assets/photo.jpg"] == (
+            b"jpeg",
+            {"ContentType": "image/jpeg"},
+        )
+
+    def test_large_asset_uploaded_in_parts(self, storage):
+        """Test an asset larger than a part is uploaded part by part."""
+        storage.PART_SIZE = 4096
+        writer = AssetWriter(storage=storage)
+        writer.DECODE_CHUNK_SIZE = 1000
+
+        asset = writer.write_base64(base64.b64encode(PNG).decode())
+
+        body, upload = storage.s3.objects[asset["uri"].split("/", 3)[3]]
+        assert body == PNG
+        assert [part["PartNumber"] for part in upload["Parts"]] == [1, 2, 3]
+        assert all(len(part) >= 4096 for part in storage.s3.parts[:-1])
+
+    def test_failed_upload_aborted(self, storage):
+        """Test a multipart upload is aborted when the payload is invalid."""
+        storage.PART_SIZE = 1024
+        writer = AssetWriter(storage=storage)
+        writer.DECODE_CHUNK_SIZE = 1000
+
+        with pytest.raises(ValueError):
+            writer.write_base64(base64.b64encode(PNG).decode() + "!!!!")
+
+        assert storage.s3.aborted is True
+        assert storage.s3.objects == {}
+
+    def test_requires_one_destination(self, storage):
+        """Test a writer needs exactly one of a directory and storage."""
+        with pytest.raises(ValueError):
+            AssetWriter()
+        with pytest.raises(ValueError):
+            AssetWriter(directory="/tmp", storage=storage)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
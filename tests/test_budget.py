@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import patch
+from backend.services.agent.budget import Budget, BudgetTracker
+
+
+class TestBudgetTracker:
+    """Test cases for BudgetTracker usage accounting and limits."""
+
+    def test_records_usage(self):
+        """Test LLM calls, tokens and tool calls are accumulated."""
+        tracker = BudgetTracker(Budget())
+        tracker.record_llm_call({"input_tokens": 100, "output_tokens": 20})
+        tracker.record_llm_call(None)
+        tracker.record_tool_call()
+
+        usage = tracker.to_json()
+        assert usage["llm_calls"] == 2
+        assert usage["tool_calls"] == 1
+        assert usage["total_tokens"] == 120
+        assert usage["exceeded"] is None
+
+    def test_within_budget(self):
+        """Test check passes while under every limit."""
+        tracker = BudgetTracker(Budget(max_llm_calls=2))
+        tracker.record_llm_call(None)
+
+        assert tracker.check() is None
+
+    def test_token_limit(self):
+        """Test the token limit is enforced."""
+        tracker = BudgetTracker(Budget(max_tokens=100))
+        tracker.record_llm_call({"input_tokens": 90, "output_tokens": 10})
+
+        assert "token limit" in tracker.check()
+        assert tracker.to_json()["exceeded"] is not None
+
+    def test_cost_limit(self):
+        """Test cost is computed from token prices and enforced."""
+        tracker = BudgetTracker(
+            Budget(
+                max_cost=0.01,
+                input_cost_per_million=1.0,
+                output_cost_per_million=10.0,
+            )
+        )
+        tracker.record_llm_call({"input_tokens": 5_000, "output_tokens": 500})
+
+        assert tracker.cost == pytest.approx(0.01)
+        assert "cost limit" in tracker.check()
+
+    def test_llm_call_limit(self):
+        """Test the LLM call limit is enforced."""
+        tracker = BudgetTracker(Budget(max_llm_calls=1))
+        tracker.record_llm_call(None)
+
+        assert "LLM call limit" in tracker.check()
+
+    def test_tool_call_limit(self):
+        """Test the tool call limit is enforced."""
+        tracker = BudgetTracker(Budget(max_tool_calls=2))
+        tracker.record_tool_call()
+        tracker.record_tool_call()
+
+        assert "tool call limit" in tracker.check()
+
+    def test_wall_clock_limit(self):
+        """Test the wall clock limit is enforced."""
+        tracker = BudgetTracker(Budget(max_wall_seconds=10))
+        with patch(
+            "backend.services.agent.budget.time.monotonic",
+            return_value=tracker.started_at + 11,
+        ):
+            assert "wall clock limit" in tracker.check()
+
+    def test_first_exceeded_reason_kept(self):
+        """Test the first reason the budget was exceeded is reported."""
+        tracker = BudgetTracker(Budget(max_llm_calls=1, max_tool_calls=1))
+        tracker.record_tool_call()
+        tracker.check()
+        tracker.record_llm_call(None)
+        tracker.check()
+
+        assert "tool call limit" in tracker.to_json()["exceeded"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,207 @@
+import pytest
+import os
+import tempfile
+import time
+from unittest.mock import patch
+from backend.services.tool.change_feed import WorkspaceChangeFeed
+from backend.services.tool.change_feed_tool import ChangeFeedTool
+
+
+def write(root, path, content):
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestWorkspaceChangeFeed:
+    """Test cases for WorkspaceChangeFeed."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Create a workspace with a source file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write(tmpdir, "src/app.ts", "const a = 1;\n")
+            yield tmpdir
+
+    @pytest.mark.parametrize("use_inotify", [True, False])
+    def test_changes_since_cursor(self, workspace, use_inotify):
+        """Test created, modified and deleted files are reported by cursor."""
+        feed = WorkspaceChangeFeed(workspace, use_inotify=use_inotify)
+        try:
+            write(workspace, "dist/js/app.js", "built")
+            write(workspace, "src/app.ts", "const a = 22;\n")
+            write(workspace, "node_modules/pkg/index.js", "ignored")
+            changes, cursor, complete = feed.changes_since(0)
+            os.remove(os.path.join(workspace, "src", "app.ts"))
+            later, _, _ = feed.changes_since(cursor)
+        finally:
+            feed.close()
+
+        assert [(c["path"], c["action"]) for c in changes] == [
+            ("dist/js/app.js", "created"),
+            ("src/app.ts", "modified"),
+        ]
+        assert (cursor, complete) == (2, True)
+        assert later == [{"path": "src/app.ts", "action": "deleted", "cursor": 3}]
+
+    def test_burst_debounced(self, workspace):
+        """Test a burst of writes is committed in the background as one change."""
+        changed = []
+        feed = WorkspaceChangeFeed(
+            workspace, change_listener=changed.append, debounce=0.05
+        )
+        feed.start()
+        try:
+            for i in range(50):
+                write(workspace, "src/app.ts", f"const a = {i};\n")
+            deadline = time.monotonic() + 5
+            while not changed and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            feed.close()
+
+        assert feed.mode == "inotify"
+        assert changed == [os.path.join(feed.root, "src", "app.ts")]
+        assert feed.cursor == 1
+
+    def test_changes_merged_by_file(self, workspace):
+        """Test a file changed repeatedly is reported once, by net change."""
+        feed = WorkspaceChangeFeed(workspace)
+        try:
+            write(workspace, "tmp.txt", "scratch")
+            feed.sync()
+            os.remove(os.path.join(workspace, "tmp.txt"))
+            write(workspace, "src/page.ts", "1")
+            feed.sync()
+            write(workspace, "src/page.ts", "22")
+            changes, cursor, _ = feed.changes_since(0)
+        finally:
+            feed.close()
+
+        assert changes == [{"path": "src/page.ts", "action": "created", "cursor": 4}]
+        assert cursor == 4
+
+    def test_dropped_changes_reported_incomplete(self, workspace):
+        """Test a cursor older than the kept changes is flagged."""
+        feed = WorkspaceChangeFeed(workspace, use_inotify=False)
+        feed.MAX_LOG_ENTRIES = 2
+        try:
+            for name in ("a.ts", "b.ts", "c.ts"):
+                write(workspace, name, "x")
+            changes, _, complete = feed.changes_since(0)
+            _, _, recent = feed.changes_since(1)
+        finally:
+            feed.close()
+
+        assert [c["path"] for c in changes] == ["b.ts", "c.ts"]
+        assert complete is False
+        assert recent is True
+
+    def test_polling_fallback(self, workspace):
+        """Test the feed polls when inotify cannot watch the tree."""
+        with patch(
+            "backend.services.tool.change_feed.InotifyWatcher",
+            side_effect=OSError(28, "No space left on device"),
+        ):
+            feed = WorkspaceChangeFeed(workspace)
+        try:
+            write(workspace, "src/new.ts", "x")
+            changes, _, _ = feed.changes_since(0)
+        finally:
+            feed.close()
+
+        assert feed.mode == "polling"
+        assert [c["path"] for c in changes] == ["src/new.ts"]
+
+    def test_related_tests(self, workspace):
+        """Test tests are selected for changed files by naming convention."""
+        for path in (
+            "src/Button.tsx",
+            "src/Button.test.tsx",
+            "src/__tests__/Button.tsx",
+            "lib/Button.spec.ts",
+            "app.py",
+            "tests/test_app.py",
+        ):
+            write(workspace, path, "x")
+        feed = WorkspaceChangeFeed(workspace, use_inotify=False)
+        try:
+            tests = feed.related_tests(["src/Button.tsx", "app.py", "lib/x.ts"])
+        finally:
+            feed.close()
+
+        assert tests == [
+            "src/Button.test.tsx",
+            "src/__tests__/Button.tsx",
+            "tests/test_app.py",
+        ]
+
+
+class TestChangeFeedTool:
+    """Test cases for ChangeFeedTool."""
+
+    def test_invoke(self):
+        """Test changes and related tests are returned for an open workspace."""
+        tool = ChangeFeedTool(use_inotify=False)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            write(tmpdir, "src/api.test.ts", "x")
+            assert tool.invoke({"cwd": tmpdir})["success"] is False
+            tool.open_workspace(tmpdir)
+            write(tmpdir, "src/api.ts", "x")
+
+            result = tool.invoke({"cwd": tmpdir, "cursor": 0})
+            invalid = tool.invoke({"cwd": tmpdir, "cursor": -1})
+            tool.close_workspace(tmpdir)
+
+        assert result["changes"] == [
+            {"path": "src/api.ts", "action": "created", "cursor": 1}
+        ]
+        assert result["related_tests"] == ["src/api.test.ts"]
+        assert (result["cursor"], result["complete"]) == (1, True)
+        assert "'cursor'" in invalid["error"]
+
+    def test_truncated_changes_resume(self):
+        """Test capped results return the cursor of the last change returned."""
+        tool = ChangeFeedTool(use_inotify=False)
+        tool.MAX_CHANGES = 2
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tool.open_workspace(tmpdir)
+            for name in ("a.ts", "b.ts", "c.ts"):
+                write(tmpdir, name, "x")
+
+            first = tool.changes_since(tmpdir)
+            rest = tool.changes_since(tmpdir, first["cursor"])
+            tool.close_workspace(tmpdir)
+
+        assert first["truncated"] is True
+        assert [c["path"] for c in first["changes"] + rest["changes"]] == [
+            "a.ts",
+            "b.ts",
+            "c.ts",
+        ]
+
+    def test_truncated_changes_keep_file_history(self):
+        """Test a file past the cap is not reported by its later change only."""
+        tool = ChangeFeedTool(use_inotify=False)
+        tool.MAX_CHANGES = 1
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tool.open_workspace(tmpdir)
+            write(tmpdir, "a.ts", "x")
+            tool.sync(tmpdir)
+            write(tmpdir, "b.ts", "x")
+            tool.sync(tmpdir)
+            write(tmpdir, "a.ts", "xx")
+
+            pages = [tool.changes_since(tmpdir)]
+            while pages[-1]["truncated"]:
+                pages.append(tool.changes_since(tmpdir, pages[-1]["cursor"]))
+            tool.close_workspace(tmpdir)
+
+        assert [
+            (c["path"], c["action"]) for page in pages for c in page["changes"]
+        ] == [("a.ts", "created"), ("b.ts", "created"), ("a.ts", "modified")]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
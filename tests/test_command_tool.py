@@ -0,0 +1,844 @@
+import pytest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+from uuid import uuid4
+from backend.services.aws.command_db import Command
+from backend.services.tool.artifact_store import (
+    ArtifactNotFound,
+    ArtifactStore,
+    LocalArtifactBackend,
+)
+from backend.services.tool.command_audit_log import CommandAuditLog
+from backend.services.tool.command_cache import CommandCache
+from backend.services.tool.command_tool import CommandTool
+from backend.services.tool.output_buffer import OutputBuffer
+from backend.services.tool.output_reducer import OutputReducer
+from backend.services.tool.resource_limits import ResourceLimits
+
+
+class TestCommandToolStreaming:
+    """Test cases for CommandTool streaming, memory-bounded output capture."""
+
+    @pytest.fixture
+    def log_dir(self):
+        """Create a temporary directory for spilled logs."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield tmpdir
+
+    def test_small_output_not_truncated(self, log_dir):
+        """Test output under the cap is returned whole."""
+        tool = CommandTool(log_dir=log_dir)
+        result = tool.execute_command("printf 'a\\nb\\n'", shell=True)
+
+        assert result["stdout"] == "a\nb\n"
+        assert result["stdout_bytes"] == 4
+        assert result["truncated"] is False
+        assert result["stdout_log"] is None
+        assert os.listdir(log_dir) == []
+
+    def test_large_output_capped_with_head_and_tail(self, log_dir):
+        """Test large output keeps head and tail and spills the full log."""
+        tool = CommandTool(max_output_bytes=1024, log_dir=log_dir)
+        result = tool.execute_command("seq 1 10000")
+
+        assert result["success"] is True
+        assert result["truncated"] is True
+        assert result["stdout"].startswith("1\n2\n3\n")
+        assert result["stdout"].endswith("9999\n10000\n")
+        assert "truncated" in result["stdout"]
+        assert len(result["stdout"]) < 2048
+        assert result["stdout_bytes"] == 48894
+        with open(result["stdout_log"]) as f:
+            assert f.read() == "".join(f"{i}\n" for i in range(1, 10001))
+
+    def test_spilled_log_moved_to_artifact_store(self, log_dir):
+        """Test the full log of truncated output is kept by hash."""
+        store = ArtifactStore(LocalArtifactBackend(os.path.join(log_dir, "store")))
+        tool = CommandTool(max_output_bytes=1024, log_dir=log_dir, artifact_store=store)
+
+        first = tool.execute_command("seq 1 10000", run_id="run-1")
+        second = tool.execute_command("seq 1 10000", run_id="run-2")
+
+        assert first["stdout_log"] is None
+        assert first["stdout_log_artifact"] == second["stdout_log_artifact"]
+        assert "full log: artifact" in first["stdout"]
+        assert store.refcount(first["stdout_log_artifact"]) == 2
+        log = store.get(first["stdout_log_artifact"]).decode()
+        assert log == "".join(f"{i}\n" for i in range(1, 10001))
+        assert os.listdir(log_dir) == ["store"]
+
+    def test_log_artifacts_released_with_run(self, log_dir):
+        """Test a run's logs are given back to the store when it is reaped."""
+        store = ArtifactStore(LocalArtifactBackend(os.path.join(log_dir, "store")))
+        tool = CommandTool(max_output_bytes=1024, log_dir=log_dir, artifact_store=store)
+        tool.open_session("run-1")
+
+        first = tool.execute_command("seq 1 10000", run_id="run-1")
+        second = tool.execute_command("seq 1 10000", session_id="run-1")
+        sha256 = first["stdout_log_artifact"]
+        assert second["stdout_log_artifact"] == sha256
+        tool.reap_run("run-1")
+
+        assert store.refcount(sha256) == 0
+        with pytest.raises(ArtifactNotFound):
+            store.get(sha256)
+
+    def test_stderr_captured_separately(self, log_dir):
+        """Test stderr is captured in its own buffer."""
+        tool = CommandTool(log_dir=log_dir)
+        result = tool.execute_command("echo out; echo err >&2", shell=True)
+
+        assert result["stdout"] == "out\n"
+        assert result["stderr"] == "err\n"
+
+    def test_on_output_receives_lines(self, log_dir):
+        """Test the callback receives every line with its stream name."""
+        tool = CommandTool(max_output_bytes=64, log_dir=log_dir)
+        lines = []
+        tool.execute_command(
+            "seq 1 100; echo done >&2",
+            shell=True,
+            on_output=lambda stream, line: lines.append((stream, line)),
+        )
+
+        stdout_lines = [line for stream, line in lines if stream == "stdout"]
+        assert stdout_lines == [f"{i}\n" for i in range(1, 101)]
+        assert ("stderr", "done\n") in lines
+
+    def test_stream_command_yields_lines_and_returns_output(self, log_dir):
+        """Test stream_command yields lines live and returns the result."""
+        tool = CommandTool(log_dir=log_dir)
+        stream = tool.stream_command("printf 'one\\ntwo'", shell=True)
+
+        lines = []
+        with pytest.raises(StopIteration) as stop:
+            while True:
+                lines.append(next(stream))
+
+        assert lines == [("stdout", "one\n"), ("stdout", "two")]
+        assert stop.value.value["success"] is True
+
+    def test_long_line_split(self, log_dir):
+        """Test a line longer than MAX_LINE_BYTES is emitted in pieces."""
+        tool = CommandTool(log_dir=log_dir)
+        lines = []
+        result = tool.execute_command(
+            f"head -c {CommandTool.MAX_LINE_BYTES * 2 + 10} /dev/zero | tr '\\0' x",
+            shell=True,
+            on_output=lambda stream, line: lines.append(line),
+        )
+
+        assert len(lines) == 3
+        assert result["stdout_bytes"] == CommandTool.MAX_LINE_BYTES * 2 + 10
+
+    def test_timeout_keeps_partial_output(self, log_dir):
+        """Test output produced before a timeout is returned."""
+        tool = CommandTool(timeout=1, log_dir=log_dir)
+        result = tool.execute_command("echo started; sleep 10", shell=True)
+
+        assert result["success"] is False
+        assert "timed out" in result["stderr"]
+        assert result["stdout"] == "started\n"
+
+    def test_invalid_max_output_bytes(self):
+        """Test a non-positive output cap is rejected."""
+        with pytest.raises(ValueError):
+            CommandTool(max_output_bytes=0)
+
+
+class TestOutputBuffer:
+    """Test cases for OutputBuffer."""
+
+    def test_head_and_tail_kept(self):
+        """Test the head and tail are kept and the middle dropped."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            buffer = OutputBuffer("stdout", 4, 4, log_dir=tmpdir)
+            for i in range(10):
+                buffer.append(f"{i}\n", 2)
+            buffer.close()
+
+            text = buffer.get_text()
+            assert text.startswith("0\n1\n")
+            assert text.endswith("8\n9\n")
+            assert "6 lines (12 bytes) truncated" in text
+            assert buffer.total_lines == 10
+            with open(buffer.log_path) as f:
+                assert f.read() == "".join(f"{i}\n" for i in range(10))
+
+
+class TestOutputReducer:
+    """Test cases for OutputReducer and CommandTool output reduction."""
+
+    def test_ansi_codes_stripped(self):
+        """Test ANSI colour codes are removed."""
+        text, stats = OutputReducer().reduce("\x1b[32mok\x1b[0m done\n")
+
+        assert text == "ok done\n"
+        assert stats["reduced_bytes"] < stats["original_bytes"]
+
+    def test_progress_bar_collapsed(self):
+        """Test carriage-return redraws and progress lines keep the last state."""
+        raw = "0%\r50%\r100%\n" + "".join(
+            f"[{'#' * i}{' ' * (10 - i)}]\n" for i in range(11)
+        )
+        text, _ = OutputReducer().reduce("start\n" + raw + "end\n")
+
+        assert text == "start\n[##########]\nend\n"
+
+    def test_repeated_lines_deduplicated(self):
+        """Test consecutive identical lines are counted instead of repeated."""
+        text, _ = OutputReducer().reduce("a\n" + "warn\n" * 50 + "b\n")
+
+        assert text == "a\nwarn\n... (previous line repeated 49 more times)\nb\n"
+
+    def test_tsc_and_npm_errors_extracted(self):
+        """Test tsc and npm errors are pulled to the top of the output."""
+        raw = (
+            "".join(f"compiling {i}\n" for i in range(200))
+            + "src/App.tsx(3,5): error TS2322: Type 'string' is not assignable.\n"
+            + "npm ERR! code ELIFECYCLE\n"
+        )
+        text, stats = OutputReducer(max_bytes=1024).reduce(raw)
+
+        assert text.startswith("[errors: tsc, npm]\nsrc/App.tsx(3,5): error TS2322")
+        assert "npm ERR! code ELIFECYCLE" in text.split("[output]")[0]
+        assert stats["error_lines"] == 2
+        assert len(text.encode()) <= 1024
+
+    def test_pytest_and_eslint_errors_extracted(self):
+        """Test pytest failures and eslint errors with their file are extracted."""
+        raw = (
+            "/app/src/App.tsx\n"
+            "  12:5  error  'x' is defined but never used  no-unused-vars\n"
+            "E       assert 1 == 2\n"
+            "FAILED tests/test_app.py::test_x - assert 1 == 2\n"
+        )
+        text, _ = OutputReducer().reduce(raw)
+        summary = text.split("[output]")[0]
+
+        assert "[errors: eslint, pytest]" in summary
+        assert "/app/src/App.tsx\n  12:5  error" in summary
+        assert "FAILED tests/test_app.py::test_x" in summary
+
+    def test_output_capped_by_tokens(self):
+        """Test the token cap keeps the head and tail of the output."""
+        raw = "".join(f"line {i}\n" for i in range(10000))
+        text, stats = OutputReducer(max_tokens=100).reduce(raw)
+
+        assert len(text) <= 100 * OutputReducer.CHARS_PER_TOKEN
+        assert text.startswith("line 0\n")
+        assert text.endswith("line 9999\n")
+        assert "characters omitted" in text
+        assert stats["ratio"] < 0.01
+
+    def test_command_tool_reduces_and_records_metrics(self):
+        """Test CommandTool reduces output when enabled and records ratios."""
+        tool = CommandTool(reduce_output=True)
+        result = tool.execute_command("yes hello | head -n 1000", shell=True)
+
+        assert (
+            result["stdout"] == "hello\n... (previous line repeated 999 more times)\n"
+        )
+        assert result["reduction"]["stdout"]["original_bytes"] == 6000
+        assert result["stdout_bytes"] == 6000
+        metrics = tool.get_metrics()
+        assert metrics["reduced_commands"] == 1
+        assert metrics["original_bytes"] == 6000
+        assert metrics["ratio"] < 0.1
+
+    def test_command_tool_reduction_disabled_by_default(self):
+        """Test output is returned unchanged without reduce_output."""
+        result = CommandTool().execute_command("printf 'a\\na\\n'", shell=True)
+
+        assert result["stdout"] == "a\na\n"
+        assert "reduction" not in result
+
+
+class TestCommandToolBatch:
+    """Test cases for concurrent command execution."""
+
+    def test_commands_run_concurrently(self):
+        """Test a batch runs its commands in parallel, not one after another."""
+        tool = CommandTool(max_processes=3)
+        commands = [{"command": "sleep 0.5"} for _ in range(3)]
+
+        start = time.monotonic()
+        results = tool.run_batch(commands)
+        elapsed = time.monotonic() - start
+
+        assert [result["success"] for result in results] == [True, True, True]
+        assert elapsed < 1.2
+
+    def test_process_limit_respected(self):
+        """Test no more than max_processes commands run at the same time."""
+        tool = CommandTool(max_processes=2)
+        commands = [{"command": "sleep 0.3"} for _ in range(4)]
+
+        start = time.monotonic()
+        tool.run_batch(commands)
+
+        assert time.monotonic() - start >= 0.6
+
+    def test_results_yielded_as_they_finish(self):
+        """Test results come in completion order with their input index."""
+        tool = CommandTool()
+        commands = [
+            {"command": "sleep 0.5 && echo slow", "shell": True},
+            {"command": "echo fast"},
+        ]
+
+        finished = list(tool.execute_batch(commands))
+
+        assert [index for index, _ in finished] == [1, 0]
+        assert finished[0][1]["stdout"] == "fast\n"
+
+    def test_per_command_timeout(self):
+        """Test each command keeps its own timeout."""
+        tool = CommandTool()
+        results = tool.run_batch(
+            [{"command": "sleep 5", "timeout": 1}, {"command": "echo ok"}]
+        )
+
+        assert results[0]["success"] is False
+        assert "timed out after 1 seconds" in results[0]["stderr"]
+        assert results[1]["success"] is True
+
+    def test_cancel_kills_running_and_skips_pending(self):
+        """Test cancellation stops running commands and skips queued ones."""
+        tool = CommandTool(max_processes=1)
+        cancel_event = threading.Event()
+        threading.Timer(0.3, cancel_event.set).start()
+
+        start = time.monotonic()
+        results = tool.run_batch(
+            [{"command": "sleep 5"}, {"command": "echo never"}], cancel_event
+        )
+
+        assert time.monotonic() - start < 2
+        assert all(result["cancelled"] for result in results)
+        assert results[1]["stdout"] == ""
+
+    def test_invoke_batch(self):
+        """Test the batch tool interface returns ordered results."""
+        tool = CommandTool()
+        output = tool.invoke_batch(
+            {"commands": [{"command": "echo a"}, {"command": "false"}]}
+        )
+
+        assert output["success"] is False
+        assert output["results"][0]["stdout"] == "a\n"
+        assert output["results"][1]["returncode"] == 1
+
+    def test_invoke_batch_invalid_input(self):
+        """Test invalid batch input and entries are reported, not raised."""
+        tool = CommandTool()
+
+        assert tool.invoke_batch({"commands": []})["success"] is False
+        output = tool.invoke_batch({"commands": [{"command": "echo a", "timeout": 0}]})
+        assert "'timeout' must be between" in output["results"][0]["stderr"]
+
+    def test_batch_tool_definition(self):
+        """Test the batch tool definition exposes the command list schema."""
+        definition = CommandTool().get_batch_tool_definition()
+
+        assert definition["name"] == "command_batch_executor"
+        assert definition["inputSchema"]["properties"]["commands"]["type"] == "array"
+
+
+class TestShellSession:
+    """Test cases for persistent shell sessions."""
+
+    @pytest.fixture
+    def tool(self):
+        """Create a CommandTool with an open session, closed after the test."""
+        tool = CommandTool()
+        tool.open_session("run-1")
+        yield tool
+        tool.close_all_sessions()
+
+    def test_state_persists_between_commands(self, tool):
+        """Test cd and exported variables carry over to the next command."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tool.execute_command(
+                f"cd {tmpdir} && export GREETING=hi", session_id="run-1"
+            )
+            result = tool.execute_command('echo "$GREETING" && pwd', session_id="run-1")
+
+            assert result["success"] is True
+            assert result["stdout"] == f"hi\n{os.path.realpath(tmpdir)}\n"
+
+    def test_exit_code_and_stderr_captured(self, tool):
+        """Test the exit code and stderr of each command are captured."""
+        result = tool.execute_command(
+            "echo out; echo err >&2; (exit 3)", session_id="run-1"
+        )
+
+        assert result["returncode"] == 3
+        assert result["stdout"] == "out\n"
+        assert result["stderr"] == "err\n"
+
+    def test_output_without_trailing_newline(self, tool):
+        """Test output not ending with a newline is kept before the marker."""
+        result = tool.execute_command("printf abc", session_id="run-1")
+
+        assert result["stdout"] == "abc"
+        assert "__SHELL_SESSION_" not in result["stdout"]
+
+    def test_syntax_error_keeps_session(self, tool):
+        """Test a syntax error fails the command but not the session."""
+        tool.execute_command("export KEEP=1", session_id="run-1")
+        result = tool.execute_command("if then", session_id="run-1")
+        after = tool.execute_command("echo $KEEP", session_id="run-1")
+
+        assert result["success"] is False
+        assert after["stdout"] == "1\n"
+
+    def test_timeout_restarts_session(self, tool):
+        """Test a timed out command kills the shell and the next one restarts it."""
+        result = tool.execute_command("sleep 5", timeout=1, session_id="run-1")
+        after = tool.execute_command("echo back", session_id="run-1")
+
+        assert result["success"] is False
+        assert "session was restarted" in result["stderr"]
+        assert after["stdout"] == "back\n"
+
+    def test_exit_reported_as_error(self, tool):
+        """Test a command that exits the shell is reported as a failure."""
+        result = tool.execute_command("exit 4", session_id="run-1")
+
+        assert result["success"] is False
+        assert "Shell session exited" in result["stderr"]
+        assert tool.execute_command("echo ok", session_id="run-1")["success"]
+
+    def test_unknown_session(self, tool):
+        """Test a command for a session that is not open returns an error."""
+        result = tool.execute_command("echo hi", session_id="missing")
+
+        assert result["success"] is False
+        assert "Shell session not found" in result["stderr"]
+
+    def test_close_session_kills_background_processes(self, tool):
+        """Test closing the session kills processes started in it."""
+        result = tool.execute_command("sleep 30 & echo $!", session_id="run-1")
+        pid = int(result["stdout"])
+
+        tool.close_session("run-1")
+        time.sleep(0.1)
+
+        # Killed; it may linger as a zombie until init reaps it
+        if os.path.exists(f"/proc/{pid}/stat"):
+            with open(f"/proc/{pid}/stat") as f:
+                assert f.read().split(") ")[1][0] == "Z"
+
+
+class TestCommandCache:
+    """Test cases for the content-addressed command result cache."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Create a workspace with an input file and a cache directory."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "project"))
+            with open(os.path.join(tmpdir, "project", "package-lock.json"), "w") as f:
+                f.write('{"v": 1}')
+            yield tmpdir
+
+    def run(self, tool, cwd, **kwargs):
+        return tool.execute_command(
+            "echo run >> runs.log && mkdir -p out && echo built > out/app.js",
+            cwd=cwd,
+            shell=True,
+            cache=True,
+            cache_inputs=["package-lock.json"],
+            **kwargs,
+        )
+
+    def test_hit_returns_cached_result(self, workspace):
+        """Test a second run with unchanged inputs is served from the cache."""
+        tool = CommandTool(cache_dir=os.path.join(workspace, "cache"))
+        cwd = os.path.join(workspace, "project")
+
+        first = self.run(tool, cwd)
+        second = self.run(tool, cwd)
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["returncode"] == 0
+        with open(os.path.join(cwd, "runs.log")) as f:
+            assert f.read() == "run\n"
+
+    def test_changed_input_misses(self, workspace):
+        """Test changing a declared input file invalidates the result."""
+        tool = CommandTool(cache_dir=os.path.join(workspace, "cache"))
+        cwd = os.path.join(workspace, "project")
+
+        self.run(tool, cwd)
+        with open(os.path.join(cwd, "package-lock.json"), "w") as f:
+            f.write('{"v": 2}')
+        result = self.run(tool, cwd)
+
+        assert result["cached"] is False
+        assert tool.cache.get_stats()["entries"] == 2
+
+    def test_artifacts_restored_on_hit(self, workspace):
+        """Test artifact directories are stored and restored on a hit."""
+        tool = CommandTool(cache_dir=os.path.join(workspace, "cache"))
+        cwd = os.path.join(workspace, "project")
+
+        self.run(tool, cwd, cache_artifacts=["out"])
+        os.remove(os.path.join(cwd, "out", "app.js"))
+        result = self.run(tool, cwd, cache_artifacts=["out"])
+
+        assert result["cached"] is True
+        with open(os.path.join(cwd, "out", "app.js")) as f:
+            assert f.read() == "built\n"
+
+    def test_hit_across_workspaces(self, workspace):
+        """Test workspaces of the same project share results by relative cwd."""
+        tool = CommandTool(cache_dir=os.path.join(workspace, "cache"))
+        for name in ("task-1", "task-2"):
+            shutil.copytree(
+                os.path.join(workspace, "project"),
+                os.path.join(workspace, name, "project"),
+            )
+
+        first = self.run(
+            tool,
+            os.path.join(workspace, "task-1", "project"),
+            cache_root=os.path.join(workspace, "task-1"),
+        )
+        second = self.run(
+            tool,
+            os.path.join(workspace, "task-2", "project"),
+            cache_root=os.path.join(workspace, "task-2"),
+        )
+        unrooted = self.run(tool, os.path.join(workspace, "task-2", "project"))
+
+        assert (first["cached"], second["cached"]) == (False, True)
+        assert unrooted["cached"] is False
+
+    def test_failed_command_not_cached(self, workspace):
+        """Test failing commands are always rerun."""
+        tool = CommandTool(cache_dir=os.path.join(workspace, "cache"))
+
+        tool.execute_command("false", cwd=workspace, cache=True)
+        result = tool.execute_command("false", cwd=workspace, cache=True)
+
+        assert result["cached"] is False
+        assert tool.cache.get_stats()["entries"] == 0
+
+    def test_cache_is_opt_in(self, workspace):
+        """Test commands without cache=True neither read nor fill the cache."""
+        tool = CommandTool(cache_dir=os.path.join(workspace, "cache"))
+
+        result = tool.execute_command("echo hi", cwd=workspace)
+
+        assert "cached" not in result
+        assert tool.cache.get_stats()["entries"] == 0
+
+    def test_lru_eviction(self, workspace):
+        """Test the least recently used entry is evicted over the entry limit."""
+        cache = CommandCache(os.path.join(workspace, "cache"), max_entries=2)
+        for name in ("a", "b"):
+            cache.put(name, {"stdout": name}, workspace)
+        cache.get("a", workspace)
+        cache.put("c", {"stdout": "c"}, workspace)
+
+        assert cache.get("b", workspace) is None
+        assert cache.get("a", workspace) == {"stdout": "a"}
+        assert cache.get("c", workspace) == {"stdout": "c"}
+
+    def test_entries_loaded_from_disk(self, workspace):
+        """Test a new cache instance reuses entries stored by an earlier one."""
+        cache_dir = os.path.join(workspace, "cache")
+        CommandCache(cache_dir).put("key", {"stdout": "x"}, workspace)
+
+        assert CommandCache(cache_dir).get("key", workspace) == {"stdout": "x"}
+
+    def test_artifact_outside_cwd_rejected(self, workspace):
+        """Test artifact paths must stay inside the working directory."""
+        tool = CommandTool(cache_dir=os.path.join(workspace, "cache"))
+
+        result = tool.execute_command(
+            "echo hi", cwd=workspace, cache=True, cache_artifacts=["../etc"]
+        )
+
+        assert result["success"] is False
+        assert "relative to cwd" in result["stderr"]
+
+
+class TestResourceLimits:
+    """Test cases for per-command rlimits and resource accounting."""
+
+    def test_usage_recorded(self):
+        """Test CPU time, max RSS and wall time are returned with the output."""
+        tool = CommandTool()
+        result = tool.execute_command(
+            "python3 -c 'sum(range(3_000_000)); x = bytearray(50_000_000)'"
+        )
+
+        resources = result["resources"]
+        assert result["success"] is True
+        assert resources["cpu_user_seconds"] + resources["cpu_system_seconds"] > 0
+        assert resources["max_rss_bytes"] >= 50_000_000
+        assert resources["wall_seconds"] > 0
+
+    def test_metrics_accumulate_usage(self):
+        """Test resource usage is summed in the tool metrics."""
+        tool = CommandTool()
+        tool.execute_command("true")
+        tool.execute_command("sleep 0.2")
+
+        metrics = tool.get_metrics()
+        assert metrics["commands"] == 2
+        assert metrics["wall_seconds"] >= 0.2
+        assert metrics["peak_rss_bytes"] > 0
+
+    def test_cpu_limit_kills_command(self):
+        """Test a command over its CPU limit is killed and reported."""
+        tool = CommandTool(resource_limits=ResourceLimits(cpu_seconds=1))
+        result = tool.execute_command("python3 -c 'while True: pass'", timeout=30)
+
+        assert result["success"] is False
+        assert "CPU time limit of 1 seconds exceeded" in result["stderr"]
+        assert result["resources"]["wall_seconds"] < 10
+
+    def test_address_space_limit(self):
+        """Test allocations over the address space limit fail."""
+        limits = ResourceLimits(address_space_bytes=200 * 1024 * 1024)
+        result = CommandTool(resource_limits=limits).execute_command(
+            "python3 -c 'bytearray(500_000_000)'"
+        )
+
+        assert result["success"] is False
+        assert "MemoryError" in result["stderr"]
+
+    def test_open_files_limit(self):
+        """Test the open files limit applies to the command."""
+        limits = ResourceLimits(open_files=64)
+        result = CommandTool(resource_limits=limits).execute_command(
+            "sh -c 'ulimit -n'"
+        )
+
+        assert result["stdout"] == "64\n"
+
+    def test_per_command_limits_override_tool_limits(self):
+        """Test limits passed to execute_command replace the tool's limits."""
+        tool = CommandTool(resource_limits=ResourceLimits(open_files=64))
+        result = tool.execute_command(
+            "sh -c 'ulimit -n'", resource_limits=ResourceLimits(open_files=128)
+        )
+
+        assert result["stdout"] == "128\n"
+
+    def test_session_limits_and_usage(self):
+        """Test session commands inherit the limits and report CPU usage."""
+        tool = CommandTool(resource_limits=ResourceLimits(open_files=64))
+        tool.open_session("run-1")
+        try:
+            limit = tool.execute_command("ulimit -n", session_id="run-1")
+            busy = tool.execute_command(
+                "python3 -c 'sum(range(10_000_000))'", session_id="run-1"
+            )
+        finally:
+            tool.close_all_sessions()
+
+        assert limit["stdout"] == "64\n"
+        resources = busy["resources"]
+        assert resources["cpu_user_seconds"] + resources["cpu_system_seconds"] > 0
+        assert resources["wall_seconds"] > 0
+        assert tool.get_metrics()["commands"] == 2
+
+    def test_session_cpu_limit_kills_command(self):
+        """Test a session command over its CPU limit is killed and reported."""
+        tool = CommandTool(resource_limits=ResourceLimits(cpu_seconds=1))
+        tool.open_session("run-1")
+        try:
+            result = tool.execute_command(
+                "python3 -c 'while True: pass'", session_id="run-1", timeout=30
+            )
+            after = tool.execute_command("echo alive", session_id="run-1")
+        finally:
+            tool.close_all_sessions()
+
+        assert result["success"] is False
+        assert "CPU time limit of 1 seconds exceeded" in result["stderr"]
+        assert after["stdout"] == "alive\n"
+
+    def test_timed_out_command_reports_usage(self):
+        """Test a killed command still reports the resources it used."""
+        result = CommandTool().execute_command("sleep 5", timeout=1)
+
+        assert result["success"] is False
+        assert result["resources"]["wall_seconds"] >= 1
+
+
+class TestCommandAuditLog:
+    """Test cases for the write-behind command audit log."""
+
+    def record(self, cmd="echo hi"):
+        return Command(id=uuid4(), cmd=cmd, created_at=datetime.now(timezone.utc))
+
+    def test_execution_recorded_without_db_write(self):
+        """Test executions are buffered with their details, not written at once."""
+        command_db = MagicMock()
+        audit_log = CommandAuditLog(command_db, flush_interval=60)
+        tool = CommandTool(audit_log=audit_log)
+
+        tool.execute_command("printf abc", cwd="/tmp")
+
+        command_db.save_commands.assert_not_called()
+        audit_log.flush()
+        (command,) = command_db.save_commands.call_args[0][0]
+        assert command.cmd == "printf abc"
+        assert command.cwd == "/tmp"
+        assert command.returncode == 0
+        assert command.stdout_bytes == 3
+        assert command.duration_seconds >= 0
+        audit_log.close()
+
+    def test_output_without_byte_counts_recorded_in_bytes(self):
+        """Test output sizes not counted by CommandTool are recorded in bytes."""
+        command_db = MagicMock()
+        audit_log = CommandAuditLog(command_db, flush_interval=60)
+
+        audit_log.record_execution(
+            "echo", "/tmp", 0.1, {"returncode": 0, "stdout": "héllo", "stderr": ""}
+        )
+        audit_log.close()
+
+        (command,) = command_db.save_commands.call_args[0][0]
+        assert (command.stdout_bytes, command.stderr_bytes) == (6, 0)
+
+    def test_flush_on_batch_size(self):
+        """Test a full batch is written by the background thread."""
+        command_db = MagicMock()
+        audit_log = CommandAuditLog(command_db, max_batch_size=3, flush_interval=60)
+
+        for _ in range(3):
+            audit_log.record(self.record())
+        deadline = time.monotonic() + 2
+        while not command_db.save_commands.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert len(command_db.save_commands.call_args[0][0]) == 3
+        audit_log.close()
+
+    def test_flush_on_interval(self):
+        """Test records are written after the flush interval."""
+        command_db = MagicMock()
+        audit_log = CommandAuditLog(command_db, flush_interval=0.1)
+
+        audit_log.record(self.record())
+        time.sleep(0.5)
+
+        assert audit_log.get_stats()["written"] == 1
+        audit_log.close()
+
+    def test_close_flushes_remaining(self):
+        """Test records still buffered are written on close."""
+        command_db = MagicMock()
+        audit_log = CommandAuditLog(command_db, flush_interval=60)
+
+        audit_log.record(self.record("a"))
+        audit_log.record(self.record("b"))
+        audit_log.close()
+
+        commands = command_db.save_commands.call_args[0][0]
+        assert [command.cmd for command in commands] == ["a", "b"]
+
+    def test_failed_write_retried(self):
+        """Test records of a failed write are kept for the next flush."""
+        command_db = MagicMock()
+        command_db.save_commands.side_effect = [Exception("down"), None]
+        audit_log = CommandAuditLog(command_db, flush_interval=60)
+
+        audit_log.record(self.record())
+        assert audit_log.flush() == 0
+        assert audit_log.flush() == 1
+        assert audit_log.get_stats() == {"written": 1, "buffered": 0, "dropped": 0}
+        audit_log.close()
+
+
+def _is_running(pid):
+    """Check a process exists and is not a zombie."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except OSError:
+        return False
+    return stat[stat.rindex(")") + 2] != "Z"
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="requires /proc")
+class TestProcessGroups:
+    """Test cases for process group lifecycle management."""
+
+    def test_timeout_kills_grandchildren(self):
+        """Test a timed out shell command takes its background children down."""
+        tool = CommandTool(timeout=1)
+        result = tool.execute_command("sleep 30 & echo $!; wait", shell=True)
+
+        assert result["returncode"] == -1
+        assert "timed out" in result["stderr"]
+        assert not _is_running(int(result["stdout"].split()[0]))
+
+    def test_sigterm_ignored_is_killed_after_grace(self):
+        """Test a command ignoring SIGTERM is killed after the grace period."""
+        tool = CommandTool(timeout=1, kill_grace_seconds=1)
+        start = time.monotonic()
+        result = tool.execute_command(
+            "trap '' TERM; sleep 30 & echo $!; wait", shell=True
+        )
+
+        assert time.monotonic() - start < 10
+        assert result["returncode"] == -1
+        assert not _is_running(int(result["stdout"].split()[0]))
+
+    def test_background_process_terminated_without_run(self):
+        """Test processes left behind are stopped when no run owns them."""
+        tool = CommandTool()
+        result = tool.execute_command("sleep 30 > /dev/null 2>&1 & echo $!", shell=True)
+
+        assert result["success"] is True
+        assert not _is_running(int(result["stdout"]))
+
+    def test_background_process_reaped_with_run(self):
+        """Test background processes of a run live until the run is reaped."""
+        tool = CommandTool()
+        result = tool.execute_command(
+            "sleep 30 > /dev/null 2>&1 & echo $!", shell=True, run_id="run-1"
+        )
+        pid = int(result["stdout"])
+        assert _is_running(pid)
+
+        leaked = tool.reap_run("run-1")
+
+        assert [process["pid"] for process in leaked] == [pid]
+        assert "sleep 30" in leaked[0]["command"]
+        assert not _is_running(pid)
+        assert tool.reaper.leaked_total == 1
+        assert tool.reap_run("run-1") == []
+
+    def test_close_session_reports_leaked_processes(self):
+        """Test closing a session terminates and reports its background jobs."""
+        tool = CommandTool()
+        tool.open_session("run-1")
+        result = tool.execute_command(
+            "sleep 30 > /dev/null 2>&1 & echo $!", session_id="run-1"
+        )
+        pid = int(result["stdout"])
+
+        leaked = tool.close_session("run-1")
+
+        assert [process["pid"] for process in leaked] == [pid]
+        assert not _is_running(pid)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
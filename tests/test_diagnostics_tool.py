@@ -0,0 +1,211 @@
+import pytest
+import os
+import shutil
+import sys
+import tempfile
+import time
+from backend.services.tool.diagnostics_tool import DiagnosticsTool
+
+# Speaks the tsserver protocol: JSON requests on stdin, Content-Length framed
+# messages on stdout. Lines containing ERROR are reported as type errors.
+FAKE_TSSERVER = r"""
+import json, sys
+
+log = open(sys.argv[1], "a")
+for line in sys.stdin:
+    request = json.loads(line)
+    log.write(request["command"] + "\n")
+    log.flush()
+    if request["command"] == "open":
+        continue
+    body = []
+    if request["command"] == "semanticDiagnosticsSync":
+        with open(request["arguments"]["file"]) as f:
+            for number, text in enumerate(f, 1):
+                if "ERROR" in text:
+                    body.append({
+                        "start": {"line": number, "offset": text.index("ERROR") + 1},
+                        "text": "Cannot find name 'ERROR'.",
+                        "code": 2304,
+                        "category": "error",
+                    })
+    for message in (
+        {"seq": 0, "type": "event", "event": "projectLoadingStart"},
+        {"seq": 0, "type": "response", "request_seq": request["seq"],
+         "success": True, "body": body},
+    ):
+        data = json.dumps(message)
+        sys.stdout.write(f"Content-Length: {len(data) + 1}\r\n\r\n{data}\n")
+    sys.stdout.flush()
+"""
+
+# Minimal eslint package for the ESLint daemon: flags console.log calls
+FAKE_ESLINT_MODULE = r"""
+const fs = require("fs");
+class ESLint {
+  async lintFiles(files) {
+    return files.map((filePath) => ({
+      filePath,
+      messages: fs.readFileSync(filePath, "utf8").split("\n").flatMap((text, i) =>
+        text.includes("console.log")
+          ? [{ ruleId: "no-console", severity: 1, message: "Unexpected console statement.",
+               line: i + 1, column: text.indexOf("console") + 1 }]
+          : []),
+    }));
+  }
+}
+module.exports = { ESLint };
+"""
+
+
+class TestDiagnosticsTool:
+    """Test cases for DiagnosticsTool with daemons speaking the real protocols."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Create a workspace with one broken and one clean TypeScript file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "src"))
+            with open(os.path.join(tmpdir, "src", "App.tsx"), "w") as f:
+                f.write("const a = 1;\nconst b = ERROR;\n")
+            with open(os.path.join(tmpdir, "src", "util.ts"), "w") as f:
+                f.write("export const ok = true;\n")
+            os.makedirs(os.path.join(tmpdir, "node_modules", "dep"))
+            with open(
+                os.path.join(tmpdir, "node_modules", "dep", "index.ts"), "w"
+            ) as f:
+                f.write("ERROR\n")
+            yield tmpdir
+
+    @pytest.fixture
+    def tool(self, workspace):
+        """Create a DiagnosticsTool whose tsc daemon is the fake tsserver."""
+        script = os.path.join(workspace, "fake_tsserver.py")
+        with open(script, "w") as f:
+            f.write(FAKE_TSSERVER)
+        self.log = os.path.join(workspace, "requests.log")
+        tool = DiagnosticsTool(
+            daemon_commands={"tsc": [sys.executable, script, self.log]}
+        )
+        yield tool
+        tool.close()
+
+    def requests(self):
+        with open(self.log) as f:
+            return f.read().split()
+
+    def test_reports_structured_diagnostics(self, tool, workspace):
+        """Test diagnostics are parsed from tsserver responses."""
+        result = tool.check(workspace, checkers=["tsc"])
+
+        assert result["success"] is False
+        assert result["files_checked"] == ["src/App.tsx", "src/util.ts"]
+        assert result["error_count"] == 1
+        assert result["diagnostics"] == [
+            {
+                "file": "src/App.tsx",
+                "line": 2,
+                "column": 11,
+                "severity": "error",
+                "code": "TS2304",
+                "message": "Cannot find name 'ERROR'.",
+                "source": "tsc",
+            }
+        ]
+
+    def test_checks_only_changed_files(self, tool, workspace):
+        """Test later checks only cover files changed since the last one."""
+        tool.check(workspace, checkers=["tsc"])
+        assert tool.check(workspace, checkers=["tsc"])["files_checked"] == []
+
+        path = os.path.join(workspace, "src", "App.tsx")
+        with open(path, "w") as f:
+            f.write("const b = 2;\n")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+        result = tool.check(workspace, checkers=["tsc"])
+
+        assert result["files_checked"] == ["src/App.tsx"]
+        assert result["success"] is True
+        assert self.requests().count("open") == 2  # one per file, on first check
+        assert self.requests().count("reload") == 1
+
+    def test_files_of_failed_checker_checked_again(self, tool, workspace):
+        """Test files a crashed checker did not check are not skipped later."""
+        command = tool.daemon_commands["tsc"]
+        tool.daemon_commands["tsc"] = [sys.executable, "-c", "pass"]
+        failed = tool.check(workspace, checkers=["tsc"])
+        tool._daemons.pop(("tsc", workspace)).close()
+        tool.daemon_commands["tsc"] = command
+        result = tool.check(workspace, checkers=["tsc"])
+
+        assert "tsc" in failed["failures"]
+        assert result["files_checked"] == ["src/App.tsx", "src/util.ts"]
+        assert result["error_count"] == 1
+
+    def test_daemon_is_reused_and_shut_down_when_idle(self, tool, workspace):
+        """Test one daemon serves repeated checks and stops once idle."""
+        tool.IDLE_CHECK_INTERVAL = 0.05
+        tool.check(workspace, files=["src/App.tsx"], checkers=["tsc"])
+        tool.check(workspace, files=["src/App.tsx"], checkers=["tsc"])
+        daemon = tool._daemons[("tsc", workspace)]
+        assert daemon.requests == 2
+        assert daemon.alive
+
+        tool.idle_timeout = 0.2
+        deadline = time.monotonic() + 5
+        # The idle check removes the daemon and then shuts it down
+        while (tool._daemons or daemon.alive) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert tool._daemons == {}
+        assert not daemon.alive
+
+    def test_missing_checker_is_reported(self, workspace):
+        """Test a checker that is not installed is reported as a failure."""
+        tool = DiagnosticsTool()
+
+        result = tool.invoke({"cwd": workspace})
+
+        assert result["success"] is False
+        assert "not installed" in result["failures"]["tsc"]
+        assert "not installed" in result["failures"]["eslint"]
+
+    def test_invalid_input(self, workspace):
+        """Test invalid input returns a failure instead of raising."""
+        tool = DiagnosticsTool()
+
+        result = tool.invoke({"cwd": workspace, "checkers": ["mypy"]})
+
+        assert result["success"] is False
+        assert "checkers" in result["failures"]["input"]
+
+    @pytest.mark.skipif(shutil.which("node") is None, reason="requires node")
+    def test_eslint_daemon(self, workspace):
+        """Test the ESLint daemon script with the workspace's eslint package."""
+        package = os.path.join(workspace, "node_modules", "eslint")
+        os.makedirs(package)
+        with open(os.path.join(package, "index.js"), "w") as f:
+            f.write(FAKE_ESLINT_MODULE)
+        os.makedirs(os.path.join(workspace, "node_modules", ".bin"))
+        binary = os.path.join(workspace, "node_modules", ".bin", "eslint")
+        with open(binary, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(binary, 0o755)
+        with open(os.path.join(workspace, "src", "log.js"), "w") as f:
+            f.write("\n  console.log(1);\n")
+        tool = DiagnosticsTool()
+
+        try:
+            result = tool.check(workspace, files=["src/log.js"], checkers=["eslint"])
+        finally:
+            tool.close()
+
+        assert result["success"] is True
+        assert result["warning_count"] == 1
+        diagnostic = result["diagnostics"][0]
+        assert diagnostic["code"] == "no-console"
+        assert (diagnostic["line"], diagnostic["column"]) == (2, 3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
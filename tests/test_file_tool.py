@@ -2,6 +2,8 @@ import pytest
 import tempfile
 import os
 import json
+from backend.services.tool.artifact_store import ArtifactStore, LocalArtifactBackend
+from backend.services.tool import atomic_file
 from backend.services.tool.file_tool import FileTool
 
 
@@ -134,6 +136,139 @@ export const MyComponent: React.FC = () => {
                 assert f.read() == content
 
 
+class TestFileToolAtomicWrite:
+    """Test cases for atomic, durable and skipped writes."""
+
+    @pytest.fixture
+    def fsyncs(self, monkeypatch):
+        """Record the paths passed to os.fsync."""
+        calls = []
+        real_fsync = os.fsync
+
+        def fsync(fd):
+            calls.append(os.readlink(f"/proc/self/fd/{fd}"))
+            real_fsync(fd)
+
+        monkeypatch.setattr(os, "fsync", fsync)
+        return calls
+
+    def test_overwrite_replaces_file(self):
+        """Test an overwrite swaps in a new file and keeps its mode."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "run.py")
+            with open(path, "w") as f:
+                f.write("old content\n")
+            os.chmod(path, 0o750)
+            inode = os.stat(path).st_ino
+
+            result = FileTool().write_file(path, "new\n")
+
+            assert result["success"] is True
+            assert os.stat(path).st_ino != inode
+            assert os.stat(path).st_mode & 0o777 == 0o750
+            assert os.listdir(tmpdir) == ["run.py"]
+            with open(path) as f:
+                assert f.read() == "new\n"
+
+    def test_write_through_symlink(self):
+        """Test writing a symlink replaces its target, not the link."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            target = os.path.join(tmpdir, "real.ts")
+            link = os.path.join(tmpdir, "link.ts")
+            with open(target, "w") as f:
+                f.write("a")
+            os.symlink("real.ts", link)
+
+            FileTool().write_file(link, "b")
+
+            assert os.readlink(link) == "real.ts"
+            with open(target) as f:
+                assert f.read() == "b"
+
+    def test_unchanged_content_is_not_rewritten(self):
+        """Test writing the current content leaves the file and mtime alone."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "App.tsx")
+            file_tool = FileTool()
+            file_tool.write_file(path, "export default 1;")
+            os.utime(path, ns=(0, 0))
+
+            result = file_tool.write_file(path, "export default 1;")
+
+            assert result["success"] is True
+            assert result["unchanged"] is True
+            assert result["bytes_written"] == 0
+            assert os.stat(path).st_mtime_ns == 0
+            assert file_tool.write_file(path, "export default 2;")["bytes_written"] > 0
+            assert os.stat(path).st_mtime_ns != 0
+
+    def test_durability_always(self, fsyncs):
+        """Test 'always' syncs the file and its directory on each write."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_tool = FileTool(durability="always")
+
+            file_tool.write_file(os.path.join(tmpdir, "a.ts"), "a")
+            file_tool.write_file(os.path.join(tmpdir, "a.ts"), "b", mode="a")
+
+            assert len(fsyncs) == 3
+            assert fsyncs[1] == os.path.realpath(tmpdir)
+
+    def write_batch(self, tmpdir, count=5):
+        return FileTool(durability="batch").batch(
+            [
+                {"operation": "write", "file_path": f"{i}.ts", "content": "x"}
+                for i in range(count)
+            ],
+            cwd=tmpdir,
+        )
+
+    def test_durability_batch_syncs_files_together(self, fsyncs, monkeypatch):
+        """Test 'batch' syncs the filesystem once and each directory once."""
+        syncfs_calls = []
+        monkeypatch.setattr(
+            atomic_file, "_syncfs", lambda fd: syncfs_calls.append(fd) or True
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = self.write_batch(tmpdir)
+
+            assert result["success"] is True
+            assert len(syncfs_calls) == 1
+            assert fsyncs == [os.path.realpath(tmpdir)]
+            assert sorted(os.listdir(tmpdir)) == [f"{i}.ts" for i in range(5)]
+
+    def test_durability_batch_syncs_before_renaming(self, fsyncs, monkeypatch):
+        """Test without syncfs every file is synced before any is renamed."""
+        monkeypatch.setattr(atomic_file, "_syncfs", lambda fd: False)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = self.write_batch(tmpdir)
+
+            assert result["success"] is True
+            assert all(path.endswith(".tmp") for path in fsyncs[:5])
+            assert fsyncs[5:] == [os.path.realpath(tmpdir)]
+
+    def test_durability_batch_read_after_write(self):
+        """Test a read after a write of the same file in a batch sees the write."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = FileTool(durability="batch").batch(
+                [
+                    {"operation": "write", "file_path": "a.ts", "content": "new"},
+                    {"operation": "read", "file_path": "a.ts"},
+                ],
+                cwd=tmpdir,
+            )
+
+            assert result["results"][1]["message"] == "new"
+
+    def test_durability_none_and_invalid(self, fsyncs):
+        """Test the default mode never syncs and unknown modes are rejected."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            FileTool().write_file(os.path.join(tmpdir, "a.ts"), "a")
+
+        assert fsyncs == []
+        with pytest.raises(ValueError):
+            FileTool(durability="sometimes")
+
+
 class TestFileToolRead:
     """Test cases for FileTool read operations."""
 
@@ -184,6 +319,621 @@ class TestFileToolRead:
             assert "🚀" in result["message"]
 
 
+class TestFileToolRangedRead:
+    """Test cases for FileTool ranged reads and peeks."""
+
+    @pytest.fixture
+    def file_tool(self):
+        """Create a FileTool instance for testing."""
+        return FileTool()
+
+    @pytest.fixture
+    def log_file(self):
+        """Create a 1000 line log file."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "build.txt")
+            with open(file_path, "w") as f:
+                f.writelines(f"line {i}\n" for i in range(1, 1001))
+            yield file_path
+
+    def test_read_line_range(self, file_tool, log_file):
+        """Test offset/limit return the requested lines only."""
+        result = file_tool.read_file(log_file, offset=10, limit=3)
+
+        assert result["success"] is True
+        assert result["message"] == "line 11\nline 12\nline 13\n"
+        assert result["line_range"] == [11, 13]
+        assert result["bytes_written"] == len(result["message"])
+        assert result["total_bytes"] == os.path.getsize(log_file)
+        assert result["truncated"] is True
+
+    def test_read_line_range_past_end(self, file_tool, log_file):
+        """Test a range running past the end returns the remaining lines."""
+        result = file_tool.read_file(log_file, offset=998, limit=10)
+
+        assert result["message"] == "line 999\nline 1000\n"
+        assert result["line_range"] == [999, 1000]
+        assert result["truncated"] is False
+
+        result = file_tool.read_file(log_file, offset=5000)
+        assert result["message"] == ""
+        assert result["line_range"] == []
+
+    def test_read_byte_range_keeps_whole_characters(self, file_tool):
+        """Test byte ranges never split a multi-byte character."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "unicode.md")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write("ab你好cd")  # 你 and 好 are 3 bytes each
+
+            result = file_tool.read_file(file_path, byte_offset=3, byte_limit=5)
+
+            assert result["message"] == "好"
+            assert result["byte_range"] == [5, 8]
+
+            result = file_tool.read_file(file_path, byte_offset=8)
+            assert result["message"] == "cd"
+            assert result["truncated"] is False
+
+    def test_peek(self, file_tool, log_file):
+        """Test a peek returns size, line count and first/last lines."""
+        result = file_tool.read_file(log_file, peek=True, peek_lines=2)
+
+        assert result["success"] is True
+        assert result["total_lines"] == 1000
+        assert result["total_bytes"] == os.path.getsize(log_file)
+        assert result["message"] == (
+            "line 1\nline 2\n... [996 lines omitted] ...\nline 999\nline 1000\n"
+        )
+
+    def test_peek_small_and_empty_files(self, file_tool):
+        """Test a peek at a file shorter than the peek returns all of it."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = os.path.join(tmpdir, "short.txt")
+            with open(file_path, "w") as f:
+                f.write("one\ntwo")
+            empty_path = os.path.join(tmpdir, "empty.txt")
+            open(empty_path, "w").close()
+
+            result = file_tool.read_file(file_path, peek=True)
+            empty = file_tool.read_file(empty_path, peek=True)
+
+        assert result["message"] == "one\ntwo"
+        assert result["total_lines"] == 2
+        assert empty["message"] == ""
+        assert empty["total_lines"] == 0
+
+    def test_large_file_needs_range(self, file_tool, log_file):
+        """Test whole reads of files over MAX_FILE_SIZE point to ranges."""
+        file_tool.MAX_FILE_SIZE = 1024
+
+        result = file_tool.read_file(log_file)
+        ranged = file_tool.read_file(log_file, offset=0)
+
+        assert result["success"] is False
+        assert "ranges" in result["message"]
+        assert ranged["bytes_written"] <= 1024
+        assert ranged["truncated"] is True
+
+    def test_invalid_range_options(self, file_tool, log_file):
+        """Test conflicting or negative range options are rejected."""
+        assert file_tool.read_file(log_file, offset=-1)["success"] is False
+        assert file_tool.read_file(log_file, offset=1, byte_limit=5)["success"] is False
+        assert file_tool.read_file(log_file, peek=True, limit=5)["success"] is False
+
+
+class TestFileToolBatch:
+    """Test cases for FileTool batch operations."""
+
+    @pytest.fixture
+    def file_tool(self):
+        """Create a FileTool instance for testing."""
+        return FileTool()
+
+    def test_batch_writes_component_tree(self, file_tool):
+        """Test one batch writes many files into new directories."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            operations = [
+                {
+                    "operation": "write",
+                    "file_path": f"src/components/{name}/{name}.tsx",
+                    "content": f"export const {name} = () => null;",
+                }
+                for name in ("Button", "Card", "Header", "Footer")
+            ]
+
+            result = file_tool.batch(operations, cwd=tmpdir)
+
+            assert result["success"] is True
+            assert [r["file_path"] for r in result["results"]] == [
+                os.path.join(tmpdir, op["file_path"]) for op in operations
+            ]
+            with open(os.path.join(tmpdir, "src/components/Card/Card.tsx")) as f:
+                assert f.read() == "export const Card = () => null;"
+
+    def test_batch_same_file_runs_in_order(self, file_tool):
+        """Test operations on one file see the effects of earlier ones."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = file_tool.batch(
+                [
+                    {"operation": "write", "file_path": "notes.md", "content": "a\n"},
+                    {
+                        "operation": "write",
+                        "file_path": "notes.md",
+                        "content": "b\n",
+                        "mode": "a",
+                    },
+                    {"operation": "read", "file_path": "notes.md"},
+                    {"operation": "read", "file_path": "notes.md", "offset": 1},
+                ],
+                cwd=tmpdir,
+            )
+
+        assert result["success"] is True
+        assert result["results"][2]["message"] == "a\nb\n"
+        assert result["results"][3]["message"] == "b\n"
+
+    def test_batch_reports_failures_per_file(self, file_tool):
+        """Test invalid operations fail alone and keep their position."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            result = file_tool.batch(
+                [
+                    {"operation": "write", "file_path": "ok.ts", "content": "x"},
+                    {"operation": "write", "file_path": "bad.exe", "content": "x"},
+                    {"operation": "read", "file_path": "missing.ts"},
+                    {"operation": "move", "file_path": "ok.ts"},
+                    "not a dict",
+                ],
+                cwd=tmpdir,
+            )
+
+            assert os.path.exists(os.path.join(tmpdir, "ok.ts"))
+
+        assert result["success"] is False
+        assert [r["success"] for r in result["results"]] == [
+            True,
+            False,
+            False,
+            False,
+            False,
+        ]
+        assert "not allowed" in result["results"][1]["message"]
+        assert "not found" in result["results"][2]["message"]
+        assert "Invalid operation" in result["results"][3]["message"]
+
+    def test_invoke_batch_validates_input(self, file_tool):
+        """Test empty or oversized batches are rejected."""
+        assert file_tool.invoke_batch({"operations": []})["success"] is False
+
+        operations = [{"operation": "read", "file_path": "a.ts"}] * (
+            file_tool.MAX_BATCH_OPERATIONS + 1
+        )
+        result = file_tool.invoke_batch({"operations": operations})
+
+        assert result["success"] is False
+        assert "cannot have more than" in result["results"][0]["message"]
+
+
+class TestFileToolPatch:
+    """Test cases for FileTool patch operations."""
+
+    @pytest.fixture
+    def file_tool(self):
+        """Create a FileTool instance for testing."""
+        return FileTool()
+
+    @pytest.fixture
+    def source_file(self):
+        """Create a file of 1000 numbered lines."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "source.ts")
+            with open(path, "w") as f:
+                f.writelines(f"line {i}\n" for i in range(1, 1001))
+            yield path
+
+    def read_lines(self, path):
+        with open(path, newline="") as f:
+            return f.read().splitlines()
+
+    def test_unified_diff(self, file_tool, source_file):
+        """Test hunks replace, insert and remove lines."""
+        diff = (
+            "--- a/source.ts\n+++ b/source.ts\n"
+            "@@ -1,3 +1,4 @@\n+// header\n line 1\n-line 2\n+LINE 2\n line 3\n"
+            "@@ -500,3 +501,2 @@\n line 500\n-line 501\n line 502\n"
+        )
+
+        result = file_tool.patch_file(source_file, diff=diff)
+
+        assert result["success"] is True
+        assert result["hunks_applied"] == 2
+        assert result["failed_hunks"] == []
+        lines = self.read_lines(source_file)
+        assert lines[:4] == ["// header", "line 1", "LINE 2", "line 3"]
+        assert lines[500:502] == ["line 500", "line 502"]
+        assert len(lines) == 1000
+        assert result["bytes_written"] == os.path.getsize(source_file)
+
+    def test_moved_hunk_is_found_by_context(self, file_tool, source_file):
+        """Test a hunk whose line numbers are off still applies."""
+        diff = "@@ -10,2 +10,2 @@\n line 25\n-line 26\n+twenty-six\n"
+
+        result = file_tool.patch_file(source_file, diff=diff)
+
+        assert result["success"] is True
+        assert self.read_lines(source_file)[24:27] == [
+            "line 25",
+            "twenty-six",
+            "line 27",
+        ]
+
+    def test_trailing_blank_lines_past_counts_dropped(self, file_tool, source_file):
+        """Test blank lines ending a hunk beyond its header counts are ignored."""
+        diff = (
+            "@@ -2,1 +2,1 @@\n-line 2\n+two\n\n"
+            "@@ -5,3 +5,3 @@\n line 5\n-line 6\n+six\n line 7\n\n\n"
+        )
+
+        result = file_tool.patch_file(source_file, diff=diff)
+
+        assert result["success"] is True
+        assert self.read_lines(source_file)[:8] == [
+            "line 1",
+            "two",
+            "line 3",
+            "line 4",
+            "line 5",
+            "six",
+            "line 7",
+            "line 8",
+        ]
+
+    def test_failed_hunk_leaves_file_unchanged(self, file_tool, source_file):
+        """Test a mismatched hunk is reported and nothing is written."""
+        with open(source_file) as f:
+            original = f.read()
+        diff = (
+            "@@ -1,2 +1,2 @@\n line 1\n-line 2\n+two\n"
+            "@@ -40,2 +40,2 @@\n line 40\n-line 4O\n+forty-one\n"
+        )
+
+        result = file_tool.patch_file(source_file, diff=diff)
+
+        assert result["success"] is False
+        assert result["hunks_applied"] == 0
+        assert [f["index"] for f in result["failed_hunks"]] == [1]
+        assert result["failed_hunks"][0]["header"] == "@@ -40,2 +40,2 @@"
+        assert "'line 4O'" in result["failed_hunks"][0]["reason"]
+        assert "unchanged" in result["message"]
+        with open(source_file) as f:
+            assert f.read() == original
+        assert os.listdir(os.path.dirname(source_file)) == ["source.ts"]
+
+    def test_line_endings_are_kept(self, file_tool):
+        """Test CRLF files stay CRLF and a missing final newline is honoured."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "crlf.ts")
+            with open(path, "w", newline="") as f:
+                f.write("a\r\nb\r\nc")
+            diff = (
+                "@@ -2,2 +2,3 @@\n b\n-c\n\\ No newline at end of file\n"
+                "+c\n+d\n\\ No newline at end of file\n"
+            )
+
+            result = file_tool.patch_file(path, diff=diff)
+
+            assert result["success"] is True
+            with open(path, newline="") as f:
+                assert f.read() == "a\r\nb\r\nc\r\nd"
+
+    def test_search_replace_edits(self, file_tool, source_file):
+        """Test anchored edits apply together."""
+        result = file_tool.patch_file(
+            source_file,
+            edits=[
+                {"search": "line 999\n", "replace": "last but one\n"},
+                {"search": "line 10\nline 11\n", "replace": "ten to eleven\n"},
+            ],
+        )
+
+        assert result["success"] is True
+        assert result["hunks_applied"] == 2
+        lines = self.read_lines(source_file)
+        assert lines[9] == "ten to eleven"
+        assert lines[-2] == "last but one"
+
+    def test_search_replace_failures(self, file_tool, source_file):
+        """Test missing, ambiguous and overlapping edits are reported."""
+        result = file_tool.patch_file(
+            source_file,
+            edits=[
+                {"search": "line 5\n", "replace": "five\n"},
+                {"search": "line 1", "replace": "one"},
+                {"search": "missing", "replace": ""},
+                {"search": "line 5\nline 6\n", "replace": "x"},
+            ],
+        )
+
+        assert result["success"] is False
+        reasons = {f["index"]: f["reason"] for f in result["failed_hunks"]}
+        assert "not unique" in reasons[1]
+        assert "not found" in reasons[2]
+        assert "Overlaps edit" in reasons[3]
+        assert 0 not in reasons
+
+    def test_invalid_patch_input(self, file_tool, source_file):
+        """Test malformed input is rejected before the file is touched."""
+        assert file_tool.patch_file(source_file)["success"] is False
+        assert file_tool.patch_file(source_file, diff="not a diff")["success"] is False
+        assert (
+            file_tool.patch_file(source_file, edits=[{"search": "", "replace": "x"}])[
+                "success"
+            ]
+            is False
+        )
+        result = file_tool.invoke_patch(
+            {
+                "file_path": "missing.ts",
+                "cwd": os.path.dirname(source_file),
+                "edits": [{"search": "a", "replace": "b"}],
+            }
+        )
+        assert "File not found" in result["message"]
+
+
+class TestFileToolOverlay:
+    """Test cases for keeping file changes in an in-memory overlay."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Create a workspace with one file on disk."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "app.ts"), "w") as f:
+                f.write("const a = 1;\nconst b = 2;\n")
+            yield tmpdir
+
+    def test_changes_stay_in_memory_until_flushed(self, workspace):
+        """Test writes, patches and deletes only reach disk on a flush."""
+        changed = []
+        file_tool = FileTool(change_listener=changed.append)
+        file_tool.open_overlay(workspace)
+        app = os.path.join(workspace, "app.ts")
+        page = os.path.join(workspace, "src", "page.tsx")
+
+        file_tool.write_file(page, "draft\n")
+        file_tool.write_file(page, "export const Page = () => null;\n")
+        file_tool.patch_file(app, edits=[{"search": "b = 2", "replace": "b = 3"}])
+        file_tool.write_file(os.path.join(workspace, "tmp.txt"), "scratch")
+        file_tool.delete_file(os.path.join(workspace, "tmp.txt"))
+
+        assert not os.path.exists(os.path.join(workspace, "src"))
+        assert file_tool.read_file(page)["message"].startswith("export const Page")
+        assert file_tool.read_file(app, offset=1, limit=1)["message"] == (
+            "const b = 3;\n"
+        )
+        assert changed == []
+
+        result = file_tool.flush_overlay(workspace)
+
+        assert result["success"] is True
+        assert [(c["path"], c["action"]) for c in result["changes"]] == [
+            (os.path.realpath(app), "modified"),
+            (os.path.realpath(page), "created"),
+        ]
+        assert changed == [c["path"] for c in result["changes"]]
+        assert sorted(os.listdir(workspace)) == ["app.ts", "src"]
+        with open(page) as f:
+            assert f.read() == "export const Page = () => null;\n"
+
+    def test_delete_and_reads_see_overlay(self, workspace):
+        """Test a file deleted in the overlay is gone for reads but on disk."""
+        file_tool = FileTool()
+        file_tool.open_overlay(workspace)
+        app = os.path.join(workspace, "app.ts")
+
+        file_tool.delete_file(app)
+
+        assert os.path.exists(app)
+        assert "not found" in file_tool.read_file(app)["message"]
+        assert file_tool.delete_file(app)["success"] is False
+        diff = "@@ -1,1 +1,1 @@\n-const a = 1;\n+const a = 0;\n"
+        assert file_tool.patch_file(app, diff=diff)["success"] is False
+        result = file_tool.flush_overlay(workspace)
+        assert result["changes"][0]["action"] == "deleted"
+        assert not os.path.exists(app)
+
+    def test_close_without_flush_discards(self, workspace):
+        """Test closing an overlay of a failed run leaves the disk unchanged."""
+        file_tool = FileTool()
+        file_tool.open_overlay(workspace)
+        app = os.path.join(workspace, "app.ts")
+        file_tool.write_file(app, "broken")
+
+        result = file_tool.close_overlay(workspace, flush=False)
+
+        assert result["message"] == "Discarded 1 change(s)"
+        with open(app) as f:
+            assert f.read() == "const a = 1;\nconst b = 2;\n"
+        file_tool.write_file(app, "direct")
+        with open(app) as f:
+            assert f.read() == "direct"
+
+    def test_close_reports_net_changes(self, workspace):
+        """Test the changes of every flush are merged by file on close."""
+        file_tool = FileTool()
+        file_tool.open_overlay(workspace)
+        new = os.path.join(workspace, "new.ts")
+        gone = os.path.join(workspace, "gone.ts")
+        file_tool.write_file(new, "1")
+        file_tool.write_file(gone, "1")
+        file_tool.flush_overlay(workspace)
+        file_tool.write_file(new, "2")
+        file_tool.delete_file(gone)
+
+        result = file_tool.close_overlay(workspace)
+
+        assert result["changes"] == [
+            {"path": os.path.realpath(new), "action": "created", "bytes": 1}
+        ]
+        assert not os.path.exists(gone)
+        assert file_tool.flush_overlay(workspace) is None
+
+    def test_flushed_changes_reference_artifacts(self, workspace):
+        """Test flushed files keep their old and new content by hash."""
+        with tempfile.TemporaryDirectory() as root:
+            store = ArtifactStore(LocalArtifactBackend(root))
+            file_tool = FileTool(artifact_store=store)
+            overlay = file_tool.open_overlay(workspace)
+            app = os.path.join(workspace, "app.ts")
+            file_tool.write_file(app, "const a = 2;\n")
+            file_tool.flush_overlay(workspace)
+            file_tool.delete_file(app)
+            file_tool.flush_overlay(workspace)
+
+            change = overlay.flushed_changes()[0]
+            assert change["action"] == "deleted"
+            store.copy_to(change["previous_sha256"], app)
+            with open(app) as f:
+                assert f.read() == "const a = 1;\nconst b = 2;\n"
+
+    def test_artifacts_released_on_close(self, workspace):
+        """Test closing an overlay gives back the references its flushes took."""
+        with tempfile.TemporaryDirectory() as root:
+            store = ArtifactStore(LocalArtifactBackend(root))
+            file_tool = FileTool(artifact_store=store)
+            file_tool.open_overlay(workspace)
+            app = os.path.join(workspace, "app.ts")
+            file_tool.write_file(app, "const a = 2;\n")
+            file_tool.flush_overlay(workspace)
+            file_tool.write_file(app, "const a = 3;\n")
+
+            change = file_tool.close_overlay(workspace)["changes"][0]
+
+            assert store.refcount(change["previous_sha256"]) == 0
+            assert store.refcount(change["sha256"]) == 0
+            assert [files for _, _, files in os.walk(root) if files] == []
+
+    def test_unchanged_content_not_flushed(self, workspace):
+        """Test files rewritten with their old content are not reported."""
+        file_tool = FileTool()
+        file_tool.open_overlay(workspace)
+        app = os.path.join(workspace, "app.ts")
+        file_tool.write_file(app, "changed")
+        file_tool.write_file(app, "const a = 1;\nconst b = 2;\n")
+
+        assert file_tool.flush_overlay(workspace)["changes"] == []
+
+    def test_large_overlay_flushed_automatically(self, workspace):
+        """Test an overlay holding too much content is flushed on write."""
+        file_tool = FileTool()
+        file_tool.MAX_OVERLAY_BYTES = 10
+        file_tool.open_overlay(workspace)
+        app = os.path.join(workspace, "app.ts")
+
+        file_tool.write_file(app, "small")
+        assert os.path.getsize(app) != 5
+        file_tool.write_file(app, "more than ten bytes", mode="a")
+        with open(app) as f:
+            assert f.read() == "smallmore than ten bytes"
+
+    def test_files_outside_overlay_go_to_disk(self, workspace):
+        """Test batch writes outside the overlay's root are not held back."""
+        file_tool = FileTool()
+        file_tool.open_overlay(workspace)
+        with tempfile.TemporaryDirectory() as other:
+            result = file_tool.batch(
+                [
+                    {"operation": "write", "file_path": "a/in.ts", "content": "x"},
+                    {
+                        "operation": "write",
+                        "file_path": os.path.join(other, "out.ts"),
+                        "content": "y",
+                    },
+                ],
+                cwd=workspace,
+            )
+
+            assert result["success"] is True
+            assert os.path.exists(os.path.join(other, "out.ts"))
+            assert not os.path.exists(os.path.join(workspace, "a"))
+
+
+class TestFileToolReadCache:
+    """Test cases for caching reads of a run's files."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Create a workspace with one file on disk."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "app.ts"), "w") as f:
+                f.write("const a = 1;\n")
+            yield tmpdir
+
+    def test_reread_served_until_file_changes(self, workspace):
+        """Test rereads hit the cache and a change on disk is noticed."""
+        file_tool = FileTool()
+        cache = file_tool.open_read_cache(workspace)
+        app = os.path.join(workspace, "app.ts")
+
+        first = file_tool.read_file(app)
+        second = file_tool.read_file(app)
+        with open(app, "w") as f:
+            f.write("const a = 22;\n")  # changed behind the tool's back
+        third = file_tool.read_file(app)
+
+        assert first == second
+        assert third["message"] == "const a = 22;\n"
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    def test_writes_and_deletes_invalidate(self, workspace):
+        """Test a write or delete through the tool drops the cached read."""
+        file_tool = FileTool()
+        cache = file_tool.open_read_cache(workspace)
+        app = os.path.join(workspace, "app.ts")
+        file_tool.read_file(app)
+
+        file_tool.batch([{"operation": "write", "file_path": app, "content": "b"}])
+        assert file_tool.read_file(app)["message"] == "b"
+        file_tool.delete_file(app)
+
+        assert "not found" in file_tool.read_file(app)["message"]
+        assert cache.get_stats()["invalidations"] == 2
+
+    def test_unchanged_reread_skipped(self, workspace):
+        """Test a repeated read is answered with a note unless forced."""
+        file_tool = FileTool()
+        file_tool.open_read_cache(workspace, skip_unchanged=True)
+        app = os.path.join(workspace, "app.ts")
+        file_tool.read_file(app)
+
+        result = file_tool.read_file(app)
+
+        assert result["unchanged"] is True
+        assert "unchanged since it was last read" in result["message"]
+        assert file_tool.read_file(app, offset=0, limit=1)["message"] == (
+            "const a = 1;\n"
+        )
+        forced = file_tool.batch(
+            [{"operation": "read", "file_path": app, "force": True}]
+        )
+        assert forced["results"][0]["message"] == "const a = 1;\n"
+
+    def test_close_and_eviction(self, workspace):
+        """Test results beyond the size limit are evicted, and close reports."""
+        file_tool = FileTool()
+        cache = file_tool.open_read_cache(workspace)
+        cache.max_bytes = 20
+        for name in ("a.ts", "b.ts"):
+            file_tool.write_file(os.path.join(workspace, name), "x" * 15)
+            file_tool.read_file(os.path.join(workspace, name))
+
+        stats = file_tool.close_read_cache(workspace)
+
+        assert (stats["files"], stats["bytes"], stats["evictions"]) == (1, 15, 1)
+        assert file_tool.close_read_cache(workspace) is None
+
+
 class TestFileToolDelete:
     """Test cases for FileTool delete operations."""
 
@@ -3,8 +3,28 @@ import json
 import tempfile
 import os
 from unittest.mock import patch
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain.messages import AIMessage, ToolMessage
+from backend.services.agent.budget import Budget
 from backend.services.agent.frontend_agent import FrontendAgent
 from backend.services.tool.command_tool import CommandTool
+from backend.services.tool.workspace_manager import WorkspaceManager
+
+
+class FakeToolCallingModel(GenericFakeChatModel):
+    """Fake chat model that replays messages and accepts bound tools."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def tool_call_message(command, call_id):
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "command_executor", "args": {"command": command}, "id": call_id}
+        ],
+    )
 
 
 class TestFrontendAgentHandleToolCall:
@@ -15,8 +35,9 @@ class TestFrontendAgentHandleToolCall:
         """Create a FrontendAgent instance for testing."""
         with patch("backend.services.agent.frontend_agent.DeepseekAI"):
             with patch("backend.services.agent.frontend_agent.SystemPromptHelper"):
-                agent = FrontendAgent()
-                return agent
+                with patch("backend.services.agent.frontend_agent.command_audit_log"):
+                    agent = FrontendAgent()
+                    return agent
 
     def test_handle_tool_call_with_valid_command(self, frontend_agent):
         """Test tool call with a valid simple command."""
@@ -87,6 +108,92 @@ class TestFrontendAgentHandleToolCall:
         assert "error" in result_dict
         assert "Invalid input format" in result_dict["error"]
 
+    def test_handle_tool_call_batch(self, frontend_agent):
+        """Test the batch tool runs every command and auto-detects shell mode."""
+        tool_input = {
+            "commands": [
+                {"command": "echo 'one' && echo 'two'"},
+                {"command": "echo three"},
+            ]
+        }
+
+        result = frontend_agent._handle_tool_call("command_batch_executor", tool_input)
+        result_dict = json.loads(result)
+
+        assert result_dict["success"] is True
+        assert result_dict["results"][0]["stdout"] == "one\ntwo\n"
+        assert result_dict["results"][1]["stdout"] == "three\n"
+
+    def test_handle_tool_call_diagnostics(self, frontend_agent):
+        """Test the diagnostics tool reports checkers missing from the project."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "index.ts"), "w") as f:
+                f.write("export {};\n")
+
+            result = frontend_agent._handle_tool_call(
+                "code_diagnostics", {"cwd": tmpdir, "checkers": ["tsc"]}
+            )
+        result_dict = json.loads(result)
+
+        assert result_dict["files_checked"] == ["index.ts"]
+        assert "not installed" in result_dict["failures"]["tsc"]
+
+    def test_handle_tool_call_file_batch(self, frontend_agent):
+        """Test the file batch tool writes and reads files in one call."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tool_input = {
+                "cwd": tmpdir,
+                "operations": [
+                    {"operation": "write", "file_path": "src/a.ts", "content": "a"},
+                    {"operation": "read", "file_path": "src/a.ts"},
+                ],
+            }
+
+            result = frontend_agent._handle_tool_call("file_batch", tool_input)
+        result_dict = json.loads(result)
+
+        assert result_dict["success"] is True
+        assert result_dict["results"][1]["message"] == "a"
+
+    def test_handle_tool_call_file_patcher(self, frontend_agent):
+        """Test the file patcher edits a file relative to cwd."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "app.ts"), "w") as f:
+                f.write("const a = 1;\nconst b = 2;\n")
+            tool_input = {
+                "cwd": tmpdir,
+                "file_path": "app.ts",
+                "diff": "@@ -2,1 +2,1 @@\n-const b = 2;\n+const b = 3;\n",
+            }
+
+            result = frontend_agent._handle_tool_call("file_patcher", tool_input)
+            with open(os.path.join(tmpdir, "app.ts")) as f:
+                content = f.read()
+        result_dict = json.loads(result)
+
+        assert result_dict["success"] is True
+        assert content == "const a = 1;\nconst b = 3;\n"
+
+    def test_handle_tool_call_code_grep_sees_command_output(self, frontend_agent):
+        """Test files created by a command are searchable afterwards."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            frontend_agent._handle_tool_call(
+                "code_grep", {"cwd": tmpdir, "pattern": "answer"}
+            )
+            frontend_agent._handle_tool_call(
+                "command_executor",
+                {"command": "echo 'const answer = 42;' > app.ts", "cwd": tmpdir},
+            )
+
+            result = frontend_agent._handle_tool_call(
+                "code_grep", {"cwd": tmpdir, "pattern": "answer"}
+            )
+        result_dict = json.loads(result)
+
+        assert result_dict["matches"] == [
+            {"file": "app.ts", "line": 1, "text": "const answer = 42;"}
+        ]
+
     def test_handle_tool_call_unknown_tool(self, frontend_agent):
         """Test tool call with unknown tool name."""
         tool_input = {"command": "echo test"}
@@ -240,6 +347,256 @@ class TestFrontendAgentHandleToolCall:
                 assert "blue-600" in content
 
 
+class TestFrontendAgentStartTask:
+    """Test cases for the FrontendAgent execution loop."""
+
+    def create_agent(self, responses, **kwargs):
+        with patch("backend.services.agent.frontend_agent.DeepseekAI"):
+            with patch("backend.services.agent.frontend_agent.SystemPromptHelper"):
+                with patch("backend.services.agent.frontend_agent.command_audit_log"):
+                    agent = FrontendAgent(**kwargs)
+        agent.system_prompt = "You are a frontend developer."
+        agent.system_message = "Build the UI."
+        agent.model = FakeToolCallingModel(messages=iter(responses))
+        return agent
+
+    def test_tool_executed_once_per_call(self):
+        """Test each tool call runs once and the loop ends on a final answer."""
+        agent = self.create_agent(
+            [tool_call_message("echo 'hello'", "call_1"), AIMessage(content="Done")]
+        )
+        with patch.object(
+            agent, "_handle_tool_call", wraps=agent._handle_tool_call
+        ) as handle_tool_call:
+            result = agent.start_task("Say hello")
+
+        messages = result["messages"]
+        tool_messages = [m for m in messages if isinstance(m, ToolMessage)]
+        assert handle_tool_call.call_count == 1
+        assert len(tool_messages) == 1
+        assert "hello" in json.loads(tool_messages[0].content)["stdout"]
+        assert sum(isinstance(m, AIMessage) for m in messages) == 2
+        assert messages[-1].content == "Done"
+
+    def test_commands_share_shell_session(self):
+        """Test commands of one run share a shell that is closed afterwards."""
+        agent = self.create_agent(
+            [
+                tool_call_message("cd /tmp && export STEP=one", "call_1"),
+                tool_call_message('echo "$STEP" && pwd', "call_2"),
+                AIMessage(content="Done"),
+            ]
+        )
+        result = agent.start_task("Use the shell")
+
+        tool_messages = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+        assert json.loads(tool_messages[1].content)["stdout"] == "one\n/tmp\n"
+        assert agent.command_tool._sessions == {}
+        assert result["leaked_processes"] == []
+
+    def test_background_process_reaped_after_run(self):
+        """Test processes a run leaves running are terminated and reported."""
+        agent = self.create_agent(
+            [
+                tool_call_message("sleep 30 > /dev/null 2>&1 &", "call_1"),
+                AIMessage(content="Done"),
+            ]
+        )
+        result = agent.start_task("Start a server")
+
+        assert [p["command"] for p in result["leaked_processes"]] == ["sleep 30"]
+
+    def test_run_starts_in_template_workspace(self):
+        """Test a run gets its own workspace cloned from the template."""
+        agent = self.create_agent(
+            [
+                tool_call_message("cat package.json && pwd", "call_1"),
+                AIMessage(content="Done"),
+            ]
+        )
+        with tempfile.TemporaryDirectory() as root_dir:
+            with tempfile.TemporaryDirectory() as project_dir:
+                with open(os.path.join(project_dir, "package.json"), "w") as f:
+                    f.write('{"name": "app"}')
+                agent.workspace_manager = WorkspaceManager(root_dir)
+                agent.workspace_manager.add_template("react", project_dir)
+            agent.workspace_template = "react"
+
+            result = agent.start_task("Build a page")
+
+            tool_messages = [
+                m for m in result["messages"] if isinstance(m, ToolMessage)
+            ]
+            stdout = json.loads(tool_messages[0].content)["stdout"]
+            assert stdout == f'{{"name": "app"}}{result["workspace"]}\n'
+            assert os.path.dirname(result["workspace"]) == (
+                agent.workspace_manager.workspaces_dir
+            )
+
+    def create_workspace_agent(self, responses, root_dir):
+        agent = self.create_agent(responses)
+        agent.workspace_manager = WorkspaceManager(root_dir)
+        agent.workspace_template = None
+        agent.file_overlay = True
+        return agent
+
+    def test_file_overlay_flushed_before_commands(self):
+        """Test file changes kept in memory reach disk before a command runs."""
+        write = AIMessage(
+            content="",
+            tool_calls=[
+                {
+                    "name": "file_batch",
+                    "args": {
+                        "operations": [
+                            {
+                                "operation": "write",
+                                "file_path": "src/a.ts",
+                                "content": "export const a = 1;\n",
+                            }
+                        ]
+                    },
+                    "id": "call_1",
+                }
+            ],
+        )
+        with tempfile.TemporaryDirectory() as root_dir:
+            agent = self.create_workspace_agent(
+                [
+                    write,
+                    tool_call_message("cat src/a.ts", "call_2"),
+                    AIMessage(content="Done"),
+                ],
+                root_dir,
+            )
+
+            result = agent.start_task("Write a module")
+
+            tool_messages = [
+                m for m in result["messages"] if isinstance(m, ToolMessage)
+            ]
+            stdout = json.loads(tool_messages[1].content)["stdout"]
+            assert stdout == "export const a = 1;\n"
+            assert result["file_changes"] == [
+                {
+                    "path": os.path.join(
+                        os.path.realpath(result["workspace"]), "src", "a.ts"
+                    ),
+                    "action": "created",
+                    "bytes": 20,
+                }
+            ]
+            assert agent.file_tool._overlays == {}
+
+    def test_workspace_changes_after_command(self):
+        """Test files a command writes are reported by the change feed."""
+        changes = AIMessage(
+            content="",
+            tool_calls=[{"name": "workspace_changes", "args": {}, "id": "call_2"}],
+        )
+        with tempfile.TemporaryDirectory() as root_dir:
+            agent = self.create_workspace_agent(
+                [
+                    tool_call_message("mkdir dist && echo x > dist/app.js", "call_1"),
+                    changes,
+                    AIMessage(content="Done"),
+                ],
+                root_dir,
+            )
+
+            result = agent.start_task("Build the app")
+
+            tool_messages = [
+                m for m in result["messages"] if isinstance(m, ToolMessage)
+            ]
+            output = json.loads(tool_messages[1].content)
+            assert output["changes"] == [
+                {"path": "dist/app.js", "action": "created", "cursor": 1}
+            ]
+            assert agent.change_feed_tool._feeds == {}
+
+    def test_file_overlay_discarded_when_run_fails(self):
+        """Test file changes of a failed run are dropped."""
+        with tempfile.TemporaryDirectory() as root_dir:
+            agent = self.create_workspace_agent([], root_dir)
+
+            def failing_run(*args, **kwargs):
+                agent._handle_tool_call(
+                    "file_batch",
+                    {
+                        "operations": [
+                            {"operation": "write", "file_path": "a.ts", "content": "x"}
+                        ]
+                    },
+                )
+                raise RuntimeError("model unavailable")
+
+            with patch.object(agent, "_invoke_agent", side_effect=failing_run):
+                with pytest.raises(RuntimeError):
+                    agent.start_task("Write a module")
+
+            workspaces = os.listdir(agent.workspace_manager.workspaces_dir)
+            workspace = os.path.join(
+                agent.workspace_manager.workspaces_dir, *workspaces
+            )
+            assert os.listdir(workspace) == []
+
+    def test_repeated_tool_call_stops_loop(self):
+        """Test identical repeated tool calls are detected and stop the run."""
+        agent = self.create_agent(
+            [tool_call_message("echo 'again'", f"call_{i}") for i in range(20)],
+            max_tool_repeats=2,
+        )
+        with patch.object(
+            agent, "_handle_tool_call", wraps=agent._handle_tool_call
+        ) as handle_tool_call:
+            result = agent.start_task("Loop forever")
+
+        assert handle_tool_call.call_count == 2
+        assert "repeated" in result["messages"][-1].content
+
+    def test_max_iterations_stops_loop(self):
+        """Test the run ends once max_iterations LLM calls are made."""
+        agent = self.create_agent(
+            [tool_call_message(f"echo {i}", f"call_{i}") for i in range(20)],
+            max_iterations=3,
+        )
+        with patch.object(
+            agent, "_handle_tool_call", wraps=agent._handle_tool_call
+        ) as handle_tool_call:
+            result = agent.start_task("Keep going")
+
+        assert handle_tool_call.call_count == 3
+        assert "limit" in result["messages"][-1].content.lower()
+
+    def test_budget_stops_loop(self):
+        """Test the run ends early when its budget is exhausted."""
+        agent = self.create_agent(
+            [tool_call_message(f"echo {i}", f"call_{i}") for i in range(20)]
+        )
+        with patch.object(
+            agent, "_handle_tool_call", wraps=agent._handle_tool_call
+        ) as handle_tool_call:
+            result = agent.start_task("Keep going", budget=Budget(max_tool_calls=2))
+
+        assert handle_tool_call.call_count == 2
+        assert result["budget"]["tool_calls"] == 2
+        assert "tool call limit" in result["budget"]["exceeded"]
+        assert "budget exceeded" in result["messages"][-1].content
+        assert result["messages"][-1].name == "budget"
+
+    def test_budget_usage_reported(self):
+        """Test budget usage is returned with the result."""
+        agent = self.create_agent(
+            [tool_call_message("echo 'hello'", "call_1"), AIMessage(content="Done")]
+        )
+        result = agent.start_task("Say hello")
+
+        assert result["budget"]["llm_calls"] == 2
+        assert result["budget"]["tool_calls"] == 1
+        assert result["budget"]["exceeded"] is None
+
+
 class TestCommandToolIntegration:
     """Integration tests for CommandTool with shell operator detection."""
 
@@ -0,0 +1,67 @@
+import pytest
+import base64
+import os
+import tempfile
+from unittest.mock import patch
+from langchain.messages import AIMessage, HumanMessage
+from backend.services.agent.graphic_designer_agent import GraphicDesignerAgent
+from backend.services.tool.asset_writer import AssetWriter
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 64
+
+
+class TestGraphicDesignerAgentAssets:
+    """Test cases for storing the images a GraphicDesignerAgent generates."""
+
+    @pytest.fixture
+    def agent(self):
+        """Create a GraphicDesignerAgent writing assets to a directory."""
+        with patch("backend.services.agent.graphic_designer_agent.OpenAI"):
+            with patch(
+                "backend.services.agent.graphic_designer_agent.SystemPromptHelper"
+            ):
+                agent = GraphicDesignerAgent()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent.asset_writer = AssetWriter(directory=tmpdir)
+            yield agent
+
+    def test_images_replaced_by_references(self, agent):
+        """Test generated images are stored and their payloads dropped."""
+        payload = base64.b64encode(PNG).decode()
+        message = AIMessage(
+            content=[
+                {"type": "text", "text": "Here is the logo"},
+                {
+                    "type": "image_generation_call",
+                    "id": "ig_1",
+                    "result": payload,
+                    "output_format": "png",
+                },
+                {"type": "image", "base64": payload, "mime_type": "image/webp"},
+            ]
+        )
+
+        assets = agent._store_images([HumanMessage(content="Draw a logo"), message])
+
+        assert [os.path.basename(asset["uri"]) for asset in assets][0] == "ig_1.png"
+        assert assets[1]["uri"].endswith(".webp")
+        assert all(asset["bytes"] == len(PNG) for asset in assets)
+        assert "result" not in message.content[1]
+        assert message.content[1]["asset"] == assets[0]
+        assert "base64" not in message.content[2]
+
+    def test_invalid_image_kept(self, agent):
+        """Test a payload that cannot be decoded is left in the message."""
+        message = AIMessage(
+            content="",
+            additional_kwargs={
+                "tool_outputs": [{"type": "image_generation_call", "result": "x"}]
+            },
+        )
+
+        assert agent._store_images([message]) == []
+        assert message.additional_kwargs["tool_outputs"][0]["result"] == "x"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
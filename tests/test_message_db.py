@@ -0,0 +1,120 @@
+import pytest
+import base64
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+from unittest.mock import patch
+from uuid import uuid4
+from langchain.messages import AIMessage
+from backend.config.enum import TeamEnum
+from backend.services.aws.message_db import Message, MessageDB
+from backend.services.exception.app_exception import AppException
+from backend.services.tool.artifact_store import (
+    ArtifactNotFound,
+    ArtifactStore,
+    LocalArtifactBackend,
+)
+
+
+def make_message():
+    return Message(
+        name="plan",
+        agent=TeamEnum.PLANNER.value,
+        content="Plan ready",
+        messages=[],
+        ref_id={"id": str(uuid4())},
+        created_at=datetime.now(timezone.utc),
+        llm_model=None,
+    )
+
+
+class TestMessageDB:
+    """Test cases for MessageDB attachments."""
+
+    @pytest.fixture
+    def store(self):
+        """Create an artifact store in a temporary directory."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield ArtifactStore(LocalArtifactBackend(tmpdir))
+
+    @pytest.fixture
+    def message_db(self, store):
+        """Create a MessageDB with a mocked DynamoDB manager."""
+        with patch("backend.services.aws.message_db.DbManager"):
+            yield MessageDB(TeamEnum.PLANNER, artifact_store=store)
+
+    def saved_item(self, message_db):
+        return message_db.db_manager.add_item.call_args.args[0]
+
+    def test_attachment_stored_on_save(self, message_db, store):
+        """Test an attachment is stored by hash when its message is saved."""
+        message = make_message()
+
+        message_db.add_attachment(message, b"PNG data", "logo.png", "image/png")
+        assert store.stats["stored"] == 0
+        message_db.save_message(message)
+
+        (attachment,) = self.saved_item(message_db)["attachments"]
+        assert attachment["name"] == "logo.png"
+        assert attachment["bytes"] == 8
+        assert message.attachments == [attachment]
+        assert message_db.get_attachment(attachment) == b"PNG data"
+
+    def test_failed_save_releases_attachments(self, message_db, store):
+        """Test the attachments of a message that could not be saved are released."""
+        message = make_message()
+        message_db.add_attachment(message, b"PNG data", "logo.png", "image/png")
+        message_db.db_manager.add_item.side_effect = Exception("down")
+
+        with pytest.raises(AppException):
+            message_db.save_message(message)
+
+        assert message.attachments == []
+        assert store.stats["stored"] == 1
+        with pytest.raises(ArtifactNotFound):
+            store.get(hashlib.sha256(b"PNG data").hexdigest())
+
+    def test_delete_releases_attachments(self, message_db, store):
+        """Test deleting a message releases its attachments."""
+        message = make_message()
+        message_db.add_attachment(message, b"PNG data", "logo.png", "image/png")
+        message_db.save_message(message)
+        message_db.db_manager.get_item.return_value = self.saved_item(message_db)
+
+        message_db.delete_message(message.name)
+
+        with pytest.raises(ArtifactNotFound):
+            message_db.get_attachment(message.attachments[0])
+
+    def test_agent_result_images_saved_as_attachments(self, message_db):
+        """Test base64 image blocks of an agent result are moved to attachments."""
+        image = base64.b64encode(b"PNG data").decode()
+        result = {
+            "ref_id": {"id": str(uuid4())},
+            "messages": [
+                AIMessage(
+                    content=[
+                        {"type": "text", "text": "Here is the logo"},
+                        {"type": "image", "base64": image, "mime_type": "image/png"},
+                    ],
+                    name="designer",
+                )
+            ],
+        }
+
+        message_db.save_message_from_agent_result(result)
+
+        item = self.saved_item(message_db)
+        (attachment,) = item["attachments"]
+        block = item["messages"][0]["content"][1]
+        assert block == {
+            "type": "image",
+            "mime_type": "image/png",
+            "attachment": attachment["name"],
+        }
+        assert attachment["media_type"] == "image/png"
+        assert message_db.get_attachment(attachment) == b"PNG data"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,180 @@
+import pytest
+import json
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+from langchain.messages import AIMessageChunk
+from backend.services.agent.planner_agent import PlannedTaskStream
+from backend.services.aws.task_db import (
+    Task,
+    PlannedTaskOutput,
+    PlannedTaskOutputResponse,
+)
+from backend.services.helper.structured_output.json_stream_parser import (
+    JsonStreamParser,
+)
+
+
+def planned_task(feature="Header"):
+    return {
+        "task_id": str(uuid4()),
+        "feature": feature,
+        "description": f'Build the {feature} with {{braces}} and "quotes"',
+        "dependencies": [],
+        "status": "Planned",
+        "priority": "High",
+        "assigned_to": "FRONTEND_DEVELOPER",
+    }
+
+
+def chunks(text, size):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+class TestJsonStreamParser:
+    """Test cases for JsonStreamParser."""
+
+    def test_objects_emitted_as_they_complete(self):
+        """Test each array item is returned once its closing brace arrives."""
+        tasks = [planned_task("Header"), planned_task("Footer")]
+        document = json.dumps({"tasks": tasks})
+        first_end = document.index(json.dumps(tasks[0])) + len(json.dumps(tasks[0]))
+        parser = JsonStreamParser()
+
+        assert parser.feed(document[: first_end - 1]) == []
+        first = parser.feed(document[first_end - 1 : first_end])
+        rest = parser.feed(document[first_end:])
+
+        assert [json.loads(item) for item in first] == [tasks[0]]
+        assert [json.loads(item) for item in rest] == [tasks[1]]
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 64])
+    def test_chunk_boundaries(self, size):
+        """Test parsing is independent of how the text is chunked."""
+        tasks = [planned_task(f"Page {i}") for i in range(3)]
+        parser = JsonStreamParser()
+
+        items = []
+        for chunk in chunks(json.dumps({"tasks": tasks}, indent=2), size):
+            items.extend(parser.feed(chunk))
+
+        assert [json.loads(item) for item in items] == tasks
+
+    def test_nested_objects_stay_in_item(self):
+        """Test nested objects are part of their item, not separate items."""
+        document = '{"tasks": [{"a": {"b": [1, {"c": "}"}]}}, {"d": 2}]}'
+
+        items = JsonStreamParser().feed(document)
+
+        assert [json.loads(item) for item in items] == [
+            {"a": {"b": [1, {"c": "}"}]}},
+            {"d": 2},
+        ]
+
+
+class TestPlannedTaskStream:
+    """Test cases for PlannedTaskStream persistence while streaming."""
+
+    @pytest.fixture
+    def task_db(self):
+        """Create a TaskDB mock that returns saved tasks."""
+        task_db = MagicMock()
+        task_db.save_task.side_effect = Task.from_parsed_response
+        return task_db
+
+    def tool_call_chunks(self, text, size=5):
+        pieces = chunks(text, size)
+        return [
+            AIMessageChunk(
+                content="",
+                id="run-1",
+                tool_call_chunks=[
+                    {
+                        "name": (
+                            PlannedTaskStream.RESPONSE_TOOL_NAME if i == 0 else None
+                        ),
+                        "args": piece,
+                        "id": "call_1" if i == 0 else None,
+                        "index": 0,
+                    }
+                ],
+            )
+            for i, piece in enumerate(pieces)
+        ]
+
+    def test_tasks_saved_before_stream_ends(self, task_db):
+        """Test the first task is saved and published before the second arrives."""
+        tasks = [planned_task("Header"), planned_task("Footer")]
+        stream = PlannedTaskStream(task_db)
+        published = []
+
+        with patch(
+            "backend.services.agent.planner_agent.task_events.publish_task_available",
+            side_effect=published.append,
+        ):
+            message_chunks = self.tool_call_chunks(json.dumps({"tasks": tasks}))
+            saved_after_chunk = []
+            for chunk in message_chunks:
+                stream.on_message_chunk(chunk)
+                saved_after_chunk.append(task_db.save_task.call_count)
+
+        assert task_db.save_task.call_count == 2
+        assert saved_after_chunk.index(1) < saved_after_chunk.index(2)
+        assert saved_after_chunk.index(1) < len(message_chunks) - 1
+        assert [str(task.task_id) for task in published] == [
+            task["task_id"] for task in tasks
+        ]
+
+    def test_other_tool_calls_ignored(self, task_db):
+        """Test arguments of other tool calls are not parsed as tasks."""
+        stream = PlannedTaskStream(task_db)
+        chunk = AIMessageChunk(
+            content="",
+            id="run-1",
+            tool_call_chunks=[
+                {
+                    "name": "list_all_tasks",
+                    "args": json.dumps({"tasks": [planned_task()]}),
+                    "id": "call_1",
+                    "index": 0,
+                }
+            ],
+        )
+
+        stream.on_message_chunk(chunk)
+
+        task_db.save_task.assert_not_called()
+
+    def test_invalid_task_skipped(self, task_db):
+        """Test objects that fail validation are skipped."""
+        invalid = planned_task()
+        del invalid["feature"]
+        stream = PlannedTaskStream(task_db)
+
+        for chunk in self.tool_call_chunks(
+            json.dumps({"tasks": [invalid, planned_task("Footer")]})
+        ):
+            stream.on_message_chunk(chunk)
+
+        assert task_db.save_task.call_count == 1
+
+    def test_save_remaining_skips_streamed_tasks(self, task_db):
+        """Test the final response only saves tasks missed while streaming."""
+        tasks = [planned_task("Header"), planned_task("Footer")]
+        stream = PlannedTaskStream(task_db)
+        for chunk in self.tool_call_chunks(json.dumps({"tasks": tasks[:1]})):
+            stream.on_message_chunk(chunk)
+
+        stream.save_remaining(
+            PlannedTaskOutputResponse(
+                tasks=[PlannedTaskOutput.model_validate(task) for task in tasks]
+            )
+        )
+
+        saved_ids = [
+            str(call.args[0].task_id) for call in task_db.save_task.call_args_list
+        ]
+        assert saved_ids == [task["task_id"] for task in tasks]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
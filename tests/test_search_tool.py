@@ -0,0 +1,84 @@
+import pytest
+import os
+import tempfile
+from backend.services.tool.file_tool import FileTool
+from backend.services.tool.search_tool import SearchTool
+
+
+class TestSearchTool:
+    """Test cases for SearchTool."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Create a workspace with one component."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "src"))
+            with open(os.path.join(tmpdir, "src", "Card.tsx"), "w") as f:
+                f.write("export function Card() {\n  return null;\n}\n")
+            yield tmpdir
+
+    def test_invoke_tools(self, workspace):
+        """Test glob, grep and symbol lookup through their invoke methods."""
+        tool = SearchTool()
+
+        glob = tool.invoke_glob({"cwd": workspace, "pattern": "*.tsx"})
+        grep = tool.invoke_grep({"cwd": workspace, "pattern": "return null"})
+        symbols = tool.invoke_symbols({"cwd": workspace, "query": "Card"})
+
+        assert glob == {
+            "success": True,
+            "files": ["src/Card.tsx"],
+            "total": 1,
+            "truncated": False,
+        }
+        assert grep["matches"] == [
+            {"file": "src/Card.tsx", "line": 2, "text": "return null;"}
+        ]
+        assert symbols["symbols"][0]["kind"] == "function"
+
+    def test_file_tool_writes_update_index(self, workspace):
+        """Test writes, patches and deletes through FileTool are searchable."""
+        tool = SearchTool()
+        file_tool = FileTool(change_listener=tool.file_changed)
+        assert tool.find_symbols(workspace, "Header")["total"] == 0
+        path = os.path.join(workspace, "src", "Header.tsx")
+
+        file_tool.write_file(path, "export const Header = () => null;\n")
+        assert tool.find_symbols(workspace, "Header")["total"] == 1
+
+        file_tool.patch_file(path, edits=[{"search": "Header", "replace": "Top"}])
+        assert tool.find_symbols(workspace, "Header")["total"] == 0
+        assert tool.find_symbols(workspace, "Top")["total"] == 1
+
+        file_tool.delete_file(path)
+        assert tool.find_symbols(workspace, "Top")["total"] == 0
+        assert tool.index_for(workspace).stale is False
+
+    def test_mark_stale_picks_up_other_changes(self, workspace):
+        """Test changes made outside FileTool show after mark_stale."""
+        tool = SearchTool()
+        tool.glob(workspace, "*")
+        with open(os.path.join(workspace, "src", "util.ts"), "w") as f:
+            f.write("export const VERSION = 1;\n")
+
+        tool.mark_stale(workspace)
+
+        assert tool.grep(workspace, "VERSION")["matches"][0]["file"] == "src/util.ts"
+
+    def test_invalid_input(self, workspace):
+        """Test invalid input returns an error instead of raising."""
+        tool = SearchTool()
+
+        assert "cwd" in tool.invoke_glob({"pattern": "*"})["error"]
+        assert "pattern" in tool.invoke_grep({"cwd": workspace})["error"]
+        limit = tool.invoke_symbols({"cwd": workspace, "query": "a", "limit": 0})
+        assert "limit" in limit["error"]
+        kind = tool.invoke_symbols({"cwd": workspace, "query": "a", "kind": "module"})
+        assert "kind" in kind["error"]
+        result = tool.invoke_grep({"cwd": workspace, "pattern": "(", "regex": True})
+        assert result["success"] is False
+        assert "regular expression" in result["error"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
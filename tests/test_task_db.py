@@ -0,0 +1,41 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import patch
+from uuid import uuid4
+from backend.config.enum import TeamEnum
+from backend.services.aws.task_db import Task, TaskDB, StatusLevel, PriorityLevel
+
+
+class TestTaskDB:
+    """Test cases for TaskDB."""
+
+    @pytest.fixture
+    def task_db(self):
+        """Create a TaskDB with a mocked DynamoDB manager."""
+        with patch("backend.services.aws.task_db.DbManager"):
+            yield TaskDB()
+
+    def test_update_task_names_reserved_attributes(self, task_db):
+        """Test the reserved word 'status' is updated through an attribute name."""
+        task = Task(
+            task_id=uuid4(),
+            feature="Header",
+            description="Create the header component",
+            dependencies=[uuid4()],
+            status=StatusLevel.DONE,
+            priority=PriorityLevel.HIGH,
+            created_at=datetime.now(timezone.utc),
+            assigned_to=TeamEnum.FRONTEND_DEVELOPER,
+        )
+
+        task_db.update_task(task)
+
+        update = task_db.db_manager.update_item.call_args.kwargs
+        assignments = update["UpdateExpression"].split("SET", 1)[1].split(",")
+        assert "#status = :status" in [a.strip() for a in assignments]
+        assert update["ExpressionAttributeNames"] == {"#status": "status"}
+        assert update["ExpressionAttributeValues"][":status"] == StatusLevel.DONE
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,258 @@
+import pytest
+import threading
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+from langchain.messages import AIMessage, ToolMessage
+from backend.services.agent.middleware.budget_middleware import STOP_MESSAGE_NAME
+from backend.config.enum import TeamEnum
+from backend.services.aws.task_db import Task, StatusLevel, PriorityLevel
+from backend.worker_service import WorkerService, WorkerStatus
+
+
+def make_task(
+    status=StatusLevel.PLANNED,
+    assigned_to=TeamEnum.FRONTEND_DEVELOPER,
+    dependencies=(),
+):
+    return Task(
+        task_id=uuid4(),
+        feature="Header",
+        description="Create the header component",
+        dependencies=list(dependencies),
+        status=status,
+        priority=PriorityLevel.HIGH,
+        created_at=datetime.now(timezone.utc),
+        assigned_to=assigned_to,
+    )
+
+
+class TestWorkerService:
+    """Test cases for WorkerService polling, health and shutdown."""
+
+    @pytest.fixture
+    def registry(self):
+        """Patch the agent registry used by the worker."""
+        with patch("backend.worker_service.agent_registry") as registry:
+            registry.agent_classes = {TeamEnum.FRONTEND_DEVELOPER: object}
+            yield registry
+
+    @pytest.fixture
+    def worker(self, registry):
+        """Create a WorkerService with a mocked TaskDB and executor."""
+        worker = WorkerService(poll_interval=0.01, max_workers=2)
+        worker.task_db = MagicMock()
+        worker._executor = MagicMock()
+        return worker
+
+    def test_invalid_configuration(self):
+        """Test invalid poll interval and worker count are rejected."""
+        with pytest.raises(ValueError):
+            WorkerService(poll_interval=0)
+        with pytest.raises(ValueError):
+            WorkerService(max_workers=0)
+        with pytest.raises(ValueError):
+            WorkerService(max_attempts=0)
+
+    def test_poll_submits_only_runnable_tasks(self, worker):
+        """Test only planned tasks for registered teams are submitted."""
+        worker.task_db.get_tasks.return_value = [
+            make_task(),
+            make_task(status=StatusLevel.DONE),
+            make_task(assigned_to=TeamEnum.RESEARCHER),
+        ]
+
+        assert worker.poll_once() == 1
+        assert worker._executor.submit.call_count == 1
+
+    def test_poll_waits_for_dependencies(self, worker):
+        """Test a task only starts once every task it depends on is done."""
+        done = make_task(status=StatusLevel.DONE)
+        running = make_task(status=StatusLevel.IN_PROGRESS)
+        ready = make_task(dependencies=[str(done.task_id)])
+        blocked = make_task(dependencies=[done.task_id, running.task_id])
+        worker.task_db.get_tasks.return_value = [done, running, ready, blocked]
+
+        assert worker.poll_once() == 1
+        assert list(worker._in_flight) == [ready.task_id]
+
+    def test_task_available_event_waits_for_dependencies(self, worker):
+        """Test a streamed task does not start before its dependencies."""
+        dependency = make_task(status=StatusLevel.DONE)
+        saved = {dependency.task_id: dependency}
+        worker.task_db.get_task_by_id.side_effect = saved.get
+
+        worker.on_task_available(make_task(dependencies=[uuid4()]))
+        worker.on_task_available(make_task(dependencies=[dependency.task_id]))
+
+        assert worker._executor.submit.call_count == 1
+
+    def test_poll_respects_max_workers(self, worker):
+        """Test no more than max_workers tasks are in flight."""
+        worker.task_db.get_tasks.return_value = [make_task() for _ in range(5)]
+
+        assert worker.poll_once() == 2
+        assert worker.get_health()["in_flight"] == 2
+
+    def test_poll_handles_db_errors(self, worker):
+        """Test a failing poll is logged and does not raise."""
+        worker.task_db.get_tasks.side_effect = Exception("boom")
+
+        assert worker.poll_once() == 0
+
+    def test_task_available_event_submits_task(self, worker):
+        """Test a published task starts without waiting for the next poll."""
+        worker.on_task_available(make_task())
+        worker.on_task_available(make_task(status=StatusLevel.DONE))
+
+        assert worker._executor.submit.call_count == 1
+        worker.task_db.get_tasks.assert_not_called()
+
+    def test_polled_task_started_by_event_not_submitted_again(self, worker):
+        """Test a poll does not start a task already started by its event."""
+        task = make_task()
+        worker.task_db.get_tasks.return_value = [Task.to_cls(task.to_json())]
+
+        worker.on_task_available(task)
+
+        assert worker.poll_once() == 0
+        assert worker._executor.submit.call_count == 1
+
+    def test_run_task_updates_status(self, worker, registry):
+        """Test a task is marked in progress and then done."""
+        task = make_task()
+        statuses = []
+        worker.task_db.update_task.side_effect = lambda t: statuses.append(t.status)
+        usage = {"llm_calls": 2, "exceeded": None}
+        registry.get_agent.return_value.start_task.return_value = {
+            "messages": [],
+            "budget": usage,
+        }
+
+        worker._run_task(task)
+
+        registry.get_agent.return_value.start_task.assert_called_once_with(
+            task=task.description, budget=None
+        )
+        assert statuses == [StatusLevel.IN_PROGRESS, StatusLevel.DONE]
+        worker.task_db.save_run_result.assert_called_once_with(task.task_id, usage)
+        assert worker.get_health()["processed"] == 1
+
+    def test_run_task_budget_exceeded_saves_partial_result(self, worker, registry):
+        """Test a run stopped by its budget pauses the task with its output."""
+        task = make_task()
+        statuses = []
+        worker.task_db.update_task.side_effect = lambda t: statuses.append(t.status)
+        usage = {"llm_calls": 50, "exceeded": "LLM call limit of 50 reached"}
+        registry.get_agent.return_value.start_task.return_value = {
+            "messages": [
+                AIMessage(content="Half of the header is done"),
+                ToolMessage(content="", tool_call_id="call_1"),
+                AIMessage(
+                    content="Stopped: budget exceeded (LLM call limit).",
+                    name=STOP_MESSAGE_NAME,
+                ),
+            ],
+            "budget": usage,
+        }
+
+        worker._run_task(task)
+
+        assert statuses == [StatusLevel.IN_PROGRESS, StatusLevel.PAUSED]
+        worker.task_db.save_run_result.assert_called_once_with(
+            task.task_id, usage, "Half of the header is done"
+        )
+
+    def test_run_task_resumes_from_partial_result(self, worker, registry):
+        """Test a paused task planned again continues from its partial result."""
+        task = make_task()
+        task.partial_result = "Half of the header is done"
+        registry.get_agent.return_value.start_task.return_value = {
+            "messages": [],
+            "budget": {"exceeded": None},
+        }
+
+        worker._run_task(task)
+
+        prompt = registry.get_agent.return_value.start_task.call_args.kwargs["task"]
+        assert prompt.startswith(task.description)
+        assert prompt.endswith("Half of the header is done")
+        assert task.status == StatusLevel.DONE
+
+    def test_resume_task_runs_paused_task_from_partial_result(self, worker, registry):
+        """Test a resumed paused task is planned again and continues its output."""
+        task = make_task(status=StatusLevel.PAUSED)
+        task.partial_result = "Half of the header is done"
+        worker.task_db.get_task_by_id.side_effect = {task.task_id: task}.get
+        statuses = []
+        worker.task_db.update_task.side_effect = lambda t: statuses.append(t.status)
+        registry.get_agent.return_value.start_task.return_value = {
+            "messages": [],
+            "budget": {"exceeded": None},
+        }
+
+        assert worker.resume_task(task.task_id) is True
+        assert worker.resume_task(uuid4()) is False
+        run, submitted = worker._executor.submit.call_args.args
+        run(submitted)
+
+        prompt = registry.get_agent.return_value.start_task.call_args.kwargs["task"]
+        assert prompt.endswith("Half of the header is done")
+        assert statuses == [
+            StatusLevel.PLANNED,
+            StatusLevel.IN_PROGRESS,
+            StatusLevel.DONE,
+        ]
+        assert worker.resume_task(task.task_id) is False
+
+    def test_run_task_records_failure(self, worker, registry):
+        """Test a failed task is planned again until its attempts run out."""
+        task = make_task()
+        statuses = []
+        worker.task_db.update_task.side_effect = lambda t: statuses.append(t.status)
+        registry.get_agent.return_value.start_task.side_effect = Exception("fail")
+
+        for _ in range(worker.max_attempts):
+            worker._run_task(task)
+
+        health = worker.get_health()
+        assert health["failed"] == 3
+        assert health["in_flight"] == 0
+        assert statuses[1::2] == [
+            StatusLevel.PLANNED,
+            StatusLevel.PLANNED,
+            StatusLevel.FAILED,
+        ]
+        assert task.attempts == 3
+
+    def test_stop_drains_in_flight_tasks(self, registry):
+        """Test stop waits for running tasks and reports health along the way."""
+        release = threading.Event()
+
+        def start_task(task, budget):
+            release.wait(5)
+            return {"messages": [], "budget": {"exceeded": None}}
+
+        registry.get_agent.return_value.start_task.side_effect = start_task
+        worker = WorkerService(poll_interval=0.01, max_workers=1)
+        worker.warm_up = MagicMock()
+        worker.task_db = MagicMock()
+        worker.task_db.get_tasks.return_value = [make_task()]
+
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        while worker.get_health()["in_flight"] == 0:
+            pass
+        assert worker.get_health()["ready"] is True
+
+        worker.stop()
+        assert worker.get_health()["status"] == WorkerStatus.DRAINING.value
+        release.set()
+        thread.join(5)
+
+        assert worker.status == WorkerStatus.STOPPED
+        assert worker.get_health()["processed"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,154 @@
+import pytest
+import os
+import re
+import tempfile
+from backend.services.tool.workspace_index import (
+    WorkspaceIndex,
+    glob_to_regex,
+    required_literals,
+)
+
+
+class TestWorkspaceIndex:
+    """Test cases for WorkspaceIndex."""
+
+    @pytest.fixture
+    def workspace(self):
+        """Create a small project with sources, dependencies and a binary."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = {
+                "src/App.tsx": (
+                    "import { Button } from './components/Button';\n\n"
+                    "export default function App() {\n"
+                    "  const [count, setCount] = useState(0);\n"
+                    "  return <Button label='Add' />;\n"
+                    "}\n"
+                ),
+                "src/components/Button.tsx": (
+                    "export interface ButtonProps { label: string }\n"
+                    "export const Button = ({ label }: ButtonProps) => (\n"
+                    "  <button>{label}</button>\n"
+                    ");\n"
+                ),
+                "scripts/build.py": "class Builder:\n    def run(self):\n        pass\n",
+                "node_modules/react/index.js": "function useState() {}\n",
+            }
+            for path, content in files.items():
+                os.makedirs(os.path.dirname(os.path.join(tmpdir, path)), exist_ok=True)
+                with open(os.path.join(tmpdir, path), "w") as f:
+                    f.write(content)
+            with open(os.path.join(tmpdir, "logo.png"), "wb") as f:
+                f.write(b"\x89PNG\0\0useState")
+            yield tmpdir
+
+    def test_glob(self, workspace):
+        """Test globs match paths, and names at any depth without a slash."""
+        index = WorkspaceIndex(workspace)
+
+        assert index.glob("src/**/*.tsx", 10) == (
+            ["src/App.tsx", "src/components/Button.tsx"],
+            2,
+        )
+        assert index.glob("*.{py,png}", 10)[0] == ["logo.png", "scripts/build.py"]
+        assert index.glob("*.js", 10) == ([], 0)  # node_modules is skipped
+        assert index.glob("src/*", 1) == (["src/App.tsx"], 1)
+
+    def test_grep_reads_only_candidate_files(self, workspace):
+        """Test the trigram index narrows grep down to files that can match."""
+        index = WorkspaceIndex(workspace)
+
+        matches, files_searched, truncated = index.grep("useState(")
+
+        assert matches == [
+            {
+                "file": "src/App.tsx",
+                "line": 4,
+                "text": "const [count, setCount] = useState(0);",
+            }
+        ]
+        assert files_searched == 1
+        assert truncated is False
+
+    def test_grep_options(self, workspace):
+        """Test regex, case-insensitive, glob-filtered and limited searches."""
+        index = WorkspaceIndex(workspace)
+
+        regex = index.grep(r"export\s+(const|default)", regex=True)[0]
+        assert [(m["file"], m["line"]) for m in regex] == [
+            ("src/App.tsx", 3),
+            ("src/components/Button.tsx", 2),
+        ]
+        assert len(index.grep("BUTTON", ignore_case=True)[0]) == 5
+        assert index.grep("BUTTON")[0] == []
+        assert index.grep("label", path_glob="App.tsx")[0][0]["line"] == 5
+        matches, _, truncated = index.grep("label", limit=2)
+        assert len(matches) == 2 and truncated is True
+        with pytest.raises(re.error):
+            index.grep("(", regex=True)
+
+    def test_symbols(self, workspace):
+        """Test definitions are found by name, best matches first."""
+        index = WorkspaceIndex(workspace)
+
+        symbols, total = index.find_symbols("button")
+
+        assert total == 2
+        assert [(s["name"], s["kind"], s["line"]) for s in symbols] == [
+            ("Button", "variable", 2),
+            ("ButtonProps", "interface", 1),
+        ]
+        assert index.find_symbols("run", kind="function")[0] == [
+            {"name": "run", "kind": "function", "file": "scripts/build.py", "line": 2}
+        ]
+
+    def test_incremental_updates(self, workspace):
+        """Test refresh and update_file only re-read changed files."""
+        index = WorkspaceIndex(workspace)
+        index.refresh()
+        digest = index.digest("src/App.tsx")
+
+        path = os.path.join(workspace, "src", "Nav.tsx")
+        with open(path, "w") as f:
+            f.write("export function Nav() {}\n")
+        index.update_file(path)
+        assert index.find_symbols("Nav")[1] == 1
+        assert index.refresh() == {"added": 0, "updated": 0, "removed": 0}
+
+        os.remove(path)
+        os.remove(os.path.join(workspace, "scripts", "build.py"))
+        assert index.refresh() == {"added": 0, "updated": 0, "removed": 2}
+        assert index.find_symbols("Nav")[1] == 0
+        assert index.grep("Builder")[0] == []
+        assert index.digest("src/App.tsx") == digest
+
+    def test_stale_index_refreshes_before_query(self, workspace):
+        """Test changes made behind the index's back show after mark_stale."""
+        index = WorkspaceIndex(workspace)
+        index.glob("*", 10)
+        with open(os.path.join(workspace, "README.md"), "w") as f:
+            f.write("# App\n")
+
+        assert "README.md" not in index.glob("*", 10)[0]
+        index.mark_stale()
+        assert "README.md" in index.glob("*", 10)[0]
+
+    def test_required_literals(self):
+        """Test literals are only taken where every match must contain them."""
+        assert required_literals(r"useState\(") == ["useState("]
+        assert required_literals(r"\bclass\s+Button") == ["class", "Button"]
+        assert required_literals("(abc)?defg") == ["defg"]
+        assert required_literals("a{2}bcd") == ["bcd"]
+        assert required_literals("abcd?e") == ["abc"]
+        assert required_literals("foo|bar") == []
+
+    def test_glob_to_regex(self):
+        """Test glob syntax translation."""
+        assert re.match(glob_to_regex("src/**/*.ts"), "src/a/b/c.ts")
+        assert re.match(glob_to_regex("src/**/*.ts"), "src/c.ts")
+        assert not re.match(glob_to_regex("src/*.ts"), "src/a/c.ts")
+        assert re.match(glob_to_regex("[!a]?.{js,ts}"), "bc.ts")
+        assert not re.match(glob_to_regex("[!a]?.{js,ts}"), "ac.ts")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+import pytest
+import os
+import tempfile
+import time
+from backend.services.tool.workspace_manager import WorkspaceManager
+
+
+class TestWorkspaceManager:
+    """Test cases for WorkspaceManager."""
+
+    @pytest.fixture
+    def root_dir(self):
+        """Create a temporary root directory for templates and workspaces."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            yield tmpdir
+
+    @pytest.fixture
+    def project_dir(self):
+        """Create a small project with installed dependencies."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "src"))
+            os.makedirs(os.path.join(tmpdir, "node_modules", "react"))
+            with open(os.path.join(tmpdir, "package.json"), "w") as f:
+                f.write('{"name": "app"}')
+            with open(os.path.join(tmpdir, "src", "App.tsx"), "w") as f:
+                f.write("export default function App() {}")
+            with open(
+                os.path.join(tmpdir, "node_modules", "react", "index.js"), "w"
+            ) as f:
+                f.write("module.exports = {}")
+            os.makedirs(os.path.join(tmpdir, "node_modules", ".bin"))
+            os.symlink(
+                "../react/index.js",
+                os.path.join(tmpdir, "node_modules", ".bin", "react"),
+            )
+            yield tmpdir
+
+    def test_create_workspace_from_template(self, root_dir, project_dir):
+        """Test a workspace has the template's files, links and dependencies."""
+        manager = WorkspaceManager(root_dir)
+        manager.add_template("react", project_dir)
+
+        workspace = manager.create_workspace("react")
+
+        assert manager.list_templates() == ["react"]
+        with open(os.path.join(workspace, "src", "App.tsx")) as f:
+            assert f.read() == "export default function App() {}"
+        link = os.path.join(workspace, "node_modules", ".bin", "react")
+        assert os.readlink(link) == "../react/index.js"
+        assert os.path.isfile(
+            os.path.join(workspace, "node_modules", "react", "index.js")
+        )
+
+    def test_workspace_edits_do_not_touch_template(self, root_dir, project_dir):
+        """Test source files are not shared with the template."""
+        manager = WorkspaceManager(root_dir)
+        template = manager.add_template("react", project_dir)
+        workspace = manager.create_workspace("react")
+
+        with open(os.path.join(workspace, "src", "App.tsx"), "w") as f:
+            f.write("changed")
+
+        with open(os.path.join(template, "src", "App.tsx")) as f:
+            assert f.read() == "export default function App() {}"
+
+    def test_dependencies_are_shared(self, root_dir, project_dir):
+        """Test node_modules files are cloned without copying their data."""
+        manager = WorkspaceManager(root_dir)
+        template = manager.add_template("react", project_dir)
+        workspace = manager.create_workspace("react")
+
+        path = os.path.join("node_modules", "react", "index.js")
+        if manager.stats["reflinked"]:
+            assert manager.stats["hardlinked"] == 0
+        else:
+            assert manager.stats["hardlinked"] == 2  # one per template and workspace
+            assert os.path.samefile(
+                os.path.join(template, path), os.path.join(workspace, path)
+            )
+            assert not os.path.samefile(
+                os.path.join(template, "package.json"),
+                os.path.join(workspace, "package.json"),
+            )
+
+    def test_empty_workspace_and_invalid_names(self, root_dir):
+        """Test empty workspaces and rejection of unknown templates and bad names."""
+        manager = WorkspaceManager(root_dir)
+
+        workspace = manager.create_workspace(workspace_id="run-1")
+
+        assert os.listdir(workspace) == []
+        with pytest.raises(ValueError):
+            manager.create_workspace(workspace_id="run-1")
+        with pytest.raises(ValueError):
+            manager.create_workspace("missing")
+        with pytest.raises(ValueError):
+            manager.create_workspace(workspace_id="../escape")
+
+    def test_garbage_collection(self, root_dir):
+        """Test old and excess workspaces are removed, active ones are kept."""
+        manager = WorkspaceManager(root_dir, max_age_seconds=60, max_workspaces=3)
+        for workspace_id in ("old", "a", "b", "active"):
+            manager.create_workspace(workspace_id=workspace_id)
+        for workspace_id in ("old", "a", "b"):
+            manager.release_workspace(workspace_id)
+        past = time.time() - 120
+        os.utime(os.path.join(manager.workspaces_dir, "old"), (past, past))
+        os.utime(os.path.join(manager.workspaces_dir, "a"), (past + 90, past + 90))
+
+        removed = manager.collect_garbage()
+
+        assert removed == ["old"]
+        manager.create_workspace(workspace_id="new")
+        assert sorted(os.listdir(manager.workspaces_dir)) == ["active", "b", "new"]
+
+    def test_release_with_remove(self, root_dir):
+        """Test a released workspace can be removed right away."""
+        manager = WorkspaceManager(root_dir)
+        workspace = manager.create_workspace(workspace_id="run-1")
+
+        manager.release_workspace("run-1", remove=True)
+
+        assert not os.path.exists(workspace)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])